@@ -0,0 +1,167 @@
+# bench_singlestore_client.py
+"""
+Same analytics workload on every SingleStoreClient backend
+(singlestore_client.py).
+
+Backends
+  sqlite      local stand-in file (always)
+  duckdb      local stand-in file (if duckdb is installed)
+  pymysql     }  a MySQL-protocol server (local MySQL / SingleStore dev
+  sqlalchemy  }  container), only when SINGLESTORE_HOST is set
+
+Workload, per backend, on a scratch table (--table, dropped afterwards):
+  load        batch_insert_dataframe of --rows rows built from
+              uk_price_paid_sample_1000.csv with dates spread over 1995-2024
+  reports     the four report aggregates (type / county / monthly / yearly),
+              one after another through execute_query
+  concurrent  the same four through execute_many_queries (cache cleared)
+  cached      the same four again, served from the result cache
+  dataframe   get_dataframe of the whole table
+
+Usage:
+    python bench_singlestore_client.py --rows 200000
+    python bench_singlestore_client.py --backends sqlite duckdb
+"""
+import argparse
+import csv
+import logging
+import os
+import random
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from singlestore_client import (SingleStoreClient, SQLiteBackend, DuckDBBackend, PyMySQLBackend,
+                                SQLAlchemyBackend, HAS_DUCKDB, HAS_SQLALCHEMY)
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uk_price_paid_sample_1000.csv')
+
+DDL = """
+    CREATE TABLE {table} (
+        price BIGINT, date DATE, postcode VARCHAR(10), type VARCHAR(20), is_new INT,
+        duration VARCHAR(20), addr1 VARCHAR(100), addr2 VARCHAR(100), street VARCHAR(100),
+        locality VARCHAR(100), town VARCHAR(100), district VARCHAR(100), county VARCHAR(100)
+    )
+"""
+
+REPORTS = {
+    'type_analysis': """
+        SELECT type, COUNT(*) as count, AVG(price) as avg_price, MIN(price) as min_price,
+               MAX(price) as max_price,
+               COUNT(*) * 100.0 / (SELECT COUNT(*) FROM {table}) as percentage
+        FROM {table} GROUP BY type ORDER BY count DESC
+    """,
+    'county_analysis': """
+        SELECT county, COUNT(*) as transactions, AVG(price) as avg_price, MAX(price) as max_price
+        FROM {table} WHERE county IS NOT NULL AND county != ''
+        GROUP BY county ORDER BY avg_price DESC LIMIT 10
+    """,
+    'monthly_trends': """
+        SELECT YEAR(date) as year, MONTH(date) as month, COUNT(*) as transactions,
+               AVG(price) as avg_price
+        FROM {table} WHERE YEAR(date) = 2024
+        GROUP BY YEAR(date), MONTH(date) ORDER BY year, month
+    """,
+    'yearly_trends': """
+        SELECT YEAR(date) as year, COUNT(*) as transactions, AVG(price) as avg_price,
+               MIN(price) as min_price, MAX(price) as max_price
+        FROM {table} WHERE date IS NOT NULL
+        GROUP BY YEAR(date) ORDER BY year DESC LIMIT 10
+    """,
+}
+
+
+def build_frame(n_rows: int, seed: int = 7) -> pd.DataFrame:
+    with open(SAMPLE, newline='') as fh:
+        rows = list(csv.reader(fh))
+    header, sample = rows[0], rows[1:]
+    rng = random.Random(seed)
+    out = []
+    for i in range(n_rows):
+        r = list(sample[i % len(sample)])
+        r[0] = int(int(r[0]) * rng.uniform(0.5, 1.5))
+        r[1] = f"{rng.randint(1995, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        r[4] = int(r[4])
+        out.append(r)
+    df = pd.DataFrame(out, columns=header)
+    df['date'] = pd.to_datetime(df['date']).dt.date
+    return df
+
+
+def backends(names, tmp):
+    for name in names:
+        if name == 'sqlite':
+            yield name, lambda: SQLiteBackend(os.path.join(tmp, 'bench.db'))
+        elif name == 'duckdb':
+            if HAS_DUCKDB:
+                yield name, lambda: DuckDBBackend(os.path.join(tmp, 'bench.duckdb'))
+            else:
+                print("ℹ️  duckdb not installed; skipping")
+        elif not os.getenv('SINGLESTORE_HOST'):
+            print(f"ℹ️  SINGLESTORE_HOST not set; skipping {name}")
+        elif name == 'sqlalchemy' and not HAS_SQLALCHEMY:
+            print("ℹ️  SQLAlchemy not installed; skipping")
+        else:
+            yield name, PyMySQLBackend if name == 'pymysql' else SQLAlchemyBackend
+
+
+def timed(fn):
+    t0 = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - t0
+
+
+def run_workload(db: SingleStoreClient, df: pd.DataFrame, table: str):
+    reports = {name: sql.format(table=table) for name, sql in REPORTS.items()}
+    db.execute_command(f"DROP TABLE IF EXISTS {table}")
+    db.execute_command(DDL.format(table=table))
+    timings = {}
+    ok, timings['load'] = timed(lambda: db.batch_insert_dataframe(df, table, workers=4))
+    assert ok, "load failed"
+
+    db.cache.clear()
+    results, timings['reports'] = timed(lambda: {n: db.execute_query(q) for n, q in reports.items()})
+    db.cache.clear()
+    concurrent, timings['concurrent'] = timed(lambda: db.execute_many_queries(reports))
+    _, timings['cached'] = timed(lambda: db.execute_many_queries(reports))
+    frame, timings['dataframe'] = timed(lambda: db.get_dataframe(f"SELECT * FROM {table}"))
+
+    assert all(results[n] for n in reports), "a report came back empty"
+    assert [r['count'] for r in results['type_analysis']] == \
+           [r['count'] for r in concurrent['type_analysis']]
+    assert len(frame) == len(df)
+    db.execute_command(f"DROP TABLE IF EXISTS {table}")
+    return timings, sum(r['count'] for r in results['type_analysis'])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Analytics workload on every SingleStoreClient backend")
+    ap.add_argument('--rows', type=int, default=200_000)
+    ap.add_argument('--table', default='uk_price_paid_bench')
+    ap.add_argument('--backends', nargs='+', default=['sqlite', 'duckdb', 'pymysql', 'sqlalchemy'])
+    args = ap.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    df = build_frame(args.rows)
+    tmp = tempfile.mkdtemp(prefix='bench_client_')
+    steps = ['load', 'reports', 'concurrent', 'cached', 'dataframe']
+    print(f"🚀 SingleStoreClient workload — {args.rows:,} rows")
+    print("=" * 78)
+    print(f"  {'BACKEND':<11}" + ''.join(f"{s.upper():>12}" for s in steps) + "   (seconds)")
+    print("-" * 78)
+    try:
+        for name, make in backends(args.backends, tmp):
+            db = SingleStoreClient(make())
+            timings, counted = run_workload(db, df, args.table)
+            assert counted == args.rows, f"{name}: {counted} rows counted"
+            print(f"  {name:<11}" + ''.join(f"{timings[s]:>12.3f}" for s in steps))
+            db.close()
+    finally:
+        shutil.rmtree(tmp)
+    print("=" * 78)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,124 @@
+# bench_singlestore_frames.py
+"""
+get_dataframe result paths, rows/s and peak memory:
+
+  dict    DictCursor-style rows → pd.DataFrame(list of dicts) → pd.to_numeric /
+          pd.to_datetime fix-up (the old export_data_properly path)
+  numpy   singlestore_frames.fetch_dataframe(engine='numpy')
+  arrow   singlestore_frames.fetch_dataframe(engine='arrow')   (needs pyarrow)
+
+Backends
+  sqlite  local stand-in: uk_price_paid with --rows rows
+          (bench_singlestore_parallel_extract.build_stand_in)
+  mysql   any MySQL-protocol server holding uk_price_paid; settings from the
+          SINGLESTORE_* variables. Use LIMIT via --rows.
+
+Peak memory is Python-heap peak measured with tracemalloc (NumPy and Arrow
+buffers are included; Arrow's own allocator is reported separately).
+
+Usage:
+    python bench_singlestore_frames.py --rows 1000000
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+from bench_singlestore_parallel_extract import build_stand_in
+from singlestore_export import HAS_PYARROW
+from singlestore_frames import fetch_dataframe
+from singlestore_pool import ConnectionPool
+
+
+def dict_path(pool, query, dict_cursor):
+    with pool.connection() as conn:
+        cur = dict_cursor(conn)
+        cur.execute(query)
+        data = cur.fetchall()
+        cur.close()
+    df = pd.DataFrame(data)
+    for col in ['price', 'is_new']:
+        if col in df.columns:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+    for col in ['date']:
+        if col in df.columns:
+            df[col] = pd.to_datetime(df[col], errors='coerce')
+    return df
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    df = fn()
+    secs = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return df, secs, peak
+
+
+def main():
+    ap = argparse.ArgumentParser(description="get_dataframe dict path vs typed columnar path")
+    ap.add_argument('--backend', choices=['sqlite', 'mysql'], default='sqlite')
+    ap.add_argument('--rows', type=int, default=1_000_000)
+    args = ap.parse_args()
+
+    tmp = None
+    query = f"SELECT * FROM uk_price_paid LIMIT {args.rows}"
+    if args.backend == 'sqlite':
+        tmp = tempfile.mkdtemp(prefix='bench_frames_')
+        db_path = os.path.join(tmp, 'uk.db')
+        build_stand_in(db_path, args.rows)
+        connect = lambda: sqlite3.connect(db_path, check_same_thread=False)
+
+        def dict_cursor(conn):
+            conn.row_factory = lambda c, r: {d[0]: v for d, v in zip(c.description, r)}
+            return conn.cursor()
+
+        def typed_cursor(conn):
+            conn.row_factory = None
+            return conn.cursor()
+        extra = {'cursor_factory': typed_cursor, 'dtypes': {'date': 'date'}}
+    else:
+        import pymysql
+        from singlestore_export import _sscursor
+
+        config = {
+            'host': os.getenv('SINGLESTORE_HOST', '127.0.0.1'),
+            'port': int(os.getenv('SINGLESTORE_PORT', 3306)),
+            'user': os.getenv('SINGLESTORE_USER', 'root'),
+            'password': os.getenv('SINGLESTORE_PASSWORD', ''),
+            'database': os.getenv('SINGLESTORE_DATABASE'),
+            'charset': 'utf8mb4',
+            'autocommit': True,
+        }
+        connect = lambda: pymysql.connect(**config)
+        dict_cursor = lambda conn: conn.cursor(pymysql.cursors.DictCursor)
+        extra = {'cursor_factory': _sscursor}
+
+    paths = [('dict', lambda: dict_path(pool, query, dict_cursor)),
+             ('numpy', lambda: fetch_dataframe(pool, query, engine='numpy', **extra))]
+    if HAS_PYARROW:
+        paths.append(('arrow', lambda: fetch_dataframe(pool, query, engine='arrow', **extra)))
+
+    print(f"🚀 get_dataframe paths — backend={args.backend}, {args.rows:,} rows")
+    print("=" * 70)
+    print(f"  {'PATH':<8} {'SECONDS':>9} {'ROWS/S':>12} {'PEAK MB':>9}  DTYPES (price, date)")
+    print("-" * 70)
+    with ConnectionPool(connect, max_size=1, name=args.backend) as pool:
+        for name, fn in paths:
+            df, secs, peak = measure(fn)
+            print(f"  {name:<8} {secs:>9.2f} {len(df) / secs:>12,.0f} {peak / 1e6:>9.1f}  "
+                  f"{df['price'].dtype}, {df['date'].dtype}")
+            del df
+    print("=" * 70)
+    if tmp:
+        shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+# bench_singlestore_parallel_extract.py
+"""
+Partitioned extract throughput at 1, 4 and 8 workers
+(singlestore_parallel_extract.py).
+
+Backends
+  sqlite  local stand-in: a uk_price_paid table of --rows rows built from
+          uk_price_paid_sample_1000.csv with dates spread over 1995-2024.
+  mysql   any MySQL-protocol server holding uk_price_paid (local MySQL /
+          SingleStore dev container); settings from the SINGLESTORE_*
+          variables.
+
+Each run plans --partitions year ranges, checks coverage/overlap, extracts
+into a fresh temp directory and verifies the rows written.
+
+Usage:
+    python bench_singlestore_parallel_extract.py --rows 300000 --workers 1 4 8
+"""
+import argparse
+import csv
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from singlestore_export import HAS_PYARROW
+from singlestore_parallel_extract import extract_partitioned
+from singlestore_pool import ConnectionPool
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uk_price_paid_sample_1000.csv')
+SQLITE_YEAR = "CAST(strftime('%Y', {key}) AS INTEGER)"
+
+
+def build_stand_in(path: str, n_rows: int, seed: int = 7):
+    with open(SAMPLE, newline='') as fh:
+        rows = list(csv.reader(fh))
+    header, sample = rows[0], rows[1:]
+    rng = random.Random(seed)
+    con = sqlite3.connect(path)
+    con.execute(f"CREATE TABLE uk_price_paid ({', '.join(header)})")
+    batch = []
+    for i in range(n_rows):
+        r = list(sample[i % len(sample)])
+        r[0] = int(int(r[0]) * rng.uniform(0.5, 1.5))
+        r[1] = f"{rng.randint(1995, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}"
+        batch.append(r)
+        if len(batch) == 50_000:
+            con.executemany(f"INSERT INTO uk_price_paid VALUES ({', '.join('?' * len(header))})", batch)
+            batch = []
+    if batch:
+        con.executemany(f"INSERT INTO uk_price_paid VALUES ({', '.join('?' * len(header))})", batch)
+    con.commit()
+    con.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Parallel partitioned extract benchmark")
+    ap.add_argument('--backend', choices=['sqlite', 'mysql'], default='sqlite')
+    ap.add_argument('--rows', type=int, default=300_000)
+    ap.add_argument('--workers', type=int, nargs='*', default=[1, 4, 8])
+    ap.add_argument('--partitions', type=int, default=16)
+    ap.add_argument('--format', choices=['parquet', 'csv'],
+                    default='parquet' if HAS_PYARROW else 'csv')
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='bench_extract_')
+    if args.backend == 'sqlite':
+        db_path = os.path.join(tmp, 'uk.db')
+        t0 = time.perf_counter()
+        build_stand_in(db_path, args.rows)
+        print(f"[+] Stand-in: {args.rows:,} rows ({os.path.getsize(db_path) / 1e6:.1f} MB) "
+              f"in {time.perf_counter() - t0:.1f}s")
+        connect = lambda: sqlite3.connect(db_path, check_same_thread=False)
+        extra = {'cursor_factory': lambda c: c.cursor(), 'year_expr': SQLITE_YEAR}
+    else:
+        import pymysql
+        from singlestore_export import _sscursor
+
+        config = {
+            'host': os.getenv('SINGLESTORE_HOST', '127.0.0.1'),
+            'port': int(os.getenv('SINGLESTORE_PORT', 3306)),
+            'user': os.getenv('SINGLESTORE_USER', 'root'),
+            'password': os.getenv('SINGLESTORE_PASSWORD', ''),
+            'database': os.getenv('SINGLESTORE_DATABASE'),
+            'charset': 'utf8mb4',
+            'autocommit': True,
+        }
+        connect = lambda: pymysql.connect(**config)
+        extra = {'cursor_factory': _sscursor}
+
+    print(f"\n{'─'*72}")
+    print(f"  {'WORKERS':>7} {'SECONDS':>9} {'ROWS/S':>12} {'SPEEDUP':>8} {'PARTS':>6} {'CHECK':>8} {'ROWS OK':>8}")
+    print(f"{'─'*72}")
+    base = None
+    for workers in args.workers:
+        out = os.path.join(tmp, f"out_{workers}")
+        with ConnectionPool(connect, max_size=workers, name=args.backend) as pool:
+            t0 = time.perf_counter()
+            m = extract_partitioned(pool, out_dir=out, partitions=args.partitions,
+                                    workers=workers, fmt=args.format, resume=False, **extra)
+            secs = time.perf_counter() - t0
+        base = base or secs
+        print(f"  {workers:>7} {secs:>9.2f} {m['rows'] / secs:>12,.0f} {base / secs:>7.2f}x "
+              f"{len(m['partitions']):>6} {'ok' if m['check']['ok'] else 'FAIL':>8} "
+              f"{'yes' if m['rows_match'] else 'NO':>8}")
+        shutil.rmtree(out)
+    print(f"{'─'*72}")
+    shutil.rmtree(tmp)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,121 @@
+# bench_singlestore_pool.py
+"""
+Queries per second: connect-per-query (the old get_connection) vs the shared
+connection pool (singlestore_pool.py), over 1..N client threads.
+
+Backends
+  mysql   pymysql against any MySQL-protocol server. Point it at a local
+          stand-in rather than the cloud cluster, e.g.
+              docker run -d -p 3306:3306 -e MYSQL_ALLOW_EMPTY_PASSWORD=1 mysql:8
+              python bench_singlestore_pool.py --backend mysql --host 127.0.0.1 --port 3306 --user root
+          Connection settings default to the SINGLESTORE_* variables.
+  sqlite  in-process stand-in: sqlite3 connections with a simulated
+          handshake (--handshake-ms) so the cost of connecting is visible
+          without a server.
+
+Usage:
+    python bench_singlestore_pool.py --backend sqlite --queries 2000 --threads 1 4 8
+"""
+import argparse
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from singlestore_pool import ConnectionPool
+
+QUERY = "SELECT 1"
+
+
+def mysql_connect(args):
+    import pymysql
+
+    config = {
+        'host': args.host or os.getenv('SINGLESTORE_HOST', '127.0.0.1'),
+        'port': args.port or int(os.getenv('SINGLESTORE_PORT', 3306)),
+        'user': args.user or os.getenv('SINGLESTORE_USER', 'root'),
+        'password': args.password if args.password is not None else os.getenv('SINGLESTORE_PASSWORD', ''),
+        'database': args.database or os.getenv('SINGLESTORE_DATABASE'),
+        'charset': 'utf8mb4',
+        'autocommit': True,
+    }
+    if args.ssl:
+        config['ssl'] = {'ssl_disabled': False}
+    return lambda: pymysql.connect(**config), lambda c: c.ping(reconnect=False)
+
+
+def sqlite_connect(args):
+    delay = args.handshake_ms / 1000.0
+
+    def connect():
+        time.sleep(delay)                      # TCP + TLS + auth round trips
+        return sqlite3.connect(':memory:', check_same_thread=False)
+    return connect, lambda c: c.execute(QUERY)
+
+
+def run_query(conn):
+    cur = conn.cursor()
+    cur.execute(QUERY)
+    cur.fetchall()
+    cur.close()
+
+
+def connect_per_query(connect, n_queries, threads):
+    def one(_):
+        conn = connect()
+        try:
+            run_query(conn)
+        finally:
+            conn.close()
+    with ThreadPoolExecutor(threads) as ex:
+        list(ex.map(one, range(n_queries)))
+
+
+def pooled(pool, n_queries, threads):
+    def one(_):
+        with pool.connection() as conn:
+            run_query(conn)
+    with ThreadPoolExecutor(threads) as ex:
+        list(ex.map(one, range(n_queries)))
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Connection pool vs connect-per-query")
+    ap.add_argument('--backend', choices=['mysql', 'sqlite'], default='sqlite')
+    ap.add_argument('--queries', type=int, default=1000)
+    ap.add_argument('--threads', type=int, nargs='*', default=[1, 4, 8])
+    ap.add_argument('--pool-size', type=int, default=8)
+    ap.add_argument('--handshake-ms', type=float, default=20.0)
+    ap.add_argument('--host')
+    ap.add_argument('--port', type=int)
+    ap.add_argument('--user')
+    ap.add_argument('--password')
+    ap.add_argument('--database')
+    ap.add_argument('--ssl', action='store_true')
+    args = ap.parse_args()
+
+    connect, ping = (mysql_connect if args.backend == 'mysql' else sqlite_connect)(args)
+
+    print(f"🚀 Pool benchmark — backend={args.backend}, {args.queries:,} queries of {QUERY!r}")
+    print("=" * 78)
+    print(f"  {'THREADS':>7} {'CONNECT/QUERY q/s':>18} {'POOLED q/s':>12} {'SPEEDUP':>8} "
+          f"{'REUSE':>7} {'WAIT AVG ms':>12}")
+    print("-" * 78)
+    for threads in args.threads:
+        t0 = time.perf_counter()
+        connect_per_query(connect, args.queries, threads)
+        base = args.queries / (time.perf_counter() - t0)
+
+        with ConnectionPool(connect, min_size=1, max_size=args.pool_size,
+                            health_check=ping, name=args.backend) as pool:
+            t0 = time.perf_counter()
+            pooled(pool, args.queries, threads)
+            fast = args.queries / (time.perf_counter() - t0)
+            s = pool.stats()
+        print(f"  {threads:>7} {base:>18,.0f} {fast:>12,.0f} {fast / base:>7.1f}x "
+              f"{s['reuse_rate']:>7.1%} {s['wait_avg'] * 1000:>12.3f}")
+    print("=" * 78)
+
+
+if __name__ == '__main__':
+    main()
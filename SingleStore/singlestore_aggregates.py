@@ -0,0 +1,448 @@
+# singlestore_aggregates.py
+"""
+Incrementally maintained summary tables for uk_price_paid.
+
+The report methods recompute the yearly trend, the property-type
+distribution and the county averages with full scans of uk_price_paid.
+These two tables hold the same aggregates pre-grouped:
+
+    agg_price_by_year_type      (year, type)           n_rows, n, total, min_price, max_price
+    agg_price_by_county_month   (county, year, month)  n_rows, n, total, min_price, max_price
+    agg_state                   (source)               stale, updated_at
+
+n_rows counts every row (COUNT(*)), n only the rows with a price
+(COUNT(price)); avg = SUM(total) / SUM(n). Counts, sums, minimums and
+maximums all merge,
+so new rows are folded in with one upsert per touched group:
+
+  bulk loader     bulk_load(on_loaded=aggregates.apply_rows) — each chunk's
+                  rows once the chunk has committed (SingleStoreDB.
+                  batch_insert_dataframe does this for uk_price_paid)
+  execute_command aggregates.apply_write(command, params, rowcount, conn) —
+                  plain INSERT … (cols) VALUES (%s, …)[, (…)] statements are
+                  applied; any other write to uk_price_paid (UPDATE, DELETE,
+                  INSERT … SELECT, LOAD DATA, unparseable SQL) marks the
+                  summaries stale. Both run on the write's own connection
+                  and commit with it, so a failure in between cannot leave
+                  fresh-looking summaries that miss the write
+
+Reports read the summaries only while they are fresh: prefer() swaps a
+report's base-table query for its summary equivalent (SUMMARY_SQL, same
+column names) when agg_state says not stale. rebuild() recomputes
+everything from uk_price_paid and clears the stale flag; check() compares
+the summaries with a full recompute.
+
+Rows with a NULL price count in n_rows only, so counts and percentages
+match the COUNT(*) of the base queries either way (price is NOT NULL in
+uk_price_paid); NULL type / county are stored as '' and a NULL date as
+year 0 / month 0, since key columns cannot be NULL. The reports leave NULL
+types and counties out, so SUMMARY_SQL skips the '' groups. rebuild() drops and
+recreates the tables, so it also brings older layouts up to date.
+
+Usage:
+    python singlestore_aggregates.py rebuild     # create + fill, mark fresh
+    python singlestore_aggregates.py check       # compare with a recompute
+    python singlestore_aggregates.py status
+"""
+import argparse
+import datetime
+import logging
+import re
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from singlestore_bulk_load import _py
+from singlestore_cache import tables_written
+
+logger = logging.getLogger(__name__)
+
+SOURCE = 'uk_price_paid'
+
+# table → [(key column, SQL type, source expression)]
+AGGREGATES = {
+    'agg_price_by_year_type': [
+        ('year', 'INT', '{year}'),
+        ('type', 'VARCHAR(50)', "COALESCE(type, '')"),
+    ],
+    'agg_price_by_county_month': [
+        ('county', 'VARCHAR(100)', "COALESCE(county, '')"),
+        ('year', 'INT', '{year}'),
+        ('month', 'INT', '{month}'),
+    ],
+}
+STATE_TABLE = 'agg_state'
+
+DIALECTS = {
+    'mysql': {
+        'placeholder': '%s',
+        'year': 'COALESCE(YEAR(date), 0)',
+        'month': 'COALESCE(MONTH(date), 0)',
+        'total': 'DECIMAL(38, 2)',
+        'now': 'NOW()',
+        'upsert': ("ON DUPLICATE KEY UPDATE n_rows = n_rows + VALUES(n_rows), n = n + VALUES(n), "
+                   "total = total + VALUES(total), "
+                   "min_price = COALESCE(LEAST(min_price, VALUES(min_price)), "
+                   "min_price, VALUES(min_price)), "
+                   "max_price = COALESCE(GREATEST(max_price, VALUES(max_price)), "
+                   "max_price, VALUES(max_price))"),
+        'state_upsert': "ON DUPLICATE KEY UPDATE stale = VALUES(stale), updated_at = VALUES(updated_at)",
+    },
+    'sqlite': {
+        'placeholder': '?',
+        'year': "COALESCE(CAST(strftime('%Y', date) AS INTEGER), 0)",
+        'month': "COALESCE(CAST(strftime('%m', date) AS INTEGER), 0)",
+        'total': 'REAL',
+        'now': "datetime('now')",
+        'upsert': ("ON CONFLICT ({keys}) DO UPDATE SET n_rows = n_rows + excluded.n_rows, "
+                   "n = n + excluded.n, total = total + excluded.total, "
+                   "min_price = COALESCE(MIN(min_price, excluded.min_price), "
+                   "min_price, excluded.min_price), "
+                   "max_price = COALESCE(MAX(max_price, excluded.max_price), "
+                   "max_price, excluded.max_price)"),
+        'state_upsert': ("ON CONFLICT (source) DO UPDATE SET stale = excluded.stale, "
+                         "updated_at = excluded.updated_at"),
+    },
+    'duckdb': {
+        'placeholder': '?',
+        'year': 'COALESCE(YEAR(date), 0)',
+        'month': 'COALESCE(MONTH(date), 0)',
+        'total': 'DOUBLE',
+        'now': 'CAST(now() AS TIMESTAMP)',
+        'upsert': ("ON CONFLICT ({keys}) DO UPDATE SET n_rows = n_rows + excluded.n_rows, "
+                   "n = n + excluded.n, total = total + excluded.total, "
+                   "min_price = LEAST(min_price, excluded.min_price), "
+                   "max_price = GREATEST(max_price, excluded.max_price)"),
+        'state_upsert': ("ON CONFLICT (source) DO UPDATE SET stale = excluded.stale, "
+                         "updated_at = excluded.updated_at"),
+    },
+}
+
+# Summary equivalents of the report queries, by the name the reports use
+SUMMARY_SQL = {
+    'type_analysis': """
+        SELECT
+            type,
+            SUM(n_rows) as count,
+            SUM(total) / NULLIF(SUM(n), 0) as avg_price,
+            MIN(min_price) as min_price,
+            MAX(max_price) as max_price,
+            SUM(n_rows) * 100.0 / (SELECT SUM(n_rows) FROM agg_price_by_year_type) as percentage
+        FROM agg_price_by_year_type
+        WHERE type != ''
+        GROUP BY type
+        ORDER BY count DESC
+    """,
+    'county_analysis': """
+        SELECT
+            county,
+            SUM(n_rows) as transactions,
+            SUM(total) / NULLIF(SUM(n), 0) as avg_price,
+            MAX(max_price) as max_price
+        FROM agg_price_by_county_month
+        WHERE county != ''
+        GROUP BY county
+        ORDER BY avg_price DESC
+        LIMIT 10
+    """,
+    'monthly_trends': """
+        SELECT
+            year,
+            month,
+            SUM(n_rows) as transactions,
+            SUM(total) / NULLIF(SUM(n), 0) as avg_price
+        FROM agg_price_by_county_month
+        WHERE year = 2024
+        GROUP BY year, month
+        ORDER BY year, month
+    """,
+    'yearly_trends': """
+        SELECT
+            year,
+            SUM(n_rows) as transactions,
+            SUM(total) / NULLIF(SUM(n), 0) as avg_price,
+            MIN(min_price) as min_price,
+            MAX(max_price) as max_price
+        FROM agg_price_by_year_type
+        WHERE year > 0
+        GROUP BY year
+        ORDER BY year DESC
+        LIMIT 10
+    """,
+}
+
+_INSERT = re.compile(r"^\s*insert\s+into\s+`?(\w+)`?\s*\(([^)]*)\)\s*values\s*"
+                     r"((?:\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)\s*,?\s*)+);?\s*$", re.I)
+_GROUP  = re.compile(r"\(([^)]*)\)")
+
+
+def _year_month(value) -> Tuple[int, int]:
+    value = _py(value)
+    if value is None:
+        return 0, 0
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.year, value.month
+    text = str(value)
+    try:
+        return int(text[:4]), int(text[5:7])
+    except ValueError:
+        return 0, 0
+
+
+class PriceAggregates:
+    """The uk_price_paid summary tables behind one connection pool."""
+
+    def __init__(self, pool, source: str = SOURCE, dialect: str = 'mysql', cache=None):
+        self.pool = pool
+        self.source = source
+        self.dialect = DIALECTS[dialect]
+        self.cache = cache
+        self._lock = threading.Lock()
+        self.stats = {'rows_applied': 0, 'upserts': 0, 'marked_stale': 0}
+
+    # ── plumbing ──────────────────────────────────────────────────────────────
+
+    @contextmanager
+    def _connection(self, conn=None):
+        if conn is not None:
+            yield conn                      # the caller's transaction: it commits
+            return
+        with self.pool.connection() as conn:
+            yield conn
+            conn.commit()
+
+    def _run(self, sql: str, params=None, many: bool = False, conn=None) -> List[tuple]:
+        with self._connection(conn) as conn:
+            cur = conn.cursor()
+            try:
+                if many:
+                    cur.executemany(sql, params)
+                elif params is not None:
+                    cur.execute(sql, params)
+                else:
+                    cur.execute(sql)
+                rows = cur.fetchall() if cur.description else []
+            finally:
+                cur.close()
+        return [tuple(r.values()) if isinstance(r, dict) else tuple(r) for r in rows]
+
+    def _expr(self, template: str) -> str:
+        return template.format(year=self.dialect['year'], month=self.dialect['month'])
+
+    def invalidate(self):
+        """Drop cached reads of the summaries (after a caller-committed apply_write)."""
+        if self.cache is not None:
+            self.cache.invalidate_tables(list(AGGREGATES) + [STATE_TABLE])
+
+    def _set_stale(self, stale: bool, conn=None):
+        ph = self.dialect['placeholder']
+        self._run(f"INSERT INTO {STATE_TABLE} (source, stale, updated_at) "
+                  f"VALUES ({ph}, {ph}, {self.dialect['now']}) {self.dialect['state_upsert']}",
+                  (self.source, int(stale)), conn=conn)
+
+    # ── setup / full recompute ────────────────────────────────────────────────
+
+    def create(self):
+        for table, keys in AGGREGATES.items():
+            cols = ', '.join(f"{name} {sql_type} NOT NULL" for name, sql_type, _ in keys)
+            self._run(f"""
+                CREATE TABLE IF NOT EXISTS {table} (
+                    {cols},
+                    n_rows BIGINT NOT NULL,
+                    n BIGINT NOT NULL,
+                    total {self.dialect['total']} NOT NULL,
+                    min_price BIGINT,
+                    max_price BIGINT,
+                    PRIMARY KEY ({', '.join(name for name, _, _ in keys)})
+                )
+            """)
+        self._run(f"""
+            CREATE TABLE IF NOT EXISTS {STATE_TABLE} (
+                source VARCHAR(100) NOT NULL PRIMARY KEY,
+                stale INT NOT NULL,
+                updated_at DATETIME
+            )
+        """)
+
+    def _recompute_sql(self, table: str) -> str:
+        keys = AGGREGATES[table]
+        exprs = [self._expr(expr) for _, _, expr in keys]
+        select = ', '.join(f"{e} AS {name}" for e, (name, _, _) in zip(exprs, keys))
+        return (f"SELECT {select}, COUNT(*) AS n_rows, COUNT(price) AS n, "
+                f"COALESCE(SUM(price), 0) AS total, MIN(price) AS min_price, "
+                f"MAX(price) AS max_price FROM {self.source} GROUP BY {', '.join(exprs)}")
+
+    def rebuild(self):
+        """Recompute every summary from the source table and mark them fresh."""
+        with self._lock:
+            for table in AGGREGATES:
+                self._run(f"DROP TABLE IF EXISTS {table}")
+            self.create()
+            for table, keys in AGGREGATES.items():
+                cols = ', '.join(name for name, _, _ in keys)
+                self._run(f"INSERT INTO {table} ({cols}, n_rows, n, total, min_price, max_price) "
+                          f"{self._recompute_sql(table)}")
+            self._set_stale(False)
+        self.invalidate()
+        logger.info(f"Rebuilt {', '.join(AGGREGATES)} from {self.source}")
+
+    # ── incremental maintenance ───────────────────────────────────────────────
+
+    def apply_rows(self, columns: Sequence[str], rows: Iterable[Sequence], conn=None) -> bool:
+        """Fold rows just inserted into the source (in `columns` order) into the summaries.
+        With `conn`, runs in that connection's transaction and leaves the commit
+        and invalidate() to the caller; returns whether the summaries changed."""
+        if not self.is_fresh(conn):
+            return False                    # not built, or stale until the next rebuild
+        index = {str(c).lower(): i for i, c in enumerate(columns)}
+        if not {'price', 'date', 'type', 'county'} <= set(index):
+            return self.mark_stale(f"insert without all of price/date/type/county: {list(columns)}",
+                                   conn)
+        ip, id_, it, ic = index['price'], index['date'], index['type'], index['county']
+        deltas: Dict[str, Dict[tuple, List]] = {t: {} for t in AGGREGATES}
+        applied = 0
+        for row in rows:
+            price = _py(row[ip])
+            if price is not None:
+                price = int(price) if float(price).is_integer() else float(price)
+            year, month = _year_month(row[id_])
+            ptype, county = _py(row[it]) or '', _py(row[ic]) or ''
+            for table, key in (('agg_price_by_year_type', (year, ptype)),
+                               ('agg_price_by_county_month', (county, year, month))):
+                d = deltas[table].setdefault(key, [0, 0, 0, None, None])
+                d[0] += 1
+                if price is not None:
+                    d[1] += 1
+                    d[2] += price
+                    d[3] = price if d[3] is None else min(d[3], price)
+                    d[4] = price if d[4] is None else max(d[4], price)
+            applied += 1
+        if not applied:
+            return False
+        ph = self.dialect['placeholder']
+        for table, groups in deltas.items():
+            keys = [name for name, _, _ in AGGREGATES[table]]
+            cols = keys + ['n_rows', 'n', 'total', 'min_price', 'max_price']
+            upsert = self.dialect['upsert'].format(keys=', '.join(keys))
+            try:
+                self._run(f"INSERT INTO {table} ({', '.join(cols)}) "
+                          f"VALUES ({', '.join([ph] * len(cols))}) {upsert}",
+                          [key + tuple(d) for key, d in groups.items()], many=True, conn=conn)
+            except Exception as e:
+                return self.mark_stale(f"upsert into {table} failed: {e}", conn)
+            with self._lock:
+                self.stats['upserts'] += len(groups)
+        with self._lock:
+            self.stats['rows_applied'] += applied
+        if conn is None:
+            self.invalidate()
+        return True
+
+    def apply_write(self, sql: str, params=None, rowcount: Optional[int] = None,
+                    conn=None) -> bool:
+        """Keep the summaries right after execute_command ran `sql` (on `conn`,
+        before its commit, when given — see apply_rows)."""
+        if not self.affects(sql):
+            return False
+        m = _INSERT.match(sql)
+        if m and m.group(1).lower() == self.source and params is not None:
+            columns = [c.strip().strip('`') for c in m.group(2).split(',')]
+            groups = _GROUP.findall(m.group(3))
+            params = list(params)
+            # rowcount -1: the driver cannot tell (DuckDB)
+            if len(params) == len(columns) * len(groups) and rowcount in (None, -1, len(groups)):
+                rows = [params[i:i + len(columns)] for i in range(0, len(params), len(columns))]
+                return self.apply_rows(columns, rows, conn)
+        return self.mark_stale(f"write not applied incrementally: {' '.join(sql.split())[:80]}",
+                               conn)
+
+    def affects(self, sql: str) -> bool:
+        """Whether `sql` may write the source table (unknown targets count)."""
+        written = tables_written(sql)
+        return written is None or self.source in written
+
+    def mark_stale(self, reason: str = '', conn=None) -> bool:
+        try:
+            self._set_stale(True, conn)
+            with self._lock:
+                self.stats['marked_stale'] += 1
+            if conn is None:
+                self.invalidate()
+            logger.warning(f"Summaries of {self.source} marked stale ({reason}); "
+                           f"run singlestore_aggregates.py rebuild")
+            return True
+        except Exception as e:
+            logger.debug(f"Could not mark summaries stale (not created?): {e}")
+            return False
+
+    # ── reading ───────────────────────────────────────────────────────────────
+
+    def is_fresh(self, conn=None) -> bool:
+        try:
+            rows = self._run(f"SELECT stale FROM {STATE_TABLE} WHERE source = "
+                             f"{self.dialect['placeholder']}", (self.source,), conn=conn)
+        except Exception:
+            return False
+        return bool(rows) and not rows[0][0]
+
+    def prefer(self, queries: Dict[str, Any]) -> Dict[str, Any]:
+        """`queries` with summary equivalents swapped in while the summaries are fresh."""
+        if not any(name in SUMMARY_SQL for name in queries) or not self.is_fresh():
+            return queries
+        return {name: SUMMARY_SQL.get(name, sql) for name, sql in queries.items()}
+
+    # ── consistency ───────────────────────────────────────────────────────────
+
+    def check(self, tolerance: float = 1e-6) -> Dict[str, Any]:
+        """Compare every summary with a full recompute from the source table."""
+        report = {'ok': True}
+        for table, keys in AGGREGATES.items():
+            names = ', '.join(name for name, _, _ in keys)
+            width = len(keys)
+            stored = {r[:width]: r[width:] for r in self._run(
+                f"SELECT {names}, n_rows, n, total, min_price, max_price FROM {table}")}
+            actual = {r[:width]: r[width:] for r in self._run(self._recompute_sql(table))}
+            mismatched = []
+            for key in stored.keys() & actual.keys():
+                (r1, n1, t1, lo1, hi1), (r2, n2, t2, lo2, hi2) = stored[key], actual[key]
+                if (r1, n1, lo1, hi1) != (r2, n2, lo2, hi2) or \
+                        abs(float(t1) - float(t2)) > tolerance * max(1.0, abs(float(t2))):
+                    mismatched.append(key)
+            result = {'groups': len(actual),
+                      'missing': len(actual.keys() - stored.keys()),
+                      'extra': len(stored.keys() - actual.keys()),
+                      'mismatched': len(mismatched),
+                      'examples': sorted(mismatched, key=str)[:5]}
+            result['ok'] = not (result['missing'] or result['extra'] or result['mismatched'])
+            report[table] = result
+            report['ok'] = report['ok'] and result['ok']
+        return report
+
+
+def main():
+    from singlestore_manager_fixed import SingleStoreManager
+
+    ap = argparse.ArgumentParser(description="Maintain the uk_price_paid summary tables")
+    ap.add_argument('action', choices=['rebuild', 'check', 'status'])
+    args = ap.parse_args()
+
+    db = SingleStoreManager()
+    aggregates = db.aggregates
+    if args.action == 'rebuild':
+        aggregates.rebuild()
+        print(f"✅ Rebuilt {', '.join(AGGREGATES)}")
+    elif args.action == 'check':
+        report = aggregates.check()
+        for table in AGGREGATES:
+            r = report[table]
+            mark = '✅' if r['ok'] else '❌'
+            print(f"{mark} {table}: {r['groups']:,} groups, {r['missing']} missing, "
+                  f"{r['extra']} extra, {r['mismatched']} mismatched {r['examples'] or ''}")
+        if not report['ok']:
+            raise SystemExit(1)
+    else:
+        print(f"{'fresh' if aggregates.is_fresh() else 'stale or not built'}")
+
+
+if __name__ == '__main__':
+    main()
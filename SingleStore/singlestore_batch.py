@@ -0,0 +1,170 @@
+# singlestore_batch.py
+"""
+Concurrent execution of independent read queries over pooled connections.
+
+run_advanced_analytics / run_property_analysis used to run their aggregate
+queries one after another, so a report took the SUM of the query times.
+iter_many_queries() runs them at once, one pooled connection each, and
+yields results as they complete, so a report takes roughly the slowest
+query's time:
+
+    for name, result in iter_many_queries(pool, {'types': sql1, 'years': sql2},
+                                          timeout=30):
+        result  →  {'status': 'ok' | 'error' | 'timeout' | 'cancelled',
+                    'rows': [...], 'error': str | None, 'seconds': float}
+
+Timeouts are per query and count from when it starts executing. A query
+over its timeout is interrupted on the server: KILL QUERY <connection id>
+sent over a one-off connection outside the pool, whose slots are usually
+all taken by the batch (pymysql), or Connection.interrupt() (sqlite3
+stand-ins). QueryBatch.cancel() does the same for every running
+query and drops the ones not yet started.
+
+A value in `queries` can be a SQL string or a (sql, params) tuple. The
+managers' default timeout is SINGLESTORE_QUERY_TIMEOUT seconds (unset: none).
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+QUERY_TIMEOUT = float(os.getenv('SINGLESTORE_QUERY_TIMEOUT', 0)) or None
+POLL_INTERVAL = 0.05
+KILL_GRACE    = 2.0          # seconds to wait for an interrupted query to return
+
+Query = Union[str, Tuple[str, Optional[tuple]]]
+
+
+def split_query(query: Query) -> Tuple[str, Optional[tuple]]:
+    return (query[0], query[1]) if isinstance(query, tuple) else (query, None)
+
+
+class QueryBatch:
+    """A set of named read queries run concurrently; iterate for results."""
+
+    def __init__(self, pool, queries: Dict[str, Query], timeout: Optional[float] = None,
+                 max_workers: Optional[int] = None):
+        self.pool = pool
+        self.queries = dict(queries)
+        self.timeout = timeout
+        self.max_workers = max_workers or getattr(pool, 'max_size', None) or len(queries) or 1
+        self._lock = threading.Lock()
+        self._cancelled = threading.Event()
+        self._running: Dict[str, Tuple[Any, float]] = {}   # name → (conn, started)
+        self._interrupted: Dict[str, str] = {}             # name → 'timeout' | 'cancelled'
+
+    # ── worker ────────────────────────────────────────────────────────────────
+
+    def _run(self, name: str) -> Dict[str, Any]:
+        if self._cancelled.is_set():
+            return {'status': 'cancelled', 'rows': [], 'error': None, 'seconds': 0.0}
+        sql, params = split_query(self.queries[name])
+        started = time.monotonic()
+        try:
+            with self.pool.connection() as conn:
+                with self._lock:
+                    self._running[name] = (conn, time.monotonic())
+                try:
+                    cur = conn.cursor()
+                    try:
+                        cur.execute(sql, params) if params is not None else cur.execute(sql)
+                        rows = cur.fetchall()
+                    finally:
+                        cur.close()
+                finally:
+                    with self._lock:
+                        self._running.pop(name, None)
+            return {'status': 'ok', 'rows': list(rows), 'error': None,
+                    'seconds': time.monotonic() - started}
+        except Exception as e:
+            status = self._interrupted.get(name, 'error')
+            return {'status': status, 'rows': [], 'error': str(e),
+                    'seconds': time.monotonic() - started}
+
+    # ── interruption ──────────────────────────────────────────────────────────
+
+    @contextmanager
+    def _killer(self):
+        # not from the pool: with max_workers = max_size the batch holds every slot
+        side = getattr(self.pool, 'side_connection', None)
+        with (side() if side else self.pool.connection()) as conn:
+            yield conn
+
+    def _interrupt(self, name: str, reason: str):
+        with self._lock:
+            entry = self._running.get(name)
+            if entry is None or name in self._interrupted:
+                return
+            self._interrupted[name] = reason
+        conn = entry[0]
+        try:
+            if hasattr(conn, 'interrupt'):
+                conn.interrupt()
+            elif hasattr(conn, 'thread_id'):
+                with self._killer() as killer:
+                    cur = killer.cursor()
+                    try:
+                        cur.execute(f"KILL QUERY {int(conn.thread_id())}")
+                    finally:
+                        cur.close()
+            logger.warning(f"Query '{name}' {reason}: interrupted on the server")
+        except Exception as e:
+            logger.warning(f"Could not interrupt query '{name}': {e}")
+
+    def cancel(self):
+        """Stop queries not yet started and interrupt the running ones."""
+        self._cancelled.set()
+        with self._lock:
+            names = list(self._running)
+        for name in names:
+            self._interrupt(name, 'cancelled')
+
+    # ── results ───────────────────────────────────────────────────────────────
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        ex = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='ss-batch')
+        futures = {ex.submit(self._run, name): name for name in self.queries}
+        given_up = {}
+        try:
+            while futures:
+                done, _ = wait(futures, timeout=POLL_INTERVAL, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    name = futures.pop(fut)
+                    given_up.pop(name, None)
+                    yield name, fut.result()
+                now = time.monotonic()
+                if self.timeout is not None:
+                    with self._lock:
+                        overdue = [n for n, (_, started) in self._running.items()
+                                   if now - started > self.timeout]
+                    for name in overdue:
+                        self._interrupt(name, 'timeout')
+                        given_up.setdefault(name, now + KILL_GRACE)
+                # a driver that ignores the interrupt: stop waiting for it
+                for fut, name in list(futures.items()):
+                    if name in given_up and now > given_up[name]:
+                        del futures[fut]
+                        yield name, {'status': self._interrupted.get(name, 'timeout'),
+                                     'rows': [], 'error': 'query did not stop after interrupt',
+                                     'seconds': None}
+        finally:
+            if futures:
+                self.cancel()
+            ex.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_many_queries(pool, queries: Dict[str, Query], timeout: Optional[float] = None,
+                      max_workers: Optional[int] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """Run `queries` concurrently; yield (name, result) as each completes."""
+    return iter(QueryBatch(pool, queries, timeout, max_workers))
+
+
+def execute_many_queries(pool, queries: Dict[str, Query], timeout: Optional[float] = None,
+                         max_workers: Optional[int] = None) -> Dict[str, Dict[str, Any]]:
+    """Run `queries` concurrently and return {name: result} once all are done."""
+    return dict(iter_many_queries(pool, queries, timeout, max_workers))
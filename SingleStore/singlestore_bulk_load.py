@@ -0,0 +1,335 @@
+# singlestore_bulk_load.py
+"""
+High-throughput bulk loader for SingleStore tables, used by
+SingleStoreDB.batch_insert_dataframe.
+
+Rows are streamed from the source (a DataFrame is walked in slices, never
+converted whole with to_numpy()) into chunks that each go to the server as
+ONE statement, so every chunk is atomic and can be retried on its own:
+
+  insert   multi-row INSERT … VALUES (…),(…) with values escaped client-side;
+           a chunk is closed before its SQL would exceed max_allowed_packet
+           (read from the server) or CHUNK_ROWS rows.
+  load     LOAD DATA LOCAL INFILE fed from an in-memory tab-separated buffer
+           (through a FIFO on POSIX, so nothing is written to disk); the
+           server's fast load path. Needs local_infile on both ends.
+
+Chunks are sent by `workers` threads over pooled connections. A chunk that
+fails with a connection-level error (OperationalError / InterfaceError) is
+retried with backoff; one that fails on its data is split in half and
+retried until the bad rows are isolated, so one bad row no longer fails the
+whole load. Bad rows are reported with their source index and error.
+
+`on_loaded(columns, rows)` is called with the rows of every chunk (or
+sub-chunk) once it has committed, e.g. to maintain the summary tables in
+singlestore_aggregates.py. It can be called from several worker threads.
+
+Usage:
+    from singlestore_bulk_load import bulk_load_dataframe
+    stats = bulk_load_dataframe(db.pool, df, 'uk_price_paid', workers=4)
+    print(stats['rows_per_sec'], stats['failed_rows'])
+"""
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+CHUNK_ROWS       = 10_000
+LOAD_CHUNK_BYTES = 16 * 1024 * 1024
+PACKET_HEADROOM  = 0.9            # use at most 90 % of max_allowed_packet
+DEFAULT_PACKET   = 4 * 1024 * 1024
+RETRIES          = 3
+BACKOFF          = 0.5            # seconds, doubled per attempt
+SLICE_ROWS       = 50_000         # DataFrame rows converted at a time
+
+_TRANSIENT = ('OperationalError', 'InterfaceError')
+
+
+def _py(value):
+    """Plain Python value for a driver: numpy scalars unwrapped, NaN/NaT/pd.NA → None."""
+    if value is None:
+        return None
+    pandas = sys.modules.get('pandas')         # pd.NA only exists once pandas is loaded
+    if pandas is not None and value is getattr(pandas, 'NA', None):
+        return None
+    try:
+        if value != value:                       # NaN, NaT
+            return None
+    except (TypeError, ValueError):
+        pass
+    if hasattr(value, 'item') and not isinstance(value, (str, bytes)):
+        try:
+            return value.item()
+        except (ValueError, AttributeError):
+            pass
+    if hasattr(value, 'to_pydatetime'):
+        return value.to_pydatetime()
+    return value
+
+
+def _pymysql_escape(value) -> str:
+    from pymysql.converters import escape_item
+
+    return escape_item(value, 'utf8mb4')
+
+
+def _is_transient(exc: Exception) -> bool:
+    return type(exc).__name__ in _TRANSIENT
+
+
+def max_allowed_packet(pool) -> int:
+    """Server's max_allowed_packet in bytes (DEFAULT_PACKET if unavailable)."""
+    try:
+        with pool.connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT @@max_allowed_packet AS p")
+                row = cur.fetchone()
+            finally:
+                cur.close()
+        return int(row['p'] if isinstance(row, dict) else row[0])
+    except Exception as e:
+        logger.warning(f"Could not read max_allowed_packet ({e}); assuming {DEFAULT_PACKET}")
+        return DEFAULT_PACKET
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Chunking
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _insert_chunks(rows: Iterable[Tuple[int, Sequence]], header: str, escape: Callable,
+                   packet: int, chunk_rows: int):
+    """Yield [(index, row, '(v1,v2,…)')] lists whose INSERT fits in `packet` bytes."""
+    budget = int(packet * PACKET_HEADROOM) - len(header.encode('utf-8'))
+    chunk, size = [], 0
+    for idx, row in rows:
+        sql = '(' + ','.join(escape(_py(v)) for v in row) + ')'
+        n = len(sql.encode('utf-8')) + 1
+        if chunk and (size + n > budget or len(chunk) >= chunk_rows):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append((idx, row, sql))
+        size += n
+    if chunk:
+        yield chunk
+
+
+def _tsv_field(value) -> str:
+    value = _py(value)
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, bytes):
+        value = value.decode('utf-8', 'replace')
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r').replace('\0', '\\0'))
+
+
+def _load_chunks(rows: Iterable[Tuple[int, Sequence]], chunk_bytes: int, chunk_rows: int):
+    """Yield [(index, row, 'tsv line')] lists of about `chunk_bytes`."""
+    chunk, size = [], 0
+    for idx, row in rows:
+        line = '\t'.join(_tsv_field(v) for v in row) + '\n'
+        chunk.append((idx, row, line))
+        size += len(line)
+        if size >= chunk_bytes or len(chunk) >= chunk_rows:
+            yield chunk
+            chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Sending one chunk
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _execute(pool, sql: str, params=None) -> int:
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql, params) if params is not None else cur.execute(sql)
+            affected = cur.rowcount
+        finally:
+            cur.close()
+        conn.commit()
+    return affected
+
+
+def _with_retry(fn, retries: int):
+    delay = BACKOFF
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except Exception as e:
+            if not _is_transient(e) or attempt == retries:
+                raise
+            logger.warning(f"Transient error, retrying in {delay:.1f}s: {e}")
+            time.sleep(delay)
+            delay *= 2
+
+
+def _send_insert(pool, header: str, chunk: List[Tuple[int, Sequence, str]], retries: int,
+                 errors: List[Dict[str, Any]], on_loaded: Optional[Callable] = None) -> int:
+    """Insert the chunk; on data errors bisect down to the failing rows."""
+    try:
+        _with_retry(lambda: _execute(pool, header + ','.join(sql for _, _, sql in chunk)), retries)
+    except Exception as e:
+        if len(chunk) == 1:
+            errors.append({'index': chunk[0][0], 'error': str(e)})
+            return 0
+        if _is_transient(e):
+            for idx, _, _ in chunk:
+                errors.append({'index': idx, 'error': str(e)})
+            return 0
+        mid = len(chunk) // 2
+        return (_send_insert(pool, header, chunk[:mid], retries, errors, on_loaded)
+                + _send_insert(pool, header, chunk[mid:], retries, errors, on_loaded))
+    if on_loaded:
+        on_loaded([row for _, row, _ in chunk])
+    return len(chunk)
+
+
+def _feed(path: str, data: bytes):
+    with open(path, 'wb') as fh:
+        fh.write(data)
+
+
+def _send_load(pool, table: str, columns: Sequence[str], chunk, retries: int,
+               errors: List[Dict[str, Any]], insert_fallback: Callable,
+               on_loaded: Optional[Callable] = None) -> int:
+    data = ''.join(line for _, _, line in chunk).encode('utf-8')
+    cols = ', '.join(f"`{c}`" for c in columns)
+
+    def load():
+        tmpdir = tempfile.mkdtemp(prefix='ss_load_')
+        path = os.path.join(tmpdir, 'chunk.tsv')
+        writer = None
+        try:
+            if hasattr(os, 'mkfifo'):
+                os.mkfifo(path)
+                writer = threading.Thread(target=_feed, args=(path, data), daemon=True)
+                writer.start()
+            else:
+                _feed(path, data)
+            sql = (f"LOAD DATA LOCAL INFILE '{path}' INTO TABLE {table} "
+                   f"FIELDS TERMINATED BY '\\t' ESCAPED BY '\\\\' "
+                   f"LINES TERMINATED BY '\\n' ({cols})")
+            return _execute(pool, sql)
+        finally:
+            if writer is not None and writer.is_alive():
+                # server never opened the file: unblock the writer
+                try:
+                    os.close(os.open(path, os.O_RDONLY | os.O_NONBLOCK))
+                except OSError:
+                    pass
+                writer.join(1)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            os.rmdir(tmpdir)
+
+    try:
+        _with_retry(load, retries)
+    except Exception as e:
+        logger.warning(f"LOAD DATA chunk of {len(chunk)} rows failed ({e}); "
+                       f"falling back to INSERT for this chunk")
+        return insert_fallback([(idx, row) for idx, row, _ in chunk])
+    if on_loaded:
+        on_loaded([row for _, row, _ in chunk])
+    return len(chunk)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Public API
+# ─────────────────────────────────────────────────────────────────────────────
+
+def bulk_load(pool, table: str, columns: Sequence[str], rows: Iterable[Sequence],
+              method: str = 'insert', workers: int = 1,
+              chunk_rows: int = CHUNK_ROWS, max_packet: Optional[int] = None,
+              load_chunk_bytes: int = LOAD_CHUNK_BYTES, retries: int = RETRIES,
+              escape: Callable[[Any], str] = _pymysql_escape,
+              progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+              on_loaded: Optional[Callable[[Sequence[str], List[Sequence]], None]] = None) -> Dict[str, Any]:
+    """
+    Load `rows` (tuples in `columns` order) into `table`.
+    Returns {'rows', 'loaded', 'failed_rows', 'errors', 'chunks', 'seconds',
+    'rows_per_sec', 'method'}; `errors` holds {'index', 'error'} per bad row.
+    """
+    if method not in ('insert', 'load'):
+        raise ValueError(f"Unknown load method: {method}")
+    header = f"INSERT INTO {table} ({', '.join(f'`{c}`' for c in columns)}) VALUES "
+    packet = max_packet or max_allowed_packet(pool)
+    indexed = enumerate(rows)
+    errors: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+    stats = {'rows': 0, 'loaded': 0, 'chunks': 0, 'method': method}
+    started = time.monotonic()
+    loaded_hook = (lambda chunk: on_loaded(columns, chunk)) if on_loaded else None
+
+    def insert_rows(chunk_rows_):
+        loaded = 0
+        for chunk in _insert_chunks(chunk_rows_, header, escape, packet, chunk_rows):
+            loaded += _send_insert(pool, header, chunk, retries, errors, loaded_hook)
+        return loaded
+
+    if method == 'insert':
+        chunks = _insert_chunks(indexed, header, escape, packet, chunk_rows)
+        send = lambda c: _send_insert(pool, header, c, retries, errors, loaded_hook)
+    else:
+        chunks = _load_chunks(indexed, load_chunk_bytes, chunk_rows)
+        send = lambda c: _send_load(pool, table, columns, c, retries, errors, insert_rows, loaded_hook)
+
+    def done(n_rows: int, loaded: int):
+        with lock:
+            stats['rows'] += n_rows
+            stats['loaded'] += loaded
+            stats['chunks'] += 1
+            elapsed = time.monotonic() - started
+            stats['seconds'] = elapsed
+            stats['rows_per_sec'] = stats['loaded'] / elapsed if elapsed else 0.0
+            snapshot = dict(stats, failed_rows=len(errors))
+        if progress:
+            progress(snapshot)
+
+    if workers <= 1:
+        for chunk in chunks:
+            done(len(chunk), send(chunk))
+    else:
+        # keep at most 2 × workers chunks in memory
+        with ThreadPoolExecutor(max_workers=workers) as ex:
+            pending = {}
+            for chunk in chunks:
+                pending[ex.submit(send, chunk)] = len(chunk)
+                if len(pending) >= workers * 2:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in finished:
+                        done(pending.pop(fut), fut.result())
+            for fut in list(pending):
+                done(pending.pop(fut), fut.result())
+
+    elapsed = time.monotonic() - started
+    stats.update(seconds=elapsed, rows_per_sec=stats['loaded'] / elapsed if elapsed else 0.0,
+                 failed_rows=len(errors), errors=sorted(errors, key=lambda e: e['index']))
+    logger.info(f"Bulk {method} into {table}: {stats['loaded']:,}/{stats['rows']:,} rows "
+                f"in {stats['chunks']} chunks, {elapsed:.2f}s "
+                f"({stats['rows_per_sec']:,.0f} rows/s), {len(errors)} failed")
+    return stats
+
+
+def iter_dataframe_rows(df, slice_rows: int = SLICE_ROWS) -> Iterable[tuple]:
+    """Rows of `df` as tuples, converting one slice at a time."""
+    for start in range(0, len(df), slice_rows):
+        yield from df.iloc[start:start + slice_rows].itertuples(index=False, name=None)
+
+
+def bulk_load_dataframe(pool, df, table: str, **kwargs) -> Dict[str, Any]:
+    """bulk_load() for a DataFrame; `errors[].index` is the row position in df."""
+    return bulk_load(pool, table, [str(c) for c in df.columns], iter_dataframe_rows(df), **kwargs)
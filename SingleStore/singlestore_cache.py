@@ -0,0 +1,232 @@
+# singlestore_cache.py
+"""
+Result cache for the SingleStore analytics reports.
+
+analyze_uk_price_paid / run_advanced_analytics / run_property_analysis
+re-run the same heavy aggregates (COUNT/AVG per type, county and year, the
+correlated COUNT(*) subquery) on every call. The managers' cached_query()
+serves them from here instead:
+
+    key      sha1(namespace + normalized SQL + params)
+             normalized = comments stripped, whitespace collapsed, lower-case
+             outside string literals, so formatting changes still hit
+    memory   LRU of MAX_ENTRIES results, each with its own expiry (TTL)
+    disk     optional SQLite file (SINGLESTORE_CACHE_DB) so a dashboard
+             restarted in a new process still renders from cache
+
+Every entry records the tables its SQL reads. execute_command (and the bulk
+loader) call invalidate_sql() with the statement they ran; the tables it
+writes (INSERT/UPDATE/DELETE/REPLACE/TRUNCATE/DROP/ALTER/LOAD DATA) have
+their entries dropped from both tiers. A write whose target cannot be
+parsed clears the whole cache.
+
+Hits and misses are counted per tier and logged by log_stats().
+"""
+import hashlib
+import logging
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+CACHE_TTL   = float(os.getenv('SINGLESTORE_CACHE_TTL', 300))
+CACHE_DB    = os.getenv('SINGLESTORE_CACHE_DB') or None
+MAX_ENTRIES = int(os.getenv('SINGLESTORE_CACHE_ENTRIES', 256))
+
+_LITERAL  = re.compile(r"('(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\")")
+_COMMENT  = re.compile(r"--[^\n]*|#[^\n]*|/\*.*?\*/", re.S)
+_NAME     = r"`?([\w$]+)`?(?:\.`?([\w$]+)`?)?"
+_READS    = re.compile(r"\b(?:from|join)\s+" + _NAME)
+_WRITES   = re.compile(r"^\s*(?:insert(?:\s+ignore)?\s+into|replace\s+into|update|"
+                       r"delete\s+from|truncate(?:\s+table)?|drop\s+table(?:\s+if\s+exists)?|"
+                       r"alter\s+table)\s+" + _NAME)
+_LOAD     = re.compile(r"^\s*load\s+data\b.*?\binto\s+table\s+" + _NAME, re.S)
+_READONLY = re.compile(r"^\s*(?:select|show|describe|desc|explain|create|with|set|use)\b")
+
+
+def normalize_sql(sql: str) -> str:
+    """Strip comments, collapse whitespace and lower-case outside literals."""
+    parts = _LITERAL.split(sql)
+    out = []
+    for i, part in enumerate(parts):
+        if i % 2:
+            out.append(part)                            # string literal, verbatim
+        else:
+            out.append(re.sub(r"\s+", " ", _COMMENT.sub(" ", part)).lower())
+    return "".join(out).strip().rstrip(";").strip()
+
+
+def _names(matches) -> Set[str]:
+    return {(table or schema).lower() for schema, table in matches}
+
+
+def tables_read(sql: str) -> Set[str]:
+    return _names(_READS.findall(_LITERAL.sub("''", normalize_sql(sql))))
+
+
+def tables_written(sql: str) -> Optional[Set[str]]:
+    """Tables a statement writes; empty for reads, None if unknown."""
+    norm = _LITERAL.sub("''", normalize_sql(sql))
+    m = _WRITES.match(norm) or _LOAD.match(norm)
+    if m:
+        return _names([m.groups()])
+    if _READONLY.match(norm):
+        return set()
+    return None
+
+
+class QueryCache:
+    """Two-tier (memory LRU + optional SQLite) TTL cache of query results.
+    `clock` (default time.time) gives the current time for expiries; the
+    disk tier stores absolute times, so it must be a wall clock."""
+
+    def __init__(self, ttl: float = CACHE_TTL, disk_path: Optional[str] = CACHE_DB,
+                 max_entries: int = MAX_ENTRIES, namespace: str = '',
+                 clock: Callable[[], float] = time.time):
+        self.ttl = ttl
+        self.clock = clock
+        self.max_entries = max_entries
+        self.namespace = namespace
+        self._lock = threading.Lock()
+        self._mem: "OrderedDict[str, Tuple[float, Set[str], Any]]" = OrderedDict()
+        self._disk = None
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0,
+                      'stores': 0, 'invalidated': 0}
+        if disk_path:
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False)
+            self._disk.execute("""
+                CREATE TABLE IF NOT EXISTS query_cache (
+                    key      TEXT PRIMARY KEY,
+                    tables   TEXT NOT NULL,
+                    expires  REAL NOT NULL,
+                    value    BLOB NOT NULL
+                )
+            """)
+            self._disk.commit()
+
+    def key(self, sql: str, params=None) -> str:
+        raw = f"{self.namespace}\n{normalize_sql(sql)}\n{params!r}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    # ── lookup / store ────────────────────────────────────────────────────────
+
+    def get(self, sql: str, params=None) -> Tuple[bool, Any]:
+        """(hit, value) for this statement."""
+        k, now = self.key(sql, params), self.clock()
+        with self._lock:
+            entry = self._mem.get(k)
+            if entry and entry[0] > now:
+                self._mem.move_to_end(k)
+                self.stats['memory_hits'] += 1
+                logger.debug(f"Cache hit (memory): {k[:10]}")
+                return True, entry[2]
+            if entry:
+                del self._mem[k]
+            if self._disk is not None:
+                row = self._disk.execute(
+                    "SELECT tables, expires, value FROM query_cache WHERE key = ?",
+                    (k,)).fetchone()
+                if row and row[1] > now:
+                    value = pickle.loads(row[2])
+                    self._remember(k, row[1], set(filter(None, row[0].split('|'))), value)
+                    self.stats['disk_hits'] += 1
+                    logger.debug(f"Cache hit (disk): {k[:10]}")
+                    return True, value
+            self.stats['misses'] += 1
+            logger.debug(f"Cache miss: {k[:10]}")
+            return False, None
+
+    def _remember(self, k: str, expires: float, tables: Set[str], value):
+        self._mem[k] = (expires, tables, value)
+        self._mem.move_to_end(k)
+        while len(self._mem) > self.max_entries:
+            self._mem.popitem(last=False)
+
+    def set(self, sql: str, params, value, ttl: Optional[float] = None):
+        k = self.key(sql, params)
+        expires = self.clock() + (self.ttl if ttl is None else ttl)
+        tables = tables_read(sql)
+        with self._lock:
+            self._remember(k, expires, tables, value)
+            self.stats['stores'] += 1
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO query_cache (key, tables, expires, value) "
+                    "VALUES (?, ?, ?, ?)",
+                    (k, '|' + '|'.join(sorted(tables)) + '|', expires, pickle.dumps(value)))
+                self._disk.commit()
+
+    def get_or_run(self, sql: str, params, run, ttl: Optional[float] = None):
+        """Cached result of `sql`, or run() it and cache non-empty results."""
+        hit, value = self.get(sql, params)
+        if hit:
+            return value
+        value = run()
+        if value:
+            self.set(sql, params, value, ttl)
+        return value
+
+    # ── invalidation ──────────────────────────────────────────────────────────
+
+    def invalidate_tables(self, tables: Iterable[str]):
+        tables = {t.lower() for t in tables}
+        if not tables:
+            return
+        with self._lock:
+            stale = [k for k, (_, read, _) in self._mem.items() if read & tables]
+            for k in stale:
+                del self._mem[k]
+            dropped = len(stale)
+            if self._disk is not None:
+                for t in tables:
+                    cur = self._disk.execute(
+                        "DELETE FROM query_cache WHERE tables LIKE ?", (f"%|{t}|%",))
+                    dropped = max(dropped, cur.rowcount)
+                self._disk.commit()
+            self.stats['invalidated'] += dropped
+        if dropped:
+            logger.info(f"Cache: invalidated {dropped} entries for {sorted(tables)}")
+
+    def invalidate_sql(self, sql: str):
+        """Drop entries that read whatever `sql` writes."""
+        written = tables_written(sql)
+        if written is None:
+            self.clear()
+        else:
+            self.invalidate_tables(written)
+
+    def clear(self):
+        with self._lock:
+            self.stats['invalidated'] += len(self._mem)
+            self._mem.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM query_cache")
+                self._disk.commit()
+        logger.info("Cache: cleared")
+
+    def log_stats(self):
+        s = self.stats
+        hits = s['memory_hits'] + s['disk_hits']
+        total = hits + s['misses']
+        logger.info(f"Query cache: {hits} hits ({s['memory_hits']} memory, {s['disk_hits']} disk), "
+                    f"{s['misses']} misses, hit rate {hits / total if total else 0:.1%}, "
+                    f"{s['invalidated']} invalidated")
+
+
+_CACHES: Dict[str, QueryCache] = {}
+_CACHES_LOCK = threading.Lock()
+
+
+def query_cache(config: Dict[str, Any], **kwargs) -> QueryCache:
+    """Shared cache for the database `config` points at."""
+    namespace = f"{config.get('host')}:{config.get('port')}/{config.get('database')}"
+    with _CACHES_LOCK:
+        if namespace not in _CACHES:
+            _CACHES[namespace] = QueryCache(namespace=namespace, **kwargs)
+        return _CACHES[namespace]
@@ -0,0 +1,576 @@
+# singlestore_client.py
+"""
+One SingleStore client for every manager, with pluggable backends.
+
+singlestore_manager.py, singlestore_manager_fixed.py,
+singlestore_simple_manager.py, singlestore_pymysql_wrapper.py and
+singlestore_sqlalchemy_env.py each carried their own copy of connection
+handling, so pooling, caching, streaming and batching had to be patched into
+all of them. They now subclass SingleStoreClient and keep only their report
+methods; the data path lives here:
+
+    pool          backend.pool()                        (singlestore_pool)
+    reads         execute_query / cached_query          (singlestore_cache)
+                  execute_many_queries                  (singlestore_batch)
+                  get_dataframe                         (singlestore_frames)
+    writes        execute_command, batch_insert_dataframe (singlestore_bulk_load)
+                  → cache invalidation + summary upkeep (singlestore_aggregates)
+    export        export_full_table                     (singlestore_export)
+    profiling     every statement                       (singlestore_profile)
+
+Backends (SINGLESTORE_BACKEND selects the default):
+
+    pymysql       PyMySQLBackend     pymysql over the shared ConnectionPool (default)
+    sqlalchemy    SQLAlchemyBackend  pymysql under a SQLAlchemy QueuePool engine
+    sqlite        SQLiteBackend      local file (SINGLESTORE_SQLITE_PATH), offline
+    duckdb        DuckDBBackend      local file (SINGLESTORE_DUCKDB_PATH), offline
+
+The two local stand-ins accept the managers' SQL unchanged where it is
+portable: %s placeholders are rewritten to ?, rows come back as dicts like
+pymysql's DictCursor, and sqlite gets YEAR() / MONTH() / NOW() functions.
+MySQL-only statements (DESCRIBE, SHOW, LOAD DATA) still need a server.
+
+Usage:
+    from singlestore_client import SingleStoreClient, SQLiteBackend
+    db = SingleStoreClient(SQLiteBackend('uk.db'))
+    db.execute_query("SELECT type, COUNT(*) AS n FROM uk_price_paid GROUP BY type")
+"""
+import datetime
+import logging
+import os
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager, suppress
+from decimal import Decimal
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+from dotenv import load_dotenv
+
+from singlestore_aggregates import PriceAggregates, SOURCE as AGG_SOURCE
+from singlestore_batch import iter_many_queries, split_query, QUERY_TIMEOUT
+from singlestore_bulk_load import bulk_load_dataframe, _pymysql_escape
+from singlestore_cache import query_cache
+from singlestore_export import export_table, print_progress, _sscursor
+from singlestore_frames import fetch_dataframe
+from singlestore_pool import get_pool, pymysql_pool, release_pool
+from singlestore_profile import QueryProfiler
+
+try:
+    import sqlalchemy
+    HAS_SQLALCHEMY = True
+except ImportError:
+    HAS_SQLALCHEMY = False
+
+try:
+    import duckdb
+    HAS_DUCKDB = True
+except ImportError:
+    HAS_DUCKDB = False
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BACKEND = os.getenv('SINGLESTORE_BACKEND', 'pymysql')
+
+
+def env_config() -> Dict[str, Any]:
+    """pymysql connection settings from the SINGLESTORE_* variables."""
+    import pymysql
+
+    return {
+        'host': os.getenv('SINGLESTORE_HOST'),
+        'port': int(os.getenv('SINGLESTORE_PORT', 3333)),
+        'user': os.getenv('SINGLESTORE_USER'),
+        'password': os.getenv('SINGLESTORE_PASSWORD'),
+        'database': os.getenv('SINGLESTORE_DATABASE'),
+        'ssl': {'ssl_disabled': False},
+        'charset': 'utf8mb4',
+        'cursorclass': pymysql.cursors.DictCursor,
+        'autocommit': True
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Local stand-ins: a DB-API adapter that speaks the managers' dialect
+# ─────────────────────────────────────────────────────────────────────────────
+
+_LITERAL = re.compile(r"('(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.)*\")")
+
+
+def qmark(sql: str) -> str:
+    """pymysql-style %s placeholders (and %% escapes) → qmark, outside literals."""
+    parts = _LITERAL.split(sql)
+    for i in range(0, len(parts), 2):
+        parts[i] = parts[i].replace('%s', '?').replace('%%', '%')
+    return ''.join(parts)
+
+
+def ansi_quotes(sql: str) -> str:
+    """MySQL `backtick` identifiers → ANSI "double quotes", outside literals."""
+    if '`' not in sql:
+        return sql
+    parts = _LITERAL.split(sql)
+    for i in range(0, len(parts), 2):
+        parts[i] = parts[i].replace('`', '"')
+    return ''.join(parts)
+
+
+def sql_literal(value) -> str:
+    """SQL literal for the stand-ins' client-side bulk INSERT."""
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, (int, float, Decimal)):
+        return str(value)
+    if isinstance(value, (bytes, bytearray)):
+        return f"X'{bytes(value).hex()}'"
+    if isinstance(value, datetime.datetime):
+        value = value.isoformat(sep=' ')
+    elif isinstance(value, (datetime.date, datetime.time)):
+        value = value.isoformat()
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+class _Cursor:
+    def __init__(self, raw, as_dict: bool):
+        self._raw = raw
+        self._as_dict = as_dict
+
+    def execute(self, sql: str, params=None):
+        sql = ansi_quotes(sql)
+        if params is None:
+            self._raw.execute(sql)
+        else:
+            self._raw.execute(qmark(sql), tuple(params))
+        return self
+
+    def executemany(self, sql: str, seq):
+        self._raw.executemany(qmark(ansi_quotes(sql)), [tuple(p) for p in seq])
+        return self
+
+    def _rows(self, rows):
+        if not self._as_dict or self._raw.description is None:
+            return rows
+        names = [d[0] for d in self._raw.description]
+        return [dict(zip(names, r)) for r in rows]
+
+    def fetchone(self):
+        row = self._raw.fetchone()
+        return None if row is None else self._rows([row])[0]
+
+    def fetchmany(self, size: int = 1):
+        return self._rows(self._raw.fetchmany(size))
+
+    def fetchall(self):
+        return self._rows(self._raw.fetchall())
+
+    @property
+    def description(self):
+        return self._raw.description
+
+    @property
+    def rowcount(self):
+        return self._raw.rowcount
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LocalConnection:
+    """sqlite3 / DuckDB connection with pymysql-style placeholders and dict rows."""
+
+    def __init__(self, raw, cursor_is_connection: bool = False):
+        self._raw = raw
+        self._cursor_is_connection = cursor_is_connection
+        self._in_transaction = False
+
+    def cursor(self, as_dict: bool = True) -> _Cursor:
+        raw = self._raw if self._cursor_is_connection else self._raw.cursor()
+        return _Cursor(raw, as_dict)
+
+    def begin(self):
+        """Explicit transaction on the autocommit stand-ins (pymysql's begin())."""
+        self._raw.execute("BEGIN")
+        self._in_transaction = True
+
+    def commit(self):
+        if not self._cursor_is_connection or self._in_transaction:
+            self._raw.commit()
+        self._in_transaction = False
+
+    def rollback(self):
+        self._in_transaction = False
+        self._raw.rollback()
+
+    def close(self):
+        self._raw.close()
+
+    def interrupt(self):
+        self._raw.interrupt()
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+
+def _tuple_cursor(conn):
+    return conn.cursor(as_dict=False)
+
+
+def _year(value):
+    return None if value is None else int(str(value)[:4])
+
+
+def _month(value):
+    return None if value is None else int(str(value)[5:7])
+
+
+def _sqlite_connect(path: str) -> LocalConnection:
+    raw = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=30)
+    raw.execute("PRAGMA journal_mode=WAL")
+    raw.create_function('YEAR', 1, _year, deterministic=True)
+    raw.create_function('MONTH', 1, _month, deterministic=True)
+    raw.create_function('NOW', 0, lambda: datetime.datetime.now().isoformat(sep=' ', timespec='seconds'))
+    return LocalConnection(raw)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Backends
+# ─────────────────────────────────────────────────────────────────────────────
+
+class Backend:
+    """How to reach the database: pool, dialect, streaming cursor, literal escaping."""
+    name = 'base'
+    dialect = 'mysql'                        # singlestore_aggregates.DIALECTS key
+    placeholder = '%s'
+    explain_prefix = 'EXPLAIN'
+    supports_load_data = False
+    config: Dict[str, Any] = {}
+
+    def pool(self, **options):
+        raise NotImplementedError
+
+    def stream_cursor(self, conn):
+        return _tuple_cursor(conn)
+
+    def escape(self, value) -> str:
+        return sql_literal(value)
+
+
+class PyMySQLBackend(Backend):
+    name = 'pymysql'
+    supports_load_data = True
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None):
+        self.config = config or env_config()
+
+    def pool(self, local_infile: bool = False, **kwargs):
+        config = {**self.config, 'local_infile': True} if local_infile else self.config
+        return pymysql_pool(config, **kwargs)
+
+    def stream_cursor(self, conn):
+        return _sscursor(conn)
+
+    def escape(self, value) -> str:
+        return _pymysql_escape(value)
+
+
+class _EnginePool:
+    """A SQLAlchemy engine's pool behind the ConnectionPool interface."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.max_size = engine.pool.size() + max(0, engine.pool._max_overflow)
+        self.name = f"sqlalchemy:{engine.url.host}"
+
+    @contextmanager
+    def connection(self):
+        conn = self.engine.raw_connection()       # checked out of the QueuePool
+        try:
+            yield conn
+        finally:
+            conn.close()                          # back to the QueuePool
+
+    def stats(self) -> Dict[str, Any]:
+        pool = self.engine.pool
+        return {'size': pool.size(), 'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(), 'status': pool.status()}
+
+    def log_stats(self):
+        logger.info(f"Pool {self.name}: {self.engine.pool.status()}")
+
+    def close(self):
+        self.engine.dispose()
+
+
+class SQLAlchemyBackend(PyMySQLBackend):
+    name = 'sqlalchemy'
+
+    def __init__(self, config: Optional[Dict[str, Any]] = None, **engine_kwargs):
+        if not HAS_SQLALCHEMY:
+            raise RuntimeError("SQLAlchemyBackend needs SQLAlchemy: pip install sqlalchemy")
+        super().__init__(config)
+        self.engine_kwargs = {
+            'pool_size': int(os.getenv('SINGLESTORE_POOL_SIZE', 5)),
+            'max_overflow': int(os.getenv('SINGLESTORE_MAX_OVERFLOW', 10)),
+            'pool_recycle': int(os.getenv('SINGLESTORE_POOL_RECYCLE', 3600)),
+            'pool_pre_ping': True,
+            **engine_kwargs,
+        }
+        self._engines = {}
+
+    def pool(self, local_infile: bool = False, **kwargs):
+        if local_infile not in self._engines:
+            c = self.config
+            url = sqlalchemy.engine.URL.create(
+                'mysql+pymysql', username=c.get('user'), password=c.get('password'),
+                host=c.get('host'), port=c.get('port'), database=c.get('database'))
+            connect_args = {k: v for k, v in c.items()
+                            if k not in ('host', 'port', 'user', 'password', 'database')}
+            if local_infile:
+                connect_args['local_infile'] = True
+            self._engines[local_infile] = _EnginePool(sqlalchemy.create_engine(
+                url, connect_args=connect_args, **self.engine_kwargs))
+        return self._engines[local_infile]
+
+
+class SQLiteBackend(Backend):
+    name = 'sqlite'
+    dialect = 'sqlite'
+    placeholder = '?'
+    explain_prefix = 'EXPLAIN QUERY PLAN'
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.getenv('SINGLESTORE_SQLITE_PATH', 'singlestore_standin.db')
+        self.config = {'host': 'sqlite', 'port': None, 'database': os.path.abspath(self.path)}
+
+    def pool(self, **kwargs):
+        kwargs.setdefault('health_check', lambda c: c.execute("SELECT 1"))
+        return get_pool(self.config, lambda: _sqlite_connect(self.path), **kwargs)
+
+
+class DuckDBBackend(Backend):
+    name = 'duckdb'
+    dialect = 'duckdb'
+    placeholder = '?'
+    explain_prefix = 'EXPLAIN'
+
+    def __init__(self, path: Optional[str] = None):
+        if not HAS_DUCKDB:
+            raise RuntimeError("DuckDBBackend needs duckdb: pip install duckdb")
+        self.path = path or os.getenv('SINGLESTORE_DUCKDB_PATH', 'singlestore_standin.duckdb')
+        self.config = {'host': 'duckdb', 'port': None, 'database': os.path.abspath(self.path)}
+        self._root = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> LocalConnection:
+        # one database handle per process; each pooled connection is a
+        # cursor on it (DuckDB's way to use one database from several threads)
+        with self._lock:
+            if self._root is None:
+                self._root = duckdb.connect(self.path)
+        return LocalConnection(self._root.cursor(), cursor_is_connection=True)
+
+    def pool(self, **kwargs):
+        kwargs.setdefault('health_check', lambda c: c.execute("SELECT 1"))
+        return get_pool(self.config, self._connect, **kwargs)
+
+
+BACKENDS = {'pymysql': PyMySQLBackend, 'sqlalchemy': SQLAlchemyBackend,
+            'sqlite': SQLiteBackend, 'duckdb': DuckDBBackend}
+
+
+def make_backend(name: str = BACKEND, **kwargs) -> Backend:
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend: {name} (one of {', '.join(BACKENDS)})")
+    return BACKENDS[name](**kwargs)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Client
+# ─────────────────────────────────────────────────────────────────────────────
+
+class SingleStoreClient:
+    def __init__(self, backend: Optional[Backend] = None):
+        self.backend = backend or make_backend()
+        self.connection_config = self.backend.config
+        self.pool = self.backend.pool()
+        self._load_pool = None                  # LOCAL INFILE pool, taken on first LOAD DATA
+        self._closed = False
+        self.cache = query_cache(self.connection_config)
+        self.aggregates = PriceAggregates(self.pool, dialect=self.backend.dialect, cache=self.cache)
+        self.profiler = QueryProfiler(self.pool, explain_prefix=self.backend.explain_prefix)
+
+    @contextmanager
+    def get_connection(self):
+        """Context manager for database connections, borrowed from the shared pool"""
+        try:
+            with self.pool.connection() as connection:
+                yield connection
+        except Exception as e:
+            logger.error(f"Connection error: {e}")
+            raise
+
+    def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
+        """Execute a SELECT query and return results"""
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    with self.profiler.track(query, params) as q:
+                        cursor.execute(query, params)
+                        result = cursor.fetchall()
+                        q.done(result)
+                    return result
+        except Exception as e:
+            logger.error(f"Query execution failed: {e}")
+            logger.error(f"Query was: {query}")
+            logger.error(f"Params were: {params}")
+            return []
+
+    def execute_command(self, command: str, params: Optional[tuple] = None) -> int:
+        """Execute INSERT, UPDATE, DELETE commands"""
+        try:
+            with self.get_connection() as conn:
+                # a write to the summarised table and its summary upkeep commit together
+                tracked = self.aggregates.affects(command)
+                if tracked:
+                    conn.begin()
+                try:
+                    with conn.cursor() as cursor:
+                        with self.profiler.track(command, params) as q:
+                            cursor.execute(command, params)
+                            q.done(rowcount=cursor.rowcount)
+                        rowcount = cursor.rowcount
+                    summaries = tracked and self.aggregates.apply_write(command, params, rowcount, conn)
+                    conn.commit()
+                except Exception:
+                    if tracked:
+                        with suppress(Exception):   # the connection may be gone
+                            conn.rollback()
+                    raise
+                self.cache.invalidate_sql(command)
+                if summaries:
+                    self.aggregates.invalidate()
+                return rowcount
+        except Exception as e:
+            logger.error(f"Command execution failed: {e}")
+            logger.error(f"Command was: {command}")
+            logger.error(f"Params were: {params}")
+            return 0
+
+    def cached_query(self, query: str, params: Optional[tuple] = None, ttl: Optional[float] = None) -> List[Dict[str, Any]]:
+        """execute_query through the shared result cache (see singlestore_cache)"""
+        return self.cache.get_or_run(query, params, lambda: self.execute_query(query, params), ttl)
+
+    def execute_many_queries(self, queries: Dict[str, Any], timeout: Optional[float] = QUERY_TIMEOUT,
+                             ttl: Optional[float] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Run independent read queries concurrently through the result cache (see singlestore_batch)"""
+        results, misses = {}, {}
+        for name, query in queries.items():
+            hit, rows = self.cache.get(*split_query(query))
+            if hit:
+                results[name] = rows
+            else:
+                misses[name] = query
+        for name, outcome in iter_many_queries(self.pool, misses, timeout):
+            self.profiler.record(*split_query(misses[name]), outcome['seconds'] or 0.0,
+                                 error=outcome['error'], result=outcome['rows'])
+            if outcome['status'] == 'ok':
+                results[name] = outcome['rows']
+                if outcome['rows']:
+                    self.cache.set(*split_query(misses[name]), outcome['rows'], ttl)
+            else:
+                logger.error(f"Query '{name}' {outcome['status']}: {outcome['error']}")
+                results[name] = []
+        return results
+
+    def get_dataframe(self, query: str, params: Optional[tuple] = None, **kwargs) -> pd.DataFrame:
+        """Execute query and return results as a typed pandas DataFrame (see singlestore_frames)"""
+        kwargs.setdefault('cursor_factory', self.backend.stream_cursor)
+        try:
+            with self.profiler.track(query, params) as q:
+                df = fetch_dataframe(self.pool, query, params, **kwargs)
+                q.done(df)
+            return df
+        except Exception as e:
+            logger.error(f"DataFrame creation failed: {e}")
+            return pd.DataFrame()
+
+    def batch_insert_dataframe(self, df: pd.DataFrame, table_name: str, **kwargs) -> bool:
+        """Bulk insert DataFrame into database table (see singlestore_bulk_load)
+
+        Extra keyword arguments go to bulk_load: method='load' for LOAD DATA
+        LOCAL INFILE, workers=N for parallel chunks, chunk_rows, retries, progress.
+        Returns True when every row was loaded; bad rows are logged, not fatal.
+        """
+        try:
+            if df.empty:
+                logger.warning("DataFrame is empty, nothing to insert")
+                return True
+
+            pool = self.pool
+            if kwargs.get('method') == 'load':
+                if self.backend.supports_load_data:
+                    if self._load_pool is None:
+                        self._load_pool = self.backend.pool(local_infile=True)
+                    pool = self._load_pool
+                else:
+                    logger.warning(f"{self.backend.name} has no LOAD DATA; using multi-row INSERT")
+                    kwargs['method'] = 'insert'
+            kwargs.setdefault('escape', self.backend.escape)
+            if self.backend.dialect != 'mysql':
+                kwargs.setdefault('max_packet', 64 * 1024 * 1024)
+            if table_name == AGG_SOURCE:
+                kwargs.setdefault('on_loaded', self.aggregates.apply_rows)
+            stats = bulk_load_dataframe(pool, df, table_name, **kwargs)
+            self.cache.invalidate_tables([table_name])
+            for err in stats['errors'][:10]:
+                logger.error(f"Row {err['index']} rejected: {err['error']}")
+            if stats['failed_rows']:
+                logger.error(f"{stats['failed_rows']} of {len(df)} rows failed to load into {table_name}")
+            logger.info(f"Successfully inserted {stats['loaded']} rows into {table_name} "
+                        f"({stats['rows_per_sec']:,.0f} rows/s)")
+            return stats['failed_rows'] == 0
+        except Exception as e:
+            logger.error(f"Batch insert failed: {e}")
+            return False
+
+    def export_full_table(self, out_dir: str = 'uk_price_paid_export', fmt: str = 'parquet',
+                          table: str = 'uk_price_paid', key: str = 'date', **kwargs) -> Dict[str, Any]:
+        """Stream the whole table to chunked Parquet / gzip CSV (no LIMIT, flat memory, resumable)"""
+        kwargs.setdefault('cursor_factory', self.backend.stream_cursor)
+        kwargs.setdefault('placeholder', self.backend.placeholder)
+        print(f"\n💾 Exporting full {table} table → {out_dir} ({fmt})")
+        manifest = export_table(self.pool, table, out_dir, fmt, key,
+                                progress=kwargs.pop('progress', print_progress), **kwargs)
+        print(f"\n✅ Exported {manifest['rows']:,} rows in {len(manifest['parts'])} parts to {out_dir}")
+        return manifest
+
+    def test_connection(self) -> bool:
+        """Test the database connection"""
+        try:
+            with self.get_connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1 AS test_value")
+                    return cursor.fetchone() is not None
+        except Exception as e:
+            logger.error(f"❌ Connection test failed: {e}")
+            return False
+
+    def close(self):
+        """Release this client's pools; shared ones close with their last user"""
+        if self._closed:
+            return
+        self._closed = True
+        for pool in (self.pool, self._load_pool):
+            if pool is not None:
+                release_pool(pool)
@@ -0,0 +1,443 @@
+# singlestore_export.py
+"""
+Streaming export of a SingleStore table (uk_price_paid by default) to
+chunked Parquet or gzip CSV, with flat memory use regardless of table size.
+
+Rows are read through an unbuffered server-side cursor (pymysql SSCursor)
+with fetchmany(), ordered by a key column, and streamed into part files:
+
+    <out_dir>/
+        manifest.json            schema, finished parts, last written key
+        part_00000.parquet       one Parquet file per part, row groups of
+        part_00001.parquet       ROW_GROUP_ROWS rows            (--format parquet)
+        part_00000.csv.gz        …or gzip CSV with a header     (--format csv)
+        part_null.parquet        rows whose key is NULL (written last)
+
+A part is only closed where the key value changes, so every row with a given
+key lives in one part. Resuming therefore restarts the query at
+`WHERE key > last_key` with no duplicates or gaps even for non-unique keys
+like `date`. Parts are written to a .tmp file and renamed once complete,
+then the manifest is updated; a crash loses at most the part in flight.
+
+Column types come from cursor.description (DATE → date32, DATETIME →
+timestamp, DECIMAL → decimal128, INT → int64, …), so the files carry
+correct dtypes without a pd.to_numeric / pd.to_datetime pass afterwards.
+
+Usage:
+    python singlestore_export.py --format parquet --out uk_price_paid_export
+    python singlestore_export.py --format csv --part-rows 500000   # resumes
+"""
+import argparse
+import csv
+import datetime
+import decimal
+import glob
+import gzip
+import json
+import logging
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+logger = logging.getLogger(__name__)
+
+PART_ROWS      = 1_000_000
+ROW_GROUP_ROWS = 100_000
+FETCH_SIZE     = 10_000
+MANIFEST       = 'manifest.json'
+
+# MySQL protocol column type codes (pymysql.constants.FIELD_TYPE)
+_INT_TYPES      = {1, 2, 3, 8, 9}           # TINY SHORT LONG LONGLONG INT24
+_FLOAT_TYPES    = {4, 5}                    # FLOAT DOUBLE
+_DECIMAL_TYPES  = {0, 246}                  # DECIMAL NEWDECIMAL
+_DATE_TYPES     = {10, 14}                  # DATE NEWDATE
+_DATETIME_TYPES = {7, 12}                   # TIMESTAMP DATETIME
+_TIME_TYPES     = {11}
+_YEAR_TYPES     = {13}
+
+
+def _sscursor(conn):
+    import pymysql
+
+    return conn.cursor(pymysql.cursors.SSCursor)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Schema from cursor.description
+# ─────────────────────────────────────────────────────────────────────────────
+
+def column_types(description) -> List[Dict[str, Any]]:
+    """Portable column spec: name + logical type, from a DB-API description."""
+    cols = []
+    for d in description:
+        name, code = d[0], d[1]
+        precision = d[4] if len(d) > 4 else None
+        scale = d[5] if len(d) > 5 else None
+        if code in _INT_TYPES or code in _YEAR_TYPES:
+            kind = 'int'
+        elif code in _FLOAT_TYPES:
+            kind = 'float'
+        elif code in _DECIMAL_TYPES:
+            kind = 'decimal'
+        elif code in _DATE_TYPES:
+            kind = 'date'
+        elif code in _DATETIME_TYPES:
+            kind = 'datetime'
+        elif code in _TIME_TYPES:
+            kind = 'time'
+        elif code is None:
+            kind = None                     # driver gives no type: infer from data
+        else:
+            kind = 'string'
+        cols.append({'name': name, 'type': kind,
+                     'precision': precision, 'scale': scale})
+    return cols
+
+
+def _infer(value) -> str:
+    if isinstance(value, bool) or isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, decimal.Decimal):
+        return 'decimal'
+    if isinstance(value, datetime.datetime):
+        return 'datetime'
+    if isinstance(value, datetime.date):
+        return 'date'
+    if isinstance(value, datetime.timedelta):
+        return 'time'
+    return 'string'
+
+
+def _resolve_types(cols: List[Dict[str, Any]], rows: List[tuple]):
+    for i, col in enumerate(cols):
+        if col['type'] is None:
+            sample = next((r[i] for r in rows if r[i] is not None), None)
+            col['type'] = _infer(sample) if sample is not None else 'string'
+
+
+def _arrow_schema(cols: List[Dict[str, Any]]):
+    fields = []
+    for col in cols:
+        kind = col['type']
+        if kind == 'int':
+            t = pa.int64()
+        elif kind == 'float':
+            t = pa.float64()
+        elif kind == 'decimal':
+            precision = min(col.get('precision') or 38, 38)
+            t = pa.decimal128(precision, col.get('scale') or 0)
+        elif kind == 'date':
+            t = pa.date32()
+        elif kind == 'datetime':
+            t = pa.timestamp('us')
+        elif kind == 'time':
+            t = pa.duration('us')
+        else:
+            t = pa.string()
+        fields.append(pa.field(col['name'], t))
+    return pa.schema(fields)
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return value.decode('utf-8', 'replace')
+    return value
+
+
+def _json_key(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    return value
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Part writers — rows in, one finished file out
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _CsvPart:
+    suffix = '.csv.gz'
+
+    def __init__(self, path: str, cols, row_group_rows: int):
+        self._fh = gzip.open(path, 'wt', newline='', encoding='utf-8')
+        self._writer = csv.writer(self._fh)
+        self._writer.writerow([c['name'] for c in cols])
+
+    def write(self, rows: List[tuple]):
+        self._writer.writerows([_csv_value(v) for v in row] for row in rows)
+
+    def close(self):
+        self._fh.close()
+
+
+class _ParquetPart:
+    suffix = '.parquet'
+
+    def __init__(self, path: str, cols, row_group_rows: int):
+        self._schema = _arrow_schema(cols)
+        self._writer = pq.ParquetWriter(path, self._schema, compression='snappy')
+        self._buffer: List[tuple] = []
+        self._row_group_rows = row_group_rows
+
+    def write(self, rows: List[tuple]):
+        self._buffer.extend(rows)
+        while len(self._buffer) >= self._row_group_rows:
+            self._flush(self._buffer[:self._row_group_rows])
+            del self._buffer[:self._row_group_rows]
+
+    def _flush(self, rows: List[tuple]):
+        columns = [pa.array([r[i] for r in rows], type=f.type)
+                   for i, f in enumerate(self._schema)]
+        self._writer.write_table(pa.Table.from_arrays(columns, schema=self._schema))
+
+    def close(self):
+        if self._buffer:
+            self._flush(self._buffer)
+            self._buffer = []
+        self._writer.close()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Exporter
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _load_manifest(out_dir: str) -> Optional[Dict[str, Any]]:
+    path = os.path.join(out_dir, MANIFEST)
+    if not os.path.exists(path):
+        return None
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def _save_manifest(out_dir: str, manifest: Dict[str, Any]):
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + '.tmp', 'w') as fh:
+        json.dump(manifest, fh, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def export_table(pool, table: str = 'uk_price_paid', out_dir: str = 'uk_price_paid_export',
+                 fmt: str = 'parquet', key: str = 'date', columns: str = '*',
+                 part_rows: int = PART_ROWS, row_group_rows: int = ROW_GROUP_ROWS,
+                 fetch_size: int = FETCH_SIZE, resume: bool = True,
+                 progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 cursor_factory: Callable = _sscursor,
+                 placeholder: str = '%s') -> Dict[str, Any]:
+    """
+    Stream `table` ordered by `key` into part files under `out_dir`.
+
+    `pool` is anything with a .connection() context manager (a
+    singlestore_pool.ConnectionPool). `progress` is called after every fetch
+    with {'rows', 'parts', 'elapsed', 'rows_per_sec', 'last_key',
+    'total_estimate'}. Returns the final manifest.
+    """
+    if fmt not in ('parquet', 'csv'):
+        raise ValueError(f"Unknown export format: {fmt}")
+    if fmt == 'parquet' and not HAS_PYARROW:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+    part_cls = _ParquetPart if fmt == 'parquet' else _CsvPart
+
+    os.makedirs(out_dir, exist_ok=True)
+    for leftover in glob.glob(os.path.join(out_dir, '*.tmp')):
+        os.remove(leftover)
+
+    manifest = _load_manifest(out_dir) if resume else None
+    if manifest and (manifest['table'], manifest['key'], manifest['format']) != (table, key, fmt):
+        raise ValueError(f"{out_dir} holds an export of {manifest['table']} by "
+                         f"{manifest['key']} as {manifest['format']}; use another --out")
+    if manifest is None:
+        for old in glob.glob(os.path.join(out_dir, 'part_*')):
+            os.remove(old)
+        manifest = {'table': table, 'key': key, 'format': fmt, 'columns': None,
+                    'parts': [], 'rows': 0, 'last_key': None,
+                    'null_done': False, 'complete': False}
+        _save_manifest(out_dir, manifest)
+    elif manifest['complete']:
+        logger.info(f"Export of {table} in {out_dir} is already complete")
+        return manifest
+    else:
+        logger.info(f"Resuming export of {table} after {key} = {manifest['last_key']} "
+                    f"({manifest['rows']:,} rows in {len(manifest['parts'])} parts)")
+
+    started = time.monotonic()
+    rows_at_start = manifest['rows']
+    total_estimate = None
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(f"SELECT TABLE_ROWS FROM information_schema.TABLES "
+                        f"WHERE TABLE_NAME = {placeholder}", (table,))
+            row = cur.fetchone()
+            total_estimate = (row[0] if not isinstance(row, dict) else row['TABLE_ROWS']) if row else None
+        except Exception:
+            pass
+        finally:
+            cur.close()
+
+    def report():
+        if progress:
+            elapsed = time.monotonic() - started
+            progress({'rows': manifest['rows'], 'parts': len(manifest['parts']),
+                      'elapsed': elapsed,
+                      'rows_per_sec': (manifest['rows'] - rows_at_start) / elapsed if elapsed else 0.0,
+                      'last_key': manifest['last_key'],
+                      'total_estimate': total_estimate})
+
+    def stream(where: str, params: tuple, part_name: Callable[[], str], split: bool):
+        sql = f"SELECT {columns} FROM {table} WHERE {where}"
+        if split:
+            sql += f" ORDER BY {key}"
+        with pool.connection() as conn:
+            cur = cursor_factory(conn)
+            try:
+                cur.execute(sql, params)
+                cols = column_types(cur.description)
+                key_idx = [c['name'] for c in cols].index(key)
+                part, tmp, name, part_count, part_key = None, None, None, 0, None
+
+                def finish():
+                    part.close()
+                    os.replace(tmp, os.path.join(out_dir, name))
+                    manifest['parts'].append({'file': name, 'rows': part_count,
+                                              'last_key': _json_key(part_key)})
+                    manifest['rows'] += part_count
+                    if split:
+                        manifest['last_key'] = _json_key(part_key)
+                    else:
+                        # the NULL part and its done flag land in one manifest save
+                        manifest['null_done'] = True
+                    _save_manifest(out_dir, manifest)
+
+                while True:
+                    rows = cur.fetchmany(fetch_size)
+                    if not rows:
+                        break
+                    if manifest['columns'] is None:
+                        _resolve_types(cols, rows)
+                        manifest['columns'] = cols
+                    cols = manifest['columns']
+                    start = 0
+                    for i, row in enumerate(rows):
+                        if (part is not None and split and part_count + (i - start) >= part_rows
+                                and row[key_idx] != part_key):
+                            part.write(rows[start:i])
+                            part_count += i - start
+                            finish()
+                            part, start = None, i
+                        if part is None:
+                            name = part_name() + part_cls.suffix
+                            tmp = os.path.join(out_dir, name + '.tmp')
+                            part, part_count = part_cls(tmp, cols, row_group_rows), 0
+                        part_key = row[key_idx]
+                    part.write(rows[start:])
+                    part_count += len(rows) - start
+                    report()
+                if part is not None:
+                    finish()
+            finally:
+                cur.close()
+
+    if manifest['last_key'] is None:
+        where, params = f"{key} IS NOT NULL", ()
+    else:
+        where, params = f"{key} > {placeholder}", (manifest['last_key'],)
+    stream(where, params,
+           lambda: f"part_{len(manifest['parts']):05d}", split=True)
+
+    if not manifest['null_done']:
+        # a manifest saved between the NULL part and its flag lists the part
+        # already; drop it so re-streaming doesn't count those rows twice
+        stale = [p for p in manifest['parts'] if p['file'].startswith('part_null')]
+        if stale:
+            manifest['parts'] = [p for p in manifest['parts'] if p not in stale]
+            manifest['rows'] -= sum(p['rows'] for p in stale)
+        stream(f"{key} IS NULL", (), lambda: 'part_null', split=False)
+        manifest['null_done'] = True
+
+    manifest['complete'] = True
+    _save_manifest(out_dir, manifest)
+    report()
+    return manifest
+
+
+def write_query(pool, sql: str, params: tuple, path: str, fmt: str = 'parquet',
+                row_group_rows: int = ROW_GROUP_ROWS, fetch_size: int = FETCH_SIZE,
+                cursor_factory: Callable = _sscursor) -> Dict[str, Any]:
+    """
+    Stream one query's result into a single Parquet / gzip CSV file at
+    `path` (written as path.tmp, renamed when complete). Returns
+    {'rows', 'columns'}.
+    """
+    if fmt == 'parquet' and not HAS_PYARROW:
+        raise RuntimeError("Parquet export needs pyarrow: pip install pyarrow")
+    part_cls = _ParquetPart if fmt == 'parquet' else _CsvPart
+    tmp, part, rows_written, cols = path + '.tmp', None, 0, None
+    with pool.connection() as conn:
+        cur = cursor_factory(conn)
+        try:
+            cur.execute(sql, params)
+            cols = column_types(cur.description)
+            while True:
+                rows = cur.fetchmany(fetch_size)
+                if not rows:
+                    break
+                if part is None:
+                    _resolve_types(cols, rows)
+                    part = part_cls(tmp, cols, row_group_rows)
+                part.write(rows)
+                rows_written += len(rows)
+        finally:
+            cur.close()
+    if part is None:
+        _resolve_types(cols, [])
+        part = part_cls(tmp, cols, row_group_rows)
+    part.close()
+    os.replace(tmp, path)
+    return {'rows': rows_written, 'columns': cols}
+
+
+def print_progress(p: Dict[str, Any]):
+    total = f" / ~{p['total_estimate']:,}" if p.get('total_estimate') else ''
+    print(f"\r  {p['rows']:>12,}{total} rows  {p['parts']:>4} parts  "
+          f"{p['rows_per_sec']:>10,.0f} rows/s  key={p['last_key']}", end='', flush=True)
+
+
+def main():
+    from singlestore_manager_fixed import SingleStoreManager
+
+    ap = argparse.ArgumentParser(description="Stream a SingleStore table to Parquet / gzip CSV")
+    ap.add_argument('--table', default='uk_price_paid')
+    ap.add_argument('--out', default='uk_price_paid_export')
+    ap.add_argument('--format', choices=['parquet', 'csv'], default='parquet')
+    ap.add_argument('--key', default='date')
+    ap.add_argument('--part-rows', type=int, default=PART_ROWS)
+    ap.add_argument('--row-group-rows', type=int, default=ROW_GROUP_ROWS)
+    ap.add_argument('--fetch-size', type=int, default=FETCH_SIZE)
+    ap.add_argument('--restart', action='store_true', help="ignore an existing manifest")
+    args = ap.parse_args()
+
+    db = SingleStoreManager()
+    print(f"💾 Exporting {args.table} → {args.out} ({args.format})")
+    manifest = export_table(db.pool, args.table, args.out, args.format, args.key,
+                            part_rows=args.part_rows, row_group_rows=args.row_group_rows,
+                            fetch_size=args.fetch_size, resume=not args.restart,
+                            progress=print_progress)
+    print(f"\n✅ {manifest['rows']:,} rows in {len(manifest['parts'])} parts")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,155 @@
+# singlestore_frames.py
+"""
+Typed, columnar result path for get_dataframe.
+
+The managers used to fetch through DictCursor (one dict per row), build the
+DataFrame from that list, and then fix dtypes with pd.to_numeric /
+pd.to_datetime in a second pass. Here rows come back as plain tuples in
+batches (fetchmany on an unbuffered cursor), each batch is transposed into
+columns, and each column is converted once into a typed buffer chosen from
+cursor.description:
+
+    INT / YEAR            int64   (pandas Int64 if the column has NULLs)
+    FLOAT / DOUBLE        float64
+    DECIMAL               float64 (what pd.to_numeric gave before)
+    DATE / DATETIME       datetime64
+    TIME                  timedelta64
+    everything else       object (str)
+
+engine='numpy' (default) builds NumPy arrays; engine='arrow' builds Arrow
+arrays and returns a DataFrame with Arrow-backed dtypes (needs pyarrow and
+pandas >= 2.0), and fetch_arrow() returns the pyarrow.Table itself.
+
+Drivers that report no column types (sqlite3 in the local stand-ins) get
+types inferred from the first batch; `dtypes={'date': 'date'}` overrides the
+type of named columns, e.g. dates stored as text.
+"""
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from singlestore_export import (column_types, _resolve_types, _arrow_schema,
+                                _sscursor, HAS_PYARROW)
+
+if HAS_PYARROW:
+    import pyarrow as pa
+
+BATCH_SIZE = 50_000
+
+_NUMPY_TYPES = {
+    'float': np.float64,
+    'decimal': np.float64,
+    'date': 'datetime64[D]',
+    'datetime': 'datetime64[us]',
+    'time': 'timedelta64[us]',
+}
+
+
+def _to_numpy(kind: str, values: tuple):
+    """One batch of one column → (array, null mask or None)."""
+    n = len(values)
+    if kind == 'int':
+        mask = np.fromiter((v is None for v in values), dtype=bool, count=n)
+        if mask.any():
+            return np.fromiter((0 if v is None else v for v in values),
+                               dtype=np.int64, count=n), mask
+        return np.fromiter(values, dtype=np.int64, count=n), None
+    if kind in _NUMPY_TYPES:
+        return np.array(values, dtype=_NUMPY_TYPES[kind]), None
+    out = np.empty(n, dtype=object)
+    out[:] = values
+    return out, None
+
+
+def _columns(pool, query: str, params, batch_size: int, dtypes: Optional[Dict[str, str]],
+             cursor_factory: Callable, on_batch: Callable[[List[Dict[str, Any]], List[tuple]], None]):
+    """Run `query`, call on_batch(cols, column_tuples) per fetched batch; return cols."""
+    cols = None
+    with pool.connection() as conn:
+        cur = cursor_factory(conn)
+        try:
+            cur.execute(query, params) if params is not None else cur.execute(query)
+            cols = column_types(cur.description)
+            for col in cols:
+                if dtypes and col['name'] in dtypes:
+                    col['type'] = dtypes[col['name']]
+            first = True
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                if first:
+                    _resolve_types(cols, rows)
+                    first = False
+                on_batch(cols, list(zip(*rows)))
+        finally:
+            cur.close()
+    _resolve_types(cols, [])
+    return cols
+
+
+def fetch_dataframe(pool, query: str, params: Optional[tuple] = None,
+                    batch_size: int = BATCH_SIZE, engine: str = 'numpy',
+                    dtypes: Optional[Dict[str, str]] = None,
+                    cursor_factory: Callable = _sscursor) -> pd.DataFrame:
+    """Run `query` on a pooled connection and build a correctly typed DataFrame."""
+    if engine == 'arrow':
+        return fetch_arrow(pool, query, params, batch_size, dtypes,
+                           cursor_factory).to_pandas(types_mapper=pd.ArrowDtype)
+    if engine != 'numpy':
+        raise ValueError(f"Unknown engine: {engine}")
+
+    parts: List[List[tuple]] = []
+
+    def on_batch(cols, columns):
+        parts.append([_to_numpy(c['type'], v) for c, v in zip(cols, columns)])
+
+    cols = _columns(pool, query, params, batch_size, dtypes, cursor_factory, on_batch)
+    data = {}
+    for i, col in enumerate(cols):
+        chunks = [p[i] for p in parts]
+        if not chunks:
+            data[col['name']] = np.array([], dtype=_NUMPY_TYPES.get(col['type'],
+                                         np.int64 if col['type'] == 'int' else object))
+            continue
+        values = np.concatenate([a for a, _ in chunks]) if len(chunks) > 1 else chunks[0][0]
+        if any(m is not None for _, m in chunks):
+            mask = np.concatenate([m if m is not None else np.zeros(len(a), dtype=bool)
+                                   for a, m in chunks])
+            values = pd.arrays.IntegerArray(values, mask)
+        data[col['name']] = values
+        for p in parts:
+            p[i] = None                     # release the batch buffers as we go
+    return pd.DataFrame(data, copy=False)
+
+
+def fetch_arrow(pool, query: str, params: Optional[tuple] = None,
+                batch_size: int = BATCH_SIZE, dtypes: Optional[Dict[str, str]] = None,
+                cursor_factory: Callable = _sscursor):
+    """Run `query` and return a pyarrow.Table built batch by batch."""
+    if not HAS_PYARROW:
+        raise RuntimeError("engine='arrow' needs pyarrow: pip install pyarrow")
+    batches = []
+    state = {}
+
+    def on_batch(cols, columns):
+        if 'schema' not in state:
+            state['schema'] = _arrow_schema(cols)
+        schema = state['schema']
+        arrays = []
+        for field, values in zip(schema, columns):
+            sample = next((v for v in values if v is not None), None)
+            if pa.types.is_decimal(field.type):
+                arrays.append(pa.array(values, type=field.type).cast(pa.float64()))
+            elif isinstance(sample, str) and not pa.types.is_string(field.type):
+                # typed via `dtypes` but stored as text (sqlite stand-in)
+                arrays.append(pa.array(values, type=pa.string()).cast(field.type))
+            else:
+                arrays.append(pa.array(values, type=field.type))
+        batches.append(pa.RecordBatch.from_arrays(arrays, names=schema.names))
+
+    cols = _columns(pool, query, params, batch_size, dtypes, cursor_factory, on_batch)
+    if not batches:
+        return _arrow_schema(cols).empty_table()
+    return pa.Table.from_batches(batches)
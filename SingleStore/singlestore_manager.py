@@ -1,12 +1,10 @@
 # singlestore_manager.py
-import pymysql
 import pandas as pd
-from typing import List, Dict, Any, Optional
-from contextlib import contextmanager
-import os
 from dotenv import load_dotenv
 import logging
 
+from singlestore_client import SingleStoreClient
+
 # Load environment variables
 load_dotenv()
 
@@ -14,67 +12,7 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SingleStoreManager:
-    def __init__(self):
-        self.connection_config = {
-            'host': os.getenv('SINGLESTORE_HOST'),
-            'port': int(os.getenv('SINGLESTORE_PORT', 3333)),
-            'user': os.getenv('SINGLESTORE_USER'),
-            'password': os.getenv('SINGLESTORE_PASSWORD'),
-            'database': os.getenv('SINGLESTORE_DATABASE'),
-            'ssl': {'ssl_disabled': False},
-            'charset': 'utf8mb4',
-            'cursorclass': pymysql.cursors.DictCursor,
-            'autocommit': True
-        }
-    
-    @contextmanager
-    def get_connection(self):
-        """Context manager for database connections"""
-        connection = None
-        try:
-            connection = pymysql.connect(**self.connection_config)
-            yield connection
-        except Exception as e:
-            logger.error(f"Connection error: {e}")
-            raise
-        finally:
-            if connection:
-                connection.close()
-    
-    def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
-        """Execute a SELECT query and return results"""
-        try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(query, params)
-                    result = cursor.fetchall()
-                    return result
-        except Exception as e:
-            logger.error(f"Query execution failed: {e}")
-            return []
-    
-    def execute_command(self, command: str, params: Optional[tuple] = None) -> int:
-        """Execute INSERT, UPDATE, DELETE commands"""
-        try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(command, params)
-                    return cursor.rowcount
-        except Exception as e:
-            logger.error(f"Command execution failed: {e}")
-            return 0
-    
-    def get_dataframe(self, query: str, params: Optional[tuple] = None) -> pd.DataFrame:
-        """Execute query and return results as pandas DataFrame"""
-        try:
-            with self.get_connection() as conn:
-                df = pd.read_sql(query, conn, params=params)
-                return df
-        except Exception as e:
-            logger.error(f"DataFrame creation failed: {e}")
-            return pd.DataFrame()
-    
+class SingleStoreManager(SingleStoreClient):
     def analyze_uk_price_paid(self):
         """Analyze the existing uk_price_paid table"""
         print("🏠 Analyzing UK Price Paid Table")
@@ -95,7 +33,7 @@ class SingleStoreManager:
                 print(f"  Row {i}: {row}")
         
         # Get basic statistics
-        stats = self.execute_query("""
+        stats = self.cached_query("""
             SELECT 
                 COUNT(*) as total_rows,
                 MIN(date) as earliest_date,
@@ -114,7 +52,7 @@ class SingleStoreManager:
             print(f"  Price Stats: Avg £{stats_row['avg_price']:,.2f}, Min £{stats_row['min_price']:,}, Max £{stats_row['max_price']:,}")
         
         # Get price distribution by year
-        yearly_stats = self.execute_query("""
+        yearly_stats = self.cached_query("""
             SELECT 
                 YEAR(date) as year,
                 COUNT(*) as transactions,
@@ -130,6 +68,8 @@ class SingleStoreManager:
             print(f"\n📅 Yearly Price Statistics:")
             for row in yearly_stats:
                 print(f"  {row['year']}: {row['transactions']:,} transactions, Avg £{row['avg_price']:,.0f}")
+        
+        self.cache.log_stats()
     
     def create_sample_tables(self):
         """Create some sample tables for testing"""
@@ -1,12 +1,10 @@
 # singlestore_manager_fixed.py
-import pymysql
 import pandas as pd
-from typing import List, Dict, Any, Optional
-from contextlib import contextmanager
-import os
 from dotenv import load_dotenv
 import logging
 
+from singlestore_client import SingleStoreClient
+
 # Load environment variables
 load_dotenv()
 
@@ -14,72 +12,7 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SingleStoreManager:
-    def __init__(self):
-        self.connection_config = {
-            'host': os.getenv('SINGLESTORE_HOST'),
-            'port': int(os.getenv('SINGLESTORE_PORT', 3333)),
-            'user': os.getenv('SINGLESTORE_USER'),
-            'password': os.getenv('SINGLESTORE_PASSWORD'),
-            'database': os.getenv('SINGLESTORE_DATABASE'),
-            'ssl': {'ssl_disabled': False},
-            'charset': 'utf8mb4',
-            'cursorclass': pymysql.cursors.DictCursor,
-            'autocommit': True
-        }
-    
-    @contextmanager
-    def get_connection(self):
-        """Context manager for database connections"""
-        connection = None
-        try:
-            connection = pymysql.connect(**self.connection_config)
-            yield connection
-        except Exception as e:
-            logger.error(f"Connection error: {e}")
-            raise
-        finally:
-            if connection:
-                connection.close()
-    
-    def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
-        """Execute a SELECT query and return results"""
-        try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(query, params)
-                    result = cursor.fetchall()
-                    return result
-        except Exception as e:
-            logger.error(f"Query execution failed: {e}")
-            return []
-    
-    def execute_command(self, command: str, params: Optional[tuple] = None) -> int:
-        """Execute INSERT, UPDATE, DELETE commands"""
-        try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(command, params)
-                    return cursor.rowcount
-        except Exception as e:
-            logger.error(f"Command execution failed: {e}")
-            return 0
-    
-    def get_dataframe(self, query: str, params: Optional[tuple] = None) -> pd.DataFrame:
-        """Execute query and return results as pandas DataFrame - FIXED VERSION"""
-        try:
-            # First get the data as dictionaries
-            data = self.execute_query(query, params)
-            if data:
-                # Convert to DataFrame
-                df = pd.DataFrame(data)
-                return df
-            else:
-                return pd.DataFrame()
-        except Exception as e:
-            logger.error(f"DataFrame creation failed: {e}")
-            return pd.DataFrame()
-    
+class SingleStoreManager(SingleStoreClient):
     def analyze_uk_price_paid(self):
         """Analyze the existing uk_price_paid table"""
         print("🏠 Analyzing UK Price Paid Table")
@@ -100,7 +33,7 @@ class SingleStoreManager:
                 print(f"  Row {i}: {row}")
         
         # Get basic statistics
-        stats = self.execute_query("""
+        stats = self.cached_query("""
             SELECT 
                 COUNT(*) as total_rows,
                 MIN(date) as earliest_date,
@@ -119,7 +52,7 @@ class SingleStoreManager:
             print(f"  Price Stats: Avg £{stats_row['avg_price']:,.2f}, Min £{stats_row['min_price']:,}, Max £{stats_row['max_price']:,}")
         
         # Get price distribution by year
-        yearly_stats = self.execute_query("""
+        yearly_stats = self.cached_query("""
             SELECT 
                 YEAR(date) as year,
                 COUNT(*) as transactions,
@@ -135,6 +68,8 @@ class SingleStoreManager:
             print(f"\n📅 Yearly Price Statistics:")
             for row in yearly_stats:
                 print(f"  {row['year']}: {row['transactions']:,} transactions, Avg £{row['avg_price']:,.0f}")
+        
+        self.cache.log_stats()
     
     def create_sample_tables_singlestore(self):
         """Create sample tables compatible with SingleStore unique key restrictions"""
@@ -208,19 +143,52 @@ class SingleStoreManager:
         print("\n🔬 Advanced Analytics on UK Price Data")
         print("=" * 50)
         
+        # Independent aggregates: run them concurrently, one pooled connection each;
+        # read from the summary tables while they are fresh (see singlestore_aggregates)
+        results = self.execute_many_queries(self.aggregates.prefer({
+            # Property type analysis
+            'type_analysis': """
+                SELECT 
+                    type,
+                    COUNT(*) as count,
+                    AVG(price) as avg_price,
+                    MIN(price) as min_price,
+                    MAX(price) as max_price,
+                    COUNT(*) * 100.0 / (SELECT COUNT(*) FROM uk_price_paid) as percentage
+                FROM uk_price_paid 
+                WHERE type IS NOT NULL
+                GROUP BY type 
+                ORDER BY count DESC
+            """,
+            # Price distribution by county (top 10)
+            'county_analysis': """
+                SELECT 
+                    county,
+                    COUNT(*) as transactions,
+                    AVG(price) as avg_price,
+                    MAX(price) as max_price
+                FROM uk_price_paid 
+                WHERE county IS NOT NULL AND county != ''
+                GROUP BY county
+                ORDER BY avg_price DESC
+                LIMIT 10
+            """,
+            # Monthly trends for current year
+            'monthly_trends': """
+                SELECT 
+                    YEAR(date) as year,
+                    MONTH(date) as month,
+                    COUNT(*) as transactions,
+                    AVG(price) as avg_price
+                FROM uk_price_paid 
+                WHERE YEAR(date) = 2024
+                GROUP BY YEAR(date), MONTH(date)
+                ORDER BY year, month
+            """,
+        }))
+        
         # Property type analysis
-        type_analysis = self.execute_query("""
-            SELECT 
-                type,
-                COUNT(*) as count,
-                AVG(price) as avg_price,
-                MIN(price) as min_price,
-                MAX(price) as max_price,
-                COUNT(*) * 100.0 / (SELECT COUNT(*) FROM uk_price_paid) as percentage
-            FROM uk_price_paid 
-            GROUP BY type 
-            ORDER BY count DESC
-        """)
+        type_analysis = results['type_analysis']
         
         if type_analysis:
             print("\n🏘️ Property Type Analysis:")
@@ -228,18 +196,7 @@ class SingleStoreManager:
                 print(f"  {row['type']:15} {row['count']:>6,} properties ({row['percentage']:.1f}%) - Avg £{row['avg_price']:,.0f}")
         
         # Price distribution by county (top 10)
-        county_analysis = self.execute_query("""
-            SELECT 
-                county,
-                COUNT(*) as transactions,
-                AVG(price) as avg_price,
-                MAX(price) as max_price
-            FROM uk_price_paid 
-            WHERE county IS NOT NULL AND county != ''
-            GROUP BY county
-            ORDER BY avg_price DESC
-            LIMIT 10
-        """)
+        county_analysis = results['county_analysis']
         
         if county_analysis:
             print("\n🏛️ Top 10 Counties by Average Price:")
@@ -247,45 +204,23 @@ class SingleStoreManager:
                 print(f"  {i:2}. {row['county']:30} £{row['avg_price']:>10,.0f} (max: £{row['max_price']:>10,})")
         
         # Monthly trends for current year
-        monthly_trends = self.execute_query("""
-            SELECT 
-                YEAR(date) as year,
-                MONTH(date) as month,
-                COUNT(*) as transactions,
-                AVG(price) as avg_price
-            FROM uk_price_paid 
-            WHERE YEAR(date) = 2024
-            GROUP BY YEAR(date), MONTH(date)
-            ORDER BY year, month
-        """)
+        monthly_trends = results['monthly_trends']
         
         if monthly_trends:
             print(f"\n📈 2024 Monthly Trends:")
             for row in monthly_trends:
                 print(f"  {row['year']}-{row['month']:02d}: {row['transactions']:>5,} transactions, Avg £{row['avg_price']:,.0f}")
+        
+        self.cache.log_stats()
     
     def export_data_properly(self, limit: int = 1000):
         """Export data properly without pandas warnings"""
         print(f"\n💾 Exporting UK Price Paid Data (first {limit} rows)")
         
-        # Get data using our fixed method
-        data = self.execute_query(f"SELECT * FROM uk_price_paid LIMIT {limit}")
+        # Typed columns straight from the cursor - no to_numeric / to_datetime pass
+        df = self.get_dataframe(f"SELECT * FROM uk_price_paid LIMIT {limit}")
         
-        if data:
-            # Convert to DataFrame
-            df = pd.DataFrame(data)
-            
-            # Fix data types
-            numeric_columns = ['price', 'is_new']
-            for col in numeric_columns:
-                if col in df.columns:
-                    df[col] = pd.to_numeric(df[col], errors='coerce')
-            
-            date_columns = ['date']
-            for col in date_columns:
-                if col in df.columns:
-                    df[col] = pd.to_datetime(df[col], errors='coerce')
-            
+        if not df.empty:
             filename = f"uk_price_paid_sample_{limit}.csv"
             df.to_csv(filename, index=False)
             print(f"✅ Exported {len(df)} rows to {filename}")
@@ -298,7 +233,7 @@ class SingleStoreManager:
         else:
             print("❌ No data to export")
             return pd.DataFrame()
-
+    
 def main():
     db = SingleStoreManager()
     
@@ -0,0 +1,285 @@
+# singlestore_parallel_extract.py
+"""
+Parallel partitioned extract of a SingleStore table to partitioned
+Parquet / gzip CSV.
+
+A single streamed export (singlestore_export.py) is bound to one connection
+and one core on the client. This splits the table into N key ranges and
+reads them concurrently over pooled connections, each worker streaming its
+range straight into its own output file:
+
+    <out_dir>/
+        manifest.json                      plan, per-partition rows, status
+        year=1995-1999/part-0.parquet      partitions by YEAR(date)  (--by year)
+        year=2000-2003/part-0.parquet
+        ...
+        year=null/part-0.parquet           rows whose key is NULL
+        range=000/part-0.parquet           or equal-width numeric ranges (--by range)
+
+Planning
+  year    SELECT YEAR(key), COUNT(*) … GROUP BY 1, then contiguous years are
+          grouped into N partitions of roughly equal row count.
+  range   MIN/MAX of a numeric key cut into N equal-width ranges.
+
+Partitions are half-open ranges on the key itself (key >= lo AND key < hi),
+so the server can use the key's sort order; the first is open below and the
+last open above, plus one `key IS NULL` partition. check_partitions()
+verifies in one scan that every row matches exactly one partition predicate
+(no gaps, no overlaps), and the extract checks that the rows written add up
+to the table's row count.
+
+Finished partitions are recorded in the manifest; re-running skips them.
+
+Usage:
+    python singlestore_parallel_extract.py --workers 8 --partitions 16
+    python singlestore_parallel_extract.py --key price --by range --format csv
+"""
+import argparse
+import json
+import logging
+import os
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional
+
+from singlestore_export import write_query, _sscursor, HAS_PYARROW
+
+logger = logging.getLogger(__name__)
+
+YEAR_EXPR = 'YEAR({key})'
+MANIFEST  = 'manifest.json'
+
+
+def _literal(value) -> str:
+    if value is None:
+        return 'NULL'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _predicate(key: str, lo, hi) -> str:
+    parts = [f"{key} IS NOT NULL"]
+    if lo is not None:
+        parts.append(f"{key} >= {_literal(lo)}")
+    if hi is not None:
+        parts.append(f"{key} < {_literal(hi)}")
+    return ' AND '.join(parts)
+
+
+def _query(pool, sql: str) -> List[tuple]:
+    with pool.connection() as conn:
+        cur = conn.cursor()
+        try:
+            cur.execute(sql)
+            return [tuple(r.values()) if isinstance(r, dict) else tuple(r)
+                    for r in cur.fetchall()]
+        finally:
+            cur.close()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Planning
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _null_partition(by: str, key: str) -> Dict[str, Any]:
+    return {'name': f"{by}=null", 'lo': None, 'hi': None, 'where': f"{key} IS NULL"}
+
+
+def plan_year_partitions(pool, table: str, key: str = 'date', n: int = 8,
+                         year_expr: str = YEAR_EXPR) -> List[Dict[str, Any]]:
+    """N contiguous year ranges of roughly equal row count, plus NULL keys."""
+    expr = year_expr.format(key=key)
+    years = [(int(y), int(c)) for y, c in _query(
+        pool, f"SELECT {expr} AS y, COUNT(*) AS c FROM {table} "
+              f"WHERE {key} IS NOT NULL GROUP BY {expr} ORDER BY y")]
+    partitions = []
+    if years:
+        total = sum(c for _, c in years)
+        target = total / max(1, min(n, len(years)))
+        groups, current, acc = [], [], 0
+        for year, count in years:
+            current.append(year)
+            acc += count
+            if acc >= target * (len(groups) + 1) and len(groups) < n - 1:
+                groups.append(current)
+                current = []
+        if current:
+            groups.append(current)
+        for i, group in enumerate(groups):
+            lo = f"{group[0]}-01-01" if i > 0 else None
+            hi = f"{group[-1] + 1}-01-01" if i < len(groups) - 1 else None
+            label = f"{group[0]}" if len(group) == 1 else f"{group[0]}-{group[-1]}"
+            partitions.append({'name': f"year={label}", 'lo': lo, 'hi': hi,
+                               'where': _predicate(key, lo, hi)})
+    partitions.append(_null_partition('year', key))
+    return partitions
+
+
+def plan_range_partitions(pool, table: str, key: str, n: int = 8) -> List[Dict[str, Any]]:
+    """N equal-width ranges of a numeric key, plus NULL keys."""
+    lo_val, hi_val = _query(pool, f"SELECT MIN({key}), MAX({key}) FROM {table}")[0]
+    partitions = []
+    if lo_val is not None:
+        if isinstance(lo_val, int) and isinstance(hi_val, int):
+            bounds = sorted(set(lo_val + (hi_val - lo_val) * i // n for i in range(1, n)) - {lo_val})
+        else:
+            lo_val, hi_val = float(lo_val), float(hi_val)
+            step = (hi_val - lo_val) / n
+            bounds = [lo_val + step * i for i in range(1, n)] if step else []
+        edges = [None] + bounds + [None]
+        for i in range(len(edges) - 1):
+            lo, hi = edges[i], edges[i + 1]
+            partitions.append({'name': f"range={i:03d}", 'lo': lo, 'hi': hi,
+                               'where': _predicate(key, lo, hi)})
+    partitions.append(_null_partition('range', key))
+    return partitions
+
+
+def check_partitions(pool, table: str, partitions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    One scan: how many rows match no partition predicate, and how many match
+    more than one. `ok` means the partitions exactly cover the table.
+    """
+    matches = ' + '.join(f"COALESCE(({p['where']}), 0)" for p in partitions)
+    total, uncovered, overlapping = _query(pool, f"""
+        SELECT COUNT(*),
+               COALESCE(SUM(CASE WHEN m = 0 THEN 1 ELSE 0 END), 0),
+               COALESCE(SUM(CASE WHEN m > 1 THEN 1 ELSE 0 END), 0)
+        FROM (SELECT {matches} AS m FROM {table}) AS x
+    """)[0]
+    bounded = [p for p in partitions if p['lo'] is not None or p['hi'] is not None]
+    ordered = all(a['hi'] is not None and b['lo'] == a['hi']
+                  for a, b in zip(bounded, bounded[1:]))
+    return {'total': int(total), 'uncovered': int(uncovered),
+            'overlapping': int(overlapping), 'contiguous': ordered,
+            'ok': int(uncovered) == 0 and int(overlapping) == 0 and ordered}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Extract
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _save_manifest(out_dir: str, manifest: Dict[str, Any]):
+    path = os.path.join(out_dir, MANIFEST)
+    with open(path + '.tmp', 'w') as fh:
+        json.dump(manifest, fh, indent=2, default=str)
+    os.replace(path + '.tmp', path)
+
+
+def extract_partitioned(pool, table: str = 'uk_price_paid', out_dir: str = 'uk_price_paid_partitioned',
+                        key: str = 'date', by: str = 'year', partitions: int = 8,
+                        workers: int = 4, fmt: str = 'parquet', columns: str = '*',
+                        check: bool = True, resume: bool = True,
+                        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+                        cursor_factory: Callable = _sscursor,
+                        year_expr: str = YEAR_EXPR, **write_kwargs) -> Dict[str, Any]:
+    """
+    Plan, verify and extract `table` into partitioned files with `workers`
+    concurrent readers. `progress` is called as each partition finishes.
+    Returns the manifest (plan, per-partition rows, check, timings).
+    """
+    if by not in ('year', 'range'):
+        raise ValueError(f"Unknown partitioning: {by}")
+    if workers > getattr(pool, 'max_size', workers):
+        logger.warning(f"{workers} workers but the pool holds {pool.max_size} connections; "
+                       f"extra workers will wait")
+
+    manifest_path = os.path.join(out_dir, MANIFEST)
+    manifest = None
+    if resume and os.path.exists(manifest_path):
+        with open(manifest_path) as fh:
+            manifest = json.load(fh)
+        if (manifest['table'], manifest['key'], manifest['by'], manifest['format']) != (table, key, by, fmt):
+            raise ValueError(f"{out_dir} holds a different extract; use another --out")
+    if manifest is None:
+        shutil.rmtree(out_dir, ignore_errors=True)
+        os.makedirs(out_dir)
+        if by == 'year':
+            plan = plan_year_partitions(pool, table, key, partitions, year_expr)
+        else:
+            plan = plan_range_partitions(pool, table, key, partitions)
+        manifest = {'table': table, 'key': key, 'by': by, 'format': fmt,
+                    'partitions': [dict(p, rows=None, done=False) for p in plan],
+                    'check': None}
+        if check:
+            manifest['check'] = check_partitions(pool, table, plan)
+            if not manifest['check']['ok']:
+                raise RuntimeError(f"Partition plan does not cover {table} exactly: "
+                                   f"{manifest['check']}")
+        _save_manifest(out_dir, manifest)
+
+    suffix = '.parquet' if fmt == 'parquet' else '.csv.gz'
+    todo = [p for p in manifest['partitions'] if not p['done']]
+    started = time.monotonic()
+
+    def run(p):
+        part_dir = os.path.join(out_dir, p['name'])
+        os.makedirs(part_dir, exist_ok=True)
+        t0 = time.monotonic()
+        result = write_query(pool, f"SELECT {columns} FROM {table} WHERE {p['where']}", (),
+                             os.path.join(part_dir, 'part-0' + suffix), fmt,
+                             cursor_factory=cursor_factory, **write_kwargs)
+        return p, result['rows'], time.monotonic() - t0
+
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(run, p) for p in todo]
+        for fut in as_completed(futures):
+            p, rows, secs = fut.result()
+            p.update(rows=rows, done=True, seconds=round(secs, 3))
+            _save_manifest(out_dir, manifest)
+            if progress:
+                progress({'partition': p['name'], 'rows': rows, 'seconds': secs,
+                          'done': sum(q['done'] for q in manifest['partitions']),
+                          'total': len(manifest['partitions'])})
+
+    written = sum(p['rows'] for p in manifest['partitions'])
+    manifest['rows'] = written
+    manifest['seconds'] = round(time.monotonic() - started, 3)
+    if manifest.get('check'):
+        manifest['rows_match'] = written == manifest['check']['total']
+        if not manifest['rows_match']:
+            logger.warning(f"Wrote {written:,} rows but {table} had "
+                           f"{manifest['check']['total']:,} when planned "
+                           f"(concurrent writes?)")
+    _save_manifest(out_dir, manifest)
+    return manifest
+
+
+def main():
+    from singlestore_manager_fixed import SingleStoreManager
+    from singlestore_pool import ConnectionPool
+
+    ap = argparse.ArgumentParser(description="Parallel partitioned extract to Parquet / gzip CSV")
+    ap.add_argument('--table', default='uk_price_paid')
+    ap.add_argument('--out', default='uk_price_paid_partitioned')
+    ap.add_argument('--key', default='date')
+    ap.add_argument('--by', choices=['year', 'range'], default='year')
+    ap.add_argument('--partitions', type=int, default=8)
+    ap.add_argument('--workers', type=int, default=4)
+    ap.add_argument('--format', choices=['parquet', 'csv'],
+                    default='parquet' if HAS_PYARROW else 'csv')
+    ap.add_argument('--restart', action='store_true', help="ignore an existing manifest")
+    args = ap.parse_args()
+
+    import pymysql
+
+    db = SingleStoreManager()
+    config = db.connection_config
+    pool = ConnectionPool(lambda: pymysql.connect(**config), max_size=args.workers,
+                          health_check=lambda c: c.ping(reconnect=False))
+    print(f"💾 Extracting {args.table} by {args.by}({args.key}) → {args.out} "
+          f"with {args.workers} workers")
+    manifest = extract_partitioned(
+        pool, args.table, args.out, args.key, args.by, args.partitions, args.workers,
+        args.format, resume=not args.restart,
+        progress=lambda p: print(f"  ✅ [{p['done']}/{p['total']}] {p['partition']:<20} "
+                                 f"{p['rows']:>12,} rows  {p['seconds']:.1f}s"))
+    print(f"✅ {manifest['rows']:,} rows in {manifest['seconds']:.1f}s; "
+          f"coverage check: {manifest['check']}")
+    pool.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+# singlestore_pool.py
+"""
+Thread-safe connection pool shared by the pymysql-based SingleStore clients
+(SingleStoreManager in singlestore_manager.py / _fixed.py /
+singlestore_simple_manager.py and SingleStoreDB in
+singlestore_pymysql_wrapper.py).
+
+Opening a SingleStore Cloud connection costs a TCP + TLS handshake plus
+authentication; the managers used to pay that on every execute_query /
+execute_command. Connections are now borrowed from a pool and handed back:
+
+    pool = pymysql_pool(connection_config)
+    with pool.connection() as conn:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT 1")
+
+Behaviour
+  min_size / max_size   idle connections opened up front / hard cap on open
+  recycle               connections older than this (seconds) are replaced
+  check_after           connections idle longer than this are pinged first
+  timeout               how long acquire() waits for a free connection
+
+Settings default to the SINGLESTORE_POOL_* environment variables, the same
+ones singlestore_sqlalchemy_env.py reads for its engine. Pools are shared per
+connection config, so every manager instance pointing at the same database
+reuses the same connections. get_pool() counts its callers: release_pool()
+drops one reference and closes the pool with the last, close_all_pools()
+closes every shared pool regardless.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+POOL_MIN_SIZE    = int(os.getenv('SINGLESTORE_POOL_MIN', 1))
+POOL_MAX_SIZE    = int(os.getenv('SINGLESTORE_POOL_SIZE', 5))
+POOL_RECYCLE     = float(os.getenv('SINGLESTORE_POOL_RECYCLE', 3600))
+POOL_TIMEOUT     = float(os.getenv('SINGLESTORE_POOL_TIMEOUT', 30))
+POOL_CHECK_AFTER = float(os.getenv('SINGLESTORE_POOL_CHECK_AFTER', 30))
+
+
+class PoolTimeout(Exception):
+    """No connection became free within the pool timeout."""
+
+
+class _Entry:
+    __slots__ = ('conn', 'created', 'last_used')
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.created = self.last_used = time.monotonic()
+
+
+class ConnectionPool:
+    """Bounded LIFO pool of DB-API connections produced by `connect()`."""
+
+    def __init__(self, connect: Callable[[], Any],
+                 min_size: int = POOL_MIN_SIZE,
+                 max_size: int = POOL_MAX_SIZE,
+                 recycle: float = POOL_RECYCLE,
+                 timeout: float = POOL_TIMEOUT,
+                 check_after: float = POOL_CHECK_AFTER,
+                 health_check: Optional[Callable[[Any], None]] = None,
+                 name: str = 'singlestore'):
+        if max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min={min_size}, max={max_size}")
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.recycle = recycle
+        self.timeout = timeout
+        self.check_after = check_after
+        self.health_check = health_check
+        self.name = name
+
+        self._cond = threading.Condition()
+        self._idle = deque()        # _Entry, most recently used on the right
+        self._size = 0              # open connections, idle + in use
+        self._closed = False
+        self._warmed = False
+        self._metrics = {
+            'acquired': 0, 'created': 0, 'reused': 0,
+            'recycled': 0, 'failed_checks': 0, 'timeouts': 0,
+            'wait_total': 0.0, 'wait_max': 0.0,
+        }
+
+    # ── connection lifecycle ──────────────────────────────────────────────────
+
+    def _open(self) -> _Entry:
+        try:
+            entry = _Entry(self._connect())
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._metrics['created'] += 1
+        return entry
+
+    def _discard(self, entry: _Entry):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+    def _healthy(self, conn) -> bool:
+        if self.health_check is None:
+            return True
+        try:
+            self.health_check(conn)
+            return True
+        except Exception as e:
+            logger.warning(f"[{self.name}] Dropping unhealthy connection: {e}")
+            return False
+
+    def warm(self):
+        """Open idle connections up to min_size."""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                entry = self._open()
+            except Exception as e:
+                logger.warning(f"[{self.name}] Pool warm-up failed: {e}")
+                return
+            with self._cond:
+                self._idle.appendleft(entry)
+                self._cond.notify()
+
+    # ── acquire / release ─────────────────────────────────────────────────────
+
+    def _acquire(self) -> _Entry:
+        start = time.monotonic()
+        deadline = start + self.timeout
+        entry = None
+        with self._cond:
+            if not self._warmed:
+                self._warmed = True
+                if self.min_size > 1:
+                    threading.Thread(target=self.warm, daemon=True).start()
+            while True:
+                if self._closed:
+                    raise RuntimeError(f"Pool '{self.name}' is closed")
+                if self._idle:
+                    entry = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._metrics['timeouts'] += 1
+                    raise PoolTimeout(
+                        f"No free connection in pool '{self.name}' after {self.timeout}s "
+                        f"(max_size={self.max_size})")
+                self._cond.wait(remaining)
+
+        if entry is not None:
+            now = time.monotonic()
+            stale = None
+            if now - entry.created > self.recycle:
+                stale = 'recycled'
+            elif now - entry.last_used > self.check_after and not self._healthy(entry.conn):
+                stale = 'failed_checks'
+            if stale:
+                # close it and open a replacement in the same slot
+                try:
+                    entry.conn.close()
+                except Exception:
+                    pass
+                with self._cond:
+                    self._metrics[stale] += 1
+                entry = None
+
+        reused = entry is not None
+        if entry is None:
+            entry = self._open()
+
+        waited = time.monotonic() - start
+        with self._cond:
+            m = self._metrics
+            m['acquired'] += 1
+            m['reused'] += reused
+            m['wait_total'] += waited
+            m['wait_max'] = max(m['wait_max'], waited)
+        return entry
+
+    def _release(self, entry: _Entry, broken: bool = False):
+        if broken and not self._healthy(entry.conn):
+            with self._cond:
+                self._metrics['failed_checks'] += 1
+            self._discard(entry)
+            return
+        entry.last_used = time.monotonic()
+        with self._cond:
+            if self._closed:
+                closed = True
+            else:
+                closed = False
+                self._idle.append(entry)
+                self._cond.notify()
+        if closed:
+            self._discard(entry)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; it goes back to the pool on exit."""
+        entry = self._acquire()
+        try:
+            yield entry.conn
+        except BaseException:
+            self._release(entry, broken=True)
+            raise
+        else:
+            self._release(entry)
+
+    @contextmanager
+    def side_connection(self):
+        """A one-off connection outside the pool and its max_size, closed on exit
+        (e.g. to send KILL QUERY while every pooled connection is busy)."""
+        conn = self._connect()
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    # ── housekeeping ──────────────────────────────────────────────────────────
+
+    def close(self):
+        """Close idle connections; in-use ones are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._cond.notify_all()
+        for entry in idle:
+            self._discard(entry)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool metrics: sizes, reuse rate and wait times (seconds)."""
+        with self._cond:
+            m = dict(self._metrics)
+            m['open'] = self._size
+            m['idle'] = len(self._idle)
+            m['in_use'] = self._size - len(self._idle)
+        m['reuse_rate'] = m['reused'] / m['acquired'] if m['acquired'] else 0.0
+        m['wait_avg'] = m['wait_total'] / m['acquired'] if m['acquired'] else 0.0
+        return m
+
+    def log_stats(self):
+        s = self.stats()
+        logger.info(f"[{self.name}] pool: {s['acquired']} acquisitions, "
+                    f"{s['created']} connects, reuse {s['reuse_rate']:.1%}, "
+                    f"wait avg {s['wait_avg'] * 1000:.2f} ms / max {s['wait_max'] * 1000:.2f} ms, "
+                    f"{s['in_use']} in use / {s['open']} open")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Shared pools, one per connection config
+# ─────────────────────────────────────────────────────────────────────────────
+
+_POOLS: Dict[str, ConnectionPool] = {}
+_REFS: Dict[str, int] = {}          # get_pool() calls not yet released, per key
+_POOLS_LOCK = threading.Lock()
+
+
+def _config_key(config: Dict[str, Any]) -> str:
+    return repr(sorted((k, repr(v)) for k, v in config.items()))
+
+
+def get_pool(config: Dict[str, Any], connect: Callable[[], Any], **kwargs) -> ConnectionPool:
+    """Return the shared pool for `config`, creating it on first use.
+    Each call takes a reference; hand it back with release_pool()."""
+    key = _config_key(config)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None or pool._closed:
+            kwargs.setdefault('name', f"{config.get('user')}@{config.get('host')}")
+            pool = _POOLS[key] = ConnectionPool(connect, **kwargs)
+            _REFS[key] = 0
+        _REFS[key] += 1
+        return pool
+
+
+def release_pool(pool):
+    """Drop one get_pool() reference; the last one closes the shared pool.
+    A pool that is not shared (or no longer is) is closed straight away."""
+    with _POOLS_LOCK:
+        key = next((k for k, p in _POOLS.items() if p is pool), None)
+        if key is not None:
+            _REFS[key] -= 1
+            if _REFS[key] > 0:
+                return
+            del _POOLS[key], _REFS[key]
+    pool.close()
+
+
+def _ping(conn):
+    conn.ping(reconnect=False)
+
+
+def pymysql_pool(config: Dict[str, Any], **kwargs) -> ConnectionPool:
+    """Shared pool of pymysql connections opened with `config`."""
+    import pymysql
+
+    kwargs.setdefault('health_check', _ping)
+    return get_pool(config, lambda: pymysql.connect(**config), **kwargs)
+
+
+def close_all_pools():
+    with _POOLS_LOCK:
+        pools = list(_POOLS.values())
+        _POOLS.clear()
+        _REFS.clear()
+    for pool in pools:
+        pool.close()
@@ -0,0 +1,339 @@
+# singlestore_profile.py
+"""
+Opt-in query profiling and slow-query log for the SingleStore managers.
+
+With SINGLESTORE_PROFILE=1 every statement that goes through
+execute_query / execute_command / get_dataframe / execute_many_queries is
+recorded with:
+
+    fingerprint   sha1 of the normalized SQL (singlestore_cache.normalize_sql),
+                  so the same statement with other formatting or parameters
+                  groups together
+    sql           normalized text
+    params_hash   sha1 of the parameters (values themselves are not stored)
+    seconds       latency, execute + fetch
+    rows          rows returned (rowcount for writes)
+    bytes         approximate payload fetched (sum of value sizes)
+    error         exception text if the statement failed
+
+A read slower than SINGLESTORE_SLOW_MS (default 1000) also gets its EXPLAIN
+output captured, once per fingerprint per process. Plans are captured and
+entries written on a background thread, off the query's own path. With
+SINGLESTORE_PROFILE_RERUN=1 it is also re-run under PROFILE and the
+SHOW PROFILE JSON output kept; that doubles the cost of slow queries, so it
+is off by default.
+
+Entries go to SINGLESTORE_PROFILE_LOG: a SQLite database (default
+singlestore_profile.db) or, if the name ends in .jsonl, one JSON object per
+line.
+
+Usage:
+    python singlestore_profile.py top                 # worst by total time
+    python singlestore_profile.py top --by max --limit 5
+    python singlestore_profile.py plan 3fa9c1         # captured plans for a fingerprint
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from singlestore_cache import normalize_sql
+
+logger = logging.getLogger(__name__)
+
+PROFILE_ENABLED = os.getenv('SINGLESTORE_PROFILE', '').lower() in ('1', 'true', 'yes')
+PROFILE_RERUN   = os.getenv('SINGLESTORE_PROFILE_RERUN', '').lower() in ('1', 'true', 'yes')
+PROFILE_LOG     = os.getenv('SINGLESTORE_PROFILE_LOG', 'singlestore_profile.db')
+SLOW_SECONDS    = float(os.getenv('SINGLESTORE_SLOW_MS', 1000)) / 1000
+
+_READ = ('select', 'with')
+
+
+def fingerprint(sql: str) -> str:
+    return hashlib.sha1(normalize_sql(sql).encode('utf-8')).hexdigest()[:16]
+
+
+def params_hash(params) -> Optional[str]:
+    if params is None:
+        return None
+    return hashlib.sha1(repr(params).encode('utf-8')).hexdigest()[:16]
+
+
+def result_bytes(rows: Iterable) -> int:
+    """Approximate payload size of fetched rows (dicts or tuples)."""
+    total = 0
+    for row in rows:
+        for v in (row.values() if isinstance(row, dict) else row):
+            if v is None:
+                continue
+            if isinstance(v, (str, bytes, bytearray)):
+                total += len(v)
+            else:
+                total += 8
+    return total
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Log storage
+# ─────────────────────────────────────────────────────────────────────────────
+
+_FIELDS = ['ts', 'fingerprint', 'sql', 'params_hash', 'seconds', 'rows', 'bytes',
+           'slow', 'error', 'plan', 'profile']
+
+
+class _SqliteLog:
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS query_log (
+                ts          REAL,
+                fingerprint TEXT,
+                sql         TEXT,
+                params_hash TEXT,
+                seconds     REAL,
+                rows        INTEGER,
+                bytes       INTEGER,
+                slow        INTEGER,
+                error       TEXT,
+                plan        TEXT,
+                profile     TEXT
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_query_log_fp ON query_log (fingerprint)")
+        self._db.commit()
+
+    def write(self, entry: Dict[str, Any]):
+        self._db.execute(f"INSERT INTO query_log VALUES ({', '.join('?' * len(_FIELDS))})",
+                         [entry.get(f) for f in _FIELDS])
+        self._db.commit()
+
+    def read(self) -> Iterator[Dict[str, Any]]:
+        for row in self._db.execute(f"SELECT {', '.join(_FIELDS)} FROM query_log ORDER BY ts"):
+            yield dict(zip(_FIELDS, row))
+
+
+class _JsonlLog:
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, entry: Dict[str, Any]):
+        with open(self.path, 'a', encoding='utf-8') as fh:
+            fh.write(json.dumps(entry, default=str) + '\n')
+
+    def read(self) -> Iterator[Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, encoding='utf-8') as fh:
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def open_log(path: str = PROFILE_LOG):
+    return _JsonlLog(path) if path.endswith('.jsonl') else _SqliteLog(path)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Profiler
+# ─────────────────────────────────────────────────────────────────────────────
+
+class _Timing:
+    __slots__ = ('rows', 'bytes')
+
+    def __init__(self):
+        self.rows = None
+        self.bytes = None
+
+    def done(self, result=None, rowcount: Optional[int] = None):
+        """Note what the statement returned: fetched rows, a DataFrame, or a write's rowcount."""
+        if hasattr(result, 'memory_usage'):
+            self.rows = len(result)
+            self.bytes = int(result.memory_usage(index=False).sum())
+        elif result is not None:
+            self.rows = len(result)
+            self.bytes = result_bytes(result)
+        elif rowcount is not None:
+            self.rows = rowcount
+
+
+class _NullTiming:
+    __slots__ = ()
+
+    def done(self, result=None, rowcount=None):
+        pass
+
+
+_NULL = _NullTiming()
+
+
+class QueryProfiler:
+    """Records statement timings to the slow-query log when enabled."""
+
+    def __init__(self, pool=None, log_path: str = PROFILE_LOG, threshold: float = SLOW_SECONDS,
+                 enabled: bool = PROFILE_ENABLED, rerun_profile: bool = PROFILE_RERUN,
+                 explain_prefix: str = 'EXPLAIN'):
+        self.pool = pool
+        self.log_path = log_path
+        self.threshold = threshold
+        self.enabled = enabled
+        self.rerun_profile = rerun_profile
+        self.explain_prefix = explain_prefix
+        self._log = None
+        self._lock = threading.Lock()
+        self._explained = set()
+        self._writer = None
+
+    @contextmanager
+    def track(self, sql: str, params=None):
+        """Time the block; call .done(result) / .done(rowcount=n) on what it yields."""
+        if not self.enabled:
+            yield _NULL
+            return
+        timing = _Timing()
+        started = time.perf_counter()
+        try:
+            yield timing
+        except Exception as e:
+            self.record(sql, params, time.perf_counter() - started, error=str(e))
+            raise
+        self.record(sql, params, time.perf_counter() - started, timing.rows, timing.bytes)
+
+    def record(self, sql: str, params, seconds: float, rows: Optional[int] = None,
+               nbytes: Optional[int] = None, error: Optional[str] = None, result=None):
+        if not self.enabled:
+            return
+        if result is not None:
+            rows, nbytes = len(result), result_bytes(result)
+        normalized = normalize_sql(sql)
+        fp = hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+        entry = {'ts': time.time(), 'fingerprint': fp, 'sql': normalized,
+                 'params_hash': params_hash(params), 'seconds': seconds, 'rows': rows,
+                 'bytes': nbytes, 'slow': int(seconds >= self.threshold), 'error': error,
+                 'plan': None, 'profile': None}
+        explain = False
+        if entry['slow'] and error is None and normalized.startswith(_READ):
+            with self._lock:
+                explain = fp not in self._explained
+                self._explained.add(fp)
+            logger.warning(f"Slow query {fp} ({seconds:.3f}s, {rows} rows): {normalized[:120]}")
+        with self._lock:
+            if self._writer is None:
+                self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='ss-profile')
+            self._writer.submit(self._write, entry, sql if explain else None, params)
+
+    def _write(self, entry: Dict[str, Any], explain_sql: Optional[str], params):
+        # runs on the writer thread: the caller may still hold its pooled
+        # connection, and EXPLAIN needs another one
+        if explain_sql is not None:
+            entry['plan'] = self._capture(f"{self.explain_prefix} {explain_sql}", params)
+            if self.rerun_profile:
+                entry['profile'] = self._capture(f"PROFILE {explain_sql}", params, "SHOW PROFILE JSON")
+        try:
+            if self._log is None:
+                self._log = open_log(self.log_path)
+            self._log.write(entry)
+        except Exception as e:
+            logger.warning(f"Could not write query profile log {self.log_path}: {e}")
+
+    def flush(self):
+        """Wait until every recorded entry is in the log."""
+        with self._lock:
+            writer = self._writer
+        if writer is not None:
+            writer.submit(lambda: None).result()
+
+    def _capture(self, sql: str, params, follow_up: Optional[str] = None) -> Optional[str]:
+        """Run `sql` (then `follow_up` on the same connection) and return its rows as JSON."""
+        if self.pool is None:
+            return None
+        try:
+            with self.pool.connection() as conn:
+                cur = conn.cursor()
+                try:
+                    cur.execute(sql, params) if params is not None else cur.execute(sql)
+                    rows = cur.fetchall()
+                    if follow_up:
+                        cur.execute(follow_up)
+                        rows = cur.fetchall()
+                finally:
+                    cur.close()
+            return json.dumps([r if isinstance(r, dict) else list(r) for r in rows], default=str)
+        except Exception as e:
+            logger.debug(f"Could not capture '{sql[:40]}…': {e}")
+            return None
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Reporting
+# ─────────────────────────────────────────────────────────────────────────────
+
+def summarize(entries: Iterable[Dict[str, Any]], by: str = 'total', limit: int = 20) -> List[Dict[str, Any]]:
+    """Group log entries by fingerprint; worst `limit` by total/mean/max seconds or count."""
+    groups: Dict[str, Dict[str, Any]] = {}
+    for e in entries:
+        g = groups.get(e['fingerprint'])
+        if g is None:
+            g = groups[e['fingerprint']] = {
+                'fingerprint': e['fingerprint'], 'sql': e['sql'], 'count': 0, 'total': 0.0,
+                'max': 0.0, 'rows': 0, 'bytes': 0, 'slow': 0, 'errors': 0, 'params': set()}
+        g['count'] += 1
+        g['total'] += e['seconds']
+        g['max'] = max(g['max'], e['seconds'])
+        g['rows'] += e['rows'] or 0
+        g['bytes'] += e['bytes'] or 0
+        g['slow'] += e['slow'] or 0
+        g['errors'] += 1 if e['error'] else 0
+        g['params'].add(e['params_hash'])
+    for g in groups.values():
+        g['mean'] = g['total'] / g['count']
+        g['params'] = len(g['params'])
+    return sorted(groups.values(), key=lambda g: g[by], reverse=True)[:limit]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Summarize the SingleStore slow-query log")
+    ap.add_argument('--log', default=PROFILE_LOG)
+    sub = ap.add_subparsers(dest='command', required=True)
+    top = sub.add_parser('top', help="statements with the most total time")
+    top.add_argument('--by', choices=['total', 'mean', 'max', 'count'], default='total')
+    top.add_argument('--limit', type=int, default=20)
+    plan = sub.add_parser('plan', help="captured EXPLAIN / PROFILE output")
+    plan.add_argument('fingerprint')
+    args = ap.parse_args()
+
+    log = open_log(args.log)
+    if args.command == 'top':
+        rows = summarize(log.read(), args.by, args.limit)
+        if not rows:
+            print(f"ℹ️  No entries in {args.log}")
+            return
+        print(f"{'fingerprint':16}  {'count':>6}  {'total s':>9}  {'mean ms':>9}  {'max ms':>9}  "
+              f"{'rows':>10}  {'MB':>8}  {'slow':>5}  sql")
+        for g in rows:
+            print(f"{g['fingerprint']:16}  {g['count']:>6,}  {g['total']:>9.2f}  "
+                  f"{g['mean'] * 1000:>9.1f}  {g['max'] * 1000:>9.1f}  {g['rows']:>10,}  "
+                  f"{g['bytes'] / 1e6:>8.1f}  {g['slow']:>5}  {g['sql'][:80]}")
+    else:
+        found = False
+        for e in log.read():
+            if e['fingerprint'].startswith(args.fingerprint) and (e['plan'] or e['profile']):
+                found = True
+                print(f"\n🔎 {e['fingerprint']}  {e['seconds']:.3f}s  {e['sql']}")
+                for label in ('plan', 'profile'):
+                    if e[label]:
+                        print(f"\n  {label.upper()}:")
+                        for row in json.loads(e[label]):
+                            print(f"    {row}")
+        if not found:
+            print(f"ℹ️  No captured plan for {args.fingerprint}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,9 @@
 # singlestore_pymysql_wrapper_fixed.py
-import pymysql
-import pandas as pd
-from typing import List, Dict, Any, Optional
-from contextlib import contextmanager
-import os
 from dotenv import load_dotenv
 import logging
 
+from singlestore_client import SingleStoreClient
+
 # Load environment variables
 load_dotenv()
 
@@ -14,99 +11,7 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SingleStoreDB:
-    def __init__(self):
-        self.connection_config = {
-            'host': os.getenv('SINGLESTORE_HOST'),
-            'port': int(os.getenv('SINGLESTORE_PORT', 3333)),
-            'user': os.getenv('SINGLESTORE_USER'),
-            'password': os.getenv('SINGLESTORE_PASSWORD'),
-            'database': os.getenv('SINGLESTORE_DATABASE'),
-            'ssl': {'ssl_disabled': False},
-            'charset': 'utf8mb4',
-            'cursorclass': pymysql.cursors.DictCursor,
-            'autocommit': True
-        }
-    
-    @contextmanager
-    def get_connection(self):
-        """Context manager for database connections"""
-        connection = None
-        try:
-            connection = pymysql.connect(**self.connection_config)
-            yield connection
-        except Exception as e:
-            logger.error(f"Connection error: {e}")
-            raise
-        finally:
-            if connection:
-                connection.close()
-    
-    def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
-        """Execute a SELECT query and return results"""
-        try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(query, params)
-                    result = cursor.fetchall()
-                    logger.info(f"Query executed successfully. Rows returned: {len(result)}")
-                    return result
-        except Exception as e:
-            logger.error(f"Query execution failed: {e}")
-            logger.error(f"Query was: {query}")
-            logger.error(f"Params were: {params}")
-            return []
-    
-    def execute_command(self, command: str, params: Optional[tuple] = None) -> int:
-        """Execute INSERT, UPDATE, DELETE commands"""
-        try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(command, params)
-                    rows_affected = cursor.rowcount
-                    logger.info(f"Command executed successfully. Rows affected: {rows_affected}")
-                    return rows_affected
-        except Exception as e:
-            logger.error(f"Command execution failed: {e}")
-            logger.error(f"Command was: {command}")
-            logger.error(f"Params were: {params}")
-            return 0
-    
-    def get_dataframe(self, query: str, params: Optional[tuple] = None) -> pd.DataFrame:
-        """Execute query and return results as pandas DataFrame"""
-        try:
-            with self.get_connection() as conn:
-                df = pd.read_sql(query, conn, params=params)
-                logger.info(f"DataFrame created with {len(df)} rows")
-                return df
-        except Exception as e:
-            logger.error(f"DataFrame creation failed: {e}")
-            return pd.DataFrame()
-    
-    def batch_insert_dataframe(self, df: pd.DataFrame, table_name: str) -> bool:
-        """Batch insert DataFrame into database table"""
-        try:
-            if df.empty:
-                logger.warning("DataFrame is empty, nothing to insert")
-                return True
-            
-            # Create placeholders for the insert query
-            columns = ', '.join(df.columns)
-            placeholders = ', '.join(['%s'] * len(df.columns))
-            
-            insert_query = f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})"
-            
-            with self.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    # Convert DataFrame to list of tuples
-                    data_tuples = [tuple(row) for row in df.to_numpy()]
-                    cursor.executemany(insert_query, data_tuples)
-                    logger.info(f"Successfully inserted {len(df)} rows into {table_name}")
-                    return True
-        except Exception as e:
-            logger.error(f"Batch insert failed: {e}")
-            return False
-    
+class SingleStoreDB(SingleStoreClient):
     def test_connection(self) -> bool:
         """Test the database connection with SingleStore compatible SQL"""
         try:
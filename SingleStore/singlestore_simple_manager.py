@@ -1,12 +1,10 @@
 # singlestore_simple_manager.py
-import pymysql
 import pandas as pd
-from typing import List, Dict, Any, Optional
-from contextlib import contextmanager
-import os
 from dotenv import load_dotenv
 import logging
 
+from singlestore_client import SingleStoreClient
+
 # Load environment variables
 load_dotenv()
 
@@ -14,70 +12,7 @@ load_dotenv()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class SingleStoreManager:
-    def __init__(self):
-        self.connection_config = {
-            'host': os.getenv('SINGLESTORE_HOST'),
-            'port': int(os.getenv('SINGLESTORE_PORT', 3333)),
-            'user': os.getenv('SINGLESTORE_USER'),
-            'password': os.getenv('SINGLESTORE_PASSWORD'),
-            'database': os.getenv('SINGLESTORE_DATABASE'),
-            'ssl': {'ssl_disabled': False},
-            'charset': 'utf8mb4',
-            'cursorclass': pymysql.cursors.DictCursor,
-            'autocommit': True
-        }
-    
-    @contextmanager
-    def get_connection(self):
-        """Context manager for database connections"""
-        connection = None
-        try:
-            connection = pymysql.connect(**self.connection_config)
-            yield connection
-        except Exception as e:
-            logger.error(f"Connection error: {e}")
-            raise
-        finally:
-            if connection:
-                connection.close()
-    
-    def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict[str, Any]]:
-        """Execute a SELECT query and return results"""
-        try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(query, params)
-                    result = cursor.fetchall()
-                    return result
-        except Exception as e:
-            logger.error(f"Query execution failed: {e}")
-            return []
-    
-    def execute_command(self, command: str, params: Optional[tuple] = None) -> int:
-        """Execute INSERT, UPDATE, DELETE commands"""
-        try:
-            with self.get_connection() as conn:
-                with conn.cursor() as cursor:
-                    cursor.execute(command, params)
-                    return cursor.rowcount
-        except Exception as e:
-            logger.error(f"Command execution failed: {e}")
-            return 0
-    
-    def get_dataframe(self, query: str, params: Optional[tuple] = None) -> pd.DataFrame:
-        """Execute query and return results as pandas DataFrame"""
-        try:
-            data = self.execute_query(query, params)
-            if data:
-                df = pd.DataFrame(data)
-                return df
-            else:
-                return pd.DataFrame()
-        except Exception as e:
-            logger.error(f"DataFrame creation failed: {e}")
-            return pd.DataFrame()
-
+class SingleStoreManager(SingleStoreClient):
     def analyze_uk_price_paid(self):
         """Analyze the existing uk_price_paid table"""
         print("🏠 Analyzing UK Price Paid Table")
@@ -98,7 +33,7 @@ class SingleStoreManager:
                 print(f"  Row {i}: Price £{row['price']:,} - {row['type']} in {row['town']}")
         
         # Get basic statistics
-        stats = self.execute_query("""
+        stats = self.cached_query("""
             SELECT 
                 COUNT(*) as total_rows,
                 MIN(date) as earliest_date,
@@ -115,6 +50,8 @@ class SingleStoreManager:
             print(f"  Total Rows: {stats_row['total_rows']:,}")
             print(f"  Date Range: {stats_row['earliest_date']} to {stats_row['latest_date']}")
             print(f"  Price Stats: Avg £{stats_row['avg_price']:,.2f}, Min £{stats_row['min_price']:,}, Max £{stats_row['max_price']:,}")
+        
+        self.cache.log_stats()
     
     def create_simple_tables(self):
         """Create simple tables without complex constraints for SingleStore"""
@@ -179,18 +116,53 @@ class SingleStoreManager:
         print("\n🔬 Property Market Analysis")
         print("=" * 50)
         
+        # Independent aggregates: run them concurrently, one pooled connection each;
+        # read from the summary tables while they are fresh (see singlestore_aggregates)
+        results = self.execute_many_queries(self.aggregates.prefer({
+            # Property type distribution
+            'type_analysis': """
+                SELECT 
+                    type,
+                    COUNT(*) as count,
+                    AVG(price) as avg_price,
+                    COUNT(*) * 100.0 / (SELECT COUNT(*) FROM uk_price_paid) as percentage
+                FROM uk_price_paid 
+                WHERE type IS NOT NULL
+                GROUP BY type 
+                ORDER BY count DESC
+            """,
+            # Top locations by average price
+            'location_analysis': """
+                SELECT 
+                    town,
+                    county,
+                    COUNT(*) as transactions,
+                    AVG(price) as avg_price
+                FROM uk_price_paid 
+                WHERE town IS NOT NULL AND town != ''
+                GROUP BY town, county
+                HAVING COUNT(*) >= 10
+                ORDER BY avg_price DESC
+                LIMIT 10
+            """,
+            # Price trends by year
+            'yearly_trends': """
+                SELECT 
+                    YEAR(date) as year,
+                    COUNT(*) as transactions,
+                    AVG(price) as avg_price,
+                    MIN(price) as min_price,
+                    MAX(price) as max_price
+                FROM uk_price_paid 
+                WHERE date IS NOT NULL
+                GROUP BY YEAR(date)
+                ORDER BY year DESC
+                LIMIT 10
+            """,
+        }))
+        
         # Property type distribution
-        type_analysis = self.execute_query("""
-            SELECT 
-                type,
-                COUNT(*) as count,
-                AVG(price) as avg_price,
-                COUNT(*) * 100.0 / (SELECT COUNT(*) FROM uk_price_paid) as percentage
-            FROM uk_price_paid 
-            WHERE type IS NOT NULL
-            GROUP BY type 
-            ORDER BY count DESC
-        """)
+        type_analysis = results['type_analysis']
         
         if type_analysis:
             print("\n🏘️ Property Type Distribution:")
@@ -198,19 +170,7 @@ class SingleStoreManager:
                 print(f"  {row['type']:15} {row['count']:>6,} properties ({row['percentage']:.1f}%) - Avg £{row['avg_price']:,.0f}")
         
         # Top locations by average price
-        location_analysis = self.execute_query("""
-            SELECT 
-                town,
-                county,
-                COUNT(*) as transactions,
-                AVG(price) as avg_price
-            FROM uk_price_paid 
-            WHERE town IS NOT NULL AND town != ''
-            GROUP BY town, county
-            HAVING COUNT(*) >= 10
-            ORDER BY avg_price DESC
-            LIMIT 10
-        """)
+        location_analysis = results['location_analysis']
         
         if location_analysis:
             print("\n🏛️ Top 10 Locations by Average Price (min 10 transactions):")
@@ -218,24 +178,14 @@ class SingleStoreManager:
                 print(f"  {i:2}. {row['town']} ({row['county']}): £{row['avg_price']:,.0f} ({row['transactions']} transactions)")
         
         # Price trends by year
-        yearly_trends = self.execute_query("""
-            SELECT 
-                YEAR(date) as year,
-                COUNT(*) as transactions,
-                AVG(price) as avg_price,
-                MIN(price) as min_price,
-                MAX(price) as max_price
-            FROM uk_price_paid 
-            WHERE date IS NOT NULL
-            GROUP BY YEAR(date)
-            ORDER BY year DESC
-            LIMIT 10
-        """)
+        yearly_trends = results['yearly_trends']
         
         if yearly_trends:
             print("\n📈 Price Trends (Last 10 Years):")
             for row in yearly_trends:
                 print(f"  {row['year']}: {row['transactions']:>6,} transactions, Avg £{row['avg_price']:,.0f}")
+        
+        self.cache.log_stats()
     
     def export_analysis_results(self):
         """Export analysis results to CSV files"""
@@ -243,7 +193,7 @@ class SingleStoreManager:
         print("=" * 50)
         
         # Export property type analysis
-        type_data = self.execute_query("""
+        type_data = self.cached_query("""
             SELECT type, COUNT(*) as count, AVG(price) as avg_price
             FROM uk_price_paid 
             WHERE type IS NOT NULL
@@ -257,7 +207,7 @@ class SingleStoreManager:
             print("✅ Exported property types analysis to property_types_analysis.csv")
         
         # Export yearly trends
-        yearly_data = self.execute_query("""
+        yearly_data = self.cached_query("""
             SELECT 
                 YEAR(date) as year,
                 COUNT(*) as transactions,
@@ -274,7 +224,7 @@ class SingleStoreManager:
             print("✅ Exported yearly trends to yearly_trends.csv")
         
         # Export sample data for further analysis
-        sample_data = self.execute_query("""
+        sample_data = self.cached_query("""
             SELECT * FROM uk_price_paid 
             WHERE date >= '2024-01-01'
             LIMIT 1000
@@ -284,7 +234,9 @@ class SingleStoreManager:
             df_sample = pd.DataFrame(sample_data)
             df_sample.to_csv('recent_properties_sample.csv', index=False)
             print("✅ Exported recent properties sample to recent_properties_sample.csv")
-
+        
+        self.cache.log_stats()
+    
 def main():
     db = SingleStoreManager()
     
@@ -1,16 +1,16 @@
 # singlestore_sqlalchemy_ssl.py
-from sqlalchemy import create_engine, text, MetaData, Table, Column, Integer, String, DateTime, Float, Boolean
+from sqlalchemy import MetaData
 from sqlalchemy.orm import sessionmaker, declarative_base
-from sqlalchemy.exc import SQLAlchemyError
 from contextlib import contextmanager
-import pandas as pd
 import os
 from dotenv import load_dotenv
 import logging
-from typing import Optional, List, Dict, Any
+from typing import Dict, Any
 import ssl
 import pymysql
 
+from singlestore_client import SingleStoreClient, SQLAlchemyBackend, env_config
+
 # Load environment variables
 load_dotenv()
 
@@ -21,12 +21,14 @@ logger = logging.getLogger(__name__)
 # SQLAlchemy Base
 Base = declarative_base()
 
-class SingleStoreDB:
+class SingleStoreDB(SingleStoreClient):
+    """SingleStoreClient on a SQLAlchemy-pooled engine, plus ORM sessions"""
     def __init__(self):
-        self.engine = None
-        self.SessionLocal = None
         self.metadata = MetaData()
-        self._setup_engine()
+        super().__init__(SQLAlchemyBackend(self._connection_config()))
+        self.engine = self.pool.engine
+        self.SessionLocal = sessionmaker(autoflush=False, bind=self.engine)
+        logger.info("✅ SQLAlchemy engine configured successfully with SSL")
     
     def _get_ssl_context(self):
         """Create SSL context for SingleStore Cloud connection"""
@@ -40,72 +42,41 @@ class SingleStoreDB:
             logger.warning(f"SSL context creation warning: {e}")
             return None
     
-    def _setup_engine(self):
-        """Setup SQLAlchemy engine with SSL configuration"""
-        try:
-            # Get configuration from environment
-            host = os.getenv('SINGLESTORE_HOST')
-            port = os.getenv('SINGLESTORE_PORT', 3333)
-            user = os.getenv('SINGLESTORE_USER')
-            password = os.getenv('SINGLESTORE_PASSWORD')
-            database = os.getenv('SINGLESTORE_DATABASE')
-            use_ssl = os.getenv('SINGLESTORE_USE_SSL', 'true').lower() == 'true'
-            
-            # Build connection URL
-            connection_url = f"mysql+pymysql://{user}:{password}@{host}:{port}/{database}"
-            
-            # SSL configuration for SingleStore Cloud
-            connect_args = {}
-            if use_ssl:
-                ssl_context = self._get_ssl_context()
-                if ssl_context:
-                    connect_args['ssl'] = ssl_context
-                else:
-                    # Fallback: use basic SSL without certificate verification
-                    connect_args['ssl'] = {'ssl_disabled': False}
-                
-                # Alternative SSL approach for pymysql
-                connect_args['ssl_verify_cert'] = os.getenv('SINGLESTORE_SSL_VERIFY_CERT', 'true').lower() == 'true'
-                connect_args['ssl_verify_identity'] = False
-            
-            logger.info(f"🔐 SSL enabled: {use_ssl}")
-            
-            # Create engine with connection pooling
-            self.engine = create_engine(
-                connection_url,
-                pool_size=int(os.getenv('SINGLESTORE_POOL_SIZE', 5)),
-                max_overflow=int(os.getenv('SINGLESTORE_MAX_OVERFLOW', 10)),
-                pool_recycle=int(os.getenv('SINGLESTORE_POOL_RECYCLE', 3600)),
-                echo=False,
-                connect_args=connect_args,
-                pool_pre_ping=True
-            )
-            
-            # Create session factory
-            self.SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=self.engine)
-            
-            logger.info("✅ SQLAlchemy engine configured successfully with SSL")
+    def _connection_config(self) -> Dict[str, Any]:
+        """pymysql settings for the engine, with SSL configuration"""
+        config = env_config()
+        use_ssl = os.getenv('SINGLESTORE_USE_SSL', 'true').lower() == 'true'
+        config.pop('ssl')
+        
+        # SSL configuration for SingleStore Cloud
+        if use_ssl:
+            ssl_context = self._get_ssl_context()
+            if ssl_context:
+                config['ssl'] = ssl_context
+            else:
+                # Fallback: use basic SSL without certificate verification
+                config['ssl'] = {'ssl_disabled': False}
             
-        except Exception as e:
-            logger.error(f"❌ Failed to setup engine: {e}")
-            raise
+            # Alternative SSL approach for pymysql
+            config['ssl_verify_cert'] = os.getenv('SINGLESTORE_SSL_VERIFY_CERT', 'true').lower() == 'true'
+            config['ssl_verify_identity'] = False
+        
+        logger.info(f"🔐 SSL enabled: {use_ssl}")
+        return config
     
     def test_connection(self) -> bool:
         """Test database connection"""
-        try:
-            with self.engine.connect() as conn:
-                result = conn.execute(text("SELECT 1 as test_value, NOW() as current_time, VERSION() as db_version"))
-                row = result.fetchone()
-                logger.info(f"✅ Connection test successful:")
-                logger.info(f"   Test Value: {row['test_value']}")
-                logger.info(f"   Current Time: {row['current_time']}")
-                logger.info(f"   DB Version: {row['db_version']}")
-                return True
-        except Exception as e:
-            logger.error(f"❌ Connection test failed: {e}")
+        result = self.execute_query("SELECT 1 as test_value, NOW() as current_time, VERSION() as db_version")
+        if not result:
+            logger.error("❌ Connection test failed")
             return False
+        row = result[0]
+        logger.info(f"✅ Connection test successful:")
+        logger.info(f"   Test Value: {row['test_value']}")
+        logger.info(f"   Current Time: {row['current_time']}")
+        logger.info(f"   DB Version: {row['db_version']}")
+        return True
 
-    # ... [rest of the methods remain the same as previous example]
     @contextmanager
     def get_session(self):
         """Context manager for database sessions"""
@@ -120,50 +91,10 @@ class SingleStoreDB:
         finally:
             session.close()
     
-    def execute_query(self, query: str, params: Dict = None) -> List[Dict[str, Any]]:
-        """Execute a raw SQL query and return results"""
-        try:
-            with self.engine.connect() as conn:
-                if params:
-                    result = conn.execute(text(query), params)
-                else:
-                    result = conn.execute(text(query))
-                
-                return [dict(row._mapping) for row in result]
-        except SQLAlchemyError as e:
-            logger.error(f"❌ Query execution failed: {e}")
-            return []
-    
-    def execute_command(self, command: str, params: Dict = None) -> int:
-        """Execute DML commands (INSERT, UPDATE, DELETE)"""
-        try:
-            with self.engine.connect() as conn:
-                if params:
-                    result = conn.execute(text(command), params)
-                else:
-                    result = conn.execute(text(command))
-                conn.commit()
-                logger.info(f"✅ Command executed. Rows affected: {result.rowcount}")
-                return result.rowcount
-        except SQLAlchemyError as e:
-            logger.error(f"❌ Command execution failed: {e}")
-            return 0
-    
-    def get_dataframe(self, query: str, params: Dict = None) -> pd.DataFrame:
-        """Execute query and return results as pandas DataFrame"""
-        try:
-            df = pd.read_sql(text(query), self.engine, params=params)
-            logger.info(f"✅ DataFrame created with {len(df)} rows")
-            return df
-        except Exception as e:
-            logger.error(f"❌ DataFrame creation failed: {e}")
-            return pd.DataFrame()
-    
     def close(self):
         """Close database connections"""
-        if self.engine:
-            self.engine.dispose()
-            logger.info("🔌 Database connections closed")
+        super().close()
+        logger.info("🔌 Database connections closed")
 
 # Alternative approach using direct PyMySQL with SSL
 def test_direct_pymysql_connection():
@@ -245,7 +176,7 @@ def main():
             # Insert test data
             db.execute_command(
                 "INSERT INTO test_connection (message) VALUES (%s)",
-                {"message": "Hello from SQLAlchemy with SSL!"}
+                ("Hello from SQLAlchemy with SSL!",)
             )
             
             # Query test data
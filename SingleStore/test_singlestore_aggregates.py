@@ -0,0 +1,158 @@
+# test_singlestore_aggregates.py
+"""
+Checks for singlestore_aggregates.PriceAggregates against a sqlite3
+stand-in: incremental upserts (direct, through execute_command-style
+INSERTs and through the bulk loader) must match a full recompute, and the
+summary report queries must match the base-table queries.
+"""
+import os
+import sqlite3
+import tempfile
+
+from singlestore_aggregates import PriceAggregates, SUMMARY_SQL
+from singlestore_bulk_load import bulk_load
+from singlestore_pool import ConnectionPool
+
+COLUMNS = ['price', 'date', 'type', 'county', 'town']
+ROWS = [
+    (250000, '2023-01-15', 'detached', 'KENT', 'ASHFORD'),
+    (180000, '2023-01-20', 'terraced', 'KENT', 'DOVER'),
+    (420000, '2024-03-02', 'detached', 'SURREY', 'WOKING'),
+    (99000, '2024-03-28', 'flat', None, 'LONDON'),
+    (310000, None, 'semi-detached', 'SURREY', 'GUILDFORD'),
+]
+MORE = [
+    (275000, '2024-03-10', 'detached', 'SURREY', 'WOKING'),
+    (150000, '2024-07-01', 'flat', 'KENT', 'DOVER'),
+    (510000, '2022-11-11', 'detached', 'ESSEX', 'CHELMSFORD'),
+]
+
+
+def sqlite_setup():
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    pool = ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False), max_size=2)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE uk_price_paid (price INTEGER NOT NULL, date, type, county, town)")
+        conn.executemany("INSERT INTO uk_price_paid VALUES (?, ?, ?, ?, ?)", ROWS)
+        conn.commit()
+    aggregates = PriceAggregates(pool, dialect='sqlite')
+    aggregates.rebuild()
+    return pool, aggregates, path
+
+
+def insert(pool, rows):
+    with pool.connection() as conn:
+        conn.executemany("INSERT INTO uk_price_paid VALUES (?, ?, ?, ?, ?)", rows)
+        conn.commit()
+
+
+def test_rebuild_is_consistent_and_fresh():
+    pool, aggregates, path = sqlite_setup()
+    assert aggregates.is_fresh()
+    report = aggregates.check()
+    assert report['ok'] and report['agg_price_by_year_type']['groups'] == 5
+    pool.close()
+    os.remove(path)
+
+
+def test_apply_rows_matches_recompute():
+    pool, aggregates, path = sqlite_setup()
+    insert(pool, MORE)
+    assert not aggregates.check()['ok']
+    aggregates.apply_rows(COLUMNS, MORE)
+    assert aggregates.check()['ok']
+    assert aggregates.stats['rows_applied'] == 3
+    pool.close()
+    os.remove(path)
+
+
+def test_apply_write():
+    pool, aggregates, path = sqlite_setup()
+    sql = "INSERT INTO uk_price_paid (price, date, type, county, town) VALUES (?, ?, ?, ?, ?), (?, ?, ?, ?, ?)"
+    params = MORE[0] + MORE[1]
+    with pool.connection() as conn:
+        rowcount = conn.execute(sql, params).rowcount
+        conn.commit()
+    aggregates.apply_write(sql, params, rowcount)
+    assert aggregates.check()['ok'] and aggregates.is_fresh()
+
+    aggregates.apply_write("SELECT * FROM uk_price_paid")           # reads change nothing
+    aggregates.apply_write("UPDATE products SET price = 1")         # nor other tables
+    assert aggregates.is_fresh()
+    aggregates.apply_write("DELETE FROM uk_price_paid WHERE price < 100000")
+    assert not aggregates.is_fresh()
+    assert aggregates.prefer({'type_analysis': 'base'}) == {'type_analysis': 'base'}
+    aggregates.rebuild()
+    assert aggregates.prefer({'type_analysis': 'base'})['type_analysis'] == SUMMARY_SQL['type_analysis']
+    pool.close()
+    os.remove(path)
+
+
+def test_bulk_load_hook():
+    pool, aggregates, path = sqlite_setup()
+    escape = lambda v: 'NULL' if v is None else (repr(v) if isinstance(v, (int, float)) else
+                                                 "'" + str(v).replace("'", "''") + "'")
+    bad = (None, '2024-01-01', 'flat', 'KENT', 'DOVER')
+    stats = bulk_load(pool, 'uk_price_paid', COLUMNS, MORE + [bad], chunk_rows=2, max_packet=1 << 20,
+                      escape=escape, on_loaded=aggregates.apply_rows)
+    assert stats['failed_rows'] == 1            # NOT NULL violation, isolated by bisection
+    assert aggregates.check()['ok']
+    pool.close()
+    os.remove(path)
+
+
+def test_summary_queries_match_base_queries():
+    pool, aggregates, path = sqlite_setup()
+    insert(pool, MORE)
+    aggregates.rebuild()
+    year = "CAST(strftime('%Y', date) AS INTEGER)"
+    base = {
+        'county_analysis': """
+            SELECT county, COUNT(*), AVG(price), MAX(price) FROM uk_price_paid
+            WHERE county IS NOT NULL AND county != '' GROUP BY county ORDER BY AVG(price) DESC LIMIT 10
+        """,
+        'yearly_trends': f"""
+            SELECT {year}, COUNT(*), AVG(price), MIN(price), MAX(price) FROM uk_price_paid
+            WHERE date IS NOT NULL GROUP BY {year} ORDER BY 1 DESC LIMIT 10
+        """,
+    }
+    with pool.connection() as conn:
+        for name, sql in base.items():
+            expected = conn.execute(sql).fetchall()
+            actual = conn.execute(SUMMARY_SQL[name]).fetchall()
+            assert [tuple(round(v, 6) if isinstance(v, float) else v for v in r) for r in actual] == \
+                   [tuple(round(v, 6) if isinstance(v, float) else v for v in r) for r in expected]
+    pool.close()
+    os.remove(path)
+
+
+def test_null_prices_count_like_the_base_table():
+    pool, aggregates, path = sqlite_setup()
+    with pool.connection() as conn:                     # the same table, price nullable
+        conn.execute("ALTER TABLE uk_price_paid RENAME TO strict")
+        conn.execute("CREATE TABLE uk_price_paid (price INTEGER, date, type, county, town)")
+        conn.execute("INSERT INTO uk_price_paid SELECT * FROM strict")
+        conn.commit()
+    unpriced = [(None, '2023-02-01', 'flat', 'KENT', 'DOVER'),
+                (None, '2024-05-05', 'bungalow', 'ESSEX', 'HARLOW')]   # a group with no price
+    insert(pool, unpriced[:1])
+    aggregates.rebuild()
+    insert(pool, unpriced[1:])
+    aggregates.apply_rows(COLUMNS, unpriced[1:])
+    assert aggregates.check()['ok']
+    base = """
+        SELECT type, COUNT(*) as count, AVG(price) as avg_price, MIN(price) as min_price,
+               MAX(price) as max_price,
+               COUNT(*) * 100.0 / (SELECT COUNT(*) FROM uk_price_paid) as percentage
+        FROM uk_price_paid GROUP BY type ORDER BY count DESC, type
+    """
+    with pool.connection() as conn:
+        expected = conn.execute(base).fetchall()
+        actual = conn.execute(SUMMARY_SQL['type_analysis'].replace(
+            'ORDER BY count DESC', 'ORDER BY count DESC, type')).fetchall()
+    assert [tuple(round(v, 6) if isinstance(v, float) else v for v in r) for r in actual] == \
+           [tuple(round(v, 6) if isinstance(v, float) else v for v in r) for r in expected]
+    assert ('bungalow', 1, None, None, None, 100.0 / 7) in actual
+    pool.close()
+    os.remove(path)
@@ -0,0 +1,112 @@
+# test_singlestore_batch.py
+"""
+Checks for singlestore_batch: concurrency, per-query timeouts and
+cancellation, against a pool of sqlite3 connections (interrupted with
+Connection.interrupt()), and KILL QUERY from outside a full pool against
+fake pymysql-style connections.
+"""
+import sqlite3
+import threading
+import time
+
+from singlestore_batch import QueryBatch, execute_many_queries, iter_many_queries
+from singlestore_pool import ConnectionPool
+
+# Counts to 10^9 — runs far longer than any test unless interrupted
+ENDLESS = """
+    WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n WHERE i < 1000000000)
+    SELECT COUNT(*) FROM n
+"""
+
+
+def sqlite_pool(max_size=4):
+    def connect():
+        conn = sqlite3.connect(':memory:', check_same_thread=False)
+        conn.create_function('sleep', 1, lambda s: time.sleep(s) or s)
+        return conn
+    return ConnectionPool(connect, max_size=max_size,
+                          health_check=lambda c: c.execute("SELECT 1"))
+
+
+def test_runs_concurrently_and_yields_as_completed():
+    pool = sqlite_pool()
+    started = time.monotonic()
+    order = [name for name, result in iter_many_queries(pool, {
+        'slow': "SELECT sleep(0.4)",
+        'fast': "SELECT sleep(0.05)",
+        'mid': ("SELECT sleep(?)", (0.2,)),
+    })]
+    elapsed = time.monotonic() - started
+    assert order == ['fast', 'mid', 'slow']
+    assert elapsed < 0.6                      # sequential would take 0.65s
+    pool.close()
+
+
+def test_results_and_errors():
+    pool = sqlite_pool()
+    results = execute_many_queries(pool, {'one': "SELECT 1", 'bad': "SELECT * FROM missing"})
+    assert results['one']['status'] == 'ok' and results['one']['rows'] == [(1,)]
+    assert results['bad']['status'] == 'error' and 'missing' in results['bad']['error']
+    pool.close()
+
+
+def test_timeout_interrupts_only_the_slow_query():
+    pool = sqlite_pool()
+    results = execute_many_queries(pool, {'endless': ENDLESS, 'quick': "SELECT 2"}, timeout=0.2)
+    assert results['quick']['status'] == 'ok'
+    assert results['endless']['status'] == 'timeout'
+    assert results['endless']['seconds'] < 2
+    # the interrupted connection went back to the pool in working order
+    with pool.connection() as conn:
+        assert conn.execute("SELECT 3").fetchone() == (3,)
+    pool.close()
+
+
+def test_cancel():
+    pool = sqlite_pool(max_size=1)
+    batch = QueryBatch(pool, {'a': ENDLESS, 'b': "SELECT 1"}, max_workers=1)
+    threading.Timer(0.2, batch.cancel).start()
+    results = dict(batch)
+    assert set(results) == {'a', 'b'}
+    assert results['a']['status'] == 'cancelled'
+    assert results['b']['status'] == 'cancelled'
+    pool.close()
+
+
+class KillableConnection:
+    """pymysql-style: no interrupt(); a query runs until KILL QUERY <its id>."""
+
+    killed = {}
+    ids = iter(range(1, 1_000_000))
+
+    def __init__(self):
+        self.id = next(KillableConnection.ids)
+        KillableConnection.killed[self.id] = threading.Event()
+
+    def thread_id(self):
+        return self.id
+
+    def cursor(self):
+        return self
+
+    def execute(self, sql, params=None):
+        if sql.startswith('KILL QUERY '):
+            KillableConnection.killed[int(sql.split()[-1])].set()
+            return
+        if not KillableConnection.killed[self.id].wait(10):
+            raise AssertionError('never killed')
+        KillableConnection.killed[self.id].clear()
+        raise RuntimeError('Query execution was interrupted')
+
+    def close(self):
+        pass
+
+
+def test_kill_does_not_wait_for_a_full_pool():
+    pool = ConnectionPool(KillableConnection, max_size=2, timeout=5)
+    started = time.monotonic()
+    results = execute_many_queries(pool, {'a': "SELECT slow", 'b': "SELECT slow"}, timeout=0.1)
+    assert {r['status'] for r in results.values()} == {'timeout'}
+    assert time.monotonic() - started < 2         # not the 5 s pool timeout
+    assert pool.stats()['open'] == 2              # the kills used no pool slot
+    pool.close()
@@ -0,0 +1,180 @@
+# test_singlestore_bulk_load.py
+"""
+Checks for singlestore_bulk_load.bulk_load against sqlite3 stand-ins:
+bisection down to a bad row (INSERT and LOAD DATA fallback), transient
+retries, the LOCAL INFILE escaping of tabs, newlines and \\N, read
+back the way MySQL's LOAD DATA parses FIELDS ESCAPED BY '\\', and pd.NA
+in nullable columns stored as NULL.
+"""
+import os
+import re
+import sqlite3
+import tempfile
+
+import pandas as pd
+import pytest
+
+import singlestore_bulk_load
+from singlestore_bulk_load import bulk_load, bulk_load_dataframe
+from singlestore_pool import ConnectionPool
+
+COLUMNS = ['id', 'name']
+GOOD = [(i, f'row {i}') for i in range(1, 10)]
+BAD = (None, 'no id')                       # id is NOT NULL
+TRICKY = ['tab\there', 'two\nlines', 'cr\rlf', '\\N', 'back\\slash', 'nul\0byte',
+          '\\t not a tab', '', None, 'plain']
+
+LOAD_SQL = re.compile(r"LOAD DATA LOCAL INFILE '([^']*)' INTO TABLE (\w+) .*\((.*)\)$", re.S)
+UNESCAPE = {'t': '\t', 'n': '\n', 'r': '\r', '0': '\0', '\\': '\\'}
+
+
+def sqlite_escape(v):
+    if v is None:
+        return 'NULL'
+    if isinstance(v, (int, float)):
+        return repr(v)
+    return "'" + str(v).replace("'", "''") + "'"
+
+
+def unescape_field(field):
+    """One LOAD DATA field: \\N alone is NULL, backslash sequences decoded."""
+    if field == '\\N':
+        return None
+    return re.sub(r'\\(.)', lambda m: UNESCAPE.get(m.group(1), m.group(1)), field, flags=re.S)
+
+
+class LoadDataConnection:
+    """sqlite3 connection whose cursors also run LOAD DATA LOCAL INFILE."""
+
+    loads = 0
+
+    def __init__(self, path):
+        self.con = sqlite3.connect(path, check_same_thread=False)
+
+    def cursor(self):
+        return LoadDataCursor(self)
+
+    def __getattr__(self, name):
+        return getattr(self.con, name)
+
+
+class LoadDataCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.cur = conn.con.cursor()
+
+    def execute(self, sql, params=None):
+        m = LOAD_SQL.match(sql)
+        if not m:
+            return self.cur.execute(sql, params or ())
+        path, table, cols = m.groups()
+        with open(path, 'rb') as fh:            # a FIFO: the loader writes the chunk
+            text = fh.read().decode('utf-8')
+        rows = [[unescape_field(f) for f in line.split('\t')]
+                for line in text.split('\n')[:-1]]
+        LoadDataConnection.loads += 1
+        # one statement, so a bad row fails the whole chunk as on the server
+        values = ', '.join('(' + ', '.join('?' * len(r)) + ')' for r in rows)
+        self.cur.execute(f"INSERT INTO {table} ({cols.replace('`', '')}) VALUES {values}",
+                         [v for r in rows for v in r])
+
+    def __getattr__(self, name):
+        return getattr(self.cur, name)
+
+
+def stand_in(connect=lambda path: sqlite3.connect(path, check_same_thread=False)):
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    con = sqlite3.connect(path)
+    con.execute("CREATE TABLE items (id INTEGER NOT NULL, name TEXT)")
+    con.commit()
+    con.close()
+    pool = ConnectionPool(lambda: connect(path), max_size=2)
+    return pool, path
+
+
+def stored(pool):
+    with pool.connection() as conn:
+        return conn.execute("SELECT id, name FROM items ORDER BY rowid").fetchall()
+
+
+def test_insert_bisects_down_to_the_bad_row():
+    pool, path = stand_in()
+    rows = GOOD[:6] + [BAD] + GOOD[6:]
+    loaded = []
+    stats = bulk_load(pool, 'items', COLUMNS, rows, chunk_rows=100, max_packet=1 << 20,
+                      escape=sqlite_escape, on_loaded=lambda cols, chunk: loaded.extend(chunk))
+    assert stats['loaded'] == 9 and stats['rows'] == 10
+    assert stats['failed_rows'] == 1
+    assert stats['errors'][0]['index'] == 6 and 'NOT NULL' in stats['errors'][0]['error']
+    assert stored(pool) == GOOD
+    assert sorted(loaded) == GOOD                # only committed rows reach the hook
+    pool.close()
+    os.remove(path)
+
+
+def test_transient_error_is_retried(monkeypatch):
+    pool, path = stand_in()
+    monkeypatch.setattr(singlestore_bulk_load, 'BACKOFF', 0)
+    real = singlestore_bulk_load._execute
+    failures = [sqlite3.OperationalError('server has gone away')]
+
+    def flaky(pool_, sql, params=None):
+        if failures:
+            raise failures.pop()
+        return real(pool_, sql, params)
+
+    monkeypatch.setattr(singlestore_bulk_load, '_execute', flaky)
+    stats = bulk_load(pool, 'items', COLUMNS, GOOD, max_packet=1 << 20, escape=sqlite_escape)
+    assert stats['loaded'] == 9 and stats['failed_rows'] == 0
+    assert stored(pool) == GOOD
+    pool.close()
+    os.remove(path)
+
+
+def test_load_data_escaping_round_trips():
+    pool, path = stand_in(LoadDataConnection)
+    rows = list(enumerate(TRICKY, 1))
+    loads = LoadDataConnection.loads
+    stats = bulk_load(pool, 'items', COLUMNS, rows, method='load', max_packet=1 << 20,
+                      escape=lambda v: 1 / 0)   # the INSERT fallback must not run
+    assert LoadDataConnection.loads == loads + 1
+    assert stats['loaded'] == len(rows) and stats['failed_rows'] == 0
+    assert stored(pool) == rows                 # None stays NULL, '\\N' stays text
+    pool.close()
+    os.remove(path)
+
+
+def test_load_data_falls_back_to_insert_for_a_bad_row():
+    pool, path = stand_in(LoadDataConnection)
+    rows = GOOD[:3] + [BAD] + GOOD[3:]
+    stats = bulk_load(pool, 'items', COLUMNS, rows, method='load', max_packet=1 << 20,
+                      escape=sqlite_escape)
+    assert stats['loaded'] == 9 and stats['failed_rows'] == 1
+    assert stats['errors'][0]['index'] == 3
+    assert stored(pool) == GOOD
+    pool.close()
+    os.remove(path)
+
+
+@pytest.mark.parametrize('method', ['insert', 'load'])
+def test_nullable_dtypes_store_na_as_null(method):
+    pool, path = stand_in(LoadDataConnection)
+    with pool.connection() as conn:
+        conn.execute("CREATE TABLE counts (id INTEGER NOT NULL, qty INTEGER, name TEXT)")
+        conn.commit()
+    df = pd.DataFrame({'id': pd.array([1, 2, 3], dtype='Int64'),
+                       'qty': pd.array([5, None, 7], dtype='Int64'),        # as fetch_dataframe
+                       'name': pd.array(['a', None, 'c'], dtype='string')})
+    loaded = []
+    stats = bulk_load_dataframe(pool, df, 'counts', method=method, max_packet=1 << 20,
+                                escape=sqlite_escape, on_loaded=lambda cols, rows: loaded.extend(rows))
+    assert stats['loaded'] == 3 and stats['failed_rows'] == 0
+    with pool.connection() as conn:
+        rows = conn.execute("SELECT id, qty, name, typeof(qty), typeof(name) FROM counts "
+                            "ORDER BY id").fetchall()
+    assert rows == [(1, 5, 'a', 'integer', 'text'), (2, None, None, 'null', 'null'),
+                    (3, 7, 'c', 'integer', 'text')]
+    assert len(loaded) == 3
+    pool.close()
+    os.remove(path)
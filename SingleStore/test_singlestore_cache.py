@@ -0,0 +1,107 @@
+# test_singlestore_cache.py
+"""
+Checks for singlestore_cache.QueryCache: memory hits across formatting
+changes, TTL expiry (on an injected clock), invalidation by the tables a
+write touches, and read-back from the SQLite disk tier in a new process'
+cache.
+"""
+import os
+import tempfile
+
+from singlestore_cache import QueryCache, tables_read, tables_written
+
+BY_TYPE = "SELECT type, COUNT(*) FROM uk_price_paid GROUP BY type"
+BY_COUNTY = ("SELECT p.county, AVG(p.price) FROM uk_price_paid p "
+             "JOIN counties c ON c.name = p.county GROUP BY p.county")
+PRODUCTS = "SELECT * FROM products WHERE price > %s"
+
+
+class Clock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def disk_path():
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    return path
+
+
+def test_hit_ignores_formatting_but_not_params():
+    cache = QueryCache(ttl=60, disk_path=None)
+    cache.set(BY_TYPE, None, [('flat', 3)])
+    assert cache.get("select type,  count(*)\n  from UK_PRICE_PAID -- per type\n group by type") \
+        == (True, [('flat', 3)])
+    cache.set(PRODUCTS, (10,), ['cheap'])
+    assert cache.get(PRODUCTS, (10,)) == (True, ['cheap'])
+    assert cache.get(PRODUCTS, (20,)) == (False, None)
+    assert cache.stats['memory_hits'] == 2 and cache.stats['misses'] == 1
+
+
+def test_entries_expire_after_their_ttl():
+    clock = Clock()
+    cache = QueryCache(ttl=60, disk_path=None, clock=clock)
+    cache.set(BY_TYPE, None, ['rows'])
+    cache.set(PRODUCTS, (1,), ['short'], ttl=5)
+    clock.now += 59
+    assert cache.get(BY_TYPE)[0]
+    assert not cache.get(PRODUCTS, (1,))[0]
+    clock.now += 2
+    assert cache.get(BY_TYPE) == (False, None)
+
+
+def test_write_evicts_only_readers_of_its_table():
+    path = disk_path()
+    cache = QueryCache(ttl=60, disk_path=path)
+    for sql in (BY_TYPE, BY_COUNTY):
+        cache.set(sql, None, ['rows'])
+    cache.set(PRODUCTS, (1,), ['rows'])
+    cache.invalidate_sql("UPDATE `counties` SET region = 'SE' WHERE name = 'KENT'")
+    assert cache.get(BY_COUNTY) == (False, None)
+    assert cache.get(BY_TYPE)[0] and cache.get(PRODUCTS, (1,))[0]
+    cache.invalidate_sql("INSERT INTO uk_price_paid (price) VALUES (1)")
+    assert not cache.get(BY_TYPE)[0] and cache.get(PRODUCTS, (1,))[0]
+    assert cache.stats['disk_hits'] == 0                  # survivors never left memory
+    # the disk tier was purged as well: a fresh cache on the file sees the same
+    fresh = QueryCache(ttl=60, disk_path=path)
+    assert not fresh.get(BY_TYPE)[0] and not fresh.get(BY_COUNTY)[0]
+    assert fresh.get(PRODUCTS, (1,))[0]
+    cache.invalidate_sql("CALL refresh_everything()")     # target unknown: clear all
+    assert not cache.get(PRODUCTS, (1,))[0]
+    os.remove(path)
+
+
+def test_disk_tier_survives_a_restart():
+    path = disk_path()
+    clock = Clock()
+    QueryCache(ttl=60, disk_path=path, clock=clock).set(BY_COUNTY, None, [('KENT', 215000.0)])
+    restarted = QueryCache(ttl=60, disk_path=path, clock=clock)
+    assert restarted.get(BY_COUNTY) == (True, [('KENT', 215000.0)])
+    assert restarted.stats['disk_hits'] == 1
+    assert restarted.get(BY_COUNTY)[0] and restarted.stats['memory_hits'] == 1
+    clock.now += 61
+    assert not QueryCache(ttl=60, disk_path=path, clock=clock).get(BY_COUNTY)[0]
+    os.remove(path)
+
+
+def test_get_or_run_caches_non_empty_results_only():
+    cache = QueryCache(ttl=60, disk_path=None)
+    calls = []
+    run = lambda rows: (lambda: calls.append(1) or rows)
+    assert cache.get_or_run(BY_TYPE, None, run([])) == []
+    assert cache.get_or_run(BY_TYPE, None, run([('flat', 1)])) == [('flat', 1)]
+    assert cache.get_or_run(BY_TYPE, None, run([('other', 2)])) == [('flat', 1)]
+    assert len(calls) == 2
+
+
+def test_table_parsing():
+    assert tables_read(BY_COUNTY) == {'uk_price_paid', 'counties'}
+    assert tables_read("SELECT 'from fake' FROM db.`Products`") == {'products'}
+    assert tables_written("LOAD DATA LOCAL INFILE '/tmp/x' INTO TABLE uk_price_paid") \
+        == {'uk_price_paid'}
+    assert tables_written("TRUNCATE TABLE products") == {'products'}
+    assert tables_written(BY_TYPE) == set()
+    assert tables_written("CALL refresh_everything()") is None
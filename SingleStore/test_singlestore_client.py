@@ -0,0 +1,143 @@
+# test_singlestore_client.py
+"""
+Checks for singlestore_client.SingleStoreClient on the local stand-in
+backends (sqlite3 always, DuckDB when installed): placeholder translation,
+dict rows, the write/read/cache path, the bulk loader with the aggregates
+hook, concurrent reports, DataFrames, and a manager running unchanged on
+a stand-in.
+"""
+import os
+import tempfile
+
+import pandas as pd
+import pytest
+
+from singlestore_client import SingleStoreClient, SQLiteBackend, DuckDBBackend, HAS_DUCKDB, qmark, ansi_quotes
+
+BACKENDS = [('sqlite', SQLiteBackend, '.db')]
+if HAS_DUCKDB:
+    BACKENDS.append(('duckdb', DuckDBBackend, '.duckdb'))
+
+FRAME = pd.DataFrame({
+    'price': [250000, 180000, 420000, 99000],
+    'date': ['2023-01-15', '2023-01-20', '2024-03-02', '2024-03-28'],
+    'type': ['detached', 'terraced', 'detached', "flat's"],
+    'county': ['KENT', 'KENT', 'SURREY', None],
+})
+
+
+@pytest.fixture(params=BACKENDS, ids=[b[0] for b in BACKENDS])
+def client(request):
+    _, backend, suffix = request.param
+    tmp = tempfile.mkdtemp()
+    db = SingleStoreClient(backend(os.path.join(tmp, 'standin' + suffix)))
+    db.execute_command("CREATE TABLE uk_price_paid (price BIGINT NOT NULL, date DATE, "
+                       "type VARCHAR(20), county VARCHAR(20))")
+    yield db
+    db.close()
+
+
+def test_placeholder_translation():
+    assert qmark("SELECT * FROM t WHERE a = %s AND b LIKE '%s%%'") == \
+           "SELECT * FROM t WHERE a = ? AND b LIKE '%s%%'"
+    assert qmark("SELECT 100 %% 7, %s") == "SELECT 100 % 7, ?"
+    assert ansi_quotes("INSERT INTO t (`a`, `b`) VALUES ('`x`')") == \
+           "INSERT INTO t (\"a\", \"b\") VALUES ('`x`')"
+
+
+def test_command_query_and_cache(client):
+    assert client.execute_command("INSERT INTO uk_price_paid VALUES (%s, %s, %s, %s)",
+                                  (300000, '2024-05-05', 'flat', 'ESSEX'))
+    rows = client.execute_query("SELECT type, county FROM uk_price_paid WHERE price > %s", (1000,))
+    assert rows == [{'type': 'flat', 'county': 'ESSEX'}]
+
+    sql = "SELECT COUNT(*) AS n FROM uk_price_paid"
+    assert client.cached_query(sql)[0]['n'] == 1
+    client.execute_command("INSERT INTO uk_price_paid VALUES (1, NULL, 'flat', NULL)")
+    assert client.cached_query(sql)[0]['n'] == 2          # the write invalidated the entry
+
+
+def test_bulk_load_updates_aggregates(client):
+    client.aggregates.rebuild()
+    assert client.batch_insert_dataframe(FRAME, 'uk_price_paid', chunk_rows=2)
+    assert client.aggregates.check()['ok']
+    # LOAD DATA is MySQL-only; the stand-ins fall back to multi-row INSERT
+    assert client.batch_insert_dataframe(FRAME, 'uk_price_paid', method='load')
+    assert client.execute_query("SELECT COUNT(*) AS n FROM uk_price_paid")[0]['n'] == 8
+
+
+def test_many_queries_and_dataframe(client):
+    client.batch_insert_dataframe(FRAME, 'uk_price_paid')
+    results = client.execute_many_queries({
+        'by_type': "SELECT type, COUNT(*) AS n FROM uk_price_paid GROUP BY type ORDER BY type",
+        'by_year': "SELECT YEAR(date) AS year, COUNT(*) AS n FROM uk_price_paid GROUP BY YEAR(date) "
+                   "ORDER BY year",
+    })
+    assert [r['n'] for r in results['by_type']] == [2, 1, 1]
+    assert [(r['year'], r['n']) for r in results['by_year']] == [(2023, 2), (2024, 2)]
+
+    df = client.get_dataframe("SELECT price, type FROM uk_price_paid WHERE county = %s", ('KENT',))
+    assert list(df.columns) == ['price', 'type'] and df['price'].tolist() == [250000, 180000]
+
+
+def test_manager_runs_on_standin(capsys):
+    from singlestore_simple_manager import SingleStoreManager
+
+    tmp = tempfile.mkdtemp()
+    manager = SingleStoreManager(SQLiteBackend(os.path.join(tmp, 'manager.db')))
+    assert manager.test_connection()
+    manager.execute_command("CREATE TABLE uk_price_paid (price BIGINT NOT NULL, date DATE, type VARCHAR(20), "
+                            "county VARCHAR(20), town VARCHAR(50))")
+    manager.batch_insert_dataframe(FRAME.assign(town='DOVER'), 'uk_price_paid')
+    manager.run_property_analysis()
+    out = capsys.readouterr().out
+    assert 'detached' in out and '2024:' in out
+    manager.close()
+
+
+def test_closing_one_client_leaves_the_shared_pool_open():
+    path = os.path.join(tempfile.mkdtemp(), 'shared.db')
+    first, second = SingleStoreClient(SQLiteBackend(path)), SingleStoreClient(SQLiteBackend(path))
+    assert first.pool is second.pool
+    first.close()
+    first.close()                               # a second close releases nothing more
+    second.execute_command("CREATE TABLE t (a INTEGER)")
+    assert second.execute_command("INSERT INTO t VALUES (%s)", (1,)) == 1
+    assert second.execute_query("SELECT a FROM t") == [{'a': 1}]
+    second.close()
+    assert second.pool._closed
+
+
+def test_write_and_summary_upkeep_commit_together(client, monkeypatch):
+    client.aggregates.rebuild()
+    insert = "INSERT INTO uk_price_paid (price, date, type, county) VALUES (%s, %s, %s, %s)"
+    assert client.execute_command(insert, (300000, '2024-05-05', 'flat', 'ESSEX'))
+    assert client.aggregates.is_fresh() and client.aggregates.check()['ok']
+
+    def fail(*args, **kwargs):
+        raise RuntimeError('lost connection before the upsert')
+    monkeypatch.setattr(client.aggregates, 'apply_rows', fail)
+    assert client.execute_command(insert, (1, '2024-06-06', 'flat', 'ESSEX')) == 0
+    monkeypatch.undo()
+    # the write went with the upsert: the summaries are fresh and still right
+    assert client.execute_query("SELECT COUNT(*) AS n FROM uk_price_paid")[0]['n'] == 1
+    assert client.aggregates.is_fresh() and client.aggregates.check()['ok']
+
+
+def test_type_summary_leaves_out_null_types(client):
+    from singlestore_aggregates import SUMMARY_SQL
+
+    client.batch_insert_dataframe(FRAME, 'uk_price_paid')
+    client.execute_command("INSERT INTO uk_price_paid VALUES (%s, %s, %s, %s)",
+                           (120000, '2024-02-02', None, 'KENT'))
+    client.aggregates.rebuild()
+    base = """
+        SELECT type, COUNT(*) as count, AVG(price) as avg_price,
+               COUNT(*) * 100.0 / (SELECT COUNT(*) FROM uk_price_paid) as percentage
+        FROM uk_price_paid WHERE type IS NOT NULL GROUP BY type ORDER BY count DESC, type
+    """
+    summary = SUMMARY_SQL['type_analysis'].replace('ORDER BY count DESC', 'ORDER BY count DESC, type')
+    rows = lambda sql: [(r['type'], r['count'], round(r['avg_price'], 6), round(r['percentage'], 6))
+                        for r in client.execute_query(sql)]
+    assert rows(summary) == rows(base)
+    assert [r[0] for r in rows(summary)] == ['detached', "flat's", 'terraced']
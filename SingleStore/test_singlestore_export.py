@@ -0,0 +1,138 @@
+# test_singlestore_export.py
+"""
+Checks for singlestore_export.export_table against an sqlite3 stand-in
+loaded from uk_price_paid_sample_1000.csv: full export, key-boundary part
+splitting, NULL keys and resume after an interrupted run.
+"""
+import csv
+import gzip
+import glob
+import os
+import shutil
+import sqlite3
+import tempfile
+
+from singlestore_export import export_table, _load_manifest
+from singlestore_pool import ConnectionPool
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uk_price_paid_sample_1000.csv')
+
+
+def stand_in():
+    path = os.path.join(tempfile.mkdtemp(prefix='export_test_'), 'uk.db')
+    con = sqlite3.connect(path)
+    with open(SAMPLE, newline='') as fh:
+        rows = list(csv.reader(fh))
+    header, data = rows[0], rows[1:]
+    con.execute(f"CREATE TABLE uk_price_paid ({', '.join(header)})")
+    con.executemany(f"INSERT INTO uk_price_paid VALUES ({', '.join('?' * len(header))})",
+                    [[int(r[0])] + r[1:] for r in data])
+    con.execute("UPDATE uk_price_paid SET date = NULL WHERE rowid % 97 = 0")
+    con.commit()
+    con.close()
+    pool = ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False), max_size=2)
+    return pool, path, len(data)
+
+
+def read_parts(out_dir):
+    rows = []
+    for part in sorted(glob.glob(os.path.join(out_dir, 'part_*.csv.gz'))):
+        with gzip.open(part, 'rt', newline='') as fh:
+            rows.extend(list(csv.reader(fh))[1:])
+    return rows
+
+
+def export(pool, out_dir, **kwargs):
+    return export_table(pool, out_dir=out_dir, fmt='csv', part_rows=100,
+                        fetch_size=37, cursor_factory=lambda c: c.cursor(),
+                        placeholder='?', **kwargs)
+
+
+def test_full_export_splits_on_key_boundaries():
+    pool, path, n = stand_in()
+    out = os.path.join(os.path.dirname(path), 'out')
+    seen = []
+    manifest = export(pool, out, progress=seen.append)
+    rows = read_parts(out)
+    assert manifest['complete'] and manifest['rows'] == n == len(rows)
+    assert seen and seen[-1]['rows'] == n
+    # no key value spans two parts
+    last_keys = [p['last_key'] for p in manifest['parts'] if p['file'] != 'part_null.csv.gz']
+    for part, next_part in zip(manifest['parts'], manifest['parts'][1:]):
+        if next_part['file'] == 'part_null.csv.gz':
+            break
+        with gzip.open(os.path.join(out, next_part['file']), 'rt') as fh:
+            first = list(csv.reader(fh))[1][1]
+        assert first > part['last_key']
+    assert last_keys == sorted(last_keys)
+    pool.close()
+    shutil.rmtree(os.path.dirname(path))
+
+
+def test_resume_after_interruption():
+    pool, path, n = stand_in()
+    out = os.path.join(os.path.dirname(path), 'out')
+
+    class Interrupted(Exception):
+        pass
+
+    def crash(p):
+        if p['parts'] >= 3:
+            raise Interrupted()
+    try:
+        export(pool, out, progress=crash)
+        assert False, "expected the export to be interrupted"
+    except Interrupted:
+        pass
+    partial = _load_manifest(out)
+    assert not partial['complete'] and len(partial['parts']) >= 3
+
+    manifest = export(pool, out)
+    rows = read_parts(out)
+    assert manifest['complete'] and manifest['rows'] == n == len(rows)
+    con = sqlite3.connect(path)
+    expected = sorted(tuple(map(str, r)) for r in con.execute("SELECT * FROM uk_price_paid"))
+    con.close()
+    got = sorted(tuple('None' if v == '' and i == 1 else v for i, v in enumerate(r)) for r in rows)
+    assert got == expected
+    pool.close()
+    shutil.rmtree(os.path.dirname(path))
+
+
+def test_crash_after_the_null_part_does_not_export_it_twice():
+    import singlestore_export
+    pool, path, n = stand_in()
+    out = os.path.join(os.path.dirname(path), 'out')
+
+    class Interrupted(Exception):
+        pass
+
+    save = singlestore_export._save_manifest
+
+    def crash_on_final_save(out_dir, manifest):
+        if manifest['complete']:
+            raise Interrupted()
+        save(out_dir, manifest)
+    singlestore_export._save_manifest = crash_on_final_save
+    try:
+        export(pool, out)
+        assert False, "expected the export to be interrupted"
+    except Interrupted:
+        pass
+    finally:
+        singlestore_export._save_manifest = save
+    partial = _load_manifest(out)
+    assert not partial['complete'] and partial['parts'][-1]['file'] == 'part_null.csv.gz'
+
+    manifest = export(pool, out)
+    assert manifest['complete'] and manifest['rows'] == n == len(read_parts(out))
+    assert [p['file'] for p in manifest['parts']].count('part_null.csv.gz') == 1
+    pool.close()
+    shutil.rmtree(os.path.dirname(path))
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,118 @@
+# test_singlestore_frames.py
+"""
+Checks for singlestore_frames.fetch_dataframe: the dtype each MySQL column
+type (from cursor.description) maps to — nullable integers as Int64, not
+float — across fetchmany batches, and the dtypes of an empty result set.
+The cursor is a fake that serves fixed rows with pymysql's type codes.
+"""
+import datetime
+from decimal import Decimal
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from singlestore_frames import fetch_dataframe
+from singlestore_pool import ConnectionPool
+
+# (name, pymysql FIELD_TYPE code, precision, scale)
+LONGLONG, DOUBLE, NEWDECIMAL, DATE, DATETIME, TIME, YEAR, VAR_STRING = 8, 5, 246, 10, 12, 11, 13, 253
+COLUMNS = [('id', LONGLONG, None, None), ('beds', LONGLONG, None, None),
+           ('price', NEWDECIMAL, 12, 2), ('ratio', DOUBLE, None, None),
+           ('sold', DATE, None, None), ('listed', DATETIME, None, None),
+           ('viewing', TIME, None, None), ('built', YEAR, None, None),
+           ('town', VAR_STRING, None, None)]
+ROWS = [
+    (1, 3, Decimal('250000.50'), 0.5, datetime.date(2023, 1, 15),
+     datetime.datetime(2022, 12, 1, 9, 30), datetime.timedelta(hours=10), 1998, 'ASHFORD'),
+    (2, 2, Decimal('180000.00'), 0.25, datetime.date(2023, 1, 20),
+     datetime.datetime(2022, 12, 2, 14, 0), datetime.timedelta(hours=11), 2005, 'DOVER'),
+    (3, None, None, None, None, None, None, 2010, None),      # NULLs only in the 2nd batch
+]
+
+
+class FakeCursor:
+    def __init__(self, rows, columns):
+        self.rows = list(rows)
+        self.columns = columns
+        self.description = None
+
+    def execute(self, query, params=None):
+        self.description = [(name, code, None, None, precision, scale, True)
+                            for name, code, precision, scale in self.columns]
+
+    def fetchmany(self, size):
+        batch, self.rows = self.rows[:size], self.rows[size:]
+        return batch
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self, rows, columns):
+        self.rows, self.columns = rows, columns
+
+    def cursor(self):
+        return FakeCursor(self.rows, self.columns)
+
+    def close(self):
+        pass
+
+
+def fetch(rows, columns=COLUMNS, **kwargs):
+    pool = ConnectionPool(lambda: FakeConnection(rows, columns), max_size=1)
+    try:
+        return fetch_dataframe(pool, "SELECT …", cursor_factory=lambda conn: conn.cursor(),
+                               **kwargs)
+    finally:
+        pool.close()
+
+
+def test_dtypes_follow_the_column_types():
+    df = fetch(ROWS, batch_size=2)
+    assert list(df.columns) == [c[0] for c in COLUMNS]
+    assert df['id'].dtype == np.int64
+    assert df['beds'].dtype == pd.Int64Dtype()              # NULL → Int64, not float64
+    assert df['beds'].tolist()[:2] == [3, 2] and df['beds'].isna().tolist() == [False, False, True]
+    assert df['price'].dtype == np.float64 and df['price'].tolist()[:2] == [250000.5, 180000.0]
+    assert df['ratio'].dtype == np.float64 and np.isnan(df['ratio'][2])
+    assert pd.api.types.is_datetime64_any_dtype(df['sold'])
+    assert df['sold'][0] == pd.Timestamp('2023-01-15') and pd.isna(df['sold'][2])
+    assert pd.api.types.is_datetime64_any_dtype(df['listed'])
+    assert df['listed'][1] == pd.Timestamp('2022-12-02 14:00')
+    assert pd.api.types.is_timedelta64_dtype(df['viewing'])
+    assert df['viewing'][0] == pd.Timedelta(hours=10)
+    assert df['built'].dtype == np.int64                    # YEAR is an integer
+    assert pd.api.types.is_string_dtype(df['town'])        # object, or str on pandas >= 3
+    assert df['town'].tolist()[:2] == ['ASHFORD', 'DOVER'] and pd.isna(df['town'][2])
+
+
+def test_batch_size_does_not_change_the_result():
+    pd.testing.assert_frame_equal(fetch(ROWS, batch_size=1), fetch(ROWS, batch_size=50_000))
+
+
+def test_empty_result_keeps_its_dtypes():
+    df = fetch([])
+    assert len(df) == 0 and list(df.columns) == [c[0] for c in COLUMNS]
+    assert df['id'].dtype == np.int64 and df['built'].dtype == np.int64
+    assert df['price'].dtype == np.float64 and df['ratio'].dtype == np.float64
+    assert pd.api.types.is_datetime64_any_dtype(df['sold'])
+    assert pd.api.types.is_datetime64_any_dtype(df['listed'])
+    assert pd.api.types.is_timedelta64_dtype(df['viewing'])
+    assert pd.api.types.is_string_dtype(df['town'])
+
+
+def test_dtypes_override_for_untyped_columns():
+    columns = [('id', None, None, None), ('sold', None, None, None)]
+    df = fetch([(1, '2023-01-15'), (2, None)], columns, dtypes={'sold': 'date'})
+    assert df['id'].dtype == np.int64                       # inferred from the first batch
+    assert pd.api.types.is_datetime64_any_dtype(df['sold']) and pd.isna(df['sold'][1])
+
+
+def test_arrow_engine_keeps_nullable_ints_and_decimals():
+    pytest.importorskip('pyarrow')
+    df = fetch(ROWS, batch_size=2, engine='arrow')
+    assert str(df['beds'].dtype) == 'int64[pyarrow]' and df['beds'].isna().tolist()[2]
+    assert str(df['price'].dtype) == 'double[pyarrow]'
+    assert df['price'][0] == 250000.5
@@ -0,0 +1,98 @@
+# test_singlestore_parallel_extract.py
+"""
+Checks for singlestore_parallel_extract.check_partitions against an sqlite3
+stand-in loaded from uk_price_paid_sample_1000.csv: the planned year and
+range partitions cover the table exactly, and plans with overlapping
+ranges or a gap are rejected — by the check and by extract_partitioned
+before anything is written.
+"""
+import csv
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+import singlestore_parallel_extract as extract
+from singlestore_parallel_extract import (check_partitions, plan_range_partitions,
+                                          plan_year_partitions, _predicate)
+from singlestore_pool import ConnectionPool
+
+SAMPLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'uk_price_paid_sample_1000.csv')
+SQLITE_YEAR = "CAST(strftime('%Y', {key}) AS INTEGER)"
+
+
+def stand_in():
+    path = os.path.join(tempfile.mkdtemp(prefix='extract_test_'), 'uk.db')
+    con = sqlite3.connect(path)
+    with open(SAMPLE, newline='') as fh:
+        rows = list(csv.reader(fh))
+    header, data = rows[0], rows[1:]
+    con.execute(f"CREATE TABLE uk_price_paid ({', '.join(header)})")
+    con.executemany(f"INSERT INTO uk_price_paid VALUES ({', '.join('?' * len(header))})",
+                    [[int(r[0])] + r[1:] for r in data])
+    con.execute("UPDATE uk_price_paid SET date = NULL WHERE rowid % 97 = 0")
+    con.commit()
+    con.close()
+    pool = ConnectionPool(lambda: sqlite3.connect(path, check_same_thread=False), max_size=2)
+    return pool, path, len(data)
+
+
+def ranges(key, bounds):
+    """Partitions [None, b0), [b0, b1), …, [bn, None) plus NULL keys."""
+    edges = [None] + list(bounds) + [None]
+    parts = [{'name': f"range={i:03d}", 'lo': lo, 'hi': hi, 'where': _predicate(key, lo, hi)}
+             for i, (lo, hi) in enumerate(zip(edges, edges[1:]))]
+    return parts + [{'name': 'range=null', 'lo': None, 'hi': None, 'where': f"{key} IS NULL"}]
+
+
+def test_planned_partitions_cover_the_table():
+    pool, path, n = stand_in()
+    for plan in (plan_year_partitions(pool, 'uk_price_paid', 'date', 4, SQLITE_YEAR),
+                 plan_range_partitions(pool, 'uk_price_paid', 'price', 6)):
+        report = check_partitions(pool, 'uk_price_paid', plan)
+        assert report == {'total': n, 'uncovered': 0, 'overlapping': 0,
+                          'contiguous': True, 'ok': True}
+    pool.close()
+    os.remove(path)
+
+
+def test_overlapping_ranges_are_rejected():
+    pool, path, n = stand_in()
+    plan = ranges('price', [200000, 400000])
+    plan[1] = dict(plan[1], lo=150000, where=_predicate('price', 150000, 400000))
+    report = check_partitions(pool, 'uk_price_paid', plan)
+    assert report['overlapping'] > 0 and report['uncovered'] == 0
+    assert not report['contiguous'] and not report['ok']
+    pool.close()
+    os.remove(path)
+
+
+def test_gap_is_rejected():
+    pool, path, n = stand_in()
+    plan = ranges('price', [200000, 300000, 400000])
+    del plan[2]                                         # [300000, 400000) no longer read
+    report = check_partitions(pool, 'uk_price_paid', plan)
+    assert report['uncovered'] > 0 and report['overlapping'] == 0
+    assert not report['contiguous'] and not report['ok']
+    # a gap no row falls into is still a broken plan
+    plan = ranges('price', [10 ** 9, 2 * 10 ** 9, 3 * 10 ** 9])
+    del plan[2]
+    report = check_partitions(pool, 'uk_price_paid', plan)
+    assert report['uncovered'] == 0 and not report['ok']
+    pool.close()
+    os.remove(path)
+
+
+def test_extract_refuses_a_bad_plan(monkeypatch):
+    pool, path, n = stand_in()
+    gapped = ranges('price', [200000, 300000, 400000])
+    del gapped[2]
+    monkeypatch.setattr(extract, 'plan_range_partitions', lambda *a, **k: gapped)
+    out = os.path.join(os.path.dirname(path), 'out')
+    with pytest.raises(RuntimeError, match='does not cover'):
+        extract.extract_partitioned(pool, out_dir=out, key='price', by='range', fmt='csv',
+                                    cursor_factory=lambda conn: conn.cursor())
+    assert not [f for f in os.listdir(out) if f.startswith('range=')]
+    pool.close()
+    os.remove(path)
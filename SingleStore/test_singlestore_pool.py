@@ -0,0 +1,169 @@
+# test_singlestore_pool.py
+"""
+Checks for singlestore_pool.ConnectionPool.
+
+The pool logic runs against an in-process sqlite3 stand-in. When
+SINGLESTORE_TEST_HOST is set, the same round trip is also run over pymysql
+against that MySQL-protocol server (e.g. a local MySQL / SingleStore dev
+container).
+"""
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from singlestore_pool import ConnectionPool, PoolTimeout, get_pool, release_pool, close_all_pools
+
+
+def sqlite_pool(**kwargs):
+    opened = []
+
+    def connect():
+        conn = sqlite3.connect(':memory:', check_same_thread=False)
+        opened.append(conn)
+        return conn
+    kwargs.setdefault('health_check', lambda c: c.execute("SELECT 1"))
+    return ConnectionPool(connect, **kwargs), opened
+
+
+def test_reuse():
+    pool, opened = sqlite_pool(max_size=2)
+    for _ in range(10):
+        with pool.connection() as conn:
+            assert conn.execute("SELECT 1").fetchone() == (1,)
+    stats = pool.stats()
+    assert len(opened) == 1
+    assert stats['acquired'] == 10 and stats['reused'] == 9
+    assert stats['reuse_rate'] == 0.9
+    pool.close()
+
+
+def test_max_size_under_concurrency():
+    pool, opened = sqlite_pool(max_size=3)
+    active, peak, lock = [0], [0], threading.Lock()
+
+    def work(_):
+        with pool.connection():
+            with lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            time.sleep(0.005)
+            with lock:
+                active[0] -= 1
+    with ThreadPoolExecutor(8) as ex:
+        list(ex.map(work, range(40)))
+    assert peak[0] <= 3 and len(opened) <= 3
+    assert pool.stats()['open'] == len(opened)
+    pool.close()
+
+
+def test_timeout():
+    pool, _ = sqlite_pool(max_size=1, timeout=0.05)
+    with pool.connection():
+        try:
+            with pool.connection():
+                pass
+            assert False, "expected PoolTimeout"
+        except PoolTimeout:
+            pass
+    assert pool.stats()['timeouts'] == 1
+    pool.close()
+
+
+def test_recycle():
+    pool, opened = sqlite_pool(max_size=1, recycle=0.01)
+    with pool.connection() as first:
+        pass
+    time.sleep(0.02)
+    with pool.connection() as second:
+        assert second is not first
+    assert pool.stats()['recycled'] == 1 and pool.stats()['open'] == 1
+    pool.close()
+
+
+def test_failed_health_check_replaces_connection():
+    pool, opened = sqlite_pool(max_size=1, check_after=0)
+    with pool.connection() as first:
+        pass
+    first.close()                               # server dropped it
+    with pool.connection() as second:
+        assert second is not first
+        assert second.execute("SELECT 1").fetchone() == (1,)
+    assert pool.stats()['failed_checks'] == 1
+    pool.close()
+
+
+def test_broken_connection_is_discarded():
+    pool, opened = sqlite_pool(max_size=1)
+    try:
+        with pool.connection() as conn:
+            conn.close()
+            conn.execute("SELECT 1")
+    except sqlite3.ProgrammingError:
+        pass
+    assert pool.stats()['open'] == 0
+    with pool.connection() as conn:
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+    pool.close()
+
+
+def test_shared_pool_per_config():
+    config = {'host': 'localhost', 'user': 'u', 'ssl': {'ssl_disabled': False}}
+    connect = lambda: sqlite3.connect(':memory:', check_same_thread=False)
+    a = get_pool(config, connect)
+    b = get_pool(dict(config), connect)
+    c = get_pool({**config, 'user': 'v'}, connect)
+    assert a is b and a is not c
+    close_all_pools()
+
+
+def test_shared_pool_closes_with_its_last_user():
+    config = {'host': 'localhost', 'user': 'refs'}
+    connect = lambda: sqlite3.connect(':memory:', check_same_thread=False)
+    a, b = get_pool(config, connect), get_pool(config, connect)
+    release_pool(a)
+    with b.connection() as conn:                # still open for the other user
+        assert conn.execute("SELECT 1").fetchone() == (1,)
+    release_pool(b)
+    assert b._closed
+    assert get_pool(config, connect) is not b   # a fresh pool for the next user
+    close_all_pools()
+
+
+def test_local_mysql_round_trip():
+    host = os.getenv('SINGLESTORE_TEST_HOST')
+    if not host:
+        print("  [skip] SINGLESTORE_TEST_HOST not set — no MySQL-protocol stand-in")
+        return
+    import pymysql
+    from singlestore_pool import pymysql_pool
+
+    config = {
+        'host': host,
+        'port': int(os.getenv('SINGLESTORE_TEST_PORT', 3306)),
+        'user': os.getenv('SINGLESTORE_TEST_USER', 'root'),
+        'password': os.getenv('SINGLESTORE_TEST_PASSWORD', ''),
+        'charset': 'utf8mb4',
+        'cursorclass': pymysql.cursors.DictCursor,
+        'autocommit': True,
+    }
+    pool = pymysql_pool(config, max_size=4, check_after=0)
+
+    def query(_):
+        with pool.connection() as conn:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT CONNECTION_ID() AS cid")
+                return cursor.fetchone()['cid']
+    with ThreadPoolExecutor(4) as ex:
+        ids = set(ex.map(query, range(50)))
+    assert len(ids) <= 4
+    assert pool.stats()['reused'] >= 46
+    close_all_pools()
+
+
+if __name__ == '__main__':
+    for name, fn in list(globals().items()):
+        if name.startswith('test_') and callable(fn):
+            fn()
+            print(f"✅ {name}")
@@ -0,0 +1,72 @@
+# test_singlestore_profile.py
+"""
+Checks for singlestore_profile.QueryProfiler against a sqlite3 stand-in,
+with both log formats.
+"""
+import json
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+from singlestore_pool import ConnectionPool
+from singlestore_profile import QueryProfiler, open_log, summarize
+
+
+def sqlite_pool():
+    conn = sqlite3.connect(':memory:', check_same_thread=False)
+    conn.execute("CREATE TABLE t (id INTEGER, name TEXT)")
+    conn.executemany("INSERT INTO t VALUES (?, ?)", [(i, f"name{i}") for i in range(100)])
+    return ConnectionPool(lambda: conn, max_size=1)
+
+
+def run(profiler, pool, sql, params=None):
+    with pool.connection() as conn:
+        with profiler.track(sql, params) as q:
+            rows = conn.execute(sql, params or ()).fetchall()
+            q.done(rows)
+    return rows
+
+
+@pytest.mark.parametrize('suffix', ['.db', '.jsonl'])
+def test_records_and_summarizes(suffix):
+    fd, path = tempfile.mkstemp(suffix=suffix)
+    os.close(fd)
+    os.remove(path)
+    pool = sqlite_pool()
+    profiler = QueryProfiler(pool, log_path=path, threshold=0.0, enabled=True,
+                             explain_prefix='EXPLAIN QUERY PLAN')
+    for i in range(3):
+        run(profiler, pool, "SELECT * FROM t WHERE id < ?", (10 * (i + 1),))
+    run(profiler, pool, "select *   from t where id < ?", (5,))      # same fingerprint
+    run(profiler, pool, "SELECT COUNT(*) FROM t")
+    with pytest.raises(sqlite3.OperationalError):
+        run(profiler, pool, "SELECT * FROM missing")
+    profiler.flush()
+
+    entries = list(open_log(path).read())
+    assert len(entries) == 6
+    top = summarize(entries, by='count')
+    assert top[0]['count'] == 4 and top[0]['params'] == 4
+    assert top[0]['rows'] == 10 + 20 + 30 + 5
+    assert top[0]['bytes'] > 0
+    assert sum(g['errors'] for g in top) == 1
+
+    # EXPLAIN captured once per slow fingerprint, not for errors
+    plans = [e for e in entries if e['plan']]
+    assert len(plans) == 2
+    assert json.loads(plans[0]['plan'])
+    pool.close()
+    os.remove(path)
+
+
+def test_disabled_records_nothing():
+    fd, path = tempfile.mkstemp(suffix='.jsonl')
+    os.close(fd)
+    os.remove(path)
+    pool = sqlite_pool()
+    profiler = QueryProfiler(pool, log_path=path, enabled=False)
+    assert len(run(profiler, pool, "SELECT * FROM t")) == 100
+    assert not os.path.exists(path)
+    pool.close()
@@ -0,0 +1,141 @@
+"""
+bench_canvas_drag.py  —  frame times of DiagramApp while dragging
+==================================================================
+Opens the real app (needs a display; Xvfb is fine) on a synthetic diagram
+of --boxes boxes and 1.5× as many arrows, then feeds it synthetic mouse
+events straight into the handlers:
+
+  drag one    press on a box, --frames B1-Motion events
+  drag many   the same with 100 boxes selected (group move)
+  band        rubber-band selection growing over the diagram
+  click       clicks at random points (box / arrow hit-tests, selection)
+  pan         middle-button pan
+  zoom        mouse-wheel zoom steps (the sharp redraw after it is timed too)
+
+A frame is the handler plus update_idletasks(), i.e. until Tk has redrawn
+the canvas.  Every scenario runs twice: retained (the normal path, only
+objects in the viewport drawn) and with the scene invalidated before each
+frame — the old delete("all") and rebuild on every event.
+
+Run:   python bench_canvas_drag.py
+       python bench_canvas_drag.py --boxes 2000 --frames 100
+"""
+
+import argparse, random, statistics, sys, time
+import tkinter as tk
+
+import diagram_tool
+from diagram_tool import Arrow, Box, DiagramApp
+
+
+class Event:
+    def __init__(self, x, y, state=0, delta=0):
+        self.x, self.y, self.state, self.delta = x, y, state, delta
+
+
+def build(app, n, seed=5):
+    rng = random.Random(seed)
+    shapes = ["rect", "roundrect", "circle", "diamond", "note", "cylinder"]
+    app.boxes = [Box(60 + (i % 40) * 200, 60 + (i // 40) * 120, 160, 70, f"Class{i}\n+run()",
+                     rng.choice(list(diagram_tool.BOX_COLORS)), rng.choice(shapes))
+                 for i in range(n)]
+    ids = [b.id for b in app.boxes]
+    app.arrows = [Arrow(rng.choice(ids), rng.choice(ids), rng.choice(["", "uses"]),
+                        rng.choice(["solid", "dashed"]), rng.choice(["open", "filled", "inheritance"]))
+                  for _ in range(n * 3 // 2)]
+    app.selected = None; app.selected_items = set()
+    app.offset_x = app.offset_y = 40; app.zoom = 1.0
+    app._invalidate(); app._draw_all(); app.root.update()
+
+
+def frames(app, events, full):
+    """Milliseconds per (handler, event) until the canvas is redrawn."""
+    out = []
+    for handler, ev in events:
+        t0 = time.perf_counter()
+        if full:
+            app._invalidate()
+        handler(ev)
+        app.root.update_idletasks()
+        out.append((time.perf_counter() - t0) * 1e3)
+    return out
+
+
+def at(app, box):
+    return app._to_canvas(box.x + box.w / 2, box.y + box.h / 2)
+
+
+def scenarios(app, n_frames):
+    def drag_one():
+        x, y = at(app, app.boxes[len(app.boxes) // 2])
+        app._on_click(Event(x, y))
+        return [(app._on_drag, Event(x + 3 * k, y + k)) for k in range(1, n_frames + 1)]
+
+    def drag_many():
+        app.selected_items = {b.id for b in app.boxes[:100]}
+        x, y = at(app, app.boxes[0])
+        app._on_click(Event(x, y))          # on a selected box: keeps the selection
+        return [(app._on_drag, Event(x + 3 * k, y + k)) for k in range(1, n_frames + 1)]
+
+    def band():
+        app._on_click(Event(5, 5))          # empty corner: starts the band
+        return [(app._on_drag, Event(5 + 12 * k, 5 + 7 * k)) for k in range(1, n_frames + 1)]
+
+    def click():
+        rng = random.Random(n_frames)
+        return [(app._on_click, Event(rng.uniform(0, 1400), rng.uniform(0, 900)))
+                for _ in range(n_frames)]
+
+    def pan():
+        app._on_pan_start(Event(400, 300))
+        return [(app._on_pan, Event(400 - 4 * k, 300 - 2 * k)) for k in range(1, n_frames + 1)]
+
+    def zoom():
+        return [(app._on_mousewheel, Event(500, 350, delta=120 if k % 20 < 10 else -120))
+                for k in range(n_frames)]
+
+    return [("drag one", drag_one), ("drag many", drag_many), ("band", band),
+            ("click", click), ("pan", pan), ("zoom", zoom)]
+
+
+def main():
+    ap = argparse.ArgumentParser(description="DiagramApp frame times while dragging")
+    ap.add_argument("--boxes", type=int, default=1000)
+    ap.add_argument("--frames", type=int, default=60)
+    args = ap.parse_args()
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        sys.exit(f"needs a display ({e}); try: xvfb-run python bench_canvas_drag.py")
+    root.geometry("1400x900")
+    app = DiagramApp(root)
+    app.minimap_enabled.set(True)
+    root.update()
+
+    print(f"DiagramApp — {args.boxes:,} boxes, {args.boxes * 3 // 2:,} arrows, "
+          f"{args.frames} frames per run (ms per frame)")
+    print("=" * 74)
+    print(f"  {'SCENARIO':<11} {'RETAINED':>9} {'p95':>8} {'REBUILD':>10} {'p95':>8} {'SPEEDUP':>9}")
+    print("-" * 74)
+    for name, setup in scenarios(app, args.frames):
+        runs = {}
+        for full in (False, True):
+            build(app, args.boxes)
+            ms = frames(app, setup(), full)
+            app._on_release(Event(0, 0))
+            if app._zoom_job:                 # the settle redraw belongs to the gesture
+                root.after_cancel(app._zoom_job)
+                t0 = time.perf_counter()
+                app._settle_zoom(); root.update_idletasks()
+                ms.append((time.perf_counter() - t0) * 1e3)
+            runs[full] = ms
+        r, f = runs[False], runs[True]
+        p95 = lambda v: sorted(v)[int(len(v) * 0.95) - 1]
+        print(f"  {name:<11} {statistics.mean(r):>9.2f} {p95(r):>8.2f} "
+              f"{statistics.mean(f):>10.2f} {p95(f):>8.2f} {statistics.mean(f) / statistics.mean(r):>8.1f}×")
+    print("=" * 74)
+    root.destroy()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+bench_code_analyzer.py  —  cold / warm timings for code_analyzer.analyze
+=========================================================================
+Generates a synthetic Python (or Java) tree of --files modules, a few
+classes each with typed fields, constructors and imports between them,
+then times:
+
+  serial      workers=1, no cache          (the old one-file-at-a-time path)
+  cold        process pool, empty cache
+  warm        process pool, nothing changed (every fragment from cache)
+  touched     --touch files re-saved unchanged (hash check, no re-parse)
+  edited      --touch files really edited (only those re-parsed)
+
+Run:   python bench_code_analyzer.py --files 10000
+       python bench_code_analyzer.py --lang java --workers 8
+"""
+
+import argparse, os, shutil, tempfile, time
+
+import code_analyzer
+
+
+def _py_module(i: int, n: int) -> str:
+    dep = (i * 7 + 3) % n
+    return (f"from pkg{dep % 50}.mod{dep} import Model{dep}\n"
+            f"import os, json\n\n"
+            f"class Model{i}(Model{dep}):\n"
+            f"    owner: Model{dep}\n"
+            f"    items: List[Part{i}]\n\n"
+            f"    def __init__(self, repo: Model{dep}, name: str):\n"
+            f"        self.repo = repo\n"
+            f"        self.name = name\n\n"
+            f"    def run(self, other: Part{i}) -> int:\n"
+            f"        return len(json.dumps({{'k': os.sep}}))\n\n"
+            f"class Part{i}:\n"
+            f"    weight: float\n\n"
+            f"    def size(self) -> int:\n"
+            f"        return {i}\n")
+
+
+def _java_module(i: int, n: int) -> str:
+    dep = (i * 7 + 3) % n
+    return (f"package pkg{i % 50};\n\nimport java.util.List;\nimport pkg{dep % 50}.Model{dep};\n\n"
+            f"public class Model{i} extends Model{dep} {{\n"
+            f"    private Model{dep} owner;\n"
+            f"    private List<Part{i}> items;\n\n"
+            f"    public Model{i}(Model{dep} repo, String name) {{ this.owner = repo; }}\n\n"
+            f"    public int run(Part{i} other) {{ return {i}; }}\n"
+            f"}}\n")
+
+
+def generate(root: str, n: int, lang: str) -> list:
+    paths = []
+    for i in range(n):
+        d = os.path.join(root, f"pkg{i % 50}")
+        os.makedirs(d, exist_ok=True)
+        if lang == "py":
+            path = os.path.join(d, f"mod{i}.py")
+            text = _py_module(i, n)
+        else:
+            path = os.path.join(d, f"Model{i}.java")
+            text = _java_module(i, n)
+        with open(path, "w") as f:
+            f.write(text)
+        paths.append(path)
+    return paths
+
+
+def run(label: str, root: str, lang: str, **kw):
+    """analyze() in its two stages, so the extract stage and its cache hits show."""
+    stats = {}
+    t0 = time.perf_counter()
+    files = code_analyzer._source_files(root, "." + lang)
+    frags = code_analyzer.extract_files(files, lang, stats=stats, **kw)
+    t1 = time.perf_counter()
+    analyzer = code_analyzer._EXTRACTORS[lang]()
+    for frag in frags:
+        analyzer._merge(frag)
+    diagram = analyzer._build_diagram()
+    t2 = time.perf_counter()
+    print(f"  {label:<9} {t1 - t0:>9.2f} {t2 - t1:>9.2f} {t2 - t0:>9.2f}"
+          f" {stats['parsed']:>9,} {stats['cached']:>9,}")
+    return diagram
+
+
+def main():
+    ap = argparse.ArgumentParser(description="code_analyzer cold/warm benchmark")
+    ap.add_argument("--files", type=int, default=10_000)
+    ap.add_argument("--lang", choices=["py", "java"], default="py")
+    ap.add_argument("--workers", type=int, default=None)
+    ap.add_argument("--touch", type=int, default=100)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_analyzer_")
+    root = os.path.join(tmp, "src")
+    code_analyzer.ANALYSIS_CACHE = os.path.join(tmp, "cache.db")
+    try:
+        paths = generate(root, args.files, args.lang)
+        print(f"code_analyzer — {args.files:,} .{args.lang} files, "
+              f"workers={args.workers or os.cpu_count()}")
+        print("=" * 60)
+        print(f"  {'RUN':<9} {'EXTRACT':>9} {'BUILD':>9} {'TOTAL':>9} {'PARSED':>9} {'CACHED':>9}")
+        print("-" * 60)
+        base = run("serial", root, args.lang, workers=1, cache=False)
+        cold = run("cold", root, args.lang, workers=args.workers)
+        warm = run("warm", root, args.lang, workers=args.workers)
+
+        later = time.time() + 5
+        for p in paths[:args.touch]:
+            os.utime(p, (later, later))
+        run("touched", root, args.lang, workers=args.workers)
+
+        for p in paths[:args.touch]:
+            with open(p, "a") as f:
+                f.write("\n# edited\n" if args.lang == "py" else "\n// edited\n")
+        edited = run("edited", root, args.lang, workers=args.workers)
+        print("=" * 60)
+        assert base == cold == warm == edited, "parallel / cached result differs from serial"
+        print(f"  identical diagrams: {len(base['boxes']):,} boxes, {len(base['arrows']):,} arrows")
+    finally:
+        shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,164 @@
+"""
+bench_dsl_editor.py  —  keystroke latency of the Text-to-Diagram editor
+=======================================================================
+Generates a DSL of --lines lines (node declarations, labelled edges,
+comments) and replays keystrokes on it:
+
+  name        a character typed into a node's name (the node is renamed)
+  label       a character typed into an edge label
+  comment     a character typed into a comment
+  new edge    a new "A -> B" line between existing nodes
+  delete      a character deleted from an edge
+
+parse + layout (no display needed): DslDocument.update() and the node
+placement of DslPreview, against the old path — the whole text re-parsed
+and the layered layout re-run on every keystroke.
+
+keystroke → render (needs a display; Xvfb is fine): a real Text and
+Canvas, timed from the edit until Tk has redrawn — DslPreview.refresh()
+against refresh(full=True), the old re-parse, re-layout, delete("all")
+redraw and whole-editor re-highlight.  The debounce delay is not counted.
+
+Run:   python bench_dsl_editor.py
+       python bench_dsl_editor.py --lines 5000 --keys 40
+"""
+
+import argparse, random, statistics, time
+import tkinter as tk
+
+from diagram_tool import DslDocument, DslPreview
+
+TYPES = ["Actor", "System", "Database", "Queue", "Cloud", "Service", "UI", "API"]
+COLORS = ["blue", "green", "purple", "teal", "orange", "red", "gray", "yellow", "pink"]
+
+
+def generate(n_lines: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    n_nodes = n_lines * 3 // 10
+    names = [f"{rng.choice(['Order', 'Billing', 'Auth', 'Search', 'Audit'])} "
+             f"{rng.choice(['Service', 'Store', 'Gateway', 'Worker'])} {i}" for i in range(n_nodes)]
+    lines = ["# generated for bench_dsl_editor.py", ""]
+    for i, nm in enumerate(names):
+        if i % 50 == 0:
+            lines.append(f"# -- group {i // 50} " + "-" * 40)
+        col = f" [color: {rng.choice(COLORS)}]" if rng.random() < 0.6 else ""
+        lines.append(f"{rng.choice(TYPES)}: {nm}{col}")
+    lines.append("")
+    while len(lines) < n_lines:
+        i = rng.randrange(n_nodes)
+        j = min(n_nodes - 1, i + rng.randint(1, 60))      # mostly "downstream"
+        op = rng.choice(["->", "->", "->", "-->", "<->"])
+        lbl = f" [label: call {rng.randrange(999)}]" if rng.random() < 0.7 else ""
+        lines.append(f"{names[i]} {op} {names[j]}{lbl}")
+    return lines
+
+
+def keystrokes(lines: list, n: int, seed: int = 11) -> list:
+    """[(kind, line_no, new_line_text or None to insert, inserted?)] applied in turn."""
+    rng = random.Random(seed)
+    decl = [i for i, l in enumerate(lines) if ":" in l and not l.startswith("#") and "->" not in l]
+    edges = [i for i, l in enumerate(lines) if "[label:" in l]
+    comments = [i for i, l in enumerate(lines) if l.startswith("#")]
+    out = []
+    for k in range(n):
+        kind = ["name", "label", "comment", "new edge", "delete"][k % 5]
+        if kind == "name":
+            i = rng.choice(decl); out.append((kind, i, lines[i].split(" [")[0] + "x", False))
+        elif kind == "label":
+            i = rng.choice(edges); out.append((kind, i, lines[i].replace("]", "x]", 1), False))
+        elif kind == "comment":
+            i = rng.choice(comments); out.append((kind, i, lines[i] + "x", False))
+        elif kind == "new edge":
+            a, b = rng.sample(decl, 2)
+            nm = lambda l: l.split(":", 1)[1].split(" [")[0].strip()
+            out.append((kind, len(lines) - 1, f"{nm(lines[a])} -> {nm(lines[b])}", True))
+        else:
+            i = rng.choice(edges); out.append((kind, i, lines[i][:-1], False))
+    return out
+
+
+def apply(lines: list, key) -> list:
+    _, i, text, insert = key
+    lines = list(lines)
+    if insert: lines.insert(i, text)
+    else: lines[i] = text
+    return lines
+
+
+def bench_model(lines: list, keys: list) -> dict:
+    """Per kind: (incremental ms, full ms) of parse + placement."""
+    pv = DslPreview(None, None)
+    pv.doc.update("\n".join(lines)); pv._place()
+    res = {}
+    cur = lines
+    for key in keys:
+        cur = apply(cur, key); text = "\n".join(cur)
+        t0 = time.perf_counter()
+        diff = pv.doc.update(text)
+        if diff and diff[2]: pv._place()
+        t1 = time.perf_counter()
+        full = DslPreview(None, None); full.doc.update(text); full._place()
+        t2 = time.perf_counter()
+        res.setdefault(key[0], []).append(((t1 - t0) * 1e3, (t2 - t1) * 1e3))
+    return res
+
+
+def bench_tk(lines: list, keys: list) -> dict:
+    try:
+        root = tk.Tk()
+    except tk.TclError as e:
+        print(f"\n  keystroke → render skipped: needs a display ({e});"
+              f" try: xvfb-run python bench_dsl_editor.py")
+        return None
+    root.geometry("1400x800")
+    editor = tk.Text(root, width=60); editor.pack(side="left", fill="y")
+    canvas = tk.Canvas(root, bg="#1e1e2e"); canvas.pack(side="left", fill="both", expand=True)
+    for tag, fg in (("comment", "#555577"), ("type_kw", "#3aaaa0"),
+                    ("arrow", "#cc7744"), ("bracket", "#a89ee8")):
+        editor.tag_configure(tag, foreground=fg)
+    res = {}
+    for full in (False, True):
+        editor.delete("1.0", "end"); editor.insert("1.0", "\n".join(lines))
+        pv = DslPreview(editor, canvas); pv.refresh(full=True); root.update()
+        for key in keys:
+            kind, i, text, insert = key
+            t0 = time.perf_counter()
+            if insert: editor.insert(f"{i + 1}.0", text + "\n")
+            else: editor.delete(f"{i + 1}.0", f"{i + 1}.end"); editor.insert(f"{i + 1}.0", text)
+            pv.refresh(full=full); root.update_idletasks()
+            res.setdefault(kind, {}).setdefault(full, []).append((time.perf_counter() - t0) * 1e3)
+    root.destroy()
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Text-to-Diagram keystroke latency")
+    ap.add_argument("--lines", type=int, default=5000)
+    ap.add_argument("--keys", type=int, default=40)
+    args = ap.parse_args()
+    lines = generate(args.lines)
+    keys = keystrokes(lines, args.keys)
+    doc = DslDocument(); doc.update("\n".join(lines))
+    print(f"Text-to-Diagram — {len(lines):,} lines, {len(doc.nodes):,} nodes, "
+          f"{len(doc.edges):,} edges, {args.keys} keystrokes (ms per keystroke)")
+
+    print("=" * 66)
+    print(f"  parse + layout   {'KIND':<10} {'INCREMENTAL':>12} {'FULL':>10} {'SPEEDUP':>9}")
+    print("-" * 66)
+    for kind, runs in bench_model(lines, keys).items():
+        inc = statistics.mean(r[0] for r in runs); full = statistics.mean(r[1] for r in runs)
+        print(f"  {'':<16} {kind:<10} {inc:>12.2f} {full:>10.1f} {full / inc:>8.0f}×")
+
+    tk_res = bench_tk(lines, keys)
+    if tk_res:
+        print("-" * 66)
+        print(f"  key → render     {'KIND':<10} {'INCREMENTAL':>12} {'FULL':>10} {'SPEEDUP':>9}")
+        print("-" * 66)
+        for kind, runs in tk_res.items():
+            inc, full = statistics.mean(runs[False]), statistics.mean(runs[True])
+            print(f"  {'':<16} {kind:<10} {inc:>12.2f} {full:>10.1f} {full / inc:>8.0f}×")
+    print("=" * 66)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+bench_hierarchy.py  —  opening a large analysis flat vs as package groups
+=========================================================================
+Generates the synthetic tree of bench_code_analyzer.py (--files modules,
+two classes each) and compares what the canvas is handed and what it
+costs to get there:
+
+  flat      analyze() with the class layout — every class a box
+  grouped   analyze(layout=False), DiagramTree, initial_cut(HIER_BUDGET),
+            view() and layout() of the cut only — what Analyse Code opens
+
+"render" is diagram_render.render_svg of the result, a display-free
+stand-in for drawing every item once.  Then the biggest group is opened
+and closed again, as a double-click / right-click on the canvas does.
+The analysis cache is warm in both, so extraction costs the same.
+
+Run:   python bench_hierarchy.py
+       python bench_hierarchy.py --files 5000 --budget 300
+"""
+
+import argparse, os, shutil, tempfile, time
+
+import code_analyzer
+import diagram_render
+from bench_code_analyzer import generate
+
+
+def timed(fn, *args, **kw):
+    t0 = time.perf_counter()
+    out = fn(*args, **kw)
+    return out, (time.perf_counter() - t0) * 1e3
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Flat vs grouped opening of a large analysis")
+    ap.add_argument("--files", type=int, default=3000)
+    ap.add_argument("--budget", type=int, default=200, help="boxes shown at first (HIER_BUDGET)")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_hierarchy_")
+    root = os.path.join(tmp, "src")
+    code_analyzer.ANALYSIS_CACHE = os.path.join(tmp, "cache.db")
+    try:
+        generate(root, args.files, "py")
+        code_analyzer.analyze(root, layout=False)            # fill the cache
+
+        flat, t_an = timed(code_analyzer.analyze, root)
+        _, t_svg = timed(diagram_render.render_svg, flat)
+        rows = [("flat", len(flat["boxes"]), len(flat["arrows"]), t_an, 0.0, t_svg)]
+
+        data, t_an = timed(code_analyzer.analyze, root, layout=False)
+        t0 = time.perf_counter()
+        tree = code_analyzer.DiagramTree(data, "module")
+        cut = tree.initial_cut(args.budget)
+        view = tree.view(cut)
+        pos = tree.layout(view)
+        for b in view["boxes"]:
+            b["x"], b["y"] = pos[b["key"]]
+        t_tree = (time.perf_counter() - t0) * 1e3
+        _, t_svg = timed(diagram_render.render_svg, view)
+        rows.append(("grouped", len(view["boxes"]), len(view["arrows"]), t_an, t_tree, t_svg))
+
+        print(f"DiagramTree — {args.files:,} .py files, {len(tree.boxes):,} classes, "
+              f"{len(tree.children) - 1:,} groups, budget {args.budget} (ms)")
+        print("=" * 74)
+        print(f"  {'OPEN':<9} {'BOXES':>7} {'ARROWS':>8} {'ANALYZE':>9} {'TREE+VIEW':>10} "
+              f"{'RENDER':>8} {'TOTAL':>8}")
+        print("-" * 74)
+        for name, nb, na, a, t, s in rows:
+            print(f"  {name:<9} {nb:>7,} {na:>8,} {a:>9.0f} {t:>10.0f} {s:>8.0f} {a + t + s:>8.0f}")
+        print("-" * 74)
+
+        g = max((n for n in cut if tree.is_group(n)), key=tree.size.get, default=None)
+        if g is None:
+            print("  everything fits the budget: no group to open")
+        else:
+            opened, t_open = timed(lambda: tree.view(tree.expand(cut, g)))
+            _, t_lay = timed(tree.layout, opened, tree.children[g])
+            closed, t_close = timed(lambda: tree.view(tree.collapse(tree.expand(cut, g), g)))
+            assert {b["key"] for b in closed["boxes"]} == {b["key"] for b in view["boxes"]}
+            print(f"  open {tree.name(g)} ({len(tree.children[g])} children): view {t_open:.0f}, "
+                  f"layout {t_lay:.0f} → {len(opened['boxes'])} boxes; close: view {t_close:.0f}")
+        print("=" * 74)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+bench_java_lexer.py  —  correctness checks + throughput for the Java lexer
+==========================================================================
+Checks (always run first; any failure aborts):
+  • demo_java/ECommerceSystem.java  — every type, its kind, bases, fields,
+    constructors; no method locals mistaken for fields
+  • demo_spring_clean               — Spring stereotypes, JPA relations,
+    constructor injection, @Bean methods, endpoints
+  • edge cases — braces / quotes inside strings, text blocks, char literals
+    and comments; nested + inner classes; generics with wildcards and >>;
+    annotations with arguments; enums with bodies; records
+
+Throughput (MB/s) of java_tokens(), parse_java() and JavaAnalyzer._extract()
+on a generated source, at growing nesting depth: the rate should stay flat
+(linear time) where the old brace scan grew quadratically.
+
+Run:   python bench_java_lexer.py
+       python bench_java_lexer.py --mb 20
+"""
+
+import argparse, time
+from pathlib import Path
+
+from code_analyzer import JavaAnalyzer, java_tokens, parse_java
+
+HERE = Path(__file__).resolve().parent
+
+
+# ── Correctness ─────────────────────────────────────────────────────────────
+
+def check_ecommerce():
+    src = (HERE / "demo_java" / "ECommerceSystem.java").read_text(encoding="utf-8")
+    unit = parse_java(src)
+    types = {t["name"]: t for t in unit["types"]}
+    assert unit["package"] == "com.demo.ecommerce"
+    assert ("java.util.*", False) in unit["imports"]
+    assert len(types) == 36, sorted(types)
+    assert types["OrderStatus"]["kind"] == "enum"
+    assert types["Repository"]["kind"] == "interface"
+    assert types["Seller"]["extends"] == ["User"]
+    assert types["ProductRepository"]["extends"] == ["Repository<Product, Long>"]
+    assert [f["name"] for f in types["Order"]["fields"]][:3] == ["id", "customer", "items"]
+    assert types["Category"]["fields"][-1]["type"] == "List<Product>"
+    assert [f["name"] for f in types["ECommerceApplication"]["fields"]] == []   # locals of main()
+    assert len(types["OrderService"]["ctors"]) == 1
+    assert len(types["OrderService"]["ctors"][0]["params"]) == 6
+
+    classes = JavaAnalyzer()._extract(src, Path("ECommerceSystem.java"))["classes"]
+    assert classes["BaseJpaRepository"]["kind"] == "abstract"
+    rels = set(classes["OrderService"]["relations"])
+    assert ("injects", "PaymentGateway", "«inject»") in rels
+    assert not any(t.endswith(">") for r in classes.values() for _, t, _ in r["relations"])
+    assert ("aggregates", "OrderItem", "0..*") in set(classes["Order"]["relations"])
+
+
+def check_spring():
+    import diagram_tool                       # tkinter import only, no window
+    sa = diagram_tool.SpringAnalyzer()
+    sa.analyze(str(HERE / "demo_spring_clean"))
+    c = sa.classes
+    assert len(c) == 29, sorted(c)
+    assert c["JwtAuthFilter"]["stereo"] == "security"           # extends OncePerRequestFilter
+    assert ("aggregates", "Review", "@OneToMany") in c["Product"]["relations"]
+    assert ("inherits", "JpaRepository", "") in c["ProductRepository"]["relations"]
+    assert "KafkaTemplate" in c["AppConfig"]["beans"]
+    stereo = {s for s in (i["stereo"] for i in c.values())}
+    assert {"controller", "service", "repository", "entity", "config"} <= stereo
+    assert any(i["endpoints"] for i in c.values() if i["stereo"] == "controller")
+    assert any(r[0] == "injects" for i in c.values() if i["stereo"] == "service"
+               for r in i["relations"])
+    assert {"kafka", "redis", "jpa"} <= set(sa.infra_nodes)
+
+
+EDGE = r'''
+package edge;
+import static java.util.Map.entry;
+/* class Fake { } */
+@Service("a{b}")
+public final class Outer<T extends Comparable<? super T>> extends Base<Map<String, List<T>>>
+        implements Api, Other<T> {
+    // } stray brace in a comment
+    private static final String S = "}{\"";
+    private static final char C = '}';
+    private static final String TB = """
+        class NotAClass { }
+        """;
+    @Autowired private Map<String, List<Item>> byName = new HashMap<String, List<Item>>(), spare;
+    int[] grid[], n = 3;
+    private Runnable r = () -> { if (n > 1) { } };
+    Outer(Repo repo, List<? extends Item>... items) { this.r = null; }
+    @GetMapping("/x") public <R> R get(@PathVariable("id") Long id) throws Exception { return null; }
+    static { new Object() { class Local { } }; }
+    class Inner { private Item item; void go() { } }
+    static class Nested implements Api { Nested(Outer<?> o) { } }
+    enum Mode { A("}"), B { void f() { } }; private String v; }
+    record Point(int x, @Nullable Item y) implements Api { Point { } }
+    @interface Tag { String value() default "{"; }
+}
+'''
+
+
+def check_edge_cases():
+    unit = parse_java(EDGE)
+    types = {t["name"]: t for t in unit["types"]}
+    assert list(types) == ["Outer", "Inner", "Nested", "Mode", "Point", "Tag"], list(types)
+    outer = types["Outer"]
+    assert outer["extends"] == ["Base<Map<String, List<T>>>"]
+    assert outer["implements"] == ["Api", "Other<T>"]
+    assert outer["annotations"] == [("Service", '@Service("a{b}")')]
+    assert [(f["name"], f["type"]) for f in outer["fields"]] == [
+        ("S", "String"), ("C", "char"), ("TB", "String"),
+        ("byName", "Map<String, List<Item>>"), ("spare", "Map<String, List<Item>>"),
+        ("grid", "int[][]"), ("n", "int[]"), ("r", "Runnable")]
+    assert outer["fields"][3]["annotations"][0][0] == "Autowired"
+    assert outer["ctors"][0]["params"] == [("repo", "Repo", []),
+                                           ("items", "List<? extends Item>...", [])]
+    get = outer["methods"][0]
+    assert (get["name"], get["ret"], get["params"]) == ("get", "R", [("id", "Long", ["PathVariable"])])
+    assert types["Inner"]["outer"] == "Outer" and types["Inner"]["fields"][0]["type"] == "Item"
+    assert types["Nested"]["implements"] == ["Api"] and len(types["Nested"]["ctors"]) == 1
+    assert [f["name"] for f in types["Mode"]["fields"]] == ["v"]
+    assert [f["name"] for f in types["Point"]["fields"]] == ["x", "y"]
+    assert types["Tag"]["kind"] == "@interface" and types["Tag"]["methods"][0]["name"] == "value"
+    assert ("str", '"}{\\""') in [t[:2] for t in java_tokens(EDGE)]
+
+
+# ── Throughput ──────────────────────────────────────────────────────────────
+
+def generate(target_bytes: int, depth: int) -> str:
+    """Files' worth of classes, each nesting `depth` inner classes."""
+    demo = (HERE / "demo_java" / "ECommerceSystem.java").read_text(encoding="utf-8")
+    demo = demo.split("package", 1)[1].split(";", 1)[1]          # drop the package line
+    parts, size, k = ["package bench;\nimport java.util.*;\n"], 0, 0
+    while size < target_bytes:
+        k += 1
+        nest = "".join(f"class In{k}_{d} {{ private List<Item> items{d}; "
+                       f"String s{d} = \"{{ }}\"; void m{d}(Item it) {{ if (it != null) {{ }} }}\n"
+                       for d in range(depth)) + "}" * depth
+        chunk = demo.replace("class ", f"class B{k}_").replace("interface ", f"interface B{k}_")
+        chunk += f"\nclass Deep{k} {{ {nest} }}\n"
+        parts.append(chunk)
+        size += len(chunk)
+    return "".join(parts)
+
+
+def rate(fn, src: str, repeat: int = 3) -> float:
+    best = min(_timed(fn, src) for _ in range(repeat))
+    return len(src.encode()) / best / 1e6
+
+
+def _timed(fn, src):
+    t0 = time.perf_counter()
+    fn(src)
+    return time.perf_counter() - t0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Java lexer checks + throughput")
+    ap.add_argument("--mb", type=float, default=5.0, help="generated source size")
+    args = ap.parse_args()
+
+    for check in (check_ecommerce, check_spring, check_edge_cases):
+        check()
+        print(f"  ✔ {check.__name__}")
+
+    extract = lambda s: JavaAnalyzer()._extract(s, Path("Bench.java"))
+    print(f"\nJava lexer throughput — {args.mb:g} MB generated source")
+    print("=" * 62)
+    print(f"  {'NESTING':<9} {'TOKENS':>12} {'TOKENIZE':>10} {'PARSE':>10} {'ANALYSE':>10}")
+    print("-" * 62)
+    for depth in (1, 8, 32, 128):
+        src = generate(int(args.mb * 1e6), depth)
+        n = len(java_tokens(src))
+        print(f"  {depth:<9} {n:>12,} {rate(java_tokens, src):>8.1f}MB/s "
+              f"{rate(parse_java, src):>6.1f}MB/s {rate(extract, src, 1):>6.1f}MB/s")
+    print("=" * 62)
+
+
+if __name__ == "__main__":
+    main()
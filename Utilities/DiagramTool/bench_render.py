@@ -0,0 +1,115 @@
+"""
+bench_render.py  —  throughput of the headless renderer
+=======================================================
+Writes --diagrams inputs into a temporary directory — generated
+Text-to-Diagram .dsl files of 20–80 nodes and, every fourth, the
+code_analyzer diagram of demo_python / demo_java saved as .json — and
+renders the directory with diagram_render.render_dir:
+
+  diagrams / s   SVG, PNG and both, in-process (-j 1) and on all CPUs
+
+then one large diagram (--nodes DSL nodes) at several PNG scales, ms per
+render.  No display is needed; PNG needs Pillow.
+
+Run:   python bench_render.py
+       python bench_render.py --diagrams 400 --nodes 1000
+"""
+
+import argparse, json, os, random, shutil, tempfile, time
+from pathlib import Path
+
+import code_analyzer
+import diagram_render
+
+TYPES = ["Actor", "System", "Database", "Queue", "Cloud", "Service", "UI", "API"]
+COLORS = ["blue", "green", "purple", "teal", "orange", "red", "gray", "yellow", "pink"]
+
+
+def generate_dsl(n_nodes: int, seed: int) -> str:
+    rng = random.Random(seed)
+    names = [f"{rng.choice(['Order', 'Billing', 'Auth', 'Search'])} {rng.choice(['Service', 'Store', 'Worker'])} {i}"
+             for i in range(n_nodes)]
+    lines = [f"# generated for bench_render.py ({n_nodes} nodes)"]
+    for nm in names:
+        col = f" [color: {rng.choice(COLORS)}]" if rng.random() < 0.5 else ""
+        lines.append(f"{rng.choice(TYPES)}: {nm}{col}")
+    for i in range(int(n_nodes * 1.4)):
+        a = rng.randrange(n_nodes)
+        b = min(n_nodes - 1, a + rng.randint(1, 12))
+        if a == b:
+            continue
+        lbl = f" [label: call {i}]" if rng.random() < 0.6 else ""
+        lines.append(f"{names[a]} {rng.choice(['->', '->', '-->'])} {names[b]}{lbl}")
+    return "\n".join(lines)
+
+
+def make_inputs(folder: Path, n: int) -> None:
+    here = Path(__file__).parent
+    analyses = [code_analyzer.analyze(str(here / d), cache=False)
+                for d in ("demo_python", "demo_java") if (here / d).is_dir()]
+    for i in range(n):
+        if analyses and i % 4 == 3:
+            (folder / f"analysis_{i:04d}.json").write_text(json.dumps(analyses[i % len(analyses)]))
+        else:
+            (folder / f"diagram_{i:04d}.dsl").write_text(generate_dsl(random.Random(i).randint(20, 80), i))
+
+
+def throughput(folder: Path, out: Path, formats: tuple, jobs: int) -> float:
+    shutil.rmtree(out, ignore_errors=True)
+    t0 = time.perf_counter()
+    results = diagram_render.render_dir([str(folder)], str(out), formats, 1.0, jobs)
+    dt = time.perf_counter() - t0
+    failed = [r for r in results if r[2]]
+    if failed:
+        raise SystemExit(f"{len(failed)} failed, e.g. {failed[0][0]}: {failed[0][2]}")
+    return len(results) / dt
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Headless renderer throughput")
+    ap.add_argument("--diagrams", type=int, default=100)
+    ap.add_argument("--nodes", type=int, default=500, help="nodes of the single large diagram")
+    args = ap.parse_args()
+    try:
+        import PIL  # noqa: F401
+        png = True
+    except ImportError:
+        png = False
+        print("Pillow not installed: PNG runs skipped  (pip install Pillow)")
+    cpus = os.cpu_count() or 1
+
+    tmp = Path(tempfile.mkdtemp(prefix="bench_render_"))
+    try:
+        src = tmp / "in"; src.mkdir()
+        make_inputs(src, args.diagrams)
+        print(f"diagram_render — {args.diagrams} diagrams, {cpus} CPUs (diagrams / s)")
+        print("=" * 58)
+        print(f"  {'FORMAT':<10} {'-j 1':>10} {f'-j {cpus}':>10} {'SPEEDUP':>9}")
+        print("-" * 58)
+        for formats in (("svg",), ("png",), ("svg", "png")):
+            if "png" in formats and not png:
+                continue
+            one = throughput(src, tmp / "out", formats, 1)
+            many = throughput(src, tmp / "out", formats, cpus)
+            print(f"  {','.join(formats):<10} {one:>10.1f} {many:>10.1f} {many / one:>8.1f}×")
+
+        data = diagram_render.dsl_to_diagram(generate_dsl(args.nodes, 1))
+        print("-" * 58)
+        print(f"  one diagram: {len(data['boxes']):,} boxes, {len(data['arrows']):,} arrows (ms)")
+        t0 = time.perf_counter(); svg = diagram_render.render_svg(data)
+        print(f"  {'svg':<10} {(time.perf_counter() - t0) * 1e3:>10.0f}   {len(svg) / 1e6:.1f} MB")
+        if png:
+            from PIL import Image
+            for scale in (0.25, 0.5, 1.0):
+                dest = tmp / f"big_{scale}.png"
+                t0 = time.perf_counter(); diagram_render.render_png(data, str(dest), scale)
+                ms = (time.perf_counter() - t0) * 1e3
+                w, h = Image.open(dest).size
+                print(f"  {f'png {scale:g}×':<10} {ms:>10.0f}   {w:,} × {h:,} px")
+        print("=" * 58)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+bench_watch.py  —  edit-to-diagram latency of code_analyzer.ProjectWatcher
+==========================================================================
+Generates the synthetic tree of bench_code_analyzer.py (--files modules)
+and compares what one saved edit costs:
+
+  full         analyze() again — no cache, and with every other file cached
+  watch        ProjectWatcher: poll() until the edit is seen, then update()
+               (re-extract the edited file, merge, diff against the last
+               diagram; no layout) — events (watchdog) and polling
+
+plus the idle poll(), what the watch loop spends every WATCH_POLL_S when
+nothing changed.  Edits alternate: a field retyped, a class renamed, a
+file removed, a file added.  No display is needed.
+
+Run:   python bench_watch.py
+       python bench_watch.py --files 10000 --edits 20
+"""
+
+import argparse, os, shutil, statistics, tempfile, time
+
+import code_analyzer
+from bench_code_analyzer import generate
+
+
+def edit(root: str, paths: list, k: int) -> None:
+    """The k-th edit of the run; keeps `paths` (the live modules) current."""
+    p = paths[(k * 37) % len(paths)]
+    kind = k % 4
+    if kind == 0:
+        with open(p) as f: s = f.read()
+        with open(p, "w") as f: f.write(s.replace("weight: float", "weight: int", 1)
+                                        if "weight: float" in s else s.replace("weight: int", "weight: float", 1))
+    elif kind == 1:
+        with open(p) as f: s = f.read()
+        with open(p, "w") as f: f.write(s.replace("class Part", f"class Edited{k}Part", 1))
+    elif kind == 2:
+        os.remove(p); paths.remove(p)
+    else:
+        new = os.path.join(root, "pkg0", f"added{k}.py")
+        with open(new, "w") as f:
+            f.write(f"class Added{k}(Model{k}):\n    part: Part{k}\n")
+        paths.append(new)
+
+
+def watch_run(root: str, paths: list, n_edits: int, events: bool) -> dict:
+    w = code_analyzer.ProjectWatcher(root, cache=False, events=events)
+    res = {"mode": w.mode, "idle": [], "seen": [], "update": [], "diff": []}
+    try:
+        for _ in range(5):
+            t0 = time.perf_counter(); w.poll()
+            res["idle"].append((time.perf_counter() - t0) * 1e3)
+        for k in range(n_edits):
+            edit(root, paths, k)
+            t0 = time.perf_counter()
+            while True:
+                found = w.poll()
+                if found or time.perf_counter() - t0 > 5: break
+                time.sleep(0.001)
+            t1 = time.perf_counter()
+            if not found:
+                raise SystemExit(f"{w.mode}: edit {k} not seen after 5 s")
+            _, diff = w.update(*found)
+            t2 = time.perf_counter()
+            res["seen"].append((t1 - t0) * 1e3); res["update"].append((t2 - t1) * 1e3)
+            res["diff"].append(code_analyzer.diff_size(diff))
+            time.sleep(0.02)           # let events for this edit settle before the next
+            w.poll()
+        full = code_analyzer.analyze(root, cache=False)
+        assert code_analyzer.diff_size(code_analyzer.diagram_diff(w.data, full)) == 0, \
+            f"{w.mode}: watched diagram differs from a full analysis"
+    finally:
+        w.close()
+    return res
+
+
+def main():
+    ap = argparse.ArgumentParser(description="ProjectWatcher edit-to-diagram latency")
+    ap.add_argument("--files", type=int, default=2000)
+    ap.add_argument("--edits", type=int, default=12)
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_watch_")
+    root = os.path.join(tmp, "src")
+    code_analyzer.ANALYSIS_CACHE = os.path.join(tmp, "cache.db")
+    try:
+        paths = generate(root, args.files, "py")
+        t0 = time.perf_counter(); data = code_analyzer.analyze(root, cache=False)
+        cold = (time.perf_counter() - t0) * 1e3
+        code_analyzer.analyze(root)                     # fill the cache
+        edit(root, paths, 0)
+        t0 = time.perf_counter(); code_analyzer.analyze(root)
+        warm = (time.perf_counter() - t0) * 1e3
+
+        print(f"ProjectWatcher — {args.files:,} .py files, {len(data['boxes']):,} boxes, "
+              f"{len(data['arrows']):,} arrows, {args.edits} edits (ms)")
+        print("=" * 70)
+        print(f"  {'full analyze, no cache':<30} {cold:>10.0f}")
+        print(f"  {'full analyze, cached':<30} {warm:>10.0f}")
+        print("-" * 70)
+        print(f"  {'WATCH':<10} {'IDLE POLL':>10} {'SEEN':>10} {'UPDATE':>10} {'DIFF':>8} {'vs FULL':>10}")
+        print("-" * 70)
+        for events in (True, False):
+            r = watch_run(root, paths, args.edits, events)
+            upd = statistics.mean(r["update"]); seen = statistics.mean(r["seen"])
+            print(f"  {r['mode']:<10} {statistics.mean(r['idle']):>10.2f} {seen:>10.2f} {upd:>10.1f}"
+                  f" {statistics.mean(r['diff']):>8.1f} {warm / (seen + upd):>9.0f}×")
+        print("=" * 70)
+        print("  SEEN: edit saved until poll() reports it; UPDATE: re-extract + merge + diff")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
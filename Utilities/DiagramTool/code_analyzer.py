@@ -14,9 +14,14 @@ and extracts:
       - Dependency Injection (constructor/setter injection)  dashed + open arrow [DI]
 
 Returns a dict compatible with DiagramTool's deserialize format.
+
+Folders are extracted file-by-file on a process pool, and each file's
+result is cached on disk (DIAGRAMTOOL_CACHE), so re-analysing a large
+tree only re-parses the files that changed.
 """
 
-import os, re, ast
+import os, re, ast, heapq, hashlib, pickle, sqlite3, threading
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 
 # ── Colour mapping by role ───────────────────────────────────────────────────
@@ -26,6 +31,7 @@ COLOR_INTERFACE = "Teal"
 COLOR_ENUM      = "Orange"
 COLOR_EXTERNAL  = "Gray"    # stdlib / third-party libraries
 COLOR_UNKNOWN   = "Gray"
+EXTERNAL_GROUP  = "(libraries)"   # the box "group" of every library box
 
 # ── Arrow styles for each relationship ──────────────────────────────────────
 REL_STYLES = {
@@ -88,49 +94,52 @@ class PythonAnalyzer:
     def __init__(self):
         self.classes   = {}   # name -> ClassInfo dict
         self.imports   = {}   # alias -> (full_module, is_external)
+        self.groups    = {}   # name -> dotted module path (source_group)
         self.local_files = set()
 
     # ── Public entry ─────────────────────────────────────────────────────────
 
-    def analyze_path(self, path: str):
-        p = Path(path)
-        if p.is_file() and p.suffix == ".py":
-            self._analyze_file(p)
-        elif p.is_dir():
-            for f in sorted(p.rglob("*.py")):
-                self._analyze_file(f)
-        return self._build_diagram()
+    def analyze_path(self, path: str, workers: int = None, cache: bool = True,
+                     layout: bool = True):
+        _merge_path(self, path, "py", workers, cache)
+        return self._build_diagram(layout)
 
     # ── File level ───────────────────────────────────────────────────────────
 
     def _analyze_file(self, path: Path):
+        self._merge(self._extract(path.read_text(encoding="utf-8", errors="replace"), path))
+
+    def _merge(self, frag, group: str = ""):
+        if frag is None:            # syntax error: file skipped
+            return
+        self.local_files.add(frag["module"])
+        self.imports.update(frag["imports"])
+        self.classes.update(frag["classes"])
+        self.groups.update(dict.fromkeys(frag["classes"], group))
+
+    def _extract(self, src: str, path: Path):
+        """Imports and classes of one file, in a single AST walk (picklable)."""
         try:
-            src = path.read_text(encoding="utf-8", errors="replace")
             tree = ast.parse(src, filename=str(path))
         except SyntaxError:
-            return
+            return None
 
-        # Collect local module names (filename stems)
-        self.local_files.add(path.stem)
-
-        # Collect imports
+        imports, classes = {}, {}
         for node in ast.walk(tree):
             if isinstance(node, ast.Import):
                 for alias in node.names:
                     name = alias.asname or alias.name.split(".")[0]
                     ext  = _is_external_python(alias.name)
-                    self.imports[name] = (alias.name, ext)
+                    imports[name] = (alias.name, ext)
             elif isinstance(node, ast.ImportFrom):
                 mod = node.module or ""
                 ext = _is_external_python(mod)
                 for alias in node.names:
                     name = alias.asname or alias.name
-                    self.imports[name] = (f"{mod}.{alias.name}", ext)
-
-        # Collect classes
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                self._analyze_class(node, path.stem)
+                    imports[name] = (f"{mod}.{alias.name}", ext)
+            elif isinstance(node, ast.ClassDef):
+                classes[node.name] = self._analyze_class(node, path.stem)
+        return dict(module=path.stem, imports=imports, classes=classes)
 
     def _analyze_class(self, node: ast.ClassDef, module: str):
         info = {
@@ -172,7 +181,7 @@ class PythonAnalyzer:
                     info["fields"].append((fname, ftype))
                     self._classify_field_rel(fname, ftype, info)
 
-        self.classes[node.name] = info
+        return info
 
     def _analyze_method(self, node: ast.FunctionDef, info: dict):
         params = []
@@ -274,7 +283,11 @@ class PythonAnalyzer:
 
     # ── Build diagram dict ────────────────────────────────────────────────────
 
-    def _build_diagram(self):
+    def _build_diagram(self, layout: bool = True):
+        """Diagram dict; every box carries a "key" (class name, or "lib:"
+        + label) that stays the same across runs and a "group" (the dotted
+        module path, EXTERNAL_GROUP for libraries).  layout=False leaves the
+        boxes at (0, 0) — for callers that place them themselves."""
         from code_layout import auto_layout
 
         boxes, arrows, floattexts = [], [], []
@@ -284,9 +297,10 @@ class PythonAnalyzer:
         _aid = [0]
         _tid = [0]
 
-        def new_box(x,y,w,h,label,color,shape="rect"):
+        def new_box(x,y,w,h,label,color,shape="rect",key=None,group=""):
             _bid[0]+=1
-            b=dict(id=_bid[0],x=x,y=y,w=w,h=h,label=label,color=color,shape=shape)
+            b=dict(id=_bid[0],x=x,y=y,w=w,h=h,label=label,color=color,shape=shape,
+                   key=key,group=group)
             boxes.append(b); return b
 
         def new_arrow(sid,did,label,ls,hs):
@@ -298,13 +312,9 @@ class PythonAnalyzer:
             _tid[0]+=1
             floattexts.append(dict(id=_tid[0],x=x,y=y,text=text,style=style))
 
-        # Collect external libraries referenced
-        external_libs = {}  # lib_name -> box_id
-
-        # Place class boxes
-        positions = auto_layout(list(self.classes.keys()))
-        for cname, (cx, cy) in positions.items():
-            info  = self.classes[cname]
+        # Class labels first: the layout needs their sizes
+        labels = {}   # class_name -> (label, w, h, color)
+        for cname, info in self.classes.items():
             kind  = info["kind"]
             color = {"class":COLOR_CLASS,"abstract":COLOR_ABSTRACT,
                      "interface":COLOR_INTERFACE,"enum":COLOR_ENUM}.get(kind, COLOR_CLASS)
@@ -326,48 +336,48 @@ class PythonAnalyzer:
 
             w = max(180, 12*max((len(l) for l in label.split("\n")), default=10))
             h = max(60,  18*len(label.split("\n")))
-            b = new_box(cx, cy, w, h, label, color)
-            box_id[cname] = b["id"]
+            labels[cname] = (label, w, h, color)
 
-        # Arrows
-        seen_rels = set()
+        # Relation targets: a local class, else an external library / unknown box
+        links = []    # (class_name, target node, rel, label)
         for cname, info in self.classes.items():
-            src_id = box_id.get(cname)
-            if not src_id: continue
-
             for (rel, target, lbl) in info["relations"]:
-                ls, hs = REL_STYLES.get(rel, ("solid","open"))
-
-                if target in box_id:
-                    key = (src_id, box_id[target], rel)
-                    if key in seen_rels: continue
-                    seen_rels.add(key)
-                    new_arrow(src_id, box_id[target], lbl, ls, hs)
-
+                if target in self.classes:
+                    links.append((cname, target, rel, lbl))
+                    continue
+                # Check if it came from an import
+                import_info = self.imports.get(target)
+                if import_info:
+                    full_mod, is_ext = import_info
+                    lib_label = target if is_ext else full_mod
                 else:
-                    # External library or unknown
-                    # Check if it came from an import
-                    import_info = self.imports.get(target)
-                    if import_info:
-                        full_mod, is_ext = import_info
-                        lib_label = target if is_ext else full_mod
-                    else:
-                        lib_label = target
-                        is_ext    = False
-
-                    if lib_label not in external_libs:
-                        # Place external box off to the right
-                        ex = 900 + len(external_libs)*10
-                        ey = 80  + len(external_libs)*90
-                        color = COLOR_EXTERNAL
-                        shape = "rect"
-                        eb = new_box(ex, ey, 160, 50, lib_label, color, shape)
-                        external_libs[lib_label] = eb["id"]
-
-                    key = (src_id, external_libs[lib_label], rel)
-                    if key in seen_rels: continue
-                    seen_rels.add(key)
-                    new_arrow(src_id, external_libs[lib_label], lbl, ls, hs)
+                    lib_label = target
+                links.append((cname, ("lib", lib_label), rel, lbl))
+        external_libs = list(dict.fromkeys(t for _, t, _, _ in links if isinstance(t, tuple)))
+
+        # Classes and libraries are laid out together, layered along the relations
+        sizes = {c: (w, h) for c, (_, w, h, _) in labels.items()}
+        sizes.update((lib, (160, 50)) for lib in external_libs)
+        positions = auto_layout(list(self.classes) + external_libs, sizes=sizes,
+                                edges=[(src, dst) for src, dst, _, _ in links]) if layout else {}
+        for cname, (label, w, h, color) in labels.items():
+            cx, cy = positions.get(cname, (0, 0))
+            b = new_box(cx, cy, w, h, label, color, key=cname, group=self.groups.get(cname, ""))
+            box_id[cname] = b["id"]
+        for lib in external_libs:
+            ex, ey = positions.get(lib, (0, 0))
+            eb = new_box(ex, ey, 160, 50, lib[1], COLOR_EXTERNAL, "rect", key="lib:" + lib[1],
+                         group=EXTERNAL_GROUP)
+            box_id[lib] = eb["id"]
+
+        # Arrows
+        seen_rels = set()
+        for (cname, target, rel, lbl) in links:
+            ls, hs = REL_STYLES.get(rel, ("solid","open"))
+            key = (box_id[cname], box_id[target], rel)
+            if key in seen_rels: continue
+            seen_rels.add(key)
+            new_arrow(box_id[cname], box_id[target], lbl, ls, hs)
 
         new_text(400, 20,
                  f"Code Analysis — Python  ({len(self.classes)} classes, "
@@ -379,30 +389,357 @@ class PythonAnalyzer:
         return dict(boxes=boxes, arrows=arrows, floattexts=floattexts)
 
 
+# ═════════════════════════════════════════════════════════════════════════════
+# JAVA LEXER
+# ═════════════════════════════════════════════════════════════════════════════
+# One left-to-right pass: a single master regex turns the source into tokens
+# (strings, text blocks, char literals and comments never reach the parser,
+# so their braces can't confuse it), then a small recursive-descent parser
+# walks the tokens once, building every type — nested ones included — with
+# its own fields, methods and constructors.  Bodies are skipped by token
+# depth, so the whole file costs O(tokens).
+
+_JAVA_TOKEN = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<str>"""(?:[^"\\]|\\.|"(?!""))*(?:"""|\Z)
+          |"(?:[^"\\\n]|\\.)*"?
+          |'(?:[^'\\\n]|\\.)*'?)
+  | (?P<id>[A-Za-z_$][\w$]*)
+  | (?P<num>\d[\w.]*)
+  | (?P<op>\.\.\.|.)
+''', re.S | re.X)
+
+JAVA_TYPE_KEYWORDS = {"class", "interface", "enum", "record"}
+JAVA_MODIFIERS = {
+    "public", "protected", "private", "static", "final", "abstract", "native",
+    "synchronized", "transient", "volatile", "strictfp", "default", "sealed",
+}
+_EOF = ("eof", "", -1, -1)
+
+
+def java_tokens(src: str) -> list:
+    """[(kind, text, start, end)] with whitespace and comments dropped."""
+    return [(m.lastgroup, m.group(), m.start(), m.end())
+            for m in _JAVA_TOKEN.finditer(src)
+            if m.lastgroup != "ws" and m.lastgroup != "comment"]
+
+
+class _JavaParser:
+
+    def __init__(self, src: str):
+        self.src   = src
+        self.toks  = java_tokens(src)
+        self.n     = len(self.toks)
+        self.i     = 0
+        self.unit  = dict(package="", imports=[], types=[])
+
+    # ── Token helpers ────────────────────────────────────────────────────────
+
+    def _tok(self, k=0):
+        j = self.i + k
+        return self.toks[j] if j < self.n else _EOF
+
+    def _is(self, text, k=0):
+        t = self._tok(k)
+        return t[1] == text and t[0] != "str"
+
+    def _skip_balanced(self, open_, close):
+        """At `open_`: skip past its matching `close` (token depth, not chars)."""
+        depth = 0
+        while self.i < self.n:
+            kind, text = self.toks[self.i][:2]
+            self.i += 1
+            if kind == "op":
+                if text == open_:
+                    depth += 1
+                elif text == close:
+                    depth -= 1
+                    if depth == 0:
+                        return
+
+    def _skip_statement(self):
+        """Up to and including the next top-level ';' or block; stops before '}'."""
+        while self.i < self.n:
+            kind, text = self.toks[self.i][:2]
+            if kind == "op":
+                if text == ";":
+                    self.i += 1; return
+                if text == "{":
+                    self._skip_balanced("{", "}"); return
+                if text == "}":
+                    return
+                if text == "(":
+                    self._skip_balanced("(", ")"); continue
+            self.i += 1
+
+    # ── Grammar (the parts a class diagram needs) ────────────────────────────
+
+    def parse(self) -> dict:
+        while self.i < self.n:
+            if self._is("package"):
+                self.i += 1
+                self.unit["package"] = self._qualified()
+                self._skip_statement()
+            elif self._is("import"):
+                self.i += 1
+                static = self._is("static")
+                if static:
+                    self.i += 1
+                self.unit["imports"].append((self._qualified(), static))
+                self._skip_statement()
+            elif self._is("}") or self._is(";"):
+                self.i += 1
+            else:
+                self._declaration(None)
+        return self.unit
+
+    def _qualified(self) -> str:
+        """a.b.C / a.b.* — stops at the first token that can't continue the name."""
+        parts = []
+        while self._tok()[0] == "id" or self._is("*"):
+            parts.append(self._tok()[1])
+            self.i += 1
+            if not self._is("."):
+                break
+            parts.append(".")
+            self.i += 1
+        return "".join(parts)
+
+    def _modifiers(self):
+        annotations, modifiers = [], []
+        while self.i < self.n:
+            kind, text, start, _ = self._tok()
+            if text == "@" and kind == "op" and not self._is("interface", 1):
+                self.i += 1
+                name = self._qualified().split(".")[-1]
+                if self._is("("):
+                    self._skip_balanced("(", ")")
+                annotations.append((name, self.src[start:self.toks[self.i - 1][3]]))
+            elif kind == "id" and text in JAVA_MODIFIERS:
+                modifiers.append(text)
+                self.i += 1
+            elif text == "non" and self._is("-", 1) and self._is("sealed", 2):
+                modifiers.append("non-sealed")
+                self.i += 3
+            else:
+                break
+        return annotations, modifiers
+
+    def _type(self):
+        """A type reference as normalised text (List<Order>, int[], T...), or None."""
+        if self._tok()[0] != "id":
+            return None
+        parts = [self._tok()[1]]
+        self.i += 1
+        while True:
+            if self._is(".") and self._tok(1)[0] == "id":
+                parts.append("." + self._tok(1)[1])
+                self.i += 2
+            elif self._is("<"):
+                parts.append(self._type_args())
+            elif self._is("@"):                 # type-use annotation: List<@NonNull X>
+                self._modifiers()
+            else:
+                break
+        while self._is("[") and self._is("]", 1):
+            parts.append("[]")
+            self.i += 2
+        if self._is("..."):
+            parts.append("...")
+            self.i += 1
+        return "".join(parts)
+
+    def _type_args(self) -> str:
+        self.i += 1                             # '<'
+        args = []
+        while self.i < self.n and not self._is(">"):
+            if self._is("?"):
+                self.i += 1
+                arg = "?"
+                if self._is("extends") or self._is("super"):
+                    bound = self._tok()[1]
+                    self.i += 1
+                    arg += f" {bound} {self._type() or ''}"
+            else:
+                self._modifiers()
+                arg = self._type()
+                if arg is None:
+                    self.i += 1
+                    continue
+            args.append(arg)
+            if self._is(","):
+                self.i += 1
+        self.i += 1                             # '>'
+        return "<" + ", ".join(args) + ">"
+
+    def _type_list(self) -> list:
+        types = []
+        while True:
+            t = self._type()
+            if t is None:
+                return types
+            types.append(t)
+            if not self._is(","):
+                return types
+            self.i += 1
+
+    def _params(self) -> list:
+        """At '(': [(name, type, [annotation names])]."""
+        self.i += 1
+        params = []
+        while self.i < self.n and not self._is(")"):
+            annotations, _ = self._modifiers()
+            ptype = self._type()
+            if ptype is None or self._tok()[0] != "id":
+                self.i += 1
+                continue
+            pname = self._tok()[1]
+            self.i += 1
+            while self._is("[") and self._is("]", 1):
+                ptype += "[]"
+                self.i += 2
+            params.append((pname, ptype, [a[0] for a in annotations]))
+            if self._is(","):
+                self.i += 1
+        self.i += 1                             # ')'
+        return params
+
+    def _declaration(self, owner):
+        start = self._tok()[2]
+        annotations, modifiers = self._modifiers()
+        kind = self._tok()[1]
+        if self._is("@") and self._is("interface", 1):
+            self.i += 2
+            return self._type_decl("@interface", annotations, modifiers, start, owner)
+        if (kind in JAVA_TYPE_KEYWORDS and self._tok()[0] == "id" and self._tok(1)[0] == "id"
+                and (kind != "record" or self._is("(", 2) or self._is("<", 2))):
+            self.i += 1
+            return self._type_decl(kind, annotations, modifiers, start, owner)
+        if owner is None:
+            return self._skip_statement()
+        if self._is("{"):                       # (static) initializer block
+            return self._skip_balanced("{", "}")
+        if self._is("<"):                       # generic method: <T> T foo()
+            self._skip_balanced("<", ">")
+
+        if self._tok()[1] == owner["name"] and (self._is("(", 1) or self._is("{", 1)):
+            self.i += 1                         # constructor (or compact record ctor)
+            params = self._params() if self._is("(") else []
+            owner["ctors"].append(dict(params=params, annotations=annotations,
+                                       modifiers=modifiers))
+            return self._skip_statement()
+
+        ftype = self._type()
+        if ftype is None or self._tok()[0] != "id":
+            return self._skip_statement()
+        name = self._tok()[1]
+        self.i += 1
+        if self._is("("):
+            owner["methods"].append(dict(name=name, ret=ftype, params=self._params(),
+                                         annotations=annotations, modifiers=modifiers))
+            return self._skip_statement()       # throws …, body or ';'
+
+        while True:                             # one or more declarators
+            dims = ""
+            while self._is("[") and self._is("]", 1):
+                dims += "[]"
+                self.i += 2
+            owner["fields"].append(dict(name=name, type=ftype + dims,
+                                        annotations=annotations, modifiers=modifiers))
+            # skip the initializer up to ';' or the next declarator at depth 0
+            while self.i < self.n:
+                kind, text = self.toks[self.i][:2]
+                if kind == "op":
+                    if text in ";}":
+                        break
+                    # `int a, b;` — not the ',' inside new Map<K, V>()
+                    if text == "," and self._tok(1)[0] == "id" and self._tok(2)[1] in ("=", ",", ";", "["):
+                        break
+                    if text in "({[":
+                        self._skip_balanced(text, {"(": ")", "{": "}", "[": "]"}[text])
+                        continue
+                self.i += 1
+            if self._is(","):
+                name = self._tok(1)[1]
+                self.i += 2
+                continue
+            if self._is(";"):
+                self.i += 1
+            return
+
+    def _type_decl(self, kind, annotations, modifiers, start, owner):
+        decl = dict(name=self._tok()[1], kind=kind, annotations=annotations,
+                    modifiers=modifiers, extends=[], implements=[], fields=[],
+                    methods=[], ctors=[], outer=owner["name"] if owner else None)
+        self.unit["types"].append(decl)
+        self.i += 1
+        if self._is("<"):
+            self._skip_balanced("<", ">")
+        if kind == "record" and self._is("("):
+            decl["fields"] = [dict(name=n, type=t, annotations=[(a, "@" + a) for a in an],
+                                   modifiers=["private", "final"])
+                              for n, t, an in self._params()]
+        while self.i < self.n and not self._is("{"):
+            if self._is("extends"):
+                self.i += 1
+                decl["extends"] = self._type_list()
+            elif self._is("implements"):
+                self.i += 1
+                decl["implements"] = self._type_list()
+            else:                               # permits …, stray tokens
+                self.i += 1
+        decl["header"] = self.src[start:self._tok()[2]] if self.i < self.n else self.src[start:]
+        self.i += 1                             # '{'
+        if kind == "enum":
+            self._enum_constants()
+        while self.i < self.n and not self._is("}"):
+            if self._is(";"):
+                self.i += 1
+            else:
+                self._declaration(decl)
+        self.i += 1                             # '}'
+
+    def _enum_constants(self):
+        while self.i < self.n:
+            self._modifiers()
+            if self._tok()[0] == "id":
+                self.i += 1
+                if self._is("("):
+                    self._skip_balanced("(", ")")
+                if self._is("{"):
+                    self._skip_balanced("{", "}")
+            if self._is(","):
+                self.i += 1
+            elif self._is(";"):
+                self.i += 1; return
+            elif self._is("}"):
+                return
+            elif self._tok()[0] != "id":
+                self.i += 1
+
+
+def parse_java(src: str) -> dict:
+    """
+    {package, imports: [(name, static)], types: [...]} for one source file.
+    Each type: name, kind (class|interface|enum|record|@interface), outer,
+    annotations [(name, source text)], modifiers, extends, implements,
+    header (declaration text up to its '{'), fields [{name, type,
+    annotations, modifiers}], methods [{name, ret, params, annotations,
+    modifiers}], ctors [{params, annotations, modifiers}];
+    params are [(name, type, [annotation names])].
+    """
+    return _JavaParser(src).parse()
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # JAVA ANALYSER
 # ═════════════════════════════════════════════════════════════════════════════
 
 class JavaAnalyzer:
-    """Parse .java files with regex (no external parser needed)."""
-
-    # Patterns
-    _P_IMPORT  = re.compile(r"^\s*import\s+(static\s+)?([^\s;]+);", re.M)
-    _P_CLASS   = re.compile(
-        r"(?:public\s+|private\s+|protected\s+|abstract\s+|final\s+)*"
-        r"(class|interface|enum|@interface)\s+(\w+)"
-        r"(?:\s*<[^>]*>)?"                           # generics
-        r"(?:\s+extends\s+([\w,\s<>]+?))??"
-        r"(?:\s+implements\s+([\w,\s<>]+?))?"
-        r"\s*\{", re.M)
-    _P_FIELD   = re.compile(
-        r"^\s*(?:private|protected|public)?\s*(?:final\s+|static\s+)*"
-        r"([\w<>\[\],\s]+?)\s+(\w+)\s*(?:=|;)", re.M)
-    _P_METHOD  = re.compile(
-        r"^\s*(?:public|private|protected|abstract|static|final|synchronized|@Override\s+)*\s+"
-        r"(?:<[^>]*>\s+)?([\w<>\[\],\s]+?)\s+(\w+)\s*\(([^)]*)\)", re.M)
-    _P_ANNOT   = re.compile(r"@(\w+)")
-    _P_INJECT  = re.compile(r"@(?:Autowired|Inject|Resource|Value)")
+    """Parse .java files with the single-pass lexer above (no external parser needed)."""
+
+    _P_INJECT  = {"Autowired", "Inject", "Resource", "Value"}
     _PRIMITIVES= {"void","int","long","double","float","boolean","char","byte",
                   "short","String","Integer","Long","Double","Float","Boolean",
                   "Object","Number","Comparable","Serializable","Iterable",
@@ -413,47 +750,43 @@ class JavaAnalyzer:
     def __init__(self):
         self.classes = {}
         self.imports = {}
+        self.groups  = {}     # name -> dotted folder (source_group)
 
-    def analyze_path(self, path: str):
-        p = Path(path)
-        if p.is_file() and p.suffix == ".java":
-            self._analyze_file(p)
-        elif p.is_dir():
-            for f in sorted(p.rglob("*.java")):
-                self._analyze_file(f)
-        return self._build_diagram()
+    def analyze_path(self, path: str, workers: int = None, cache: bool = True,
+                     layout: bool = True):
+        _merge_path(self, path, "java", workers, cache)
+        return self._build_diagram(layout)
 
     def _analyze_file(self, path: Path):
         try:
             src = path.read_text(encoding="utf-8", errors="replace")
         except Exception:
             return
+        self._merge(self._extract(src, path))
+
+    def _merge(self, frag, group: str = ""):
+        if frag is None:
+            return
+        self.imports.update(frag["imports"])
+        self.classes.update(frag["classes"])
+        self.groups.update(dict.fromkeys(frag["classes"], group))
+
+    def _extract(self, src: str, path: Path):
+        """Imports and classes of one file (picklable)."""
+        unit = parse_java(src)
+        imports, classes = {}, {}
 
         # Imports
-        file_imports = {}
-        for m in self._P_IMPORT.finditer(src):
-            full = m.group(2).strip()
+        for full, _static in unit["imports"]:
             simple = full.split(".")[-1]
-            ext = _is_external_java(full)
-            file_imports[simple] = (full, ext)
-            self.imports[simple] = (full, ext)
-
-        # Classes
-        for m in self._P_CLASS.finditer(src):
-            kind_kw = m.group(1)   # class|interface|enum|@interface
-            cname   = m.group(2)
-            extends = [x.strip().split("<")[0]
-                       for x in (m.group(3) or "").split(",") if x.strip()]
-            implements = [x.strip().split("<")[0]
-                          for x in (m.group(4) or "").split(",") if x.strip()]
+            imports[simple] = (full, _is_external_java(full))
 
+        # Classes (nested ones too, each with only its own members)
+        for decl in unit["types"]:
+            cname = decl["name"]
             kind = {"interface":"interface","enum":"enum",
-                    "@interface":"interface"}.get(kind_kw,"class")
-
-            # Try to detect abstract
-            start = max(0, m.start()-80)
-            preceding = src[start:m.start()]
-            if "abstract" in preceding:
+                    "@interface":"interface"}.get(decl["kind"],"class")
+            if kind == "class" and "abstract" in decl["modifiers"]:
                 kind = "abstract"
 
             info = {
@@ -464,104 +797,70 @@ class JavaAnalyzer:
                 "relations": [],
             }
 
-            # Extends → inherits
-            for base in extends:
-                if base:
-                    info["relations"].append(("inherits", base, ""))
+            # Extends → inherits  (an interface's extends list included)
+            for base in decl["extends"]:
+                info["relations"].append(("inherits", base.split("<")[0], ""))
 
             # Implements → implements
-            for iface in implements:
-                if iface:
-                    info["relations"].append(("implements", iface, ""))
-
-            # Get class body (heuristic: find matching brace)
-            body = self._extract_body(src, m.end()-1)
+            for iface in decl["implements"]:
+                info["relations"].append(("implements", iface.split("<")[0], ""))
 
             # Fields
-            for fm in self._P_FIELD.finditer(body):
-                ftype = fm.group(1).strip()
-                fname = fm.group(2).strip()
-                if fname in ("class","return","new","if","for","while",
-                             "else","throw","catch"): continue
+            for field in decl["fields"]:
+                ftype = field["type"]
+                fname = field["name"]
                 info["fields"].append((fname, ftype))
 
                 # Determine relationship type from field type
-                col_m = re.match(r"(\w+)\s*<\s*([\w<>]+)", ftype)
+                col_m = re.match(r"(\w+)\s*<\s*(\w+)", ftype)
                 if col_m:
                     container = col_m.group(1)
-                    inner     = col_m.group(2).split("<")[0]
+                    inner     = col_m.group(2)
                     if container in self._COLLECT and inner not in self._PRIMITIVES:
                         info["relations"].append(("aggregates", inner, "0..*"))
                 else:
                     clean = ftype.split("<")[0].strip().split("[")[0].strip()
                     if clean and clean not in self._PRIMITIVES and clean[0].isupper():
-                        # Check if @Autowired / @Inject precedes field
-                        fpos = src.find(ftype, m.end())
-                        pre  = src[max(0,fpos-100):fpos]
-                        if self._P_INJECT.search(pre):
+                        # @Autowired / @Inject on the field → DI
+                        if any(a[0] in self._P_INJECT for a in field["annotations"]):
                             info["relations"].append(("injects", clean, "«inject»"))
                         else:
                             info["relations"].append(("composes", clean, ""))
 
             # Methods
-            for mm in self._P_METHOD.finditer(body):
-                ret    = mm.group(1).strip()
-                mname  = mm.group(2).strip()
-                params = mm.group(3).strip()
-                if mname in ("if","while","for","catch","switch"): continue
+            for method in decl["methods"]:
                 param_list = []
-                if params:
-                    for p in params.split(","):
-                        parts = p.strip().split()
-                        if len(parts)>=2:
-                            ptype = parts[-2].split("<")[0]
-                            pname = parts[-1]
-                            param_list.append((pname, ptype))
-                            if (ptype not in self._PRIMITIVES and
-                                    ptype[0:1].isupper()):
-                                info["relations"].append(("depends", ptype, ""))
-                info["methods"].append((mname, param_list, ret))
+                for pname, ptype, _annots in method["params"]:
+                    ptype = ptype.split("<")[0]
+                    param_list.append((pname, ptype))
+                    base = ptype.rstrip(".[]")
+                    if base not in self._PRIMITIVES and base[0:1].isupper():
+                        info["relations"].append(("depends", base, ""))
+                info["methods"].append((method["name"], param_list, method["ret"]))
 
             # Constructor injection detection
-            ctor_pattern = re.compile(
-                rf"(?:public|protected)\s+{re.escape(cname)}\s*\(([^)]*)\)", re.M)
-            for cm in ctor_pattern.finditer(body):
-                params_raw = cm.group(1)
-                for p in params_raw.split(","):
-                    parts = p.strip().split()
-                    if len(parts)>=2:
-                        ptype = parts[-2].split("<")[0]
-                        if (ptype not in self._PRIMITIVES and
-                                ptype[0:1].isupper()):
-                            info["relations"].append(("injects", ptype, "«inject»"))
-
-            self.classes[cname] = info
-
-    def _extract_body(self, src: str, start: int) -> str:
-        """Extract content between matching braces starting at `start`."""
-        depth=0; i=start
-        begin=-1
-        while i < len(src):
-            if src[i]=="{":
-                depth+=1
-                if begin==-1: begin=i
-            elif src[i]=="}":
-                depth-=1
-                if depth==0:
-                    return src[begin+1:i]
-            i+=1
-        return src[begin+1:] if begin>=0 else ""
-
-    def _build_diagram(self):
+            for ctor in decl["ctors"]:
+                for _pname, ptype, _annots in ctor["params"]:
+                    ptype = ptype.split("<")[0].rstrip(".[]")
+                    if ptype not in self._PRIMITIVES and ptype[0:1].isupper():
+                        info["relations"].append(("injects", ptype, "«inject»"))
+
+            classes[cname] = info
+
+        return dict(imports=imports, classes=classes)
+
+    def _build_diagram(self, layout: bool = True):
+        """Diagram dict with box "key"s, as PythonAnalyzer._build_diagram."""
         from code_layout import auto_layout
         boxes, arrows, floattexts = [], [], []
         box_id = {}
 
         _bid=[0]; _aid=[0]; _tid=[0]
 
-        def new_box(x,y,w,h,label,color,shape="rect"):
+        def new_box(x,y,w,h,label,color,shape="rect",key=None,group=""):
             _bid[0]+=1
-            b=dict(id=_bid[0],x=x,y=y,w=w,h=h,label=label,color=color,shape=shape)
+            b=dict(id=_bid[0],x=x,y=y,w=w,h=h,label=label,color=color,shape=shape,
+                   key=key,group=group)
             boxes.append(b); return b
 
         def new_arrow(sid,did,label,ls,hs):
@@ -573,11 +872,8 @@ class JavaAnalyzer:
             _tid[0]+=1
             floattexts.append(dict(id=_tid[0],x=x,y=y,text=text,style=style))
 
-        external_libs = {}
-        positions = auto_layout(list(self.classes.keys()))
-
-        for cname,(cx,cy) in positions.items():
-            info  = self.classes[cname]
+        labels = {}
+        for cname,info in self.classes.items():
             kind  = info["kind"]
             color = {"class":COLOR_CLASS,"abstract":COLOR_ABSTRACT,
                      "interface":COLOR_INTERFACE,"enum":COLOR_ENUM}.get(kind,COLOR_CLASS)
@@ -595,35 +891,34 @@ class JavaAnalyzer:
 
             w=max(190,11*max((len(l) for l in label.split("\n")),default=10))
             h=max(60, 17*len(label.split("\n")))
-            b=new_box(cx,cy,w,h,label,color)
+            labels[cname]=(label,w,h,color)
+
+        # unknown targets (libraries, JDK types) get one box each
+        links=[(cname, target if target in self.classes else ("lib",target), rel, lbl)
+               for cname,info in self.classes.items()
+               for (rel,target,lbl) in info["relations"]]
+        external_libs=list(dict.fromkeys(t for _,t,_,_ in links if isinstance(t,tuple)))
+
+        sizes={c:(w,h) for c,(_,w,h,_) in labels.items()}
+        sizes.update((lib,(160,50)) for lib in external_libs)
+        positions=auto_layout(list(self.classes)+external_libs, sizes=sizes,
+                              edges=[(src,dst) for src,dst,_,_ in links]) if layout else {}
+        for cname,(label,w,h,color) in labels.items():
+            cx,cy=positions.get(cname,(0,0))
+            b=new_box(cx,cy,w,h,label,color,key=cname,group=self.groups.get(cname,""))
             box_id[cname]=b["id"]
+        for lib in external_libs:
+            ex,ey=positions.get(lib,(0,0))
+            eb=new_box(ex,ey,160,50,lib[1],COLOR_EXTERNAL,key="lib:"+lib[1],group=EXTERNAL_GROUP)
+            box_id[lib]=eb["id"]
 
         seen=set()
-        for cname,info in self.classes.items():
-            sid=box_id.get(cname)
-            if not sid: continue
-            for (rel,target,lbl) in info["relations"]:
-                ls,hs=REL_STYLES.get(rel,("solid","open"))
-                if target in box_id:
-                    key=(sid,box_id[target],rel)
-                    if key in seen: continue
-                    seen.add(key)
-                    new_arrow(sid,box_id[target],lbl,ls,hs)
-                else:
-                    imp=self.imports.get(target)
-                    lib_label=target
-                    if imp:
-                        full,is_ext=imp
-                        lib_label=target
-                    if lib_label not in external_libs:
-                        ex=900+len(external_libs)*10
-                        ey=80+len(external_libs)*90
-                        eb=new_box(ex,ey,160,50,lib_label,COLOR_EXTERNAL)
-                        external_libs[lib_label]=eb["id"]
-                    key=(sid,external_libs[lib_label],rel)
-                    if key in seen: continue
-                    seen.add(key)
-                    new_arrow(sid,external_libs[lib_label],lbl,ls,hs)
+        for (cname,target,rel,lbl) in links:
+            ls,hs=REL_STYLES.get(rel,("solid","open"))
+            key=(box_id[cname],box_id[target],rel)
+            if key in seen: continue
+            seen.add(key)
+            new_arrow(box_id[cname],box_id[target],lbl,ls,hs)
 
         new_text(400,20,
                  f"Code Analysis — Java  ({len(self.classes)} classes, "
@@ -635,39 +930,702 @@ class JavaAnalyzer:
         return dict(boxes=boxes,arrows=arrows,floattexts=floattexts)
 
 
+# ═════════════════════════════════════════════════════════════════════════════
+# PER-FILE EXTRACTION  —  process pool + on-disk cache
+# ═════════════════════════════════════════════════════════════════════════════
+# Each file is reduced to a small picklable fragment ({imports, classes});
+# the analysers merge fragments in path order, so results don't depend on
+# which worker finished first.  Fragments are cached on disk keyed by path,
+# and reused while (mtime, size) match — or, after a touch / checkout,
+# while the content hash still matches.  Only changed files are re-parsed.
+
+ANALYSIS_CACHE = os.environ.get(
+    "DIAGRAMTOOL_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "diagramtool", "analysis.db"))
+CACHE_VERSION  = 2        # bump when a fragment's shape changes
+PARALLEL_MIN   = 64       # fewer files to parse than this → stay in-process
+LOOKUP_CHUNK   = 900      # cached paths fetched per query
+_EXTRACTORS    = {"py": PythonAnalyzer, "java": JavaAnalyzer}
+
+
+def _source_files(path: str, suffix: str) -> list:
+    p = Path(path)
+    if p.is_file():
+        return [p] if p.suffix == suffix else []
+    return sorted(p.rglob("*" + suffix)) if p.is_dir() else []
+
+
+def source_group(root: str, path: str, lang: str) -> str:
+    """The box "group" of the classes in `path`, a file under `root`: its
+    dotted module path for Python (pkg/sub/mod.py → pkg.sub.mod), its folder
+    for Java (src/main/java/com/acme/Foo.java → src.main.java.com.acme)."""
+    root = str(root).rstrip(os.sep)
+    path = str(path)
+    rel = path[len(root) + 1:] if path.startswith(root + os.sep) else os.path.basename(path)
+    rel = os.path.splitext(rel)[0].replace(os.sep, ".")
+    if lang == "java":
+        return rel.rpartition(".")[0]
+    return rel[:-len(".__init__")] if rel.endswith(".__init__") else rel
+
+
+def _extract_one(lang: str, path: str, known_hash: str = None):
+    """Worker: (content hash, fragment); fragment is skipped if the hash is known."""
+    try:
+        data = Path(path).read_bytes()
+    except OSError:
+        return None, None
+    digest = hashlib.sha1(data).hexdigest()
+    if digest == known_hash:
+        return digest, None
+    src = data.decode("utf-8", errors="replace")
+    return digest, _EXTRACTORS[lang]()._extract(src, Path(path))
+
+
+def _extract_chunk(lang: str, jobs: list) -> list:
+    return [_extract_one(lang, path, known) for path, known in jobs]
+
+
+class AnalysisCache:
+    """sqlite file of per-file fragments: path → (mtime, size, sha1, pickle)."""
+
+    def __init__(self, db_path: str = None):
+        db_path = db_path or ANALYSIS_CACHE
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS fragments (path TEXT, lang TEXT, "
+                        "version INT, mtime REAL, size INT, sha1 TEXT, frag BLOB, "
+                        "PRIMARY KEY (path, lang))")
+
+    def lookup(self, lang: str, paths: list) -> dict:
+        """Cached rows of `paths` only — the file is shared by every project
+        ever analysed, so it is queried by primary key, LOOKUP_CHUNK paths
+        at a time (under sqlite's 999 bound parameters)."""
+        rows = {}
+        paths = list(dict.fromkeys(paths))
+        for i in range(0, len(paths), LOOKUP_CHUNK):
+            chunk = paths[i:i + LOOKUP_CHUNK]
+            cur = self.db.execute(
+                "SELECT path, mtime, size, sha1, frag FROM fragments "
+                f"WHERE lang = ? AND version = ? AND path IN ({','.join('?' * len(chunk))})",
+                (lang, CACHE_VERSION, *chunk))
+            for path, mtime, size, sha1, frag in cur:
+                rows[path] = (mtime, size, sha1, frag)
+        return rows
+
+    def store(self, lang: str, entries: list):
+        """entries: [(path, mtime, size, sha1, fragment)]"""
+        self.db.executemany(
+            "INSERT OR REPLACE INTO fragments VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(path, lang, CACHE_VERSION, mtime, size, sha1,
+              pickle.dumps(frag, pickle.HIGHEST_PROTOCOL))
+             for path, mtime, size, sha1, frag in entries])
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+def extract_files(files: list, lang: str, workers: int = None, cache: bool = True,
+                  stats: dict = None) -> list:
+    """
+    Fragments for `files` (in the same order), parsing only what changed.
+    `workers` caps the process pool (default: CPU count; 1 = in-process).
+    `stats`, if given, is filled with {'files', 'cached', 'parsed'}.
+    """
+    frags = extract_map(files, lang, workers, cache, stats)
+    return [frags[str(f)] for f in files if str(f) in frags]
+
+
+def extract_map(files: list, lang: str, workers: int = None, cache: bool = True,
+                stats: dict = None) -> dict:
+    """{path: fragment} for the `files` that could be read — extract_files."""
+    paths  = [str(f) for f in files]
+    store  = AnalysisCache() if cache else None
+    known  = store.lookup(lang, paths) if store else {}
+    frags  = {}
+    todo   = []          # (path, cached sha1 or None)
+    stat   = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        stat[path] = (st.st_mtime, st.st_size)
+        hit = known.get(path)
+        if hit and (hit[0], hit[1]) == stat[path]:
+            frags[path] = pickle.loads(hit[3])
+        else:
+            todo.append((path, hit[2] if hit else None))
+
+    workers = workers or os.cpu_count() or 1
+    if len(todo) < PARALLEL_MIN or workers == 1:
+        results = _extract_chunk(lang, todo)
+    else:
+        # a handful of chunks per worker: amortises pickling, keeps load balanced
+        size   = max(16, len(todo) // (workers * 4))
+        chunks = [todo[i:i+size] for i in range(0, len(todo), size)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [r for part in pool.map(_extract_chunk, [lang]*len(chunks), chunks)
+                       for r in part]
+
+    fresh, parsed = [], 0
+    for (path, known_hash), (digest, frag) in zip(todo, results):
+        if digest is None:                     # vanished / unreadable
+            continue
+        if digest == known_hash:               # touched, not changed
+            frag = pickle.loads(known[path][3])
+        else:
+            parsed += 1
+        frags[path] = frag
+        fresh.append((path, *stat[path], digest, frag))
+    if store:
+        if fresh:
+            store.store(lang, fresh)
+        store.close()
+    if stats is not None:
+        stats.update(files=len(paths), cached=len(paths) - parsed, parsed=parsed)
+    return frags
+
+
+def _merge_path(analyser, path: str, lang: str, workers: int, cache: bool):
+    """Extract every source file under `path` into `analyser`, in path order."""
+    files = _source_files(path, "." + lang)
+    frags = extract_map(files, lang, workers, cache)
+    for f in map(str, files):
+        if f in frags:
+            analyser._merge(frags[f], source_group(path, f, lang))
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # UNIFIED ENTRY
 # ═════════════════════════════════════════════════════════════════════════════
 
-def analyze(path: str) -> dict:
+def analyze(path: str, workers: int = None, cache: bool = True,
+            layout: bool = True) -> dict:
     """
     Analyze a file or directory of Python / Java source code.
     Returns a diagram dict ready for DiagramApp._deserialize().
+    Files are extracted on a process pool and cached (see extract_files).
+    layout=False skips placing the boxes (all at (0, 0)).
     """
     p = Path(path)
     # Decide language
     if p.is_file():
         if p.suffix == ".py":
-            return PythonAnalyzer().analyze_path(path)
+            return PythonAnalyzer().analyze_path(path, workers, cache, layout)
         elif p.suffix == ".java":
-            return JavaAnalyzer().analyze_path(path)
+            return JavaAnalyzer().analyze_path(path, workers, cache, layout)
         else:
             raise ValueError(f"Unsupported file type: {p.suffix}")
     elif p.is_dir():
-        # Mixed folder: run both
-        py_files  = list(p.rglob("*.py"))
-        java_files = list(p.rglob("*.java"))
-        if py_files and not java_files:
-            return PythonAnalyzer().analyze_path(path)
-        elif java_files and not py_files:
-            return JavaAnalyzer().analyze_path(path)
-        elif py_files and java_files:
-            # Prefer Python if more .py files
-            if len(py_files) >= len(java_files):
-                return PythonAnalyzer().analyze_path(path)
-            else:
-                return JavaAnalyzer().analyze_path(path)
-        else:
-            raise ValueError("No .py or .java files found in directory.")
+        if project_lang(path) == "py":
+            return PythonAnalyzer().analyze_path(path, workers, cache, layout)
+        return JavaAnalyzer().analyze_path(path, workers, cache, layout)
     else:
         raise FileNotFoundError(path)
+
+
+def project_lang(path: str) -> str:
+    """The language of a source file or folder, "py" or "java" (a mixed
+    folder: the one with more files, Python on a tie)."""
+    p = Path(path)
+    if p.is_file():
+        if p.suffix not in (".py", ".java"):
+            raise ValueError(f"Unsupported file type: {p.suffix}")
+        return p.suffix[1:]
+    # Mixed folder: one walk, then the language with more files wins
+    py_files = java_files = 0
+    for _dir, _subdirs, names in os.walk(p):
+        for n in names:
+            if n.endswith(".py"):     py_files += 1
+            elif n.endswith(".java"): java_files += 1
+    if not py_files and not java_files:
+        raise ValueError("No .py or .java files found in directory.")
+    # Prefer Python if more .py files
+    return "py" if py_files >= java_files else "java"
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# WATCH MODE  —  incremental re-analysis
+# ═════════════════════════════════════════════════════════════════════════════
+# A ProjectWatcher holds the fragments of every file of a project in memory.
+# After an edit only the changed files are extracted again; the fragments are
+# re-merged (dict updates, in path order as in analyze_path) and the diagram
+# rebuilt without layout.  diagram_diff then tells the canvas which boxes and
+# arrows to add, remove or relabel — by box "key", so moved boxes stay put.
+
+WATCH_SKIP_DIRS = {".git", ".hg", ".svn", "__pycache__", "node_modules",
+                   ".gradle", ".idea", ".venv", "venv", ".tox"}
+
+
+def arrow_key(arrow: dict, box_keys: dict) -> tuple:
+    """(src key, dst key, label, line style, head style) of an arrow dict;
+    `box_keys` maps box id → key."""
+    return (box_keys.get(arrow["src_id"]), box_keys.get(arrow["dst_id"]),
+            arrow.get("label", ""), arrow.get("line_style", "solid"),
+            arrow.get("head_style", "open"))
+
+
+def diagram_index(data: dict) -> tuple:
+    """({key: box dict}, {arrow key: arrow dict}) of a diagram: what
+    diagram_diff matches boxes and arrows by."""
+    boxes = {b["key"]: b for b in data.get("boxes", []) if b.get("key")}
+    keys = {b["id"]: b.get("key") for b in data.get("boxes", [])}
+    arrows = {}
+    for a in data.get("arrows", []):
+        arrows.setdefault(arrow_key(a, keys), a)
+    return boxes, arrows
+
+
+def diagram_diff(old: dict, new: dict, old_index: tuple = None,
+                 new_index: tuple = None) -> dict:
+    """
+    What changed between two analyses of one project.  Boxes are matched by
+    "key" (boxes without one are ignored), arrows by arrow_key:
+
+      added           [box dict]                   new boxes
+      removed         [key]
+      changed         {key: {attr: new value}}     label / w / h / color / shape
+      arrows_added    [(src key, dst key, arrow dict)]
+      arrows_removed  [arrow key]
+      texts           [(index, text)]              float texts that changed
+
+    `old_index` / `new_index` are diagram_index results already at hand.
+    """
+    old_boxes, old_arrows = old_index or diagram_index(old)
+    new_boxes, new_arrows = new_index or diagram_index(new)
+    changed = {}
+    for key, b in new_boxes.items():
+        o = old_boxes.get(key)
+        if o is not None:
+            attrs = {a: b[a] for a in ("label", "w", "h", "color", "shape") if o.get(a) != b.get(a)}
+            if attrs:
+                changed[key] = attrs
+    old_texts, new_texts = old.get("floattexts", []), new.get("floattexts", [])
+    return dict(
+        added=[b for key, b in new_boxes.items() if key not in old_boxes],
+        removed=[key for key in old_boxes if key not in new_boxes],
+        changed=changed,
+        arrows_added=[(k[0], k[1], a) for k, a in new_arrows.items()
+                      if k not in old_arrows and k[0] and k[1]],
+        arrows_removed=[k for k in old_arrows if k not in new_arrows],
+        texts=[(i, ft["text"]) for i, ft in enumerate(new_texts)
+               if i < len(old_texts) and old_texts[i]["text"] != ft["text"]],
+    )
+
+
+def diff_size(diff: dict) -> int:
+    return sum(len(v) for v in diff.values())
+
+
+class ProjectWatcher:
+    """
+    Keeps the analysis of a source folder current while its files change.
+
+    poll() returns the files changed / removed since the last call, or None.
+    With watchdog installed (inotify, FSEvents, ReadDirectoryChangesW) it
+    only looks at the paths named by file-system events; otherwise it
+    compares (mtime, size) of every file.  update() re-extracts just those
+    files and returns (diagram, diff) against the previous diagram.
+
+    `lang` is "py" or "java" (default: project_lang).  Other project kinds
+    pass the `suffixes` worth watching and `rebuild(changed, removed)`,
+    returning the whole diagram dict; load() calls it with (None, None).
+    layout=False: the first diagram is not laid out either.
+    """
+
+    def __init__(self, path: str, lang: str = None, workers: int = None,
+                 cache: bool = True, rebuild=None, suffixes: tuple = None,
+                 events: bool = True, layout: bool = True):
+        self.path = os.path.abspath(path)
+        self.rebuild = rebuild
+        self.lang = None if rebuild else (lang or project_lang(path))
+        self.suffixes = tuple(suffixes or ("." + self.lang,))
+        self.workers, self.cache, self.layout = workers, cache, layout
+        self.stamps = {}          # path -> (mtime, size)
+        self.frags = {}           # path -> fragment (py / java)
+        self.groups = {}          # path -> source_group
+        self._order = None        # frags' paths in merge order (as _source_files)
+        self.data = None          # the last diagram
+        self._index = None        # its diagram_index
+        self._observer = None
+        self._events = set()      # paths named by events since the last poll
+        self._rescan = False      # a directory moved / vanished: scan everything
+        self._lock = threading.Lock()
+        self.load()
+        if events:
+            self._watch_events()
+
+    # ── File state ───────────────────────────────────────────────────────────
+
+    def _wanted(self, path: str) -> bool:
+        return path.endswith(self.suffixes)
+
+    def _stamp(self, path: str):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime, st.st_size
+
+    def scan(self) -> dict:
+        """{path: (mtime, size)} of every watched file under the folder."""
+        if os.path.isfile(self.path):
+            s = self._stamp(self.path)
+            return {self.path: s} if s else {}
+        out = {}
+        for folder, dirs, names in os.walk(self.path):
+            dirs[:] = [d for d in dirs if d not in WATCH_SKIP_DIRS]
+            for n in names:
+                if n.endswith(self.suffixes):
+                    full = os.path.join(folder, n)
+                    s = self._stamp(full)
+                    if s:
+                        out[full] = s
+        return out
+
+    def load(self) -> dict:
+        """Full analysis (with layout): the diagram to start the canvas from."""
+        self.stamps = self.scan()
+        self._index = None
+        if self.rebuild:
+            self.data = self.rebuild(None, None)
+            return self.data
+        self.frags = extract_map(sorted(self.stamps), self.lang, self.workers, self.cache)
+        self.data = self._build(layout=self.layout)
+        return self.data
+
+    def _build(self, layout: bool) -> dict:
+        analyser = PythonAnalyzer() if self.lang == "py" else JavaAnalyzer()
+        if self._order is None or len(self._order) != len(self.frags):
+            self._order = sorted(self.frags, key=lambda p: Path(p).parts)
+        groups = self.groups
+        for path in self._order:
+            g = groups.get(path)
+            if g is None:
+                g = groups[path] = source_group(self.path, path, self.lang)
+            analyser._merge(self.frags[path], g)
+        return analyser._build_diagram(layout=layout)
+
+    # ── Change detection ─────────────────────────────────────────────────────
+
+    def _watch_events(self):
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return                                  # polling it is
+        watcher = self
+        folder = self.path if os.path.isdir(self.path) else os.path.dirname(self.path) or "."
+
+        def skipped(path, is_dir):
+            # the folders scan() does not walk into (.venv, node_modules, …)
+            parts = Path(os.path.relpath(os.fsdecode(path), folder)).parts
+            return not WATCH_SKIP_DIRS.isdisjoint(parts if is_dir else parts[:-1])
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = [p for p in (event.src_path, getattr(event, "dest_path", ""))
+                         if p and not skipped(p, event.is_directory)]
+                if event.is_directory:
+                    if paths and event.event_type in ("moved", "deleted"):
+                        watcher._rescan = True
+                    return
+                with watcher._lock:
+                    for p in paths:
+                        if watcher._wanted(p):
+                            watcher._events.add(os.fsdecode(p))
+
+        try:
+            observer = Observer()
+            observer.schedule(Handler(), folder, recursive=True)
+            observer.start()
+        except Exception:                           # no inotify watches left, …
+            return
+        self._observer = observer
+
+    @property
+    def mode(self) -> str:
+        return "events" if self._observer else "polling"
+
+    def poll(self):
+        """(changed, removed) paths since the last poll, or None."""
+        if self._observer and not self._rescan:
+            with self._lock:
+                paths, self._events = self._events, set()
+            now = {}
+            for p in paths:
+                if os.path.isfile(self.path) and p != self.path:
+                    continue
+                now[p] = self._stamp(p)
+        else:
+            self._rescan = False
+            now = self.scan()
+            now.update((p, None) for p in self.stamps if p not in now)
+        changed = [p for p, s in now.items() if s and self.stamps.get(p) != s]
+        removed = [p for p, s in now.items() if s is None and p in self.stamps]
+        if not changed and not removed:
+            return None
+        for p in changed:
+            self.stamps[p] = now[p]
+        for p in removed:
+            del self.stamps[p]
+        return changed, removed
+
+    def update(self, changed: list, removed: list):
+        """(diagram, diff) after re-extracting `changed` and dropping `removed`."""
+        if self.rebuild:
+            data = self.rebuild(changed, removed)
+        else:
+            for p in removed:
+                self.frags.pop(p, None)
+            if changed:
+                fresh = extract_map(changed, self.lang, self.workers, self.cache)
+                if any(p not in self.frags for p in fresh):
+                    self._order = None
+                self.frags.update(fresh)
+            if removed:
+                self._order = None
+            data = self._build(layout=False)
+        index = diagram_index(data)
+        diff = diagram_diff(self.data, data, self._index or diagram_index(self.data), index)
+        self.data, self._index = data, index
+        return data, diff
+
+    def close(self):
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=2)
+            self._observer = None
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# HIERARCHY  —  package groups for large diagrams
+# ═════════════════════════════════════════════════════════════════════════════
+# Thousands of class boxes are more than a canvas (or a reader) can take in.
+# A DiagramTree arranges an analysis by its boxes' "group" paths into nested
+# package / module nodes, and the canvas shows a *cut* through it: a set of
+# nodes, groups or classes, covering every class at most once.  view() turns
+# a cut into a diagram — a group box stands for all the classes below it and
+# the arrows between two shown nodes are merged into one, labelled ×count —
+# so only what is shown is ever built, laid out or drawn.  Expanding a group
+# replaces it in the cut by its children; collapsing does the reverse.
+
+GROUP_PREFIX = "pkg:"       # node id of a group: GROUP_PREFIX + dotted path
+COLOR_GROUP  = "Yellow"
+
+
+class DiagramTree:
+    """
+    The package / module tree of one analysis (boxes with "key" and "group").
+
+    Nodes are class keys and group ids; ROOT is the group of the empty path.
+    A chain of groups with one child each is folded into its last link, so
+    src/main/java/com/acme is one group, not five.  `leaf_kind` is the
+    stereotype of groups that hold classes only ("module" for Python).
+    """
+
+    ROOT = GROUP_PREFIX
+
+    def __init__(self, data: dict, leaf_kind: str = "package"):
+        self.data = data
+        self.leaf_kind = leaf_kind
+        self.boxes = {b["key"]: b for b in data.get("boxes", []) if b.get("key")}
+        self._key_of = {b["id"]: b.get("key") for b in data.get("boxes", [])}
+        raw = {self.ROOT: []}              # group -> children, before folding
+        for key, b in self.boxes.items():
+            node, parts = self.ROOT, (b.get("group") or "").split(".")
+            for i in range(1, len(parts) + 1 if parts[0] else 1):
+                g = GROUP_PREFIX + ".".join(parts[:i])
+                if g not in raw:
+                    raw[g] = []
+                    raw[node].append(g)
+                node = g
+            raw[node].append(key)
+        self.parent, self.children, self.size = {}, {}, {}
+        order, stack = [], [self.ROOT]
+        while stack:
+            g = stack.pop()
+            order.append(g)
+            groups, classes = [], []
+            for k in raw[g]:
+                while k in raw and len(raw[k]) == 1:
+                    k = raw[k][0]
+                self.parent[k] = g
+                (groups if k in raw else classes).append(k)
+            self.children[g] = sorted(groups) + classes
+            stack.extend(groups)
+        for g in reversed(order):          # children before their parents
+            self.size[g] = sum(self.size.get(k, 1) for k in self.children[g])
+
+    def is_group(self, node: str) -> bool:
+        return node in self.children
+
+    def name(self, node: str) -> str:
+        """A group's path below its parent group (a class: its key)."""
+        if not self.is_group(node):
+            return node
+        path = node[len(GROUP_PREFIX):]
+        base = self.parent.get(node, self.ROOT)[len(GROUP_PREFIX):]
+        return path[len(base) + 1:] if base else path
+
+    def descendants(self, node: str) -> list:
+        out, stack = [], list(self.children.get(node, ()))
+        while stack:
+            n = stack.pop()
+            out.append(n)
+            stack.extend(self.children.get(n, ()))
+        return out
+
+    # ── Cuts ─────────────────────────────────────────────────────────────────
+
+    def initial_cut(self, budget: int) -> set:
+        """The top-level nodes, then the biggest groups expanded for as long
+        as no more than `budget` nodes are shown (all classes, if they fit)."""
+        cut = set(self.children[self.ROOT])
+        heap = [(-self.size[g], g) for g in cut if self.is_group(g)]
+        heapq.heapify(heap)
+        while heap:
+            _, g = heapq.heappop(heap)
+            kids = self.children[g]
+            if len(cut) - 1 + len(kids) > budget:
+                continue
+            cut.discard(g)
+            cut.update(kids)
+            for k in kids:
+                if self.is_group(k):
+                    heapq.heappush(heap, (-self.size[k], k))
+        return cut
+
+    def expand(self, cut: set, node: str) -> set:
+        return (set(cut) - {node}) | set(self.children[node])
+
+    def collapse(self, cut: set, node: str) -> set:
+        return (set(cut) - set(self.descendants(node))) | {node}
+
+    def rep_map(self, cut: set) -> dict:
+        """{node: the node of `cut` it is shown as, or None} for every class
+        (and the groups walked through on the way up)."""
+        rep = {}
+        for key in self.boxes:
+            path, n = [], key
+            while True:
+                if n in cut:
+                    r = n
+                    break
+                if n in rep:
+                    r = rep[n]
+                    break
+                if n == self.ROOT:
+                    r = None
+                    break
+                path.append(n)
+                n = self.parent[n]
+            for m in path:
+                rep[m] = r
+            rep[key] = r
+        return rep
+
+    def adapt(self, old: "DiagramTree", cut: set, spread: int = 50) -> set:
+        """The cut of this (re-analysed) tree that follows `cut` of the old
+        one.  Classes that are new — or were shown as a group that no longer
+        exists — are added: one by one, or as their enclosing group if more
+        than `spread` of them would land in it.  Classes the old cut did not
+        show (deleted from the canvas) stay out."""
+        old_rep = old.rep_map(cut)
+        cut = {n for n in cut if n in self.parent}
+        rep = self.rep_map(cut)
+        todo = [c for c in self.boxes if rep.get(c) is None and
+                (c not in old.boxes or (old_rep.get(c) is not None and old_rep[c] not in self.parent))]
+        opened = set()                     # groups with something of the cut below
+        for n in cut:
+            n = self.parent[n]
+            while n not in opened and n != self.ROOT:
+                opened.add(n)
+                n = self.parent[n]
+        tops = {}
+        for c in todo:
+            top = n = c
+            while n != self.ROOT and n not in opened:
+                top, n = n, self.parent[n]
+            tops.setdefault(top, []).append(c)
+        for top, classes in tops.items():
+            if self.is_group(top) and len(classes) > spread:
+                cut.add(top)
+            else:
+                cut.update(classes)
+        return cut
+
+    # ── Diagrams ─────────────────────────────────────────────────────────────
+
+    def group_box(self, node: str) -> dict:
+        path = node[len(GROUP_PREFIX):]
+        if path == EXTERNAL_GROUP:
+            kind = "external"
+        elif any(self.is_group(k) for k in self.children[node]):
+            kind = "package"
+        else:
+            kind = self.leaf_kind
+        n = self.size[node]
+        label = f"«{kind}»\n{self.name(node)}\n{n:,} class{'' if n == 1 else 'es'}"
+        lines = label.split("\n")
+        return dict(id=0, x=0, y=0, w=max(180, 12 * max(len(l) for l in lines)),
+                    h=max(60, 18 * len(lines)), label=label, color=COLOR_GROUP,
+                    shape="roundrect", key=node)
+
+    def shown(self, cut: set) -> list:
+        """The nodes of `cut` in tree order (groups first, by path)."""
+        out, stack = [], [self.ROOT]
+        while stack:
+            g = stack.pop()
+            for k in self.children[g]:
+                if k in cut:
+                    out.append(k)
+                elif k in self.children:
+                    stack.append(k)
+        return out
+
+    def view(self, cut: set) -> dict:
+        """The diagram of `cut`: class boxes as analysed, a group_box per
+        group, class-to-class arrows as they are and every other arrow
+        merged per (shown source, shown target) — one merged arrow keeps its
+        own style, more become one dashed "×n".  Boxes are at (0, 0)."""
+        rep = self.rep_map(cut)
+        boxes, ids = [], {}
+        for n in self.shown(cut):
+            b = self.group_box(n) if self.is_group(n) else dict(self.boxes[n])
+            b["id"] = ids[n] = len(boxes) + 1
+            boxes.append(b)
+        arrows, merged = [], {}
+        key_of = self._key_of
+        for a in self.data.get("arrows", []):
+            s, d = key_of.get(a["src_id"]), key_of.get(a["dst_id"])
+            rs, rd = rep.get(s), rep.get(d)
+            if rs is None or rd is None or rs == rd:
+                continue
+            if rs == s and rd == d:
+                arrows.append(dict(a, src_id=ids[rs], dst_id=ids[rd]))
+            else:
+                merged.setdefault((rs, rd), []).append(a)
+        for (rs, rd), links in merged.items():
+            a = dict(links[0]) if len(links) == 1 else dict(
+                label=f"×{len(links)}", line_style="dashed", head_style="open")
+            a.update(src_id=ids[rs], dst_id=ids[rd])
+            arrows.append(a)
+        for i, a in enumerate(arrows, 1):
+            a["id"] = i
+        return dict(boxes=boxes, arrows=arrows,
+                    floattexts=[dict(ft) for ft in self.data.get("floattexts", [])])
+
+    def layout(self, view: dict, nodes: list = None, x: float = 60, y: float = 80) -> dict:
+        """{node: (x, y)} — code_layout.auto_layout of `nodes` (default:
+        all) of a view, along the view's arrows between them."""
+        from code_layout import auto_layout
+        boxes = {b["key"]: b for b in view["boxes"]}
+        nodes = list(boxes) if nodes is None else [n for n in nodes if n in boxes]
+        keep = set(nodes)
+        key_of = {b["id"]: b["key"] for b in view["boxes"]}
+        edges = [(key_of[a["src_id"]], key_of[a["dst_id"]]) for a in view["arrows"]
+                 if key_of[a["src_id"]] in keep and key_of[a["dst_id"]] in keep]
+        return auto_layout(nodes, sizes={n: (boxes[n]["w"], boxes[n]["h"]) for n in nodes},
+                           edges=edges, start_x=x, start_y=y)
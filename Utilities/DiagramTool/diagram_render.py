@@ -0,0 +1,607 @@
+"""
+diagram_render.py  —  Headless renderer: diagram / DSL → SVG and PNG
+=====================================================================
+Draws a DiagramTool diagram without Tk — the boxes / arrows / floattexts
+dict of a saved .json, code_analyzer.analyze() or DiagramApp._serialize(),
+or a Text-to-Diagram .dsl file (laid out like the editor's preview).
+
+  render_svg(data)               → SVG text, written directly
+  render_png(data, path, scale)  → PNG through Pillow, at any scale
+  render_dir(paths, out_dir)     → every .json / .dsl under `paths`, on a
+                                   process pool
+
+Both formats are drawn from one list of shapes in diagram coordinates
+(the same shapes DiagramApp draws at 100 % zoom), cropped to the diagram
+plus a margin.
+
+Run:   python diagram_render.py diagram.json                     → diagram.svg
+       python diagram_render.py dsl/ -o out -f svg,png --scale 2
+Opt:   pip install Pillow   (PNG)
+"""
+
+import argparse, json, math, os, re, sys, textwrap
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+from code_layout import layered_layout
+
+# ── Theme (as in diagram_tool.py) ────────────────────────────────────────────
+BG         = "#1e1e2e"
+ACCENT2    = "#a89ee8"
+TEXT_LIGHT = "#e0dff5"
+ARROW_COL  = "#a0b0e0"
+
+BOX_COLORS = {
+    "Blue":   ("#2e3a5c","#5a7ec8"), "Green": ("#1e3d2e","#3aaa6a"),
+    "Purple": ("#3a2e5c","#7c6fcd"), "Teal":  ("#1e3d3a","#3aaaa0"),
+    "Orange": ("#4a3020","#cc7744"), "Red":   ("#4a2020","#cc4444"),
+    "Gray":   ("#2e2e3e","#666688"), "Yellow":("#3a3a1e","#aaaa3a"),
+    "Pink":   ("#3a1e3a","#cc44cc"),
+}
+
+# ═══ TEXT-TO-DIAGRAM DSL ══════════════════════════════════════════════════════
+
+class DslDocument:
+    """The Text-to-Diagram DSL, parsed line by line.
+
+    update(text) diffs the new text against the last one (common head and
+    tail), re-parses only the lines in between — through a cache keyed by
+    the line's text — and refolds the per-line results into `nodes`
+    ({name: {type, color, fill, stroke}}) and `edges` ([{src, dst, op,
+    lbl}]).  Node and edge dicts are shared with the cache: read only."""
+
+    NODE_FILLS = {
+        "actor":    ("Gray",   "#2e2e3e","#666688"),
+        "system":   ("Blue",   "#2e3a5c","#5a7ec8"),
+        "database": ("Teal",   "#1e3d3a","#3aaaa0"),
+        "queue":    ("Orange", "#4a3020","#cc7744"),
+        "cloud":    ("Green",  "#1e3d2e","#3aaa6a"),
+        "service":  ("Purple", "#3a2e5c","#7c6fcd"),
+        "ui":       ("Pink",   "#3a1e3a","#cc44cc"),
+        "api":      ("Yellow", "#3a3a1e","#aaaa3a"),
+        "default":  ("Blue",   "#2e3a5c","#5a7ec8"),
+    }
+    COLOR_MAP = {
+        "blue":   ("#2e3a5c","#5a7ec8"), "green":  ("#1e3d2e","#3aaa6a"),
+        "purple": ("#3a2e5c","#7c6fcd"), "teal":   ("#1e3d3a","#3aaaa0"),
+        "orange": ("#4a3020","#cc7744"), "red":    ("#4a2020","#cc4444"),
+        "gray":   ("#2e2e3e","#666688"), "yellow": ("#3a3a1e","#aaaa3a"),
+        "pink":   ("#3a1e3a","#cc44cc"),
+    }
+    DIAGRAM_COLOR_MAP = {
+        "blue":"Blue","green":"Green","purple":"Purple","teal":"Teal",
+        "orange":"Orange","red":"Red","gray":"Gray","yellow":"Yellow","pink":"Pink",
+    }
+    TYPE_COLOR_MAP = {
+        "actor":"Gray","system":"Blue","database":"Teal","queue":"Orange",
+        "cloud":"Green","service":"Purple","ui":"Pink","api":"Yellow",
+    }
+    DEFAULT_NODE = {"type":"default","color":"Blue","fill":"#2e3a5c","stroke":"#5a7ec8"}
+
+    TYPE_RE = re.compile(r"^(Actor|System|Database|Queue|Cloud|Service|UI|API|DB):\s*(.+)", re.I)
+    EDGE_RE = re.compile(r"^(.+?)\s*(<->|-->|->)\s*(.+)")
+    LBL_RE  = re.compile(r"\[label:\s*([^\]]+)\]")
+    COL_RE  = re.compile(r"\[color:\s*(\w+)\]")
+    BRACKET_RE = re.compile(r"\[.*?\]")
+    KEYWORD_RE = re.compile(r"(Actor|System|Database|Queue|Cloud|Service|UI|API|DB):", re.I)
+
+    def __init__(self):
+        self.lines=[]; self.parsed=[]; self.nodes={}; self.edges=[]
+        self._cache={}
+
+    @classmethod
+    def _clean(cls,s): return cls.BRACKET_RE.sub("",s).strip()
+
+    def parse_line(self,raw):
+        """("node", name, info) / ("edge", info) / None, cached by text."""
+        hit=self._cache.get(raw,self)
+        if hit is not self: return hit
+        line=raw.strip(); out=None
+        if line and not line.startswith("#"):
+            tm=self.TYPE_RE.match(line)
+            if tm:
+                typ=tm.group(1).lower(); rest=tm.group(2)
+                m=self.COL_RE.search(rest); col=m.group(1).lower() if m else None
+                if col and col in self.COLOR_MAP:
+                    fill,stroke=self.COLOR_MAP[col]; dcolor=self.DIAGRAM_COLOR_MAP.get(col,"Blue")
+                else:
+                    dcolor,fill,stroke=self.NODE_FILLS.get(typ,self.NODE_FILLS["default"])
+                out=("node",self._clean(rest),
+                     {"type":typ,"color":dcolor,"fill":fill,"stroke":stroke})
+            else:
+                em=self.EDGE_RE.match(line)
+                if em:
+                    lbl=""
+                    for part in (em.group(3),em.group(1)):
+                        m=self.LBL_RE.search(part)
+                        if m: lbl=m.group(1).strip(); break
+                    out=("edge",{"src":self._clean(em.group(1)),"dst":self._clean(em.group(3)),
+                                 "op":em.group(2),"lbl":lbl})
+        if len(self._cache)>2*len(self.lines)+1024:
+            self._cache={l:p for l,p in zip(self.lines,self.parsed)}
+        self._cache[raw]=out
+        return out
+
+    def update(self,text):
+        """Take the editor's text.  Returns (lo, hi, changed): the new lines
+        lo..hi-1 differ from before, `changed` if nodes / edges did — or
+        None when the text is the same."""
+        old=self.lines; new=text.split("\n")
+        if new==old: return None
+        lo=0; n=min(len(old),len(new))
+        while lo<n and old[lo]==new[lo]: lo+=1
+        ho,hn=len(old),len(new)
+        while ho>lo and hn>lo and old[ho-1]==new[hn-1]: ho-=1; hn-=1
+        parsed=[self.parse_line(l) for l in new[lo:hn]]
+        changed=parsed!=self.parsed[lo:ho]
+        self.parsed[lo:ho]=parsed; self.lines=new
+        if changed: self._fold()
+        return lo,hn,changed
+
+    def _fold(self):
+        nodes={}; edges=[]
+        for p in self.parsed:
+            if p is None: continue
+            if p[0]=="node": nodes[p[1]]=p[2]; continue
+            e=p[1]; edges.append(e)
+            if e["src"] not in nodes: nodes[e["src"]]=self.DEFAULT_NODE
+            if e["dst"] not in nodes: nodes[e["dst"]]=self.DEFAULT_NODE
+        self.nodes=nodes; self.edges=edges
+
+
+DSL_BOX = (160, 52)
+
+
+def dsl_layout(doc):
+    """{name: (x, y)} — the layered layout the editor's preview starts from."""
+    names=list(doc.nodes)
+    return layered_layout(names,[(e["src"],e["dst"]) for e in doc.edges],
+                          {nm:DSL_BOX for nm in names},
+                          h_gap=50,v_gap=78,start_x=50,start_y=50)
+
+
+def dsl_to_diagram(source,positions=None):
+    """
+    Diagram dict for a DSL text (or a DslDocument): one box per node, one
+    arrow per edge.  `positions` ({name: (x, y)}, e.g. dragged in the
+    preview) wins over the layered layout.
+    """
+    doc=source
+    if not isinstance(source,DslDocument):
+        doc=DslDocument(); doc.update(source)
+    positions=positions or {}
+    auto={} if all(nm in positions for nm in doc.nodes) else dsl_layout(doc)
+    boxes,arrows,ids=[],[],{}
+    for nm,nd in doc.nodes.items():
+        x,y=positions.get(nm) or auto.get(nm,(100,100))
+        color=DslDocument.DIAGRAM_COLOR_MAP.get(nd.get("color","blue").lower(),"Blue")
+        if color=="Blue" and nd["type"]!="default":
+            color=DslDocument.TYPE_COLOR_MAP.get(nd["type"],"Blue")
+        ids[nm]=len(boxes)+1
+        boxes.append(dict(id=ids[nm],x=x,y=y,w=DSL_BOX[0],h=DSL_BOX[1],
+                          label=nd["type"].upper()+"\n"+nm if nd["type"]!="default" else nm,
+                          color=color,
+                          shape="actor" if nd["type"]=="actor" else
+                                "cylinder" if nd["type"]=="database" else "rect"))
+    for e in doc.edges:
+        if e["src"] in ids and e["dst"] in ids:
+            arrows.append(dict(id=len(arrows)+1,src_id=ids[e["src"]],dst_id=ids[e["dst"]],
+                               label=e["lbl"],line_style="dashed" if e["op"]=="-->" else "solid",
+                               head_style="open",orthogonal=False))
+    return dict(boxes=boxes,arrows=arrows,floattexts=[])
+
+# ═══ HEADLESS DRAWING ═════════════════════════════════════════════════════════
+# A diagram becomes a list of shapes in diagram coordinates, the ones
+# DiagramApp._draw_box / _draw_arrow / _draw_floattext put on the canvas
+# at 100 % zoom; render_svg and render_png only translate them.
+#   ("rect",  x1, y1, x2, y2, fill, outline, width, radius)
+#   ("oval",  x1, y1, x2, y2, fill, outline, width)
+#   ("poly",  points, fill, outline, width)
+#   ("line",  points, colour, width, dash)
+#   ("text",  x, y, lines, pt, colour, anchor "c" | "s", family, weight, slant)
+
+def _edge_point(b,tx,ty):
+    """Where the line from box `b`'s centre towards (tx, ty) leaves it."""
+    hw,hh=b["w"]/2,b["h"]/2; cx,cy=b["x"]+hw,b["y"]+hh; dx,dy=tx-cx,ty-cy
+    if dx==0 and dy==0: return cx,cy
+    a=math.atan2(dy,dx); ca,sa=math.cos(a),math.sin(a)
+    s=b.get("shape","rect")
+    if s in("circle","ellipse","oval"):
+        d=math.hypot(ca/hw,sa/hh); scale=1/d if d else hw
+    elif s=="diamond":
+        denom=abs(ca)*hh+abs(sa)*hw
+        scale=(hw*hh)/denom if denom else hw
+    else:
+        scale=hw/abs(ca) if abs(ca)*hh>abs(sa)*hw else hh/abs(sa)
+    return cx+ca*scale, cy+sa*scale
+
+
+def _wrap(text,width,pt,family="mono"):
+    """Tk-style wrapping of `text` at `width` pixels (approximate glyph widths)."""
+    per=max(1,int(width/(pt*4/3*(0.6 if family=="mono" else 0.55))))
+    out=[]
+    for line in text.split("\n"):
+        out+=textwrap.wrap(line,per,break_on_hyphens=False) or [""]
+    return out
+
+
+def _label(ops,cx,cy,text,width,pt=10):
+    ops.append(("text",cx,cy,_wrap(text,width,pt),pt,TEXT_LIGHT,"c","mono","normal","normal"))
+
+
+def _box_ops(ops,b):
+    x1,y1=b["x"],b["y"]; x2,y2=x1+b["w"],y1+b["h"]
+    fill,bc=BOX_COLORS.get(b.get("color","Blue"),("#2e3a5c","#5a7ec8")); lw=1
+    W=x2-x1; H=y2-y1; cx=(x1+x2)/2; cy=(y1+y2)/2
+    s=b.get("shape","rect"); label=b.get("label","")
+    if s=="roundrect":
+        r=min(10,W/4,H/4)
+        ops.append(("rect",x1+3,y1+3,x2+3,y2+3,"#111122","",0,0))
+        ops.append(("rect",x1,y1,x2,y2,fill,bc,lw,r))
+        _label(ops,cx,cy,label,W-10)
+    elif s in("circle","ellipse","oval"):
+        ops.append(("oval",x1,y1,x2,y2,fill,bc,lw))
+        _label(ops,cx,cy,label,W-12)
+    elif s=="diamond":
+        ops.append(("poly",[cx,y1,x2,cy,cx,y2,x1,cy],fill,bc,lw))
+        _label(ops,cx,cy,label,W*0.6)
+    elif s=="triangle":
+        ops.append(("poly",[cx,y1,x2,y2,x1,y2],fill,bc,lw))
+        _label(ops,cx,y1+H*0.6,label,W-10)
+    elif s=="hexagon":
+        pts=[]
+        for i in range(6):
+            a=math.radians(60*i-30); pts+=[cx+(W/2)*math.cos(a),cy+(H/2)*math.sin(a)]
+        ops.append(("poly",pts,fill,bc,lw))
+        _label(ops,cx,cy,label,W*0.7)
+    elif s=="parallelogram":
+        sk=min(20,W*0.2)
+        ops.append(("poly",[x1+sk,y1,x2,y1,x2-sk,y2,x1,y2],fill,bc,lw))
+        _label(ops,cx,cy,label,W-sk*2-4)
+    elif s=="note":
+        fold=min(16,W*0.2)
+        ops.append(("poly",[x1,y1,x2-fold,y1,x2,y1+fold,x2,y2,x1,y2],fill,bc,lw))
+        ops.append(("line",[x2-fold,y1,x2-fold,y1+fold,x2,y1+fold],bc,lw,()))
+        _label(ops,cx,cy,label,W-fold-4)
+    elif s=="cylinder":
+        ry=min(14,H*0.2)
+        ops.append(("rect",x1,y1+ry,x2,y2-ry,fill,"",0,0))
+        ops.append(("oval",x1,y1,x2,y1+ry*2,fill,bc,lw))
+        ops.append(("oval",x1,y2-ry*2,x2,y2,fill,bc,lw))
+        ops.append(("line",[x1,y1+ry,x1,y2-ry],bc,lw,()))
+        ops.append(("line",[x2,y1+ry,x2,y2-ry],bc,lw,()))
+        _label(ops,cx,cy,label,W-8)
+    elif s=="actor":
+        r=min(12,H*0.15)
+        ops.append(("oval",cx-r,y1,cx+r,y1+r*2,fill,bc,lw))
+        by=y1+r*2+(H*0.25); ay=y1+r*2+(H*0.1)
+        ops.append(("line",[cx,y1+r*2,cx,by],bc,lw,()))
+        ops.append(("line",[x1+4,ay,x2-4,ay],bc,lw,()))
+        ops.append(("line",[cx,by,x1+4,y2-4],bc,lw,()))
+        ops.append(("line",[cx,by,x2-4,y2-4],bc,lw,()))
+        if label:
+            ops.append(("text",cx,y2,_wrap(label,W,10,"sans"),10,TEXT_LIGHT,"s","sans","normal","normal"))
+    else:                                   # "rect" and anything unknown
+        ops.append(("rect",x1+3,y1+3,x2+3,y2+3,"#111122","",0,0))
+        ops.append(("rect",x1,y1,x2,y2,fill,"",0,0))
+        ops.append(("rect",x1,y1,x2,y1+max(3,H*0.06),bc,"",0,0))
+        ops.append(("rect",x1,y1,x2,y2,"",bc,lw,0))
+        _label(ops,cx,cy,label,W-10)
+
+
+def _arrowhead(x1,y1,x2,y2,d1,d2,d3):
+    """Tk's arrow=LAST with arrowshape=(d1, d2, d3), as a polygon."""
+    a=math.atan2(y2-y1,x2-x1); ca,sa=math.cos(a),math.sin(a)
+    nx,ny=x2-d1*ca,y2-d1*sa; bx,by=x2-d2*ca,y2-d2*sa
+    return [x2,y2, bx-d3*sa,by+d3*ca, nx,ny, bx+d3*sa,by-d3*ca]
+
+
+def _arrow_ops(ops,a,src,dst):
+    sx,sy=src["x"]+src["w"]/2,src["y"]+src["h"]/2
+    tx,ty=dst["x"]+dst["w"]/2,dst["y"]+dst["h"]/2
+    x1,y1=_edge_point(src,tx,ty); x2,y2=_edge_point(dst,sx,sy)
+    color=ARROW_COL; lw=1.5
+    dash=(6,4) if a.get("line_style","solid")=="dashed" else ()
+    head=a.get("head_style","open")
+    if a.get("orthogonal",False):
+        mx=(x1+x2)/2; pts=[x1,y1,mx,y1,mx,y2,x2,y2]; hx,hy=mx,y2
+    else:
+        pts=[x1,y1,x2,y2]; hx,hy=x1,y1
+    ops.append(("line",pts,color,lw,dash))
+    if head=="inheritance":
+        t=math.atan2(y2-hy,x2-hx); s=14; sp=math.radians(25)
+        ops.append(("poly",[x2,y2,x2-s*math.cos(t-sp),y2-s*math.sin(t-sp),
+                            x2-s*math.cos(t+sp),y2-s*math.sin(t+sp)],BG,color,1.5))
+    elif head in("diamond","odiamond"):
+        t=math.atan2(y2-hy,x2-hx); s=14
+        bx=x2-s*math.cos(t); by=y2-s*math.sin(t)
+        mx=x2-(s/2)*math.cos(t); my=y2-(s/2)*math.sin(t)
+        p=t+math.pi/2; w=s*0.45
+        ops.append(("poly",[x2,y2,mx+w*math.cos(p),my+w*math.sin(p),bx,by,
+                            mx-w*math.cos(p),my-w*math.sin(p)],
+                    color if head=="odiamond" else BG,color,1.5))
+    elif head=="filled":
+        ops.append(("poly",_arrowhead(pts[-4],pts[-3],x2,y2,12,14,5),color,"",0))
+    elif head!="none":
+        ops.append(("poly",_arrowhead(pts[-4],pts[-3],x2,y2,10,12,4),color,"",0))
+    if a.get("label"):
+        ops.append(("text",(x1+x2)/2,(y1+y2)/2-10,[a["label"]],9,ACCENT2,"c","sans","normal","normal"))
+
+
+def diagram_ops(data):
+    """(shapes, (x1, y1, x2, y2) bounds) for a diagram dict."""
+    ops=[]
+    boxes={b["id"]:b for b in data.get("boxes",[])}
+    for a in data.get("arrows",[]):
+        src=boxes.get(a["src_id"]); dst=boxes.get(a["dst_id"])
+        if src and dst: _arrow_ops(ops,a,src,dst)
+    for b in data.get("boxes",[]):
+        _box_ops(ops,b)
+    for ft in data.get("floattexts",[]):
+        style=ft.get("style","normal")
+        ops.append(("text",ft["x"],ft["y"],ft.get("text","").split("\n"),13 if style=="heading" else 11,
+                    ACCENT2,"c","sans","bold" if style=="heading" else "normal",
+                    "italic" if style=="note" else "normal"))
+    xs,ys=[],[]
+    for op in ops:
+        kind=op[0]
+        if kind in("rect","oval"):
+            xs+=[op[1],op[3]]; ys+=[op[2],op[4]]
+        elif kind in("poly","line"):
+            xs+=op[1][0::2]; ys+=op[1][1::2]
+        else:
+            _,x,y,lines,pt=op[:5]; px=pt*4/3
+            half=max((len(l) for l in lines),default=0)*px*0.3; tall=len(lines)*px*1.2
+            xs+=[x-half,x+half]; ys+=[y-tall,y+tall] if op[6]=="s" else [y-tall/2,y+tall/2]
+    if not xs: return ops,(0,0,1,1)
+    return ops,(min(xs),min(ys),max(xs),max(ys))
+
+# ═══ SVG ══════════════════════════════════════════════════════════════════════
+
+def _esc(s):
+    return s.replace("&","&amp;").replace("<","&lt;").replace(">","&gt;").replace('"',"&quot;")
+
+
+def _svg_paint(fill,outline,width):
+    out=f'fill="{fill or "none"}"'
+    if outline and width: out+=f' stroke="{outline}" stroke-width="{width:g}"'
+    return out
+
+
+def render_svg(data,scale=1.0,margin=40):
+    """SVG text for a diagram dict: the whole diagram plus `margin`,
+    `scale` × its size in pixels."""
+    ops,(bx1,by1,bx2,by2)=diagram_ops(data)
+    ox,oy=margin-bx1,margin-by1
+    vw=bx2-bx1+2*margin; vh=by2-by1+2*margin
+    f=lambda v:f"{v:.1f}"
+    pts=lambda p:" ".join(f"{p[i]+ox:.1f},{p[i+1]+oy:.1f}" for i in range(0,len(p),2))
+    out=[f'<svg xmlns="http://www.w3.org/2000/svg" width="{vw*scale:.0f}" height="{vh*scale:.0f}" '
+         f'viewBox="0 0 {vw:.1f} {vh:.1f}">',
+         f'<rect width="100%" height="100%" fill="{BG}"/>']
+    for op in ops:
+        kind=op[0]
+        if kind=="rect":
+            _,x1,y1,x2,y2,fill,outline,width,r=op
+            rx=f' rx="{r:.1f}"' if r else ""
+            out.append(f'<rect x="{f(x1+ox)}" y="{f(y1+oy)}" width="{f(x2-x1)}" height="{f(y2-y1)}"{rx} '
+                       f'{_svg_paint(fill,outline,width)}/>')
+        elif kind=="oval":
+            _,x1,y1,x2,y2,fill,outline,width=op
+            out.append(f'<ellipse cx="{f((x1+x2)/2+ox)}" cy="{f((y1+y2)/2+oy)}" rx="{f((x2-x1)/2)}" '
+                       f'ry="{f((y2-y1)/2)}" {_svg_paint(fill,outline,width)}/>')
+        elif kind=="poly":
+            _,p,fill,outline,width=op
+            out.append(f'<polygon points="{pts(p)}" {_svg_paint(fill,outline,width)}/>')
+        elif kind=="line":
+            _,p,color,width,dash=op
+            d=f' stroke-dasharray="{dash[0]},{dash[1]}"' if dash else ""
+            out.append(f'<polyline points="{pts(p)}" fill="none" stroke="{color}" '
+                       f'stroke-width="{width:g}"{d}/>')
+        else:
+            _,x,y,lines,pt,color,anchor,family,weight,slant=op
+            px=pt*4/3; lh=px*1.2
+            top=y-len(lines)*lh if anchor=="s" else y-len(lines)*lh/2
+            fam="Consolas, monospace" if family=="mono" else "Segoe UI, sans-serif"
+            style=(f' font-weight="{weight}"' if weight!="normal" else "")+\
+                  (f' font-style="{slant}"' if slant!="normal" else "")
+            spans="".join(f'<tspan x="{f(x+ox)}" y="{f(top+(i+0.5)*lh+oy)}">{_esc(l)}</tspan>'
+                          for i,l in enumerate(lines))
+            out.append(f'<text text-anchor="middle" dominant-baseline="central" font-family="{fam}" '
+                       f'font-size="{px:.1f}"{style} fill="{color}">{spans}</text>')
+    out.append("</svg>")
+    return "\n".join(out)
+
+# ═══ PNG (Pillow) ═════════════════════════════════════════════════════════════
+
+_FONT_FILES = {
+    ("mono","normal"): ("DejaVuSansMono.ttf","consola.ttf","Menlo.ttc"),
+    ("mono","bold"):   ("DejaVuSansMono-Bold.ttf","consolab.ttf","Menlo.ttc"),
+    ("sans","normal"): ("DejaVuSans.ttf","segoeui.ttf","Arial.ttf"),
+    ("sans","bold"):   ("DejaVuSans-Bold.ttf","segoeuib.ttf","Arial Bold.ttf"),
+    ("sans","italic"): ("DejaVuSans-Oblique.ttf","segoeuii.ttf","Arial Italic.ttf"),
+}
+
+
+@lru_cache(maxsize=128)
+def _font(family,style,px):
+    from PIL import ImageFont
+    for name in _FONT_FILES.get((family,style),_FONT_FILES[(family,"normal")]):
+        try: return ImageFont.truetype(name,px)
+        except OSError: continue
+    try: return ImageFont.load_default(px)
+    except TypeError: return ImageFont.load_default()      # Pillow < 10.1
+
+
+def _dashed(p,dash):
+    """Split a polyline into its dash segments."""
+    on,off=dash; out=[]; left=on; drawing=True
+    for i in range(0,len(p)-2,2):
+        x1,y1,x2,y2=p[i],p[i+1],p[i+2],p[i+3]
+        seg=math.hypot(x2-x1,y2-y1); t=0.0
+        while seg>0 and t<seg:
+            step=min(left,seg-t); t2=t+step
+            if drawing:
+                out.append([x1+(x2-x1)*t/seg,y1+(y2-y1)*t/seg,x1+(x2-x1)*t2/seg,y1+(y2-y1)*t2/seg])
+            left-=step; t=t2
+            if left<=1e-9: drawing=not drawing; left=on if drawing else off
+    return out
+
+
+SUPERSAMPLE_MAX_PX = 48_000_000    # above this, draw at the output size
+
+
+def render_png(data,path,scale=1.0,margin=40,supersample=2):
+    """Write a diagram dict as PNG (`path`: file name or binary file) at
+    `scale` × its size.  Shapes are drawn `supersample` × larger and
+    box-filtered down, for smooth edges — unless that image would pass
+    SUPERSAMPLE_MAX_PX pixels.  Needs Pillow."""
+    from PIL import Image, ImageDraw
+    ops,(bx1,by1,bx2,by2)=diagram_ops(data)
+    ox,oy=margin-bx1,margin-by1
+    size=(max(1,round((bx2-bx1+2*margin)*scale)),max(1,round((by2-by1+2*margin)*scale)))
+    ss=max(1,int(supersample))
+    if size[0]*size[1]*ss*ss>SUPERSAMPLE_MAX_PX: ss=1
+    k=scale*ss
+    img=Image.new("RGB",(size[0]*ss,size[1]*ss),BG)
+    d=ImageDraw.Draw(img)
+    X=lambda v:(v+ox)*k; Y=lambda v:(v+oy)*k
+    P=lambda p:[(X(p[i]),Y(p[i+1])) for i in range(0,len(p),2)]
+    W=lambda w:max(1,round(w*k)) if w else 0
+    for op in ops:
+        kind=op[0]
+        if kind in("rect","oval"):
+            x1,y1,x2,y2,fill,outline,width=op[1:8]
+            box=[X(min(x1,x2)),Y(min(y1,y2)),X(max(x1,x2)),Y(max(y1,y2))]
+            paint=dict(fill=fill or None,outline=outline or None,width=W(width) if outline else 0)
+            if kind=="oval": d.ellipse(box,**paint)
+            elif op[8]: d.rounded_rectangle(box,radius=op[8]*k,**paint)
+            else: d.rectangle(box,**paint)
+        elif kind=="poly":
+            _,p,fill,outline,width=op
+            d.polygon(P(p),fill=fill or None,outline=outline or None,width=W(width) if outline else 0)
+        elif kind=="line":
+            _,p,color,width,dash=op
+            for seg in (_dashed(p,dash) if dash else [p]):
+                d.line(P(seg),fill=color,width=W(width),joint="curve")
+        else:
+            _,x,y,lines,pt,color,anchor,family,weight,slant=op
+            px=pt*4/3; lh=px*1.2
+            font=_font(family,"bold" if weight=="bold" else slant,max(1,round(px*k)))
+            top=y-len(lines)*lh if anchor=="s" else y-len(lines)*lh/2
+            for i,l in enumerate(lines):
+                if l: d.text((X(x),Y(top+(i+0.5)*lh)),l,fill=color,font=font,anchor="mm")
+    if ss>1: img=img.reduce(ss)
+    img.save(path,format="PNG",compress_level=3)
+
+# ═══ FILES / BATCH ════════════════════════════════════════════════════════════
+
+INPUT_SUFFIXES = (".json",".dsl")
+PARALLEL_MIN   = 4           # fewer inputs than this: render in-process
+
+
+def load_diagram(path):
+    """Diagram dict for a saved .json diagram or a .dsl file."""
+    text=Path(path).read_text(encoding="utf-8",errors="replace")
+    if str(path).endswith(".json"):
+        data=json.loads(text)
+        if not isinstance(data,dict) or "boxes" not in data:
+            raise ValueError("not a DiagramTool diagram (no 'boxes')")
+        return data
+    return dsl_to_diagram(text)
+
+
+def render_file(path,out_dir=None,formats=("svg",),scale=1.0):
+    """Render one input next to it (or into `out_dir`); the paths written."""
+    data=load_diagram(path)
+    src=Path(path); out=Path(out_dir) if out_dir else src.parent
+    out.mkdir(parents=True,exist_ok=True)
+    written=[]
+    for fmt in formats:
+        dest=out/f"{src.stem}.{fmt}"
+        if fmt=="svg": dest.write_text(render_svg(data,scale),encoding="utf-8")
+        elif fmt=="png": render_png(data,str(dest),scale)
+        else: raise ValueError(f"unknown format: {fmt}")
+        written.append(str(dest))
+    return written
+
+
+def _render_one(path,out_dir,formats,scale):
+    try:
+        return path,render_file(path,out_dir,formats,scale),None
+    except Exception as e:                      # reported per file, the batch goes on
+        return path,[],f"{type(e).__name__}: {e}"
+
+
+def _render_chunk(jobs,out_dir,formats,scale):
+    return [_render_one(p,out_dir,formats,scale) for p in jobs]
+
+
+def input_files(paths):
+    """The .json / .dsl files named by `paths` (directories are walked)."""
+    files=[]
+    for p in map(Path,paths):
+        if p.is_dir():
+            files+=sorted(str(f) for f in p.rglob("*") if f.suffix in INPUT_SUFFIXES and f.is_file())
+        else:
+            files.append(str(p))
+    return files
+
+
+def render_dir(paths,out_dir=None,formats=("svg",),scale=1.0,workers=None):
+    """
+    Render every input under `paths` — [(path, written paths, error or
+    None)] in input order.  `workers` caps the process pool (default: CPU
+    count; 1 = in-process).  Inputs of a directory keep their sub-path
+    under `out_dir`.
+    """
+    jobs=[]
+    for root in map(Path,paths):
+        for f in input_files([root]):
+            dest=out_dir
+            if out_dir and root.is_dir():
+                dest=str(Path(out_dir)/Path(f).parent.relative_to(root))
+            jobs.append((f,dest))
+    workers=workers or os.cpu_count() or 1
+    if len(jobs)<PARALLEL_MIN or workers==1:
+        return [_render_one(f,dest,formats,scale) for f,dest in jobs]
+    # a handful of chunks per worker: amortises start-up, keeps load balanced
+    groups={}
+    for f,dest in jobs: groups.setdefault(dest,[]).append(f)
+    size=max(1,len(jobs)//(workers*4)); tasks=[]
+    for dest,files in groups.items():
+        tasks+=[(files[i:i+size],dest) for i in range(0,len(files),size)]
+    results={}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures=[pool.submit(_render_chunk,chunk,dest,formats,scale) for chunk,dest in tasks]
+        for fut in futures:
+            for r in fut.result(): results[r[0]]=r
+    return [results[f] for f,_ in jobs]
+
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(description="Render DiagramTool .json / .dsl files to SVG / PNG without Tk")
+    ap.add_argument("inputs",nargs="+",help=".json / .dsl files or directories")
+    ap.add_argument("-o","--out",help="output directory (default: next to each input)")
+    ap.add_argument("-f","--format",default="svg",help="svg, png or svg,png (default svg)")
+    ap.add_argument("-s","--scale",type=float,default=1.0,help="pixels per diagram unit (default 1)")
+    ap.add_argument("-j","--jobs",type=int,default=None,help="worker processes (default: CPU count)")
+    args=ap.parse_args(argv)
+    formats=tuple(f.strip().lower() for f in args.format.split(",") if f.strip())
+    bad=[f for f in formats if f not in("svg","png")]
+    if bad: ap.error(f"unknown format: {', '.join(bad)}")
+    if "png" in formats:
+        try: import PIL  # noqa: F401
+        except ImportError: ap.error("PNG needs Pillow:  pip install Pillow")
+    results=render_dir(args.inputs,args.out,formats,args.scale,args.jobs)
+    failed=0
+    for path,written,err in results:
+        if err: failed+=1; print(f"✗ {path}: {err}",file=sys.stderr)
+        else: print(f"✓ {path} → {', '.join(written)}")
+    print(f"{len(results)-failed} rendered, {failed} failed")
+    return 1 if failed or not results else 0
+
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -11,7 +11,7 @@ FEATURES
   Canvas:  Box/Arrow/Text/Select/Pan modes
            12 shape palette, resize handles, snap-to-grid
            Multi-select (rubber-band + Shift+Click), group move
-           Copy/Paste (Ctrl+C/V), Undo (Ctrl+Z)
+           Copy/Paste (Ctrl+C/V), Undo / Redo (Ctrl+Z / Ctrl+Y)
            Orthogonal L-shaped arrows, Zoom + Pan
            Right-click context menu, Minimap
 
@@ -35,18 +35,26 @@ FEATURES
 
 import tkinter as tk
 from tkinter import ttk, filedialog, simpledialog, messagebox
-import json, math, os, re, ast, copy, sys
+import json, math, os, re, ast, copy, sys, time, hashlib, heapq, pickle, sqlite3, textwrap, threading, queue
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 # ═══ CODE LAYOUT ENGINE ══════════════════════════════════════════════════
 
 def auto_layout(class_names: list, cols: int = 4,
                 col_w: int = 280, row_h: int = 220,
-                start_x: int = 60, start_y: int = 80) -> dict:
+                start_x: int = 60, start_y: int = 80,
+                edges: list = None, sizes: dict = None) -> dict:
     """
     Returns {class_name: (x, y)} for each name.
     Grid layout with auto column count by total size.
+    Given `edges` ((src, dst) pairs) the layered layout is used instead;
+    `sizes` ({name: (w, h)}) lets it pack boxes of different sizes.
     """
+    if edges is not None:
+        return layered_layout(class_names, edges, sizes,
+                              start_x=start_x, start_y=start_y)
     n = len(class_names)
     if n == 0:
         return {}
@@ -67,6 +75,285 @@ def auto_layout(class_names: list, cols: int = 4,
 
     return positions
 
+
+def layered_layout(nodes: list, edges: list, sizes: dict = None,
+                   h_gap: int = 40, v_gap: int = 90,
+                   start_x: int = 60, start_y: int = 80,
+                   max_width: int = None, sweeps: int = 6) -> dict:
+    """
+    Returns {node: (x, y)} — a Sugiyama-style layered (top → bottom) layout.
+
+      1. cycle breaking     Eades' greedy ordering; edges against it are
+                            reversed (few of them, never a long chain)
+      2. layering           longest path from the sources, then sources are
+                            pulled down next to their highest successor
+      3. crossing reduction barycentric sweeps down / up over neighbours'
+                            relative positions; the best ordering is kept
+      4. coordinates        neighbours' mean x, packed left → right with
+                            `h_gap`; layers wider than `max_width` pixels
+                            are wrapped onto extra rows
+
+    `edges` are (src, dst) pairs (unknown names and self-loops ignored);
+    `sizes` maps node → (w, h), default 180 × 60.  Adjacency is indexed
+    once, so the cost is O((V + E) · sweeps · log V).
+    """
+    index = {}
+    for n in nodes:
+        index.setdefault(n, len(index))
+    names = list(index)
+    N = len(names)
+    if N == 0:
+        return {}
+    sizes = sizes or {}
+    W = [sizes.get(n, (180, 60))[0] for n in names]
+    H = [sizes.get(n, (180, 60))[1] for n in names]
+
+    succ = [[] for _ in range(N)]
+    seen = set()
+    for s, d in edges:
+        i, j = index.get(s), index.get(d)
+        if i is None or j is None or i == j or (i, j) in seen:
+            continue
+        seen.add((i, j))
+        succ[i].append(j)
+
+    # 1. cycle breaking (Eades greedy): peel sinks and sources, otherwise
+    #    take the node with the largest out − in; edges against that
+    #    sequence are reversed — few of them, and never a long chain
+    rev = [[] for _ in range(N)]
+    for v in range(N):
+        for w in succ[v]:
+            rev[w].append(v)
+    outd = [len(s) for s in succ]
+    ind  = [len(r) for r in rev]
+    gone = [False] * N
+    heads, tails = [], []
+    sinks   = [v for v in range(N) if outd[v] == 0]
+    sources = [v for v in range(N) if outd[v] and ind[v] == 0]
+    heap    = [(ind[v] - outd[v], v) for v in range(N)]
+    heapq.heapify(heap)
+    left = N
+
+    def remove(v):
+        gone[v] = True
+        for w in succ[v]:
+            if not gone[w]:
+                ind[w] -= 1
+                if ind[w] == 0 and outd[w]:
+                    sources.append(w)
+                heapq.heappush(heap, (ind[w] - outd[w], w))
+        for u in rev[v]:
+            if not gone[u]:
+                outd[u] -= 1
+                if outd[u] == 0:
+                    sinks.append(u)
+                heapq.heappush(heap, (ind[u] - outd[u], u))
+
+    while left:
+        if sinks:
+            v = sinks.pop()
+            if gone[v]: continue
+            tails.append(v)
+        elif sources:
+            v = sources.pop()
+            if gone[v]: continue
+            heads.append(v)
+        else:
+            key, v = heapq.heappop(heap)
+            if gone[v] or key != ind[v] - outd[v]: continue
+            heads.append(v)
+        remove(v)
+        left -= 1
+    seq = {v: i for i, v in enumerate(heads + tails[::-1])}
+    dag = [[] for _ in range(N)]
+    for v in range(N):
+        for w in succ[v]:
+            if seq[v] < seq[w]:
+                dag[v].append(w)
+            else:
+                dag[w].append(v)          # against the sequence → reversed
+    pred = [[] for _ in range(N)]
+    for v in range(N):
+        for w in dag[v]:
+            pred[w].append(v)
+
+    # 2. longest-path layering (Kahn order), then tighten the sources
+    indeg = [len(p) for p in pred]
+    order = [v for v in range(N) if indeg[v] == 0]
+    layer = [0] * N
+    for v in order:                       # `order` grows while we walk it
+        for w in dag[v]:
+            if layer[v] + 1 > layer[w]:
+                layer[w] = layer[v] + 1
+            indeg[w] -= 1
+            if indeg[w] == 0:
+                order.append(w)
+    for v in reversed(order):
+        if not pred[v] and dag[v]:
+            layer[v] = min(layer[w] for w in dag[v]) - 1
+    base = min(layer)
+    n_layers = max(layer) - base + 1
+    layers = [[] for _ in range(n_layers)]
+    for v in order:                       # topological order = first ordering
+        layer[v] -= base
+        layers[layer[v]].append(v)
+
+    # 3. crossing reduction
+    rank = [0.0] * N                      # relative position in own layer, 0..1
+    def set_ranks(lay):
+        k = len(lay)
+        for i, v in enumerate(lay):
+            rank[v] = (i + 0.5) / k
+    for lay in layers:
+        set_ranks(lay)
+
+    def sweep(seq, nbrs):
+        for li in seq:
+            lay = layers[li]
+            keyed = []
+            for v in lay:
+                ns = nbrs[v]
+                keyed.append((sum(rank[u] for u in ns) / len(ns) if ns else rank[v], rank[v], v))
+            keyed.sort()
+            layers[li] = lay = [v for _, _, v in keyed]
+            set_ranks(lay)
+
+    best, best_x = [lay[:] for lay in layers], _layer_crossings(layers, dag, layer)
+    for _ in range(sweeps):
+        sweep(range(1, n_layers), pred)
+        sweep(range(n_layers - 2, -1, -1), dag)
+        x = _layer_crossings(layers, dag, layer)
+        if x < best_x:
+            best, best_x = [lay[:] for lay in layers], x
+        elif x == best_x:
+            break
+    layers = best
+
+    # 4. coordinates: wrap wide layers into rows, then align with neighbours
+    if max_width is None:                 # about 3 : 2 for the whole diagram
+        area = sum((W[v] + h_gap) * (H[v] + v_gap) for v in range(N))
+        max_width = 2.0 * area ** 0.5
+    rows = []
+    for lay in layers:
+        if sum(W[v] + h_gap for v in lay) <= max_width:
+            rows.append(lay)
+            continue
+        # wrapped: nodes fed from above go in the first rows, nodes feeding
+        # the layer below in the last; each row keeps the swept order
+        at = {v: i for i, v in enumerate(lay)}
+        row, x = [], 0
+        for v in sorted(lay, key=lambda v: (len(dag[v]) - len(pred[v]), at[v])):
+            if row and x + W[v] > max_width:
+                rows.append(sorted(row, key=at.get))
+                row, x = [], 0
+            row.append(v)
+            x += W[v] + h_gap
+        rows.append(sorted(row, key=at.get))
+    xc = [0.0] * N                        # centre x
+    for row in rows:
+        x = 0.0
+        for v in row:
+            xc[v] = x + W[v] / 2
+            x += W[v] + h_gap
+    span = max(xc[row[-1]] + W[row[-1]] / 2 for row in rows)
+    for row in rows:                      # centre every row under the widest
+        shift = (span - (xc[row[-1]] + W[row[-1]] / 2)) / 2
+        for v in row:
+            xc[v] += shift
+    for nbrs, seq in ((pred, rows), (dag, rows[::-1]), (pred, rows)):
+        for row in seq:
+            want = [sum(xc[u] for u in nbrs[v]) / len(nbrs[v]) if nbrs[v] else xc[v]
+                    for v in row]
+            x_prev = None
+            for v, d in zip(row, want):   # keep order + gaps, as close as possible
+                lo = d - W[v] / 2
+                if x_prev is not None and lo < x_prev:
+                    lo = x_prev
+                xc[v] = lo + W[v] / 2
+                x_prev = lo + W[v] + h_gap
+            drift = sum(d - xc[v] for v, d in zip(row, want)) / len(row)
+            for v in row:
+                xc[v] += drift
+    left = min(xc[v] - W[v] / 2 for v in range(N))
+
+    positions = {}
+    y = start_y
+    for row in rows:
+        for v in row:
+            positions[names[v]] = (int(start_x + xc[v] - W[v] / 2 - left), y)
+        y += max(H[v] for v in row) + v_gap
+    return positions
+
+
+def _layer_crossings(layers, dag, layer) -> int:
+    """Crossings between consecutive layers (edges spanning one layer)."""
+    pos = {}
+    for lay in layers:
+        for i, v in enumerate(lay):
+            pos[v] = i
+    total = 0
+    for li in range(len(layers) - 1):
+        pairs = sorted((pos[v], pos[w]) for v in layers[li] for w in dag[v]
+                       if layer[w] == li + 1)
+        total += _inversions([b for _, b in pairs], len(layers[li + 1]))
+    return total
+
+
+def _inversions(seq: list, size: int) -> int:
+    """Pairs i < j with seq[i] > seq[j] (Fenwick tree, O(n log size))."""
+    tree = [0] * (size + 1)
+    count = 0
+    for i, b in enumerate(seq):
+        j = b + 1                         # how many seen so far are ≤ b
+        le = 0
+        while j > 0:
+            le += tree[j]
+            j -= j & -j
+        count += i - le
+        j = b + 1
+        while j <= size:
+            tree[j] += 1
+            j += j & -j
+    return count
+
+
+def count_crossings(positions: dict, edges: list, sizes: dict = None) -> int:
+    """
+    Quality metric for any layout: crossings between straight edges drawn
+    between the nodes' top-centre points.  Nodes are grouped into rows by y; every edge is cut
+    at each row gap it spans, and two straight edges cross exactly where
+    their order flips inside one gap — so per-gap inversions add up to
+    the exact count.  Edges within a single row are ignored.
+    """
+    sizes = sizes or {}
+    ys = sorted({p[1] for p in positions.values()})
+    row_of = {y: i for i, y in enumerate(ys)}
+    gaps = [[] for _ in ys]               # gap r: between row r and r + 1
+    for s, d in set(edges):
+        if s not in positions or d not in positions:
+            continue
+        (x1, y1), (x2, y2) = positions[s], positions[d]
+        r1, r2 = row_of[y1], row_of[y2]
+        if r1 == r2:
+            continue
+        if r1 > r2:
+            x1, y1, r1, x2, y2, r2 = x2, y2, r2, x1, y1, r1
+            s, d = d, s
+        x1 += sizes.get(s, (180, 60))[0] / 2
+        x2 += sizes.get(d, (180, 60))[0] / 2
+        dx = (x2 - x1) / (y2 - y1)
+        for r in range(r1, r2):
+            top, bottom = ys[r], ys[r + 1]
+            gaps[r].append((x1 + dx * (top - y1), x1 + dx * (bottom - y1)))
+    total = 0
+    for segs in gaps:
+        if len(segs) < 2:
+            continue
+        lower = {b: i for i, b in enumerate(sorted({b for _, b in segs}))}
+        segs.sort()
+        total += _inversions([lower[b] for _, b in segs], len(lower))
+    return total
+
 # ═══ PYTHON / JAVA CODE ANALYSER ════════════════════════════════════════
 
 # ── Colour mapping by role ───────────────────────────────────────────────────
@@ -76,6 +363,7 @@ COLOR_INTERFACE = "Teal"
 COLOR_ENUM      = "Orange"
 COLOR_EXTERNAL  = "Gray"    # stdlib / third-party libraries
 COLOR_UNKNOWN   = "Gray"
+EXTERNAL_GROUP  = "(libraries)"   # the box "group" of every library box
 
 # ── Arrow styles for each relationship ──────────────────────────────────────
 REL_STYLES = {
@@ -138,49 +426,52 @@ class PythonAnalyzer:
     def __init__(self):
         self.classes   = {}   # name -> ClassInfo dict
         self.imports   = {}   # alias -> (full_module, is_external)
+        self.groups    = {}   # name -> dotted module path (source_group)
         self.local_files = set()
 
     # ── Public entry ─────────────────────────────────────────────────────────
 
-    def analyze_path(self, path: str):
-        p = Path(path)
-        if p.is_file() and p.suffix == ".py":
-            self._analyze_file(p)
-        elif p.is_dir():
-            for f in sorted(p.rglob("*.py")):
-                self._analyze_file(f)
-        return self._build_diagram()
+    def analyze_path(self, path: str, workers: int = None, cache: bool = True,
+                     layout: bool = True):
+        _merge_path(self, path, "py", workers, cache)
+        return self._build_diagram(layout)
 
     # ── File level ───────────────────────────────────────────────────────────
 
     def _analyze_file(self, path: Path):
+        self._merge(self._extract(path.read_text(encoding="utf-8", errors="replace"), path))
+
+    def _merge(self, frag, group: str = ""):
+        if frag is None:            # syntax error: file skipped
+            return
+        self.local_files.add(frag["module"])
+        self.imports.update(frag["imports"])
+        self.classes.update(frag["classes"])
+        self.groups.update(dict.fromkeys(frag["classes"], group))
+
+    def _extract(self, src: str, path: Path):
+        """Imports and classes of one file, in a single AST walk (picklable)."""
         try:
-            src = path.read_text(encoding="utf-8", errors="replace")
             tree = ast.parse(src, filename=str(path))
         except SyntaxError:
-            return
+            return None
 
-        # Collect local module names (filename stems)
-        self.local_files.add(path.stem)
-
-        # Collect imports
+        imports, classes = {}, {}
         for node in ast.walk(tree):
             if isinstance(node, ast.Import):
                 for alias in node.names:
                     name = alias.asname or alias.name.split(".")[0]
                     ext  = _is_external_python(alias.name)
-                    self.imports[name] = (alias.name, ext)
+                    imports[name] = (alias.name, ext)
             elif isinstance(node, ast.ImportFrom):
                 mod = node.module or ""
                 ext = _is_external_python(mod)
                 for alias in node.names:
                     name = alias.asname or alias.name
-                    self.imports[name] = (f"{mod}.{alias.name}", ext)
-
-        # Collect classes
-        for node in ast.walk(tree):
-            if isinstance(node, ast.ClassDef):
-                self._analyze_class(node, path.stem)
+                    imports[name] = (f"{mod}.{alias.name}", ext)
+            elif isinstance(node, ast.ClassDef):
+                classes[node.name] = self._analyze_class(node, path.stem)
+        return dict(module=path.stem, imports=imports, classes=classes)
 
     def _analyze_class(self, node: ast.ClassDef, module: str):
         info = {
@@ -222,7 +513,7 @@ class PythonAnalyzer:
                     info["fields"].append((fname, ftype))
                     self._classify_field_rel(fname, ftype, info)
 
-        self.classes[node.name] = info
+        return info
 
     def _analyze_method(self, node: ast.FunctionDef, info: dict):
         params = []
@@ -324,8 +615,11 @@ class PythonAnalyzer:
 
     # ── Build diagram dict ────────────────────────────────────────────────────
 
-    def _build_diagram(self):
-
+    def _build_diagram(self, layout: bool = True):
+        """Diagram dict; every box carries a "key" (class name, or "lib:"
+        + label) that stays the same across runs and a "group" (the dotted
+        module path, EXTERNAL_GROUP for libraries).  layout=False leaves the
+        boxes at (0, 0) — for callers that place them themselves."""
         boxes, arrows, floattexts = [], [], []
         box_id = {}   # class_name -> box id
 
@@ -333,9 +627,10 @@ class PythonAnalyzer:
         _aid = [0]
         _tid = [0]
 
-        def new_box(x,y,w,h,label,color,shape="rect"):
+        def new_box(x,y,w,h,label,color,shape="rect",key=None,group=""):
             _bid[0]+=1
-            b=dict(id=_bid[0],x=x,y=y,w=w,h=h,label=label,color=color,shape=shape)
+            b=dict(id=_bid[0],x=x,y=y,w=w,h=h,label=label,color=color,shape=shape,
+                   key=key,group=group)
             boxes.append(b); return b
 
         def new_arrow(sid,did,label,ls,hs):
@@ -347,13 +642,9 @@ class PythonAnalyzer:
             _tid[0]+=1
             floattexts.append(dict(id=_tid[0],x=x,y=y,text=text,style=style))
 
-        # Collect external libraries referenced
-        external_libs = {}  # lib_name -> box_id
-
-        # Place class boxes
-        positions = auto_layout(list(self.classes.keys()))
-        for cname, (cx, cy) in positions.items():
-            info  = self.classes[cname]
+        # Class labels first: the layout needs their sizes
+        labels = {}   # class_name -> (label, w, h, color)
+        for cname, info in self.classes.items():
             kind  = info["kind"]
             color = {"class":COLOR_CLASS,"abstract":COLOR_ABSTRACT,
                      "interface":COLOR_INTERFACE,"enum":COLOR_ENUM}.get(kind, COLOR_CLASS)
@@ -375,48 +666,48 @@ class PythonAnalyzer:
 
             w = max(180, 12*max((len(l) for l in label.split("\n")), default=10))
             h = max(60,  18*len(label.split("\n")))
-            b = new_box(cx, cy, w, h, label, color)
-            box_id[cname] = b["id"]
+            labels[cname] = (label, w, h, color)
 
-        # Arrows
-        seen_rels = set()
+        # Relation targets: a local class, else an external library / unknown box
+        links = []    # (class_name, target node, rel, label)
         for cname, info in self.classes.items():
-            src_id = box_id.get(cname)
-            if not src_id: continue
-
             for (rel, target, lbl) in info["relations"]:
-                ls, hs = REL_STYLES.get(rel, ("solid","open"))
-
-                if target in box_id:
-                    key = (src_id, box_id[target], rel)
-                    if key in seen_rels: continue
-                    seen_rels.add(key)
-                    new_arrow(src_id, box_id[target], lbl, ls, hs)
-
+                if target in self.classes:
+                    links.append((cname, target, rel, lbl))
+                    continue
+                # Check if it came from an import
+                import_info = self.imports.get(target)
+                if import_info:
+                    full_mod, is_ext = import_info
+                    lib_label = target if is_ext else full_mod
                 else:
-                    # External library or unknown
-                    # Check if it came from an import
-                    import_info = self.imports.get(target)
-                    if import_info:
-                        full_mod, is_ext = import_info
-                        lib_label = target if is_ext else full_mod
-                    else:
-                        lib_label = target
-                        is_ext    = False
-
-                    if lib_label not in external_libs:
-                        # Place external box off to the right
-                        ex = 900 + len(external_libs)*10
-                        ey = 80  + len(external_libs)*90
-                        color = COLOR_EXTERNAL
-                        shape = "rect"
-                        eb = new_box(ex, ey, 160, 50, lib_label, color, shape)
-                        external_libs[lib_label] = eb["id"]
-
-                    key = (src_id, external_libs[lib_label], rel)
-                    if key in seen_rels: continue
-                    seen_rels.add(key)
-                    new_arrow(src_id, external_libs[lib_label], lbl, ls, hs)
+                    lib_label = target
+                links.append((cname, ("lib", lib_label), rel, lbl))
+        external_libs = list(dict.fromkeys(t for _, t, _, _ in links if isinstance(t, tuple)))
+
+        # Classes and libraries are laid out together, layered along the relations
+        sizes = {c: (w, h) for c, (_, w, h, _) in labels.items()}
+        sizes.update((lib, (160, 50)) for lib in external_libs)
+        positions = auto_layout(list(self.classes) + external_libs, sizes=sizes,
+                                edges=[(src, dst) for src, dst, _, _ in links]) if layout else {}
+        for cname, (label, w, h, color) in labels.items():
+            cx, cy = positions.get(cname, (0, 0))
+            b = new_box(cx, cy, w, h, label, color, key=cname, group=self.groups.get(cname, ""))
+            box_id[cname] = b["id"]
+        for lib in external_libs:
+            ex, ey = positions.get(lib, (0, 0))
+            eb = new_box(ex, ey, 160, 50, lib[1], COLOR_EXTERNAL, "rect", key="lib:" + lib[1],
+                         group=EXTERNAL_GROUP)
+            box_id[lib] = eb["id"]
+
+        # Arrows
+        seen_rels = set()
+        for (cname, target, rel, lbl) in links:
+            ls, hs = REL_STYLES.get(rel, ("solid","open"))
+            key = (box_id[cname], box_id[target], rel)
+            if key in seen_rels: continue
+            seen_rels.add(key)
+            new_arrow(box_id[cname], box_id[target], lbl, ls, hs)
 
         new_text(400, 20,
                  f"Code Analysis — Python  ({len(self.classes)} classes, "
@@ -428,30 +719,357 @@ class PythonAnalyzer:
         return dict(boxes=boxes, arrows=arrows, floattexts=floattexts)
 
 
+# ═════════════════════════════════════════════════════════════════════════════
+# JAVA LEXER
+# ═════════════════════════════════════════════════════════════════════════════
+# One left-to-right pass: a single master regex turns the source into tokens
+# (strings, text blocks, char literals and comments never reach the parser,
+# so their braces can't confuse it), then a small recursive-descent parser
+# walks the tokens once, building every type — nested ones included — with
+# its own fields, methods and constructors.  Bodies are skipped by token
+# depth, so the whole file costs O(tokens).
+
+_JAVA_TOKEN = re.compile(r'''
+    (?P<ws>\s+)
+  | (?P<comment>//[^\n]*|/\*.*?(?:\*/|\Z))
+  | (?P<str>"""(?:[^"\\]|\\.|"(?!""))*(?:"""|\Z)
+          |"(?:[^"\\\n]|\\.)*"?
+          |'(?:[^'\\\n]|\\.)*'?)
+  | (?P<id>[A-Za-z_$][\w$]*)
+  | (?P<num>\d[\w.]*)
+  | (?P<op>\.\.\.|.)
+''', re.S | re.X)
+
+JAVA_TYPE_KEYWORDS = {"class", "interface", "enum", "record"}
+JAVA_MODIFIERS = {
+    "public", "protected", "private", "static", "final", "abstract", "native",
+    "synchronized", "transient", "volatile", "strictfp", "default", "sealed",
+}
+_EOF = ("eof", "", -1, -1)
+
+
+def java_tokens(src: str) -> list:
+    """[(kind, text, start, end)] with whitespace and comments dropped."""
+    return [(m.lastgroup, m.group(), m.start(), m.end())
+            for m in _JAVA_TOKEN.finditer(src)
+            if m.lastgroup != "ws" and m.lastgroup != "comment"]
+
+
+class _JavaParser:
+
+    def __init__(self, src: str):
+        self.src   = src
+        self.toks  = java_tokens(src)
+        self.n     = len(self.toks)
+        self.i     = 0
+        self.unit  = dict(package="", imports=[], types=[])
+
+    # ── Token helpers ────────────────────────────────────────────────────────
+
+    def _tok(self, k=0):
+        j = self.i + k
+        return self.toks[j] if j < self.n else _EOF
+
+    def _is(self, text, k=0):
+        t = self._tok(k)
+        return t[1] == text and t[0] != "str"
+
+    def _skip_balanced(self, open_, close):
+        """At `open_`: skip past its matching `close` (token depth, not chars)."""
+        depth = 0
+        while self.i < self.n:
+            kind, text = self.toks[self.i][:2]
+            self.i += 1
+            if kind == "op":
+                if text == open_:
+                    depth += 1
+                elif text == close:
+                    depth -= 1
+                    if depth == 0:
+                        return
+
+    def _skip_statement(self):
+        """Up to and including the next top-level ';' or block; stops before '}'."""
+        while self.i < self.n:
+            kind, text = self.toks[self.i][:2]
+            if kind == "op":
+                if text == ";":
+                    self.i += 1; return
+                if text == "{":
+                    self._skip_balanced("{", "}"); return
+                if text == "}":
+                    return
+                if text == "(":
+                    self._skip_balanced("(", ")"); continue
+            self.i += 1
+
+    # ── Grammar (the parts a class diagram needs) ────────────────────────────
+
+    def parse(self) -> dict:
+        while self.i < self.n:
+            if self._is("package"):
+                self.i += 1
+                self.unit["package"] = self._qualified()
+                self._skip_statement()
+            elif self._is("import"):
+                self.i += 1
+                static = self._is("static")
+                if static:
+                    self.i += 1
+                self.unit["imports"].append((self._qualified(), static))
+                self._skip_statement()
+            elif self._is("}") or self._is(";"):
+                self.i += 1
+            else:
+                self._declaration(None)
+        return self.unit
+
+    def _qualified(self) -> str:
+        """a.b.C / a.b.* — stops at the first token that can't continue the name."""
+        parts = []
+        while self._tok()[0] == "id" or self._is("*"):
+            parts.append(self._tok()[1])
+            self.i += 1
+            if not self._is("."):
+                break
+            parts.append(".")
+            self.i += 1
+        return "".join(parts)
+
+    def _modifiers(self):
+        annotations, modifiers = [], []
+        while self.i < self.n:
+            kind, text, start, _ = self._tok()
+            if text == "@" and kind == "op" and not self._is("interface", 1):
+                self.i += 1
+                name = self._qualified().split(".")[-1]
+                if self._is("("):
+                    self._skip_balanced("(", ")")
+                annotations.append((name, self.src[start:self.toks[self.i - 1][3]]))
+            elif kind == "id" and text in JAVA_MODIFIERS:
+                modifiers.append(text)
+                self.i += 1
+            elif text == "non" and self._is("-", 1) and self._is("sealed", 2):
+                modifiers.append("non-sealed")
+                self.i += 3
+            else:
+                break
+        return annotations, modifiers
+
+    def _type(self):
+        """A type reference as normalised text (List<Order>, int[], T...), or None."""
+        if self._tok()[0] != "id":
+            return None
+        parts = [self._tok()[1]]
+        self.i += 1
+        while True:
+            if self._is(".") and self._tok(1)[0] == "id":
+                parts.append("." + self._tok(1)[1])
+                self.i += 2
+            elif self._is("<"):
+                parts.append(self._type_args())
+            elif self._is("@"):                 # type-use annotation: List<@NonNull X>
+                self._modifiers()
+            else:
+                break
+        while self._is("[") and self._is("]", 1):
+            parts.append("[]")
+            self.i += 2
+        if self._is("..."):
+            parts.append("...")
+            self.i += 1
+        return "".join(parts)
+
+    def _type_args(self) -> str:
+        self.i += 1                             # '<'
+        args = []
+        while self.i < self.n and not self._is(">"):
+            if self._is("?"):
+                self.i += 1
+                arg = "?"
+                if self._is("extends") or self._is("super"):
+                    bound = self._tok()[1]
+                    self.i += 1
+                    arg += f" {bound} {self._type() or ''}"
+            else:
+                self._modifiers()
+                arg = self._type()
+                if arg is None:
+                    self.i += 1
+                    continue
+            args.append(arg)
+            if self._is(","):
+                self.i += 1
+        self.i += 1                             # '>'
+        return "<" + ", ".join(args) + ">"
+
+    def _type_list(self) -> list:
+        types = []
+        while True:
+            t = self._type()
+            if t is None:
+                return types
+            types.append(t)
+            if not self._is(","):
+                return types
+            self.i += 1
+
+    def _params(self) -> list:
+        """At '(': [(name, type, [annotation names])]."""
+        self.i += 1
+        params = []
+        while self.i < self.n and not self._is(")"):
+            annotations, _ = self._modifiers()
+            ptype = self._type()
+            if ptype is None or self._tok()[0] != "id":
+                self.i += 1
+                continue
+            pname = self._tok()[1]
+            self.i += 1
+            while self._is("[") and self._is("]", 1):
+                ptype += "[]"
+                self.i += 2
+            params.append((pname, ptype, [a[0] for a in annotations]))
+            if self._is(","):
+                self.i += 1
+        self.i += 1                             # ')'
+        return params
+
+    def _declaration(self, owner):
+        start = self._tok()[2]
+        annotations, modifiers = self._modifiers()
+        kind = self._tok()[1]
+        if self._is("@") and self._is("interface", 1):
+            self.i += 2
+            return self._type_decl("@interface", annotations, modifiers, start, owner)
+        if (kind in JAVA_TYPE_KEYWORDS and self._tok()[0] == "id" and self._tok(1)[0] == "id"
+                and (kind != "record" or self._is("(", 2) or self._is("<", 2))):
+            self.i += 1
+            return self._type_decl(kind, annotations, modifiers, start, owner)
+        if owner is None:
+            return self._skip_statement()
+        if self._is("{"):                       # (static) initializer block
+            return self._skip_balanced("{", "}")
+        if self._is("<"):                       # generic method: <T> T foo()
+            self._skip_balanced("<", ">")
+
+        if self._tok()[1] == owner["name"] and (self._is("(", 1) or self._is("{", 1)):
+            self.i += 1                         # constructor (or compact record ctor)
+            params = self._params() if self._is("(") else []
+            owner["ctors"].append(dict(params=params, annotations=annotations,
+                                       modifiers=modifiers))
+            return self._skip_statement()
+
+        ftype = self._type()
+        if ftype is None or self._tok()[0] != "id":
+            return self._skip_statement()
+        name = self._tok()[1]
+        self.i += 1
+        if self._is("("):
+            owner["methods"].append(dict(name=name, ret=ftype, params=self._params(),
+                                         annotations=annotations, modifiers=modifiers))
+            return self._skip_statement()       # throws …, body or ';'
+
+        while True:                             # one or more declarators
+            dims = ""
+            while self._is("[") and self._is("]", 1):
+                dims += "[]"
+                self.i += 2
+            owner["fields"].append(dict(name=name, type=ftype + dims,
+                                        annotations=annotations, modifiers=modifiers))
+            # skip the initializer up to ';' or the next declarator at depth 0
+            while self.i < self.n:
+                kind, text = self.toks[self.i][:2]
+                if kind == "op":
+                    if text in ";}":
+                        break
+                    # `int a, b;` — not the ',' inside new Map<K, V>()
+                    if text == "," and self._tok(1)[0] == "id" and self._tok(2)[1] in ("=", ",", ";", "["):
+                        break
+                    if text in "({[":
+                        self._skip_balanced(text, {"(": ")", "{": "}", "[": "]"}[text])
+                        continue
+                self.i += 1
+            if self._is(","):
+                name = self._tok(1)[1]
+                self.i += 2
+                continue
+            if self._is(";"):
+                self.i += 1
+            return
+
+    def _type_decl(self, kind, annotations, modifiers, start, owner):
+        decl = dict(name=self._tok()[1], kind=kind, annotations=annotations,
+                    modifiers=modifiers, extends=[], implements=[], fields=[],
+                    methods=[], ctors=[], outer=owner["name"] if owner else None)
+        self.unit["types"].append(decl)
+        self.i += 1
+        if self._is("<"):
+            self._skip_balanced("<", ">")
+        if kind == "record" and self._is("("):
+            decl["fields"] = [dict(name=n, type=t, annotations=[(a, "@" + a) for a in an],
+                                   modifiers=["private", "final"])
+                              for n, t, an in self._params()]
+        while self.i < self.n and not self._is("{"):
+            if self._is("extends"):
+                self.i += 1
+                decl["extends"] = self._type_list()
+            elif self._is("implements"):
+                self.i += 1
+                decl["implements"] = self._type_list()
+            else:                               # permits …, stray tokens
+                self.i += 1
+        decl["header"] = self.src[start:self._tok()[2]] if self.i < self.n else self.src[start:]
+        self.i += 1                             # '{'
+        if kind == "enum":
+            self._enum_constants()
+        while self.i < self.n and not self._is("}"):
+            if self._is(";"):
+                self.i += 1
+            else:
+                self._declaration(decl)
+        self.i += 1                             # '}'
+
+    def _enum_constants(self):
+        while self.i < self.n:
+            self._modifiers()
+            if self._tok()[0] == "id":
+                self.i += 1
+                if self._is("("):
+                    self._skip_balanced("(", ")")
+                if self._is("{"):
+                    self._skip_balanced("{", "}")
+            if self._is(","):
+                self.i += 1
+            elif self._is(";"):
+                self.i += 1; return
+            elif self._is("}"):
+                return
+            elif self._tok()[0] != "id":
+                self.i += 1
+
+
+def parse_java(src: str) -> dict:
+    """
+    {package, imports: [(name, static)], types: [...]} for one source file.
+    Each type: name, kind (class|interface|enum|record|@interface), outer,
+    annotations [(name, source text)], modifiers, extends, implements,
+    header (declaration text up to its '{'), fields [{name, type,
+    annotations, modifiers}], methods [{name, ret, params, annotations,
+    modifiers}], ctors [{params, annotations, modifiers}];
+    params are [(name, type, [annotation names])].
+    """
+    return _JavaParser(src).parse()
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # JAVA ANALYSER
 # ═════════════════════════════════════════════════════════════════════════════
 
 class JavaAnalyzer:
-    """Parse .java files with regex (no external parser needed)."""
-
-    # Patterns
-    _P_IMPORT  = re.compile(r"^\s*import\s+(static\s+)?([^\s;]+);", re.M)
-    _P_CLASS   = re.compile(
-        r"(?:public\s+|private\s+|protected\s+|abstract\s+|final\s+)*"
-        r"(class|interface|enum|@interface)\s+(\w+)"
-        r"(?:\s*<[^>]*>)?"                           # generics
-        r"(?:\s+extends\s+([\w,\s<>]+?))??"
-        r"(?:\s+implements\s+([\w,\s<>]+?))?"
-        r"\s*\{", re.M)
-    _P_FIELD   = re.compile(
-        r"^\s*(?:private|protected|public)?\s*(?:final\s+|static\s+)*"
-        r"([\w<>\[\],\s]+?)\s+(\w+)\s*(?:=|;)", re.M)
-    _P_METHOD  = re.compile(
-        r"^\s*(?:public|private|protected|abstract|static|final|synchronized|@Override\s+)*\s+"
-        r"(?:<[^>]*>\s+)?([\w<>\[\],\s]+?)\s+(\w+)\s*\(([^)]*)\)", re.M)
-    _P_ANNOT   = re.compile(r"@(\w+)")
-    _P_INJECT  = re.compile(r"@(?:Autowired|Inject|Resource|Value)")
+    """Parse .java files with the single-pass lexer above (no external parser needed)."""
+
+    _P_INJECT  = {"Autowired", "Inject", "Resource", "Value"}
     _PRIMITIVES= {"void","int","long","double","float","boolean","char","byte",
                   "short","String","Integer","Long","Double","Float","Boolean",
                   "Object","Number","Comparable","Serializable","Iterable",
@@ -462,47 +1080,43 @@ class JavaAnalyzer:
     def __init__(self):
         self.classes = {}
         self.imports = {}
+        self.groups  = {}     # name -> dotted folder (source_group)
 
-    def analyze_path(self, path: str):
-        p = Path(path)
-        if p.is_file() and p.suffix == ".java":
-            self._analyze_file(p)
-        elif p.is_dir():
-            for f in sorted(p.rglob("*.java")):
-                self._analyze_file(f)
-        return self._build_diagram()
+    def analyze_path(self, path: str, workers: int = None, cache: bool = True,
+                     layout: bool = True):
+        _merge_path(self, path, "java", workers, cache)
+        return self._build_diagram(layout)
 
     def _analyze_file(self, path: Path):
         try:
             src = path.read_text(encoding="utf-8", errors="replace")
         except Exception:
             return
+        self._merge(self._extract(src, path))
+
+    def _merge(self, frag, group: str = ""):
+        if frag is None:
+            return
+        self.imports.update(frag["imports"])
+        self.classes.update(frag["classes"])
+        self.groups.update(dict.fromkeys(frag["classes"], group))
+
+    def _extract(self, src: str, path: Path):
+        """Imports and classes of one file (picklable)."""
+        unit = parse_java(src)
+        imports, classes = {}, {}
 
         # Imports
-        file_imports = {}
-        for m in self._P_IMPORT.finditer(src):
-            full = m.group(2).strip()
+        for full, _static in unit["imports"]:
             simple = full.split(".")[-1]
-            ext = _is_external_java(full)
-            file_imports[simple] = (full, ext)
-            self.imports[simple] = (full, ext)
-
-        # Classes
-        for m in self._P_CLASS.finditer(src):
-            kind_kw = m.group(1)   # class|interface|enum|@interface
-            cname   = m.group(2)
-            extends = [x.strip().split("<")[0]
-                       for x in (m.group(3) or "").split(",") if x.strip()]
-            implements = [x.strip().split("<")[0]
-                          for x in (m.group(4) or "").split(",") if x.strip()]
+            imports[simple] = (full, _is_external_java(full))
 
+        # Classes (nested ones too, each with only its own members)
+        for decl in unit["types"]:
+            cname = decl["name"]
             kind = {"interface":"interface","enum":"enum",
-                    "@interface":"interface"}.get(kind_kw,"class")
-
-            # Try to detect abstract
-            start = max(0, m.start()-80)
-            preceding = src[start:m.start()]
-            if "abstract" in preceding:
+                    "@interface":"interface"}.get(decl["kind"],"class")
+            if kind == "class" and "abstract" in decl["modifiers"]:
                 kind = "abstract"
 
             info = {
@@ -513,103 +1127,69 @@ class JavaAnalyzer:
                 "relations": [],
             }
 
-            # Extends → inherits
-            for base in extends:
-                if base:
-                    info["relations"].append(("inherits", base, ""))
+            # Extends → inherits  (an interface's extends list included)
+            for base in decl["extends"]:
+                info["relations"].append(("inherits", base.split("<")[0], ""))
 
             # Implements → implements
-            for iface in implements:
-                if iface:
-                    info["relations"].append(("implements", iface, ""))
-
-            # Get class body (heuristic: find matching brace)
-            body = self._extract_body(src, m.end()-1)
+            for iface in decl["implements"]:
+                info["relations"].append(("implements", iface.split("<")[0], ""))
 
             # Fields
-            for fm in self._P_FIELD.finditer(body):
-                ftype = fm.group(1).strip()
-                fname = fm.group(2).strip()
-                if fname in ("class","return","new","if","for","while",
-                             "else","throw","catch"): continue
+            for field in decl["fields"]:
+                ftype = field["type"]
+                fname = field["name"]
                 info["fields"].append((fname, ftype))
 
                 # Determine relationship type from field type
-                col_m = re.match(r"(\w+)\s*<\s*([\w<>]+)", ftype)
+                col_m = re.match(r"(\w+)\s*<\s*(\w+)", ftype)
                 if col_m:
                     container = col_m.group(1)
-                    inner     = col_m.group(2).split("<")[0]
+                    inner     = col_m.group(2)
                     if container in self._COLLECT and inner not in self._PRIMITIVES:
                         info["relations"].append(("aggregates", inner, "0..*"))
                 else:
                     clean = ftype.split("<")[0].strip().split("[")[0].strip()
                     if clean and clean not in self._PRIMITIVES and clean[0].isupper():
-                        # Check if @Autowired / @Inject precedes field
-                        fpos = src.find(ftype, m.end())
-                        pre  = src[max(0,fpos-100):fpos]
-                        if self._P_INJECT.search(pre):
+                        # @Autowired / @Inject on the field → DI
+                        if any(a[0] in self._P_INJECT for a in field["annotations"]):
                             info["relations"].append(("injects", clean, "«inject»"))
                         else:
                             info["relations"].append(("composes", clean, ""))
 
             # Methods
-            for mm in self._P_METHOD.finditer(body):
-                ret    = mm.group(1).strip()
-                mname  = mm.group(2).strip()
-                params = mm.group(3).strip()
-                if mname in ("if","while","for","catch","switch"): continue
+            for method in decl["methods"]:
                 param_list = []
-                if params:
-                    for p in params.split(","):
-                        parts = p.strip().split()
-                        if len(parts)>=2:
-                            ptype = parts[-2].split("<")[0]
-                            pname = parts[-1]
-                            param_list.append((pname, ptype))
-                            if (ptype not in self._PRIMITIVES and
-                                    ptype[0:1].isupper()):
-                                info["relations"].append(("depends", ptype, ""))
-                info["methods"].append((mname, param_list, ret))
+                for pname, ptype, _annots in method["params"]:
+                    ptype = ptype.split("<")[0]
+                    param_list.append((pname, ptype))
+                    base = ptype.rstrip(".[]")
+                    if base not in self._PRIMITIVES and base[0:1].isupper():
+                        info["relations"].append(("depends", base, ""))
+                info["methods"].append((method["name"], param_list, method["ret"]))
 
             # Constructor injection detection
-            ctor_pattern = re.compile(
-                rf"(?:public|protected)\s+{re.escape(cname)}\s*\(([^)]*)\)", re.M)
-            for cm in ctor_pattern.finditer(body):
-                params_raw = cm.group(1)
-                for p in params_raw.split(","):
-                    parts = p.strip().split()
-                    if len(parts)>=2:
-                        ptype = parts[-2].split("<")[0]
-                        if (ptype not in self._PRIMITIVES and
-                                ptype[0:1].isupper()):
-                            info["relations"].append(("injects", ptype, "«inject»"))
+            for ctor in decl["ctors"]:
+                for _pname, ptype, _annots in ctor["params"]:
+                    ptype = ptype.split("<")[0].rstrip(".[]")
+                    if ptype not in self._PRIMITIVES and ptype[0:1].isupper():
+                        info["relations"].append(("injects", ptype, "«inject»"))
 
-            self.classes[cname] = info
+            classes[cname] = info
 
-    def _extract_body(self, src: str, start: int) -> str:
-        """Extract content between matching braces starting at `start`."""
-        depth=0; i=start
-        begin=-1
-        while i < len(src):
-            if src[i]=="{":
-                depth+=1
-                if begin==-1: begin=i
-            elif src[i]=="}":
-                depth-=1
-                if depth==0:
-                    return src[begin+1:i]
-            i+=1
-        return src[begin+1:] if begin>=0 else ""
-
-    def _build_diagram(self):
+        return dict(imports=imports, classes=classes)
+
+    def _build_diagram(self, layout: bool = True):
+        """Diagram dict with box "key"s, as PythonAnalyzer._build_diagram."""
         boxes, arrows, floattexts = [], [], []
         box_id = {}
 
         _bid=[0]; _aid=[0]; _tid=[0]
 
-        def new_box(x,y,w,h,label,color,shape="rect"):
+        def new_box(x,y,w,h,label,color,shape="rect",key=None,group=""):
             _bid[0]+=1
-            b=dict(id=_bid[0],x=x,y=y,w=w,h=h,label=label,color=color,shape=shape)
+            b=dict(id=_bid[0],x=x,y=y,w=w,h=h,label=label,color=color,shape=shape,
+                   key=key,group=group)
             boxes.append(b); return b
 
         def new_arrow(sid,did,label,ls,hs):
@@ -621,11 +1201,8 @@ class JavaAnalyzer:
             _tid[0]+=1
             floattexts.append(dict(id=_tid[0],x=x,y=y,text=text,style=style))
 
-        external_libs = {}
-        positions = auto_layout(list(self.classes.keys()))
-
-        for cname,(cx,cy) in positions.items():
-            info  = self.classes[cname]
+        labels = {}
+        for cname,info in self.classes.items():
             kind  = info["kind"]
             color = {"class":COLOR_CLASS,"abstract":COLOR_ABSTRACT,
                      "interface":COLOR_INTERFACE,"enum":COLOR_ENUM}.get(kind,COLOR_CLASS)
@@ -643,35 +1220,34 @@ class JavaAnalyzer:
 
             w=max(190,11*max((len(l) for l in label.split("\n")),default=10))
             h=max(60, 17*len(label.split("\n")))
-            b=new_box(cx,cy,w,h,label,color)
+            labels[cname]=(label,w,h,color)
+
+        # unknown targets (libraries, JDK types) get one box each
+        links=[(cname, target if target in self.classes else ("lib",target), rel, lbl)
+               for cname,info in self.classes.items()
+               for (rel,target,lbl) in info["relations"]]
+        external_libs=list(dict.fromkeys(t for _,t,_,_ in links if isinstance(t,tuple)))
+
+        sizes={c:(w,h) for c,(_,w,h,_) in labels.items()}
+        sizes.update((lib,(160,50)) for lib in external_libs)
+        positions=auto_layout(list(self.classes)+external_libs, sizes=sizes,
+                              edges=[(src,dst) for src,dst,_,_ in links]) if layout else {}
+        for cname,(label,w,h,color) in labels.items():
+            cx,cy=positions.get(cname,(0,0))
+            b=new_box(cx,cy,w,h,label,color,key=cname,group=self.groups.get(cname,""))
             box_id[cname]=b["id"]
+        for lib in external_libs:
+            ex,ey=positions.get(lib,(0,0))
+            eb=new_box(ex,ey,160,50,lib[1],COLOR_EXTERNAL,key="lib:"+lib[1],group=EXTERNAL_GROUP)
+            box_id[lib]=eb["id"]
 
         seen=set()
-        for cname,info in self.classes.items():
-            sid=box_id.get(cname)
-            if not sid: continue
-            for (rel,target,lbl) in info["relations"]:
-                ls,hs=REL_STYLES.get(rel,("solid","open"))
-                if target in box_id:
-                    key=(sid,box_id[target],rel)
-                    if key in seen: continue
-                    seen.add(key)
-                    new_arrow(sid,box_id[target],lbl,ls,hs)
-                else:
-                    imp=self.imports.get(target)
-                    lib_label=target
-                    if imp:
-                        full,is_ext=imp
-                        lib_label=target
-                    if lib_label not in external_libs:
-                        ex=900+len(external_libs)*10
-                        ey=80+len(external_libs)*90
-                        eb=new_box(ex,ey,160,50,lib_label,COLOR_EXTERNAL)
-                        external_libs[lib_label]=eb["id"]
-                    key=(sid,external_libs[lib_label],rel)
-                    if key in seen: continue
-                    seen.add(key)
-                    new_arrow(sid,external_libs[lib_label],lbl,ls,hs)
+        for (cname,target,rel,lbl) in links:
+            ls,hs=REL_STYLES.get(rel,("solid","open"))
+            key=(box_id[cname],box_id[target],rel)
+            if key in seen: continue
+            seen.add(key)
+            new_arrow(box_id[cname],box_id[target],lbl,ls,hs)
 
         new_text(400,20,
                  f"Code Analysis — Java  ({len(self.classes)} classes, "
@@ -683,43 +1259,706 @@ class JavaAnalyzer:
         return dict(boxes=boxes,arrows=arrows,floattexts=floattexts)
 
 
+# ═════════════════════════════════════════════════════════════════════════════
+# PER-FILE EXTRACTION  —  process pool + on-disk cache
+# ═════════════════════════════════════════════════════════════════════════════
+# Each file is reduced to a small picklable fragment ({imports, classes});
+# the analysers merge fragments in path order, so results don't depend on
+# which worker finished first.  Fragments are cached on disk keyed by path,
+# and reused while (mtime, size) match — or, after a touch / checkout,
+# while the content hash still matches.  Only changed files are re-parsed.
+
+ANALYSIS_CACHE = os.environ.get(
+    "DIAGRAMTOOL_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "diagramtool", "analysis.db"))
+CACHE_VERSION  = 2        # bump when a fragment's shape changes
+PARALLEL_MIN   = 64       # fewer files to parse than this → stay in-process
+LOOKUP_CHUNK   = 900      # cached paths fetched per query
+_EXTRACTORS    = {"py": PythonAnalyzer, "java": JavaAnalyzer}
+
+
+def _source_files(path: str, suffix: str) -> list:
+    p = Path(path)
+    if p.is_file():
+        return [p] if p.suffix == suffix else []
+    return sorted(p.rglob("*" + suffix)) if p.is_dir() else []
+
+
+def source_group(root: str, path: str, lang: str) -> str:
+    """The box "group" of the classes in `path`, a file under `root`: its
+    dotted module path for Python (pkg/sub/mod.py → pkg.sub.mod), its folder
+    for Java (src/main/java/com/acme/Foo.java → src.main.java.com.acme)."""
+    root = str(root).rstrip(os.sep)
+    path = str(path)
+    rel = path[len(root) + 1:] if path.startswith(root + os.sep) else os.path.basename(path)
+    rel = os.path.splitext(rel)[0].replace(os.sep, ".")
+    if lang == "java":
+        return rel.rpartition(".")[0]
+    return rel[:-len(".__init__")] if rel.endswith(".__init__") else rel
+
+
+def _extract_one(lang: str, path: str, known_hash: str = None):
+    """Worker: (content hash, fragment); fragment is skipped if the hash is known."""
+    try:
+        data = Path(path).read_bytes()
+    except OSError:
+        return None, None
+    digest = hashlib.sha1(data).hexdigest()
+    if digest == known_hash:
+        return digest, None
+    src = data.decode("utf-8", errors="replace")
+    return digest, _EXTRACTORS[lang]()._extract(src, Path(path))
+
+
+def _extract_chunk(lang: str, jobs: list) -> list:
+    return [_extract_one(lang, path, known) for path, known in jobs]
+
+
+class AnalysisCache:
+    """sqlite file of per-file fragments: path → (mtime, size, sha1, pickle)."""
+
+    def __init__(self, db_path: str = None):
+        db_path = db_path or ANALYSIS_CACHE
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+        self.db = sqlite3.connect(db_path)
+        self.db.execute("CREATE TABLE IF NOT EXISTS fragments (path TEXT, lang TEXT, "
+                        "version INT, mtime REAL, size INT, sha1 TEXT, frag BLOB, "
+                        "PRIMARY KEY (path, lang))")
+
+    def lookup(self, lang: str, paths: list) -> dict:
+        """Cached rows of `paths` only — the file is shared by every project
+        ever analysed, so it is queried by primary key, LOOKUP_CHUNK paths
+        at a time (under sqlite's 999 bound parameters)."""
+        rows = {}
+        paths = list(dict.fromkeys(paths))
+        for i in range(0, len(paths), LOOKUP_CHUNK):
+            chunk = paths[i:i + LOOKUP_CHUNK]
+            cur = self.db.execute(
+                "SELECT path, mtime, size, sha1, frag FROM fragments "
+                f"WHERE lang = ? AND version = ? AND path IN ({','.join('?' * len(chunk))})",
+                (lang, CACHE_VERSION, *chunk))
+            for path, mtime, size, sha1, frag in cur:
+                rows[path] = (mtime, size, sha1, frag)
+        return rows
+
+    def store(self, lang: str, entries: list):
+        """entries: [(path, mtime, size, sha1, fragment)]"""
+        self.db.executemany(
+            "INSERT OR REPLACE INTO fragments VALUES (?, ?, ?, ?, ?, ?, ?)",
+            [(path, lang, CACHE_VERSION, mtime, size, sha1,
+              pickle.dumps(frag, pickle.HIGHEST_PROTOCOL))
+             for path, mtime, size, sha1, frag in entries])
+        self.db.commit()
+
+    def close(self):
+        self.db.close()
+
+
+def extract_files(files: list, lang: str, workers: int = None, cache: bool = True,
+                  stats: dict = None) -> list:
+    """
+    Fragments for `files` (in the same order), parsing only what changed.
+    `workers` caps the process pool (default: CPU count; 1 = in-process).
+    `stats`, if given, is filled with {'files', 'cached', 'parsed'}.
+    """
+    frags = extract_map(files, lang, workers, cache, stats)
+    return [frags[str(f)] for f in files if str(f) in frags]
+
+
+def extract_map(files: list, lang: str, workers: int = None, cache: bool = True,
+                stats: dict = None) -> dict:
+    """{path: fragment} for the `files` that could be read — extract_files."""
+    paths  = [str(f) for f in files]
+    store  = AnalysisCache() if cache else None
+    known  = store.lookup(lang, paths) if store else {}
+    frags  = {}
+    todo   = []          # (path, cached sha1 or None)
+    stat   = {}
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        stat[path] = (st.st_mtime, st.st_size)
+        hit = known.get(path)
+        if hit and (hit[0], hit[1]) == stat[path]:
+            frags[path] = pickle.loads(hit[3])
+        else:
+            todo.append((path, hit[2] if hit else None))
+
+    workers = workers or os.cpu_count() or 1
+    if len(todo) < PARALLEL_MIN or workers == 1:
+        results = _extract_chunk(lang, todo)
+    else:
+        # a handful of chunks per worker: amortises pickling, keeps load balanced
+        size   = max(16, len(todo) // (workers * 4))
+        chunks = [todo[i:i+size] for i in range(0, len(todo), size)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = [r for part in pool.map(_extract_chunk, [lang]*len(chunks), chunks)
+                       for r in part]
+
+    fresh, parsed = [], 0
+    for (path, known_hash), (digest, frag) in zip(todo, results):
+        if digest is None:                     # vanished / unreadable
+            continue
+        if digest == known_hash:               # touched, not changed
+            frag = pickle.loads(known[path][3])
+        else:
+            parsed += 1
+        frags[path] = frag
+        fresh.append((path, *stat[path], digest, frag))
+    if store:
+        if fresh:
+            store.store(lang, fresh)
+        store.close()
+    if stats is not None:
+        stats.update(files=len(paths), cached=len(paths) - parsed, parsed=parsed)
+    return frags
+
+
+def _merge_path(analyser, path: str, lang: str, workers: int, cache: bool):
+    """Extract every source file under `path` into `analyser`, in path order."""
+    files = _source_files(path, "." + lang)
+    frags = extract_map(files, lang, workers, cache)
+    for f in map(str, files):
+        if f in frags:
+            analyser._merge(frags[f], source_group(path, f, lang))
+
+
 # ═════════════════════════════════════════════════════════════════════════════
 # UNIFIED ENTRY
 # ═════════════════════════════════════════════════════════════════════════════
 
-def _analyze_code_files(path: str) -> dict:
+def _analyze_code_files(path: str, workers: int = None, cache: bool = True,
+            layout: bool = True) -> dict:
     """
     Analyze a file or directory of Python / Java source code.
     Returns a diagram dict ready for DiagramApp._deserialize().
+    Files are extracted on a process pool and cached (see extract_files).
+    layout=False skips placing the boxes (all at (0, 0)).
     """
     p = Path(path)
     # Decide language
     if p.is_file():
         if p.suffix == ".py":
-            return PythonAnalyzer().analyze_path(path)
+            return PythonAnalyzer().analyze_path(path, workers, cache, layout)
         elif p.suffix == ".java":
-            return JavaAnalyzer().analyze_path(path)
+            return JavaAnalyzer().analyze_path(path, workers, cache, layout)
         else:
             raise ValueError(f"Unsupported file type: {p.suffix}")
     elif p.is_dir():
-        # Mixed folder: run both
-        py_files  = list(p.rglob("*.py"))
-        java_files = list(p.rglob("*.java"))
-        if py_files and not java_files:
-            return PythonAnalyzer().analyze_path(path)
-        elif java_files and not py_files:
-            return JavaAnalyzer().analyze_path(path)
-        elif py_files and java_files:
-            # Prefer Python if more .py files
-            if len(py_files) >= len(java_files):
-                return PythonAnalyzer().analyze_path(path)
-            else:
-                return JavaAnalyzer().analyze_path(path)
-        else:
-            raise ValueError("No .py or .java files found in directory.")
+        if project_lang(path) == "py":
+            return PythonAnalyzer().analyze_path(path, workers, cache, layout)
+        return JavaAnalyzer().analyze_path(path, workers, cache, layout)
     else:
         raise FileNotFoundError(path)
 
+
+def project_lang(path: str) -> str:
+    """The language of a source file or folder, "py" or "java" (a mixed
+    folder: the one with more files, Python on a tie)."""
+    p = Path(path)
+    if p.is_file():
+        if p.suffix not in (".py", ".java"):
+            raise ValueError(f"Unsupported file type: {p.suffix}")
+        return p.suffix[1:]
+    # Mixed folder: one walk, then the language with more files wins
+    py_files = java_files = 0
+    for _dir, _subdirs, names in os.walk(p):
+        for n in names:
+            if n.endswith(".py"):     py_files += 1
+            elif n.endswith(".java"): java_files += 1
+    if not py_files and not java_files:
+        raise ValueError("No .py or .java files found in directory.")
+    # Prefer Python if more .py files
+    return "py" if py_files >= java_files else "java"
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# WATCH MODE  —  incremental re-analysis
+# ═════════════════════════════════════════════════════════════════════════════
+# A ProjectWatcher holds the fragments of every file of a project in memory.
+# After an edit only the changed files are extracted again; the fragments are
+# re-merged (dict updates, in path order as in analyze_path) and the diagram
+# rebuilt without layout.  diagram_diff then tells the canvas which boxes and
+# arrows to add, remove or relabel — by box "key", so moved boxes stay put.
+
+WATCH_SKIP_DIRS = {".git", ".hg", ".svn", "__pycache__", "node_modules",
+                   ".gradle", ".idea", ".venv", "venv", ".tox"}
+
+
+def arrow_key(arrow: dict, box_keys: dict) -> tuple:
+    """(src key, dst key, label, line style, head style) of an arrow dict;
+    `box_keys` maps box id → key."""
+    return (box_keys.get(arrow["src_id"]), box_keys.get(arrow["dst_id"]),
+            arrow.get("label", ""), arrow.get("line_style", "solid"),
+            arrow.get("head_style", "open"))
+
+
+def diagram_index(data: dict) -> tuple:
+    """({key: box dict}, {arrow key: arrow dict}) of a diagram: what
+    diagram_diff matches boxes and arrows by."""
+    boxes = {b["key"]: b for b in data.get("boxes", []) if b.get("key")}
+    keys = {b["id"]: b.get("key") for b in data.get("boxes", [])}
+    arrows = {}
+    for a in data.get("arrows", []):
+        arrows.setdefault(arrow_key(a, keys), a)
+    return boxes, arrows
+
+
+def diagram_diff(old: dict, new: dict, old_index: tuple = None,
+                 new_index: tuple = None) -> dict:
+    """
+    What changed between two analyses of one project.  Boxes are matched by
+    "key" (boxes without one are ignored), arrows by arrow_key:
+
+      added           [box dict]                   new boxes
+      removed         [key]
+      changed         {key: {attr: new value}}     label / w / h / color / shape
+      arrows_added    [(src key, dst key, arrow dict)]
+      arrows_removed  [arrow key]
+      texts           [(index, text)]              float texts that changed
+
+    `old_index` / `new_index` are diagram_index results already at hand.
+    """
+    old_boxes, old_arrows = old_index or diagram_index(old)
+    new_boxes, new_arrows = new_index or diagram_index(new)
+    changed = {}
+    for key, b in new_boxes.items():
+        o = old_boxes.get(key)
+        if o is not None:
+            attrs = {a: b[a] for a in ("label", "w", "h", "color", "shape") if o.get(a) != b.get(a)}
+            if attrs:
+                changed[key] = attrs
+    old_texts, new_texts = old.get("floattexts", []), new.get("floattexts", [])
+    return dict(
+        added=[b for key, b in new_boxes.items() if key not in old_boxes],
+        removed=[key for key in old_boxes if key not in new_boxes],
+        changed=changed,
+        arrows_added=[(k[0], k[1], a) for k, a in new_arrows.items()
+                      if k not in old_arrows and k[0] and k[1]],
+        arrows_removed=[k for k in old_arrows if k not in new_arrows],
+        texts=[(i, ft["text"]) for i, ft in enumerate(new_texts)
+               if i < len(old_texts) and old_texts[i]["text"] != ft["text"]],
+    )
+
+
+def diff_size(diff: dict) -> int:
+    return sum(len(v) for v in diff.values())
+
+
+class ProjectWatcher:
+    """
+    Keeps the analysis of a source folder current while its files change.
+
+    poll() returns the files changed / removed since the last call, or None.
+    With watchdog installed (inotify, FSEvents, ReadDirectoryChangesW) it
+    only looks at the paths named by file-system events; otherwise it
+    compares (mtime, size) of every file.  update() re-extracts just those
+    files and returns (diagram, diff) against the previous diagram.
+
+    `lang` is "py" or "java" (default: project_lang).  Other project kinds
+    pass the `suffixes` worth watching and `rebuild(changed, removed)`,
+    returning the whole diagram dict; load() calls it with (None, None).
+    layout=False: the first diagram is not laid out either.
+    """
+
+    def __init__(self, path: str, lang: str = None, workers: int = None,
+                 cache: bool = True, rebuild=None, suffixes: tuple = None,
+                 events: bool = True, layout: bool = True):
+        self.path = os.path.abspath(path)
+        self.rebuild = rebuild
+        self.lang = None if rebuild else (lang or project_lang(path))
+        self.suffixes = tuple(suffixes or ("." + self.lang,))
+        self.workers, self.cache, self.layout = workers, cache, layout
+        self.stamps = {}          # path -> (mtime, size)
+        self.frags = {}           # path -> fragment (py / java)
+        self.groups = {}          # path -> source_group
+        self._order = None        # frags' paths in merge order (as _source_files)
+        self.data = None          # the last diagram
+        self._index = None        # its diagram_index
+        self._observer = None
+        self._events = set()      # paths named by events since the last poll
+        self._rescan = False      # a directory moved / vanished: scan everything
+        self._lock = threading.Lock()
+        self.load()
+        if events:
+            self._watch_events()
+
+    # ── File state ───────────────────────────────────────────────────────────
+
+    def _wanted(self, path: str) -> bool:
+        return path.endswith(self.suffixes)
+
+    def _stamp(self, path: str):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime, st.st_size
+
+    def scan(self) -> dict:
+        """{path: (mtime, size)} of every watched file under the folder."""
+        if os.path.isfile(self.path):
+            s = self._stamp(self.path)
+            return {self.path: s} if s else {}
+        out = {}
+        for folder, dirs, names in os.walk(self.path):
+            dirs[:] = [d for d in dirs if d not in WATCH_SKIP_DIRS]
+            for n in names:
+                if n.endswith(self.suffixes):
+                    full = os.path.join(folder, n)
+                    s = self._stamp(full)
+                    if s:
+                        out[full] = s
+        return out
+
+    def load(self) -> dict:
+        """Full analysis (with layout): the diagram to start the canvas from."""
+        self.stamps = self.scan()
+        self._index = None
+        if self.rebuild:
+            self.data = self.rebuild(None, None)
+            return self.data
+        self.frags = extract_map(sorted(self.stamps), self.lang, self.workers, self.cache)
+        self.data = self._build(layout=self.layout)
+        return self.data
+
+    def _build(self, layout: bool) -> dict:
+        analyser = PythonAnalyzer() if self.lang == "py" else JavaAnalyzer()
+        if self._order is None or len(self._order) != len(self.frags):
+            self._order = sorted(self.frags, key=lambda p: Path(p).parts)
+        groups = self.groups
+        for path in self._order:
+            g = groups.get(path)
+            if g is None:
+                g = groups[path] = source_group(self.path, path, self.lang)
+            analyser._merge(self.frags[path], g)
+        return analyser._build_diagram(layout=layout)
+
+    # ── Change detection ─────────────────────────────────────────────────────
+
+    def _watch_events(self):
+        try:
+            from watchdog.observers import Observer
+            from watchdog.events import FileSystemEventHandler
+        except ImportError:
+            return                                  # polling it is
+        watcher = self
+        folder = self.path if os.path.isdir(self.path) else os.path.dirname(self.path) or "."
+
+        def skipped(path, is_dir):
+            # the folders scan() does not walk into (.venv, node_modules, …)
+            parts = Path(os.path.relpath(os.fsdecode(path), folder)).parts
+            return not WATCH_SKIP_DIRS.isdisjoint(parts if is_dir else parts[:-1])
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                paths = [p for p in (event.src_path, getattr(event, "dest_path", ""))
+                         if p and not skipped(p, event.is_directory)]
+                if event.is_directory:
+                    if paths and event.event_type in ("moved", "deleted"):
+                        watcher._rescan = True
+                    return
+                with watcher._lock:
+                    for p in paths:
+                        if watcher._wanted(p):
+                            watcher._events.add(os.fsdecode(p))
+
+        try:
+            observer = Observer()
+            observer.schedule(Handler(), folder, recursive=True)
+            observer.start()
+        except Exception:                           # no inotify watches left, …
+            return
+        self._observer = observer
+
+    @property
+    def mode(self) -> str:
+        return "events" if self._observer else "polling"
+
+    def poll(self):
+        """(changed, removed) paths since the last poll, or None."""
+        if self._observer and not self._rescan:
+            with self._lock:
+                paths, self._events = self._events, set()
+            now = {}
+            for p in paths:
+                if os.path.isfile(self.path) and p != self.path:
+                    continue
+                now[p] = self._stamp(p)
+        else:
+            self._rescan = False
+            now = self.scan()
+            now.update((p, None) for p in self.stamps if p not in now)
+        changed = [p for p, s in now.items() if s and self.stamps.get(p) != s]
+        removed = [p for p, s in now.items() if s is None and p in self.stamps]
+        if not changed and not removed:
+            return None
+        for p in changed:
+            self.stamps[p] = now[p]
+        for p in removed:
+            del self.stamps[p]
+        return changed, removed
+
+    def update(self, changed: list, removed: list):
+        """(diagram, diff) after re-extracting `changed` and dropping `removed`."""
+        if self.rebuild:
+            data = self.rebuild(changed, removed)
+        else:
+            for p in removed:
+                self.frags.pop(p, None)
+            if changed:
+                fresh = extract_map(changed, self.lang, self.workers, self.cache)
+                if any(p not in self.frags for p in fresh):
+                    self._order = None
+                self.frags.update(fresh)
+            if removed:
+                self._order = None
+            data = self._build(layout=False)
+        index = diagram_index(data)
+        diff = diagram_diff(self.data, data, self._index or diagram_index(self.data), index)
+        self.data, self._index = data, index
+        return data, diff
+
+    def close(self):
+        if self._observer:
+            self._observer.stop()
+            self._observer.join(timeout=2)
+            self._observer = None
+
+
+# ═════════════════════════════════════════════════════════════════════════════
+# HIERARCHY  —  package groups for large diagrams
+# ═════════════════════════════════════════════════════════════════════════════
+# Thousands of class boxes are more than a canvas (or a reader) can take in.
+# A DiagramTree arranges an analysis by its boxes' "group" paths into nested
+# package / module nodes, and the canvas shows a *cut* through it: a set of
+# nodes, groups or classes, covering every class at most once.  view() turns
+# a cut into a diagram — a group box stands for all the classes below it and
+# the arrows between two shown nodes are merged into one, labelled ×count —
+# so only what is shown is ever built, laid out or drawn.  Expanding a group
+# replaces it in the cut by its children; collapsing does the reverse.
+
+GROUP_PREFIX = "pkg:"       # node id of a group: GROUP_PREFIX + dotted path
+COLOR_GROUP  = "Yellow"
+
+
+class DiagramTree:
+    """
+    The package / module tree of one analysis (boxes with "key" and "group").
+
+    Nodes are class keys and group ids; ROOT is the group of the empty path.
+    A chain of groups with one child each is folded into its last link, so
+    src/main/java/com/acme is one group, not five.  `leaf_kind` is the
+    stereotype of groups that hold classes only ("module" for Python).
+    """
+
+    ROOT = GROUP_PREFIX
+
+    def __init__(self, data: dict, leaf_kind: str = "package"):
+        self.data = data
+        self.leaf_kind = leaf_kind
+        self.boxes = {b["key"]: b for b in data.get("boxes", []) if b.get("key")}
+        self._key_of = {b["id"]: b.get("key") for b in data.get("boxes", [])}
+        raw = {self.ROOT: []}              # group -> children, before folding
+        for key, b in self.boxes.items():
+            node, parts = self.ROOT, (b.get("group") or "").split(".")
+            for i in range(1, len(parts) + 1 if parts[0] else 1):
+                g = GROUP_PREFIX + ".".join(parts[:i])
+                if g not in raw:
+                    raw[g] = []
+                    raw[node].append(g)
+                node = g
+            raw[node].append(key)
+        self.parent, self.children, self.size = {}, {}, {}
+        order, stack = [], [self.ROOT]
+        while stack:
+            g = stack.pop()
+            order.append(g)
+            groups, classes = [], []
+            for k in raw[g]:
+                while k in raw and len(raw[k]) == 1:
+                    k = raw[k][0]
+                self.parent[k] = g
+                (groups if k in raw else classes).append(k)
+            self.children[g] = sorted(groups) + classes
+            stack.extend(groups)
+        for g in reversed(order):          # children before their parents
+            self.size[g] = sum(self.size.get(k, 1) for k in self.children[g])
+
+    def is_group(self, node: str) -> bool:
+        return node in self.children
+
+    def name(self, node: str) -> str:
+        """A group's path below its parent group (a class: its key)."""
+        if not self.is_group(node):
+            return node
+        path = node[len(GROUP_PREFIX):]
+        base = self.parent.get(node, self.ROOT)[len(GROUP_PREFIX):]
+        return path[len(base) + 1:] if base else path
+
+    def descendants(self, node: str) -> list:
+        out, stack = [], list(self.children.get(node, ()))
+        while stack:
+            n = stack.pop()
+            out.append(n)
+            stack.extend(self.children.get(n, ()))
+        return out
+
+    # ── Cuts ─────────────────────────────────────────────────────────────────
+
+    def initial_cut(self, budget: int) -> set:
+        """The top-level nodes, then the biggest groups expanded for as long
+        as no more than `budget` nodes are shown (all classes, if they fit)."""
+        cut = set(self.children[self.ROOT])
+        heap = [(-self.size[g], g) for g in cut if self.is_group(g)]
+        heapq.heapify(heap)
+        while heap:
+            _, g = heapq.heappop(heap)
+            kids = self.children[g]
+            if len(cut) - 1 + len(kids) > budget:
+                continue
+            cut.discard(g)
+            cut.update(kids)
+            for k in kids:
+                if self.is_group(k):
+                    heapq.heappush(heap, (-self.size[k], k))
+        return cut
+
+    def expand(self, cut: set, node: str) -> set:
+        return (set(cut) - {node}) | set(self.children[node])
+
+    def collapse(self, cut: set, node: str) -> set:
+        return (set(cut) - set(self.descendants(node))) | {node}
+
+    def rep_map(self, cut: set) -> dict:
+        """{node: the node of `cut` it is shown as, or None} for every class
+        (and the groups walked through on the way up)."""
+        rep = {}
+        for key in self.boxes:
+            path, n = [], key
+            while True:
+                if n in cut:
+                    r = n
+                    break
+                if n in rep:
+                    r = rep[n]
+                    break
+                if n == self.ROOT:
+                    r = None
+                    break
+                path.append(n)
+                n = self.parent[n]
+            for m in path:
+                rep[m] = r
+            rep[key] = r
+        return rep
+
+    def adapt(self, old: "DiagramTree", cut: set, spread: int = 50) -> set:
+        """The cut of this (re-analysed) tree that follows `cut` of the old
+        one.  Classes that are new — or were shown as a group that no longer
+        exists — are added: one by one, or as their enclosing group if more
+        than `spread` of them would land in it.  Classes the old cut did not
+        show (deleted from the canvas) stay out."""
+        old_rep = old.rep_map(cut)
+        cut = {n for n in cut if n in self.parent}
+        rep = self.rep_map(cut)
+        todo = [c for c in self.boxes if rep.get(c) is None and
+                (c not in old.boxes or (old_rep.get(c) is not None and old_rep[c] not in self.parent))]
+        opened = set()                     # groups with something of the cut below
+        for n in cut:
+            n = self.parent[n]
+            while n not in opened and n != self.ROOT:
+                opened.add(n)
+                n = self.parent[n]
+        tops = {}
+        for c in todo:
+            top = n = c
+            while n != self.ROOT and n not in opened:
+                top, n = n, self.parent[n]
+            tops.setdefault(top, []).append(c)
+        for top, classes in tops.items():
+            if self.is_group(top) and len(classes) > spread:
+                cut.add(top)
+            else:
+                cut.update(classes)
+        return cut
+
+    # ── Diagrams ─────────────────────────────────────────────────────────────
+
+    def group_box(self, node: str) -> dict:
+        path = node[len(GROUP_PREFIX):]
+        if path == EXTERNAL_GROUP:
+            kind = "external"
+        elif any(self.is_group(k) for k in self.children[node]):
+            kind = "package"
+        else:
+            kind = self.leaf_kind
+        n = self.size[node]
+        label = f"«{kind}»\n{self.name(node)}\n{n:,} class{'' if n == 1 else 'es'}"
+        lines = label.split("\n")
+        return dict(id=0, x=0, y=0, w=max(180, 12 * max(len(l) for l in lines)),
+                    h=max(60, 18 * len(lines)), label=label, color=COLOR_GROUP,
+                    shape="roundrect", key=node)
+
+    def shown(self, cut: set) -> list:
+        """The nodes of `cut` in tree order (groups first, by path)."""
+        out, stack = [], [self.ROOT]
+        while stack:
+            g = stack.pop()
+            for k in self.children[g]:
+                if k in cut:
+                    out.append(k)
+                elif k in self.children:
+                    stack.append(k)
+        return out
+
+    def view(self, cut: set) -> dict:
+        """The diagram of `cut`: class boxes as analysed, a group_box per
+        group, class-to-class arrows as they are and every other arrow
+        merged per (shown source, shown target) — one merged arrow keeps its
+        own style, more become one dashed "×n".  Boxes are at (0, 0)."""
+        rep = self.rep_map(cut)
+        boxes, ids = [], {}
+        for n in self.shown(cut):
+            b = self.group_box(n) if self.is_group(n) else dict(self.boxes[n])
+            b["id"] = ids[n] = len(boxes) + 1
+            boxes.append(b)
+        arrows, merged = [], {}
+        key_of = self._key_of
+        for a in self.data.get("arrows", []):
+            s, d = key_of.get(a["src_id"]), key_of.get(a["dst_id"])
+            rs, rd = rep.get(s), rep.get(d)
+            if rs is None or rd is None or rs == rd:
+                continue
+            if rs == s and rd == d:
+                arrows.append(dict(a, src_id=ids[rs], dst_id=ids[rd]))
+            else:
+                merged.setdefault((rs, rd), []).append(a)
+        for (rs, rd), links in merged.items():
+            a = dict(links[0]) if len(links) == 1 else dict(
+                label=f"×{len(links)}", line_style="dashed", head_style="open")
+            a.update(src_id=ids[rs], dst_id=ids[rd])
+            arrows.append(a)
+        for i, a in enumerate(arrows, 1):
+            a["id"] = i
+        return dict(boxes=boxes, arrows=arrows,
+                    floattexts=[dict(ft) for ft in self.data.get("floattexts", [])])
+
+    def layout(self, view: dict, nodes: list = None, x: float = 60, y: float = 80) -> dict:
+        """{node: (x, y)} — auto_layout of `nodes` (default: all) of a
+        view, along the view's arrows between them."""
+        boxes = {b["key"]: b for b in view["boxes"]}
+        nodes = list(boxes) if nodes is None else [n for n in nodes if n in boxes]
+        keep = set(nodes)
+        key_of = {b["id"]: b["key"] for b in view["boxes"]}
+        edges = [(key_of[a["src_id"]], key_of[a["dst_id"]]) for a in view["arrows"]
+                 if key_of[a["src_id"]] in keep and key_of[a["dst_id"]] in keep]
+        return auto_layout(nodes, sizes={n: (boxes[n]["w"], boxes[n]["h"]) for n in nodes},
+                           edges=edges, start_x=x, start_y=y)
+
+
 # ═══ SPRING BOOT PROJECT ANALYSER ═══════════════════════════════════════
 
 # ── Colour per stereotype ────────────────────────────────────────────────────
@@ -765,20 +2004,8 @@ JPA_REL_PATTERNS = [
     re.compile(r"@OneToOne.*?(?:targetEntity\s*=\s*(\w+)\.class)?"),
     re.compile(r"@ManyToMany.*?(?:targetEntity\s*=\s*(\w+)\.class)?"),
 ]
-JPA_ANNO_RE  = re.compile(r"@(OneToMany|ManyToOne|OneToOne|ManyToMany)")
-FIELD_TYPE_RE= re.compile(
-    r"(?:private|protected|public)\s+(?:final\s+)?"
-    r"([\w<>\[\],\s]+?)\s+(\w+)\s*(?:;|=)")
 COLLECTION_RE= re.compile(r"(?:List|Set|Collection|Iterable|Page)\s*<\s*(\w+)\s*>")
-IMPORT_RE    = re.compile(r"^\s*import\s+(?:static\s+)?([\w.]+);", re.M)
-CLASS_RE     = re.compile(
-    r"(?:public\s+|abstract\s+|final\s+)*(?:class|interface|enum)\s+(\w+)"
-    r"(?:<[^>]*>)?"
-    r"(?:\s+extends\s+([\w.<>, ]+?))?"
-    r"(?:\s+implements\s+([\w.<>, ]+?))?"
-    r"\s*\{", re.M)
-CTOR_RE_TMPL = r"(?:public|protected)\s+{}\s*\(([^)]*)\)"
-AUTOWIRED_RE = re.compile(r"@(?:Autowired|Inject|Resource)")
+AUTOWIRED    = {"Autowired", "Inject", "Resource"}
 BEAN_RE      = re.compile(r"@Bean\b")
 REQUEST_MAP  = re.compile(r"@(?:RequestMapping|GetMapping|PostMapping|PutMapping|DeleteMapping|PatchMapping)"
                            r"(?:\([^)]*value\s*=\s*\"([^\"]*)\"|"
@@ -814,10 +2041,11 @@ PRIMITIVES = {
 # ═════════════════════════════════════════════════════════════════════════════
 class SpringAnalyzer:
 
-    def __init__(self):
+    def __init__(self, memo: dict = None):
         self.classes    = {}   # name -> ClassInfo
         self.infra_nodes= {}   # label -> infra box dict
         self.prop_lines = []   # lines from application.properties/yml
+        self.memo       = memo # path -> ((mtime, size), classes, infra keys), kept across runs
 
     # ── Public ────────────────────────────────────────────────────────────────
 
@@ -853,16 +2081,31 @@ class SpringAnalyzer:
     def _scan_java_files(self, root: Path):
         for f in sorted(root.rglob("*.java")):
             try:
-                self._parse_java(f)
+                if self.memo is None:
+                    self._parse_java(f)
+                else:
+                    self._parse_java_memo(f)
             except Exception:
                 pass
 
+    def _parse_java_memo(self, path: Path):
+        """_parse_java through self.memo: a file whose (mtime, size) is
+        unchanged since the last run replays what it contributed."""
+        st = path.stat(); stamp = (st.st_mtime, st.st_size)
+        hit = self.memo.get(str(path))
+        if not hit or hit[0] != stamp:
+            sub = SpringAnalyzer(); sub.prop_lines = self.prop_lines
+            try:
+                sub._parse_java(path)
+            finally:
+                hit = self.memo[str(path)] = (stamp, sub.classes, list(sub.infra_nodes))
+        self.classes.update(hit[1])
+        for key in hit[2]:
+            self._ensure_infra(key)
+
     def _parse_java(self, path: Path):
         src = path.read_text(encoding="utf-8", errors="replace")
-
-        # Collect imports
-        imports = {m.group(1).split(".")[-1]: m.group(1)
-                   for m in IMPORT_RE.finditer(src)}
+        unit = parse_java(src)
 
         # Detect infra usage from imports
         for infra_key, markers in EXTERNAL_IMPORTS.items():
@@ -876,17 +2119,13 @@ class SpringAnalyzer:
                 if infra_key in line.lower():
                     self._ensure_infra(infra_key)
 
-        # Parse classes
-        for m in CLASS_RE.finditer(src):
-            cname = m.group(1)
-            # grab preceding ~300 chars for annotations
-            pre_start = max(0, m.start() - 300)
-            pre = src[pre_start:m.start()]
-            full_block = src[m.start():m.start()+1]  # minimal, body extracted below
+        # Parse classes (single-pass lexer, nested types included)
+        for decl in unit["types"]:
+            cname = decl["name"]
+            # annotations + modifiers + "class X extends … implements …"
+            header = decl["header"]
 
-            stereo = self._detect_stereo(pre, src, cname)
-            extends_raw = m.group(2) or ""
-            implements_raw = m.group(3) or ""
+            stereo = self._detect_stereo(header, src, cname)
 
             info = {
                 "name":      cname,
@@ -896,43 +2135,41 @@ class SpringAnalyzer:
                 "relations": [],
                 "endpoints": [],
                 "beans":     [],
-                "transactional": TRANSACT_RE.search(pre) is not None,
+                "transactional": TRANSACT_RE.search(header) is not None,
             }
 
             # Inheritance
-            for base in [x.strip().split("<")[0] for x in extends_raw.split(",") if x.strip()]:
-                info["relations"].append(("inherits", base, ""))
+            for base in decl["extends"]:
+                info["relations"].append(("inherits", base.split("<")[0], ""))
 
             # Implementation
-            for iface in [x.strip().split("<")[0] for x in implements_raw.split(",") if x.strip()]:
-                if iface:
-                    info["relations"].append(("implements", iface, ""))
-
-            # Extract body
-            body = self._extract_body(src, m.end() - 1)
-
-            # Endpoints
-            for em in REQUEST_MAP.finditer(pre + body):
-                path_val = em.group(1) or em.group(2) or em.group(3) or ""
+            for iface in decl["implements"]:
+                info["relations"].append(("implements", iface.split("<")[0], ""))
+
+            # Endpoints: class-level + method-level mapping annotations
+            annotations = decl["annotations"] + [a for m in decl["methods"] for a in m["annotations"]]
+            for _name, text in annotations:
+                em = REQUEST_MAP.match(text)
+                path_val = em and (em.group(1) or em.group(2) or em.group(3))
                 if path_val:
                     info["endpoints"].append(path_val)
 
             # @Bean methods
             if stereo == "config":
-                bean_types = re.findall(r"@Bean\s+(?:public\s+)?(\w+)\s+\w+\s*\(", body)
-                info["beans"] = bean_types
+                info["beans"] = [m["ret"].split("<")[0] for m in decl["methods"]
+                                 if any(a[0] == "Bean" for a in m["annotations"])]
 
             # Fields → composition / aggregation / JPA
-            self._parse_fields(body, info, imports)
+            self._parse_fields(decl, info)
 
             # Constructor injection
-            self._parse_ctor_injection(body, cname, info, imports)
+            self._parse_ctor_injection(decl, info)
 
-            # @Autowired field injection
-            self._parse_autowired(body, info, imports)
+            # @Autowired field / setter injection
+            self._parse_autowired(decl, info)
 
             # FeignClient URL
-            fm = FEIGN_URL.search(pre)
+            fm = FEIGN_URL.search(header)
             if fm:
                 info["feign_url"] = fm.group(1)
 
@@ -957,7 +2194,7 @@ class SpringAnalyzer:
                 return stereo
         return "unknown"
 
-    def _parse_fields(self, body: str, info: dict, imports: dict):
+    def _parse_fields(self, decl: dict, info: dict):
         # JPA annotation → relationship type
         jpa_anno_map = {
             "OneToMany":  "aggregates",
@@ -965,18 +2202,12 @@ class SpringAnalyzer:
             "ManyToOne":  "composes",
             "OneToOne":   "composes",
         }
-        # Split by semicolons to get field declarations
-        for m in FIELD_TYPE_RE.finditer(body):
-            ftype_raw = m.group(1).strip()
-            fname     = m.group(2).strip()
-            if fname in ("class","return","new","if","for","while","else",
-                         "throw","catch","try","final","static","void"): continue
-
-            # Check JPA annotation immediately before this field
-            fpos = m.start()
-            pre_field = body[max(0,fpos-150):fpos]
-            jpa_match = JPA_ANNO_RE.search(pre_field)
-            jpa_rel   = jpa_anno_map.get(jpa_match.group(1)) if jpa_match else None
+        for field in decl["fields"]:
+            ftype_raw = field["type"]
+
+            # JPA annotation on this field
+            jpa_anno = next((a[0] for a in field["annotations"] if a[0] in jpa_anno_map), None)
+            jpa_rel  = jpa_anno_map.get(jpa_anno)
 
             # Collection field
             col_m = COLLECTION_RE.match(ftype_raw)
@@ -984,7 +2215,7 @@ class SpringAnalyzer:
                 inner = col_m.group(1)
                 if inner not in PRIMITIVES:
                     rel = jpa_rel or "aggregates"
-                    label = f"@{jpa_match.group(1)}" if jpa_match else "0..*"
+                    label = f"@{jpa_anno}" if jpa_anno else "0..*"
                     info["relations"].append((rel, inner, label))
                 continue
 
@@ -992,43 +2223,27 @@ class SpringAnalyzer:
             clean = ftype_raw.split("<")[0].split("[")[0].strip()
             if clean and clean not in PRIMITIVES and clean[0].isupper():
                 rel = jpa_rel or "composes"
-                label = f"@{jpa_match.group(1)}" if jpa_match else ""
+                label = f"@{jpa_anno}" if jpa_anno else ""
                 info["relations"].append((rel, clean, label))
 
-    def _parse_ctor_injection(self, body: str, cname: str, info: dict, imports: dict):
-        ctor_pat = re.compile(
-            CTOR_RE_TMPL.format(re.escape(cname)), re.M)
-        for m in ctor_pat.finditer(body):
-            params_raw = m.group(1)
-            for p in params_raw.split(","):
-                parts = p.strip().split()
-                if len(parts) >= 2:
-                    ptype = parts[-2].split("<")[0]
-                    if ptype not in PRIMITIVES and ptype[0:1].isupper():
-                        info["relations"].append(("injects", ptype, "«inject»"))
-
-    def _parse_autowired(self, body: str, info: dict, imports: dict):
-        # Find @Autowired / @Inject preceded field declarations
-        for am in AUTOWIRED_RE.finditer(body):
-            after = body[am.end():am.end()+150]
-            fm = FIELD_TYPE_RE.search(after)
-            if fm:
-                ftype = fm.group(1).strip().split("<")[0].split("[")[0]
-                if ftype not in PRIMITIVES and ftype[0:1].isupper():
-                    info["relations"].append(("injects", ftype, "«inject»"))
-
-    def _extract_body(self, src: str, start: int) -> str:
-        depth = 0; i = start; begin = -1
-        while i < len(src):
-            if src[i] == "{":
-                depth += 1
-                if begin == -1: begin = i
-            elif src[i] == "}":
-                depth -= 1
-                if depth == 0:
-                    return src[begin+1:i]
-            i += 1
-        return src[begin+1:] if begin >= 0 else ""
+    def _parse_ctor_injection(self, decl: dict, info: dict):
+        for ctor in decl["ctors"]:
+            for _pname, ptype, _annots in ctor["params"]:
+                ptype = ptype.split("<")[0]
+                if ptype not in PRIMITIVES and ptype[0:1].isupper():
+                    info["relations"].append(("injects", ptype, "«inject»"))
+
+    def _parse_autowired(self, decl: dict, info: dict):
+        # @Autowired / @Inject / @Resource fields, and setters carrying them
+        injected = [f["type"] for f in decl["fields"]
+                    if any(a[0] in AUTOWIRED for a in f["annotations"])]
+        injected += [ptype for m in decl["methods"]
+                     if any(a[0] in AUTOWIRED for a in m["annotations"])
+                     for _pname, ptype, _annots in m["params"]]
+        for ftype in injected:
+            ftype = ftype.split("<")[0].split("[")[0]
+            if ftype not in PRIMITIVES and ftype[0:1].isupper():
+                info["relations"].append(("injects", ftype, "«inject»"))
 
     def _ensure_infra(self, key: str):
         labels = {
@@ -1110,10 +2325,10 @@ class SpringAnalyzer:
         box_id    = {}
         _bid = [0]; _aid = [0]; _tid = [0]
 
-        def new_box(x, y, w, h, label, color, shape="rect"):
+        def new_box(x, y, w, h, label, color, shape="rect", key=None):
             _bid[0] += 1
             b = dict(id=_bid[0], x=x, y=y, w=w, h=h,
-                     label=label, color=color, shape=shape)
+                     label=label, color=color, shape=shape, key=key)
             boxes.append(b); return b
 
         def new_arrow(sid, did, label, ls, hs):
@@ -1153,14 +2368,15 @@ class SpringAnalyzer:
             info  = self.classes[cname]
             label = self._make_label(info)
             color = info["color"]
-            b = new_box(x, y, w, h, label, color)
+            b = new_box(x, y, w, h, label, color, key=cname)
             box_id[cname] = b["id"]
 
         # Infra boxes
         infra_ids = {}
         for key, (x, y, w, h) in infra_positions.items():
             label = self.infra_nodes[key]
-            b = new_box(x, y, w, h, label, "Gray", "cylinder" if "DB" in label or "SQL" in label or "Mongo" in label else "rect")
+            b = new_box(x, y, w, h, label, "Gray", "cylinder" if "DB" in label or "SQL" in label or "Mongo" in label else "rect",
+                        key="infra:" + key)
             infra_ids[key] = b["id"]
 
         # Arrows between classes
@@ -1257,12 +2473,13 @@ class SpringAnalyzer:
 
 # ── Unified entry (called from code_analyzer.py or directly) ─────────────────
 
-def _analyze_spring_project(path: str) -> dict:
+def _analyze_spring_project(path: str, memo: dict = None) -> dict:
     """
     Analyze a Spring Boot project folder.
     Returns diagram dict for DiagramApp._deserialize().
+    `memo` (a dict kept by the caller) makes re-runs parse only changed files.
     """
-    return SpringAnalyzer().analyze(path)
+    return SpringAnalyzer(memo).analyze(path)
 
 # ═══ DIAGRAM TOOL — MAIN APPLICATION ════════════════════════════════════
 
@@ -1315,6 +2532,12 @@ HEAD_STYLES = [
 ]
 
 GRID_SIZE = 20   # snap grid in world units
+WATCH_POLL_S = 0.5   # watch mode: seconds between scans of the project (polling)
+WATCH_EVENT_S = 0.1  # … and between looks at the file-system events (watchdog)
+HIER_BUDGET = 200    # boxes an analysis opens with; bigger ones start as package groups
+LOD_ZOOM = 0.45      # below: boxes show one line, arrows lose heads and labels
+LOD_TEXT_ZOOM = 0.2  # below: no text at all
+SPRING_WATCH_SUFFIXES = (".java",".properties",".yml",".yaml",".xml",".gradle")
 
 # ═══ DATA MODELS ══════════════════════════════════════════════════════════════
 
@@ -1324,6 +2547,7 @@ class Box:
         Box._id+=1
         self.id=Box._id; self.x=x; self.y=y; self.w=w; self.h=h
         self.label=label; self.color=color; self.shape=shape
+        self.key=None   # analyser's key of a box from code analysis
 
     def center(self): return self.x+self.w/2, self.y+self.h/2
 
@@ -1355,14 +2579,16 @@ class Box:
         self.x=round(self.x/gs)*gs; self.y=round(self.y/gs)*gs
 
     def to_dict(self):
-        return dict(id=self.id,x=self.x,y=self.y,w=self.w,h=self.h,
-                    label=self.label,color=self.color,shape=self.shape)
+        d=dict(id=self.id,x=self.x,y=self.y,w=self.w,h=self.h,
+               label=self.label,color=self.color,shape=self.shape)
+        if self.key: d["key"]=self.key
+        return d
 
     @classmethod
     def from_dict(cls,d):
         b=cls(d["x"],d["y"],d["w"],d["h"],d["label"],
               d.get("color","Blue"),d.get("shape","rect"))
-        b.id=d["id"]; return b
+        b.id=d["id"]; b.key=d.get("key"); return b
 
 
 class Arrow:
@@ -1402,6 +2628,166 @@ class FloatText:
         ft.id=d["id"]; return ft
 
 
+class SpatialGrid:
+    """Uniform grid over world space: each key (a box or arrow id) is
+    listed in every `cell`-sized square its shape touches — a rectangle,
+    or a polyline walked cell by cell, so a long arrow only sits in the
+    cells it crosses.  query() returns the keys listed in the squares a
+    rectangle covers: candidates, to be checked exactly by the caller."""
+
+    def __init__(self,cell=256):
+        self.cell=cell
+        self.cells={}     # (i, j) -> set of keys
+        self.where={}     # key -> (shape, cells it is listed in)
+
+    def put_rect(self,key,x1,y1,x2,y2):
+        """List `key` under a rectangle; False if it already was."""
+        old=self.where.get(key)
+        if old is not None and old[0]==(x1,y1,x2,y2): return False
+        c=self.cell
+        return self._put(key,(x1,y1,x2,y2),
+                  [(i,j) for i in range(int(x1//c),int(x2//c)+1)
+                         for j in range(int(y1//c),int(y2//c)+1)])
+
+    def put_path(self,key,pts):
+        cells=set()
+        for (x1,y1),(x2,y2) in zip(pts,pts[1:]):
+            cells.update(self._segment_cells(x1,y1,x2,y2))
+        return self._put(key,tuple(pts),cells)
+
+    def _segment_cells(self,x1,y1,x2,y2):
+        c=self.cell
+        if x1>x2: x1,y1,x2,y2=x2,y2,x1,y1
+        slope=(y2-y1)/(x2-x1) if x2!=x1 else None
+        for i in range(int(x1//c),int(x2//c)+1):
+            if slope is None: ya,yb=y1,y2
+            else:             # the part of the segment inside column i
+                ya=y1+slope*(max(x1,i*c)-x1); yb=y1+slope*(min(x2,(i+1)*c)-x1)
+            for j in range(int(min(ya,yb)//c),int(max(ya,yb)//c)+1):
+                yield i,j
+
+    def _put(self,key,shape,cells):
+        old=self.where.get(key)
+        if old is not None:
+            if old[0]==shape: return False
+            self.remove(key)
+        self.where[key]=(shape,cells)
+        for ij in cells:
+            bucket=self.cells.get(ij)
+            if bucket is None: self.cells[ij]={key}
+            else: bucket.add(key)
+        return True
+
+    def remove(self,key):
+        entry=self.where.pop(key,None)
+        if entry is None: return
+        for ij in entry[1]:
+            bucket=self.cells[ij]; bucket.discard(key)
+            if not bucket: del self.cells[ij]
+
+    def shape(self,key):
+        entry=self.where.get(key)
+        return entry[0] if entry else None
+
+    def query(self,x1,y1,x2,y2):
+        c=self.cell; out=set()
+        i1,i2=int(x1//c),int(x2//c); j1,j2=int(y1//c),int(y2//c)
+        if (i2-i1+1)*(j2-j1+1)>len(self.cells):    # zoomed far out: walk the occupied cells
+            for (i,j),bucket in self.cells.items():
+                if i1<=i<=i2 and j1<=j<=j2: out|=bucket
+            return out
+        for i in range(i1,i2+1):
+            for j in range(j1,j2+1):
+                bucket=self.cells.get((i,j))
+                if bucket: out|=bucket
+        return out
+
+
+class History:
+    """Undo / redo as patches.  An entry is a list of ops that name only
+    what they touched:
+
+        ("set",    obj,  {attr: (old, new)})      attributes of one object
+        ("insert", name, [(index, obj), ...])     items put into owner.<name>
+        ("remove", name, [(index, obj), ...])     items taken out (ascending)
+        ["swap",   name, other_list]              owner.<name> replaced whole
+        ["ids",    (box, arrow, text)]            the id counters, with a swap
+
+    A set op may carry its cost as a 4th element when the values it keeps
+    alive outweigh the attributes it names (a whole analysis, say).
+
+    Undo and redo replay an entry's ops (inverse, reverse order), so they
+    cost the size of the entry, never of the diagram.  Set-only entries
+    recorded with the same `key` within `window` seconds merge into one
+    (a burst of drags of the same selection).  Oldest entries are dropped
+    beyond `max_entries` or `max_cost` attribute / object references."""
+
+    def __init__(self,owner,max_entries=500,max_cost=500_000,window=1.0):
+        self.owner=owner; self.max_entries=max_entries; self.max_cost=max_cost
+        self.window=window
+        self.done=[]; self.undone=[]; self.cost=0
+
+    @staticmethod
+    def _op_cost(op):
+        if len(op)>3: return op[3]
+        return len(op[2]) if op[0] in ("set","insert","remove","swap") else 1
+
+    def record(self,label,ops,key=None):
+        ops=[op for op in ops if op[0]!="set" or op[2]]
+        if not ops: return
+        now=time.monotonic()
+        for e in self.undone: self.cost-=e["cost"]
+        self.undone.clear()
+        last=self.done[-1] if self.done else None
+        if (key is not None and last and last["key"]==key and now-last["t"]<self.window
+                and all(op[0]=="set" for op in ops)):
+            by_obj={id(op[1]):op for op in last["ops"]}
+            for op in ops:
+                prev=by_obj.get(id(op[1]))
+                if prev is None:
+                    last["ops"].append(op); last["cost"]+=len(op[2]); self.cost+=len(op[2])
+                    continue
+                for attr,(old,new) in op[2].items():
+                    if attr not in prev[2]: last["cost"]+=1; self.cost+=1
+                    prev[2][attr]=(prev[2].get(attr,(old,new))[0],new)
+            last["t"]=now
+            return
+        cost=sum(self._op_cost(op) for op in ops)
+        self.done.append(dict(label=label,ops=ops,key=key,t=now,cost=cost))
+        self.cost+=cost
+        while len(self.done)>1 and (len(self.done)>self.max_entries or self.cost>self.max_cost):
+            self.cost-=self.done.pop(0)["cost"]
+
+    def undo(self):
+        if not self.done: return None
+        e=self.done.pop(); self._apply(e["ops"],undo=True)
+        e["key"]=None; self.undone.append(e)
+        return e["label"]
+
+    def redo(self):
+        if not self.undone: return None
+        e=self.undone.pop(); self._apply(e["ops"],undo=False)
+        e["t"]=0; self.done.append(e)
+        return e["label"]
+
+    def _apply(self,ops,undo):
+        for op in (reversed(ops) if undo else ops):
+            kind=op[0]
+            if kind=="set":
+                for attr,(old,new) in op[2].items(): setattr(op[1],attr,old if undo else new)
+            elif kind in ("insert","remove"):
+                lst=getattr(self.owner,op[1])
+                if (kind=="insert")==undo:
+                    for i,_ in reversed(op[2]): del lst[i]
+                else:
+                    for i,obj in op[2]: lst.insert(i,obj)
+            elif kind=="swap":
+                cur=getattr(self.owner,op[1]); setattr(self.owner,op[1],op[2]); op[2]=cur
+            elif kind=="ids":
+                cur=(Box._id,Arrow._id,FloatText._id)
+                Box._id,Arrow._id,FloatText._id=op[1]; op[1]=cur
+
+
 # ═══ TEMPLATES (all 28, compact) ═════════════════════════════════════════════
 
 def _b(x,y,w,h,label,color="Blue",shape="rect"):
@@ -1716,8 +3102,691 @@ TEMPLATES = {
     },
 }
 
+# ═══ TEXT-TO-DIAGRAM DSL ══════════════════════════════════════════════════════
+
+class DslDocument:
+    """The Text-to-Diagram DSL, parsed line by line.
+
+    update(text) diffs the new text against the last one (common head and
+    tail), re-parses only the lines in between — through a cache keyed by
+    the line's text — and refolds the per-line results into `nodes`
+    ({name: {type, color, fill, stroke}}) and `edges` ([{src, dst, op,
+    lbl}]).  Node and edge dicts are shared with the cache: read only."""
+
+    NODE_FILLS = {
+        "actor":    ("Gray",   "#2e2e3e","#666688"),
+        "system":   ("Blue",   "#2e3a5c","#5a7ec8"),
+        "database": ("Teal",   "#1e3d3a","#3aaaa0"),
+        "queue":    ("Orange", "#4a3020","#cc7744"),
+        "cloud":    ("Green",  "#1e3d2e","#3aaa6a"),
+        "service":  ("Purple", "#3a2e5c","#7c6fcd"),
+        "ui":       ("Pink",   "#3a1e3a","#cc44cc"),
+        "api":      ("Yellow", "#3a3a1e","#aaaa3a"),
+        "default":  ("Blue",   "#2e3a5c","#5a7ec8"),
+    }
+    COLOR_MAP = {
+        "blue":   ("#2e3a5c","#5a7ec8"), "green":  ("#1e3d2e","#3aaa6a"),
+        "purple": ("#3a2e5c","#7c6fcd"), "teal":   ("#1e3d3a","#3aaaa0"),
+        "orange": ("#4a3020","#cc7744"), "red":    ("#4a2020","#cc4444"),
+        "gray":   ("#2e2e3e","#666688"), "yellow": ("#3a3a1e","#aaaa3a"),
+        "pink":   ("#3a1e3a","#cc44cc"),
+    }
+    DIAGRAM_COLOR_MAP = {
+        "blue":"Blue","green":"Green","purple":"Purple","teal":"Teal",
+        "orange":"Orange","red":"Red","gray":"Gray","yellow":"Yellow","pink":"Pink",
+    }
+    TYPE_COLOR_MAP = {
+        "actor":"Gray","system":"Blue","database":"Teal","queue":"Orange",
+        "cloud":"Green","service":"Purple","ui":"Pink","api":"Yellow",
+    }
+    DEFAULT_NODE = {"type":"default","color":"Blue","fill":"#2e3a5c","stroke":"#5a7ec8"}
+
+    TYPE_RE = re.compile(r"^(Actor|System|Database|Queue|Cloud|Service|UI|API|DB):\s*(.+)", re.I)
+    EDGE_RE = re.compile(r"^(.+?)\s*(<->|-->|->)\s*(.+)")
+    LBL_RE  = re.compile(r"\[label:\s*([^\]]+)\]")
+    COL_RE  = re.compile(r"\[color:\s*(\w+)\]")
+    BRACKET_RE = re.compile(r"\[.*?\]")
+    KEYWORD_RE = re.compile(r"(Actor|System|Database|Queue|Cloud|Service|UI|API|DB):", re.I)
+
+    def __init__(self):
+        self.lines=[]; self.parsed=[]; self.nodes={}; self.edges=[]
+        self._cache={}
+
+    @classmethod
+    def _clean(cls,s): return cls.BRACKET_RE.sub("",s).strip()
+
+    def parse_line(self,raw):
+        """("node", name, info) / ("edge", info) / None, cached by text."""
+        hit=self._cache.get(raw,self)
+        if hit is not self: return hit
+        line=raw.strip(); out=None
+        if line and not line.startswith("#"):
+            tm=self.TYPE_RE.match(line)
+            if tm:
+                typ=tm.group(1).lower(); rest=tm.group(2)
+                m=self.COL_RE.search(rest); col=m.group(1).lower() if m else None
+                if col and col in self.COLOR_MAP:
+                    fill,stroke=self.COLOR_MAP[col]; dcolor=self.DIAGRAM_COLOR_MAP.get(col,"Blue")
+                else:
+                    dcolor,fill,stroke=self.NODE_FILLS.get(typ,self.NODE_FILLS["default"])
+                out=("node",self._clean(rest),
+                     {"type":typ,"color":dcolor,"fill":fill,"stroke":stroke})
+            else:
+                em=self.EDGE_RE.match(line)
+                if em:
+                    lbl=""
+                    for part in (em.group(3),em.group(1)):
+                        m=self.LBL_RE.search(part)
+                        if m: lbl=m.group(1).strip(); break
+                    out=("edge",{"src":self._clean(em.group(1)),"dst":self._clean(em.group(3)),
+                                 "op":em.group(2),"lbl":lbl})
+        if len(self._cache)>2*len(self.lines)+1024:
+            self._cache={l:p for l,p in zip(self.lines,self.parsed)}
+        self._cache[raw]=out
+        return out
+
+    def update(self,text):
+        """Take the editor's text.  Returns (lo, hi, changed): the new lines
+        lo..hi-1 differ from before, `changed` if nodes / edges did — or
+        None when the text is the same."""
+        old=self.lines; new=text.split("\n")
+        if new==old: return None
+        lo=0; n=min(len(old),len(new))
+        while lo<n and old[lo]==new[lo]: lo+=1
+        ho,hn=len(old),len(new)
+        while ho>lo and hn>lo and old[ho-1]==new[hn-1]: ho-=1; hn-=1
+        parsed=[self.parse_line(l) for l in new[lo:hn]]
+        changed=parsed!=self.parsed[lo:ho]
+        self.parsed[lo:ho]=parsed; self.lines=new
+        if changed: self._fold()
+        return lo,hn,changed
+
+    def _fold(self):
+        nodes={}; edges=[]
+        for p in self.parsed:
+            if p is None: continue
+            if p[0]=="node": nodes[p[1]]=p[2]; continue
+            e=p[1]; edges.append(e)
+            if e["src"] not in nodes: nodes[e["src"]]=self.DEFAULT_NODE
+            if e["dst"] not in nodes: nodes[e["dst"]]=self.DEFAULT_NODE
+        self.nodes=nodes; self.edges=edges
+
+
+DSL_BOX = (160, 52)
+
+
+def dsl_layout(doc):
+    """{name: (x, y)} — the layered layout the editor's preview starts from."""
+    names=list(doc.nodes)
+    return layered_layout(names,[(e["src"],e["dst"]) for e in doc.edges],
+                          {nm:DSL_BOX for nm in names},
+                          h_gap=50,v_gap=78,start_x=50,start_y=50)
+
+
+def dsl_to_diagram(source,positions=None):
+    """
+    Diagram dict for a DSL text (or a DslDocument): one box per node, one
+    arrow per edge.  `positions` ({name: (x, y)}, e.g. dragged in the
+    preview) wins over the layered layout.
+    """
+    doc=source
+    if not isinstance(source,DslDocument):
+        doc=DslDocument(); doc.update(source)
+    positions=positions or {}
+    auto={} if all(nm in positions for nm in doc.nodes) else dsl_layout(doc)
+    boxes,arrows,ids=[],[],{}
+    for nm,nd in doc.nodes.items():
+        x,y=positions.get(nm) or auto.get(nm,(100,100))
+        color=DslDocument.DIAGRAM_COLOR_MAP.get(nd.get("color","blue").lower(),"Blue")
+        if color=="Blue" and nd["type"]!="default":
+            color=DslDocument.TYPE_COLOR_MAP.get(nd["type"],"Blue")
+        ids[nm]=len(boxes)+1
+        boxes.append(dict(id=ids[nm],x=x,y=y,w=DSL_BOX[0],h=DSL_BOX[1],
+                          label=nd["type"].upper()+"\n"+nm if nd["type"]!="default" else nm,
+                          color=color,
+                          shape="actor" if nd["type"]=="actor" else
+                                "cylinder" if nd["type"]=="database" else "rect"))
+    for e in doc.edges:
+        if e["src"] in ids and e["dst"] in ids:
+            arrows.append(dict(id=len(arrows)+1,src_id=ids[e["src"]],dst_id=ids[e["dst"]],
+                               label=e["lbl"],line_style="dashed" if e["op"]=="-->" else "solid",
+                               head_style="open",orthogonal=False))
+    return dict(boxes=boxes,arrows=arrows,floattexts=[])
+
+# ═══ HEADLESS DRAWING ═════════════════════════════════════════════════════════
+# A diagram becomes a list of shapes in diagram coordinates, the ones
+# DiagramApp._draw_box / _draw_arrow / _draw_floattext put on the canvas
+# at 100 % zoom; render_svg and render_png only translate them.
+#   ("rect",  x1, y1, x2, y2, fill, outline, width, radius)
+#   ("oval",  x1, y1, x2, y2, fill, outline, width)
+#   ("poly",  points, fill, outline, width)
+#   ("line",  points, colour, width, dash)
+#   ("text",  x, y, lines, pt, colour, anchor "c" | "s", family, weight, slant)
+
+def _edge_point(b,tx,ty):
+    """Where the line from box `b`'s centre towards (tx, ty) leaves it."""
+    hw,hh=b["w"]/2,b["h"]/2; cx,cy=b["x"]+hw,b["y"]+hh; dx,dy=tx-cx,ty-cy
+    if dx==0 and dy==0: return cx,cy
+    a=math.atan2(dy,dx); ca,sa=math.cos(a),math.sin(a)
+    s=b.get("shape","rect")
+    if s in("circle","ellipse","oval"):
+        d=math.hypot(ca/hw,sa/hh); scale=1/d if d else hw
+    elif s=="diamond":
+        denom=abs(ca)*hh+abs(sa)*hw
+        scale=(hw*hh)/denom if denom else hw
+    else:
+        scale=hw/abs(ca) if abs(ca)*hh>abs(sa)*hw else hh/abs(sa)
+    return cx+ca*scale, cy+sa*scale
+
+
+def _wrap(text,width,pt,family="mono"):
+    """Tk-style wrapping of `text` at `width` pixels (approximate glyph widths)."""
+    per=max(1,int(width/(pt*4/3*(0.6 if family=="mono" else 0.55))))
+    out=[]
+    for line in text.split("\n"):
+        out+=textwrap.wrap(line,per,break_on_hyphens=False) or [""]
+    return out
+
+
+def _label(ops,cx,cy,text,width,pt=10):
+    ops.append(("text",cx,cy,_wrap(text,width,pt),pt,TEXT_LIGHT,"c","mono","normal","normal"))
+
+
+def _box_ops(ops,b):
+    x1,y1=b["x"],b["y"]; x2,y2=x1+b["w"],y1+b["h"]
+    fill,bc=BOX_COLORS.get(b.get("color","Blue"),("#2e3a5c","#5a7ec8")); lw=1
+    W=x2-x1; H=y2-y1; cx=(x1+x2)/2; cy=(y1+y2)/2
+    s=b.get("shape","rect"); label=b.get("label","")
+    if s=="roundrect":
+        r=min(10,W/4,H/4)
+        ops.append(("rect",x1+3,y1+3,x2+3,y2+3,"#111122","",0,0))
+        ops.append(("rect",x1,y1,x2,y2,fill,bc,lw,r))
+        _label(ops,cx,cy,label,W-10)
+    elif s in("circle","ellipse","oval"):
+        ops.append(("oval",x1,y1,x2,y2,fill,bc,lw))
+        _label(ops,cx,cy,label,W-12)
+    elif s=="diamond":
+        ops.append(("poly",[cx,y1,x2,cy,cx,y2,x1,cy],fill,bc,lw))
+        _label(ops,cx,cy,label,W*0.6)
+    elif s=="triangle":
+        ops.append(("poly",[cx,y1,x2,y2,x1,y2],fill,bc,lw))
+        _label(ops,cx,y1+H*0.6,label,W-10)
+    elif s=="hexagon":
+        pts=[]
+        for i in range(6):
+            a=math.radians(60*i-30); pts+=[cx+(W/2)*math.cos(a),cy+(H/2)*math.sin(a)]
+        ops.append(("poly",pts,fill,bc,lw))
+        _label(ops,cx,cy,label,W*0.7)
+    elif s=="parallelogram":
+        sk=min(20,W*0.2)
+        ops.append(("poly",[x1+sk,y1,x2,y1,x2-sk,y2,x1,y2],fill,bc,lw))
+        _label(ops,cx,cy,label,W-sk*2-4)
+    elif s=="note":
+        fold=min(16,W*0.2)
+        ops.append(("poly",[x1,y1,x2-fold,y1,x2,y1+fold,x2,y2,x1,y2],fill,bc,lw))
+        ops.append(("line",[x2-fold,y1,x2-fold,y1+fold,x2,y1+fold],bc,lw,()))
+        _label(ops,cx,cy,label,W-fold-4)
+    elif s=="cylinder":
+        ry=min(14,H*0.2)
+        ops.append(("rect",x1,y1+ry,x2,y2-ry,fill,"",0,0))
+        ops.append(("oval",x1,y1,x2,y1+ry*2,fill,bc,lw))
+        ops.append(("oval",x1,y2-ry*2,x2,y2,fill,bc,lw))
+        ops.append(("line",[x1,y1+ry,x1,y2-ry],bc,lw,()))
+        ops.append(("line",[x2,y1+ry,x2,y2-ry],bc,lw,()))
+        _label(ops,cx,cy,label,W-8)
+    elif s=="actor":
+        r=min(12,H*0.15)
+        ops.append(("oval",cx-r,y1,cx+r,y1+r*2,fill,bc,lw))
+        by=y1+r*2+(H*0.25); ay=y1+r*2+(H*0.1)
+        ops.append(("line",[cx,y1+r*2,cx,by],bc,lw,()))
+        ops.append(("line",[x1+4,ay,x2-4,ay],bc,lw,()))
+        ops.append(("line",[cx,by,x1+4,y2-4],bc,lw,()))
+        ops.append(("line",[cx,by,x2-4,y2-4],bc,lw,()))
+        if label:
+            ops.append(("text",cx,y2,_wrap(label,W,10,"sans"),10,TEXT_LIGHT,"s","sans","normal","normal"))
+    else:                                   # "rect" and anything unknown
+        ops.append(("rect",x1+3,y1+3,x2+3,y2+3,"#111122","",0,0))
+        ops.append(("rect",x1,y1,x2,y2,fill,"",0,0))
+        ops.append(("rect",x1,y1,x2,y1+max(3,H*0.06),bc,"",0,0))
+        ops.append(("rect",x1,y1,x2,y2,"",bc,lw,0))
+        _label(ops,cx,cy,label,W-10)
+
+
+def _arrowhead(x1,y1,x2,y2,d1,d2,d3):
+    """Tk's arrow=LAST with arrowshape=(d1, d2, d3), as a polygon."""
+    a=math.atan2(y2-y1,x2-x1); ca,sa=math.cos(a),math.sin(a)
+    nx,ny=x2-d1*ca,y2-d1*sa; bx,by=x2-d2*ca,y2-d2*sa
+    return [x2,y2, bx-d3*sa,by+d3*ca, nx,ny, bx+d3*sa,by-d3*ca]
+
+
+def _arrow_ops(ops,a,src,dst):
+    sx,sy=src["x"]+src["w"]/2,src["y"]+src["h"]/2
+    tx,ty=dst["x"]+dst["w"]/2,dst["y"]+dst["h"]/2
+    x1,y1=_edge_point(src,tx,ty); x2,y2=_edge_point(dst,sx,sy)
+    color=ARROW_COL; lw=1.5
+    dash=(6,4) if a.get("line_style","solid")=="dashed" else ()
+    head=a.get("head_style","open")
+    if a.get("orthogonal",False):
+        mx=(x1+x2)/2; pts=[x1,y1,mx,y1,mx,y2,x2,y2]; hx,hy=mx,y2
+    else:
+        pts=[x1,y1,x2,y2]; hx,hy=x1,y1
+    ops.append(("line",pts,color,lw,dash))
+    if head=="inheritance":
+        t=math.atan2(y2-hy,x2-hx); s=14; sp=math.radians(25)
+        ops.append(("poly",[x2,y2,x2-s*math.cos(t-sp),y2-s*math.sin(t-sp),
+                            x2-s*math.cos(t+sp),y2-s*math.sin(t+sp)],BG,color,1.5))
+    elif head in("diamond","odiamond"):
+        t=math.atan2(y2-hy,x2-hx); s=14
+        bx=x2-s*math.cos(t); by=y2-s*math.sin(t)
+        mx=x2-(s/2)*math.cos(t); my=y2-(s/2)*math.sin(t)
+        p=t+math.pi/2; w=s*0.45
+        ops.append(("poly",[x2,y2,mx+w*math.cos(p),my+w*math.sin(p),bx,by,
+                            mx-w*math.cos(p),my-w*math.sin(p)],
+                    color if head=="odiamond" else BG,color,1.5))
+    elif head=="filled":
+        ops.append(("poly",_arrowhead(pts[-4],pts[-3],x2,y2,12,14,5),color,"",0))
+    elif head!="none":
+        ops.append(("poly",_arrowhead(pts[-4],pts[-3],x2,y2,10,12,4),color,"",0))
+    if a.get("label"):
+        ops.append(("text",(x1+x2)/2,(y1+y2)/2-10,[a["label"]],9,ACCENT2,"c","sans","normal","normal"))
+
+
+def diagram_ops(data):
+    """(shapes, (x1, y1, x2, y2) bounds) for a diagram dict."""
+    ops=[]
+    boxes={b["id"]:b for b in data.get("boxes",[])}
+    for a in data.get("arrows",[]):
+        src=boxes.get(a["src_id"]); dst=boxes.get(a["dst_id"])
+        if src and dst: _arrow_ops(ops,a,src,dst)
+    for b in data.get("boxes",[]):
+        _box_ops(ops,b)
+    for ft in data.get("floattexts",[]):
+        style=ft.get("style","normal")
+        ops.append(("text",ft["x"],ft["y"],ft.get("text","").split("\n"),13 if style=="heading" else 11,
+                    ACCENT2,"c","sans","bold" if style=="heading" else "normal",
+                    "italic" if style=="note" else "normal"))
+    xs,ys=[],[]
+    for op in ops:
+        kind=op[0]
+        if kind in("rect","oval"):
+            xs+=[op[1],op[3]]; ys+=[op[2],op[4]]
+        elif kind in("poly","line"):
+            xs+=op[1][0::2]; ys+=op[1][1::2]
+        else:
+            _,x,y,lines,pt=op[:5]; px=pt*4/3
+            half=max((len(l) for l in lines),default=0)*px*0.3; tall=len(lines)*px*1.2
+            xs+=[x-half,x+half]; ys+=[y-tall,y+tall] if op[6]=="s" else [y-tall/2,y+tall/2]
+    if not xs: return ops,(0,0,1,1)
+    return ops,(min(xs),min(ys),max(xs),max(ys))
+
+# ═══ SVG ══════════════════════════════════════════════════════════════════════
+
+def _esc(s):
+    return s.replace("&","&amp;").replace("<","&lt;").replace(">","&gt;").replace('"',"&quot;")
+
+
+def _svg_paint(fill,outline,width):
+    out=f'fill="{fill or "none"}"'
+    if outline and width: out+=f' stroke="{outline}" stroke-width="{width:g}"'
+    return out
+
+
+def render_svg(data,scale=1.0,margin=40):
+    """SVG text for a diagram dict: the whole diagram plus `margin`,
+    `scale` × its size in pixels."""
+    ops,(bx1,by1,bx2,by2)=diagram_ops(data)
+    ox,oy=margin-bx1,margin-by1
+    vw=bx2-bx1+2*margin; vh=by2-by1+2*margin
+    f=lambda v:f"{v:.1f}"
+    pts=lambda p:" ".join(f"{p[i]+ox:.1f},{p[i+1]+oy:.1f}" for i in range(0,len(p),2))
+    out=[f'<svg xmlns="http://www.w3.org/2000/svg" width="{vw*scale:.0f}" height="{vh*scale:.0f}" '
+         f'viewBox="0 0 {vw:.1f} {vh:.1f}">',
+         f'<rect width="100%" height="100%" fill="{BG}"/>']
+    for op in ops:
+        kind=op[0]
+        if kind=="rect":
+            _,x1,y1,x2,y2,fill,outline,width,r=op
+            rx=f' rx="{r:.1f}"' if r else ""
+            out.append(f'<rect x="{f(x1+ox)}" y="{f(y1+oy)}" width="{f(x2-x1)}" height="{f(y2-y1)}"{rx} '
+                       f'{_svg_paint(fill,outline,width)}/>')
+        elif kind=="oval":
+            _,x1,y1,x2,y2,fill,outline,width=op
+            out.append(f'<ellipse cx="{f((x1+x2)/2+ox)}" cy="{f((y1+y2)/2+oy)}" rx="{f((x2-x1)/2)}" '
+                       f'ry="{f((y2-y1)/2)}" {_svg_paint(fill,outline,width)}/>')
+        elif kind=="poly":
+            _,p,fill,outline,width=op
+            out.append(f'<polygon points="{pts(p)}" {_svg_paint(fill,outline,width)}/>')
+        elif kind=="line":
+            _,p,color,width,dash=op
+            d=f' stroke-dasharray="{dash[0]},{dash[1]}"' if dash else ""
+            out.append(f'<polyline points="{pts(p)}" fill="none" stroke="{color}" '
+                       f'stroke-width="{width:g}"{d}/>')
+        else:
+            _,x,y,lines,pt,color,anchor,family,weight,slant=op
+            px=pt*4/3; lh=px*1.2
+            top=y-len(lines)*lh if anchor=="s" else y-len(lines)*lh/2
+            fam="Consolas, monospace" if family=="mono" else "Segoe UI, sans-serif"
+            style=(f' font-weight="{weight}"' if weight!="normal" else "")+\
+                  (f' font-style="{slant}"' if slant!="normal" else "")
+            spans="".join(f'<tspan x="{f(x+ox)}" y="{f(top+(i+0.5)*lh+oy)}">{_esc(l)}</tspan>'
+                          for i,l in enumerate(lines))
+            out.append(f'<text text-anchor="middle" dominant-baseline="central" font-family="{fam}" '
+                       f'font-size="{px:.1f}"{style} fill="{color}">{spans}</text>')
+    out.append("</svg>")
+    return "\n".join(out)
+
+# ═══ PNG (Pillow) ═════════════════════════════════════════════════════════════
+
+_FONT_FILES = {
+    ("mono","normal"): ("DejaVuSansMono.ttf","consola.ttf","Menlo.ttc"),
+    ("mono","bold"):   ("DejaVuSansMono-Bold.ttf","consolab.ttf","Menlo.ttc"),
+    ("sans","normal"): ("DejaVuSans.ttf","segoeui.ttf","Arial.ttf"),
+    ("sans","bold"):   ("DejaVuSans-Bold.ttf","segoeuib.ttf","Arial Bold.ttf"),
+    ("sans","italic"): ("DejaVuSans-Oblique.ttf","segoeuii.ttf","Arial Italic.ttf"),
+}
+
+
+@lru_cache(maxsize=128)
+def _font(family,style,px):
+    from PIL import ImageFont
+    for name in _FONT_FILES.get((family,style),_FONT_FILES[(family,"normal")]):
+        try: return ImageFont.truetype(name,px)
+        except OSError: continue
+    try: return ImageFont.load_default(px)
+    except TypeError: return ImageFont.load_default()      # Pillow < 10.1
+
+
+def _dashed(p,dash):
+    """Split a polyline into its dash segments."""
+    on,off=dash; out=[]; left=on; drawing=True
+    for i in range(0,len(p)-2,2):
+        x1,y1,x2,y2=p[i],p[i+1],p[i+2],p[i+3]
+        seg=math.hypot(x2-x1,y2-y1); t=0.0
+        while seg>0 and t<seg:
+            step=min(left,seg-t); t2=t+step
+            if drawing:
+                out.append([x1+(x2-x1)*t/seg,y1+(y2-y1)*t/seg,x1+(x2-x1)*t2/seg,y1+(y2-y1)*t2/seg])
+            left-=step; t=t2
+            if left<=1e-9: drawing=not drawing; left=on if drawing else off
+    return out
+
+
+SUPERSAMPLE_MAX_PX = 48_000_000    # above this, draw at the output size
+
+
+def render_png(data,path,scale=1.0,margin=40,supersample=2):
+    """Write a diagram dict as PNG (`path`: file name or binary file) at
+    `scale` × its size.  Shapes are drawn `supersample` × larger and
+    box-filtered down, for smooth edges — unless that image would pass
+    SUPERSAMPLE_MAX_PX pixels.  Needs Pillow."""
+    from PIL import Image, ImageDraw
+    ops,(bx1,by1,bx2,by2)=diagram_ops(data)
+    ox,oy=margin-bx1,margin-by1
+    size=(max(1,round((bx2-bx1+2*margin)*scale)),max(1,round((by2-by1+2*margin)*scale)))
+    ss=max(1,int(supersample))
+    if size[0]*size[1]*ss*ss>SUPERSAMPLE_MAX_PX: ss=1
+    k=scale*ss
+    img=Image.new("RGB",(size[0]*ss,size[1]*ss),BG)
+    d=ImageDraw.Draw(img)
+    X=lambda v:(v+ox)*k; Y=lambda v:(v+oy)*k
+    P=lambda p:[(X(p[i]),Y(p[i+1])) for i in range(0,len(p),2)]
+    W=lambda w:max(1,round(w*k)) if w else 0
+    for op in ops:
+        kind=op[0]
+        if kind in("rect","oval"):
+            x1,y1,x2,y2,fill,outline,width=op[1:8]
+            box=[X(min(x1,x2)),Y(min(y1,y2)),X(max(x1,x2)),Y(max(y1,y2))]
+            paint=dict(fill=fill or None,outline=outline or None,width=W(width) if outline else 0)
+            if kind=="oval": d.ellipse(box,**paint)
+            elif op[8]: d.rounded_rectangle(box,radius=op[8]*k,**paint)
+            else: d.rectangle(box,**paint)
+        elif kind=="poly":
+            _,p,fill,outline,width=op
+            d.polygon(P(p),fill=fill or None,outline=outline or None,width=W(width) if outline else 0)
+        elif kind=="line":
+            _,p,color,width,dash=op
+            for seg in (_dashed(p,dash) if dash else [p]):
+                d.line(P(seg),fill=color,width=W(width),joint="curve")
+        else:
+            _,x,y,lines,pt,color,anchor,family,weight,slant=op
+            px=pt*4/3; lh=px*1.2
+            font=_font(family,"bold" if weight=="bold" else slant,max(1,round(px*k)))
+            top=y-len(lines)*lh if anchor=="s" else y-len(lines)*lh/2
+            for i,l in enumerate(lines):
+                if l: d.text((X(x),Y(top+(i+0.5)*lh)),l,fill=color,font=font,anchor="mm")
+    if ss>1: img=img.reduce(ss)
+    img.save(path,format="PNG",compress_level=3)
+
+
+class DslPreview:
+    """Live preview of a DslDocument on a canvas, with syntax colours in
+    the editor.
+
+    refresh() is the keystroke path: only the edited lines are re-parsed
+    and re-coloured, nodes keep the positions they have (new ones are put
+    next to a neighbour, a renamed one takes the old name's spot; the
+    full layered layout runs only when no node is placed yet or on
+    relayout()), and only nodes / edges whose drawing changed are redrawn.
+    schedule() debounces refresh() for <KeyRelease>."""
+
+    BOX_W, BOX_H = 160, 52
+    H_GAP, V_GAP = 50, 78
+    HL_TAGS = ("comment","type_kw","arrow","bracket")
+
+    def __init__(self,editor,canvas):
+        self.editor=editor; self.canvas=canvas
+        self.doc=DslDocument(); self.pos={}
+        self._job=None; self.last_ms=0.0
+        self._node_items={}     # name -> (signature, tag)
+        self._edge_items={}     # signature -> [tag, ...]
+        self._tag_seq=0; self._grid_key=None; self._ready=False
+
+    # ── keystroke path ────────────────────────────────────────────────────
+    def schedule(self,event=None):
+        if self._job: self.editor.after_cancel(self._job)
+        delay=int(min(400,40+2*self.last_ms))
+        self._job=self.editor.after(delay,self.refresh)
+
+    def refresh(self,full=False):
+        """Bring the preview up to the editor's text.  `full` re-parses,
+        lays out, redraws and re-colours everything."""
+        self._job=None; t0=time.perf_counter()
+        if full: self.doc=DslDocument(); self.pos={}; self._reset_canvas()
+        diff=self.doc.update(self.editor.get("1.0","end"))
+        if diff:
+            lo,hi,changed=diff
+            if changed: self._place(); self.render()
+            self.highlight(lo,hi)
+        elif full: self.render()
+        self.last_ms=(time.perf_counter()-t0)*1e3
+
+    def relayout(self):
+        self.pos={}; self._place(); self.render()
+
+    # ── layout ────────────────────────────────────────────────────────────
+    def _full_layout(self):
+        return dsl_layout(self.doc)
+
+    def _place(self):
+        nodes=self.doc.nodes; pos=self.pos
+        gone=[nm for nm in pos if nm not in nodes]
+        new=[nm for nm in nodes if nm not in pos]
+        if new and len(new)==len(nodes):
+            self.pos=self._full_layout(); return
+        for old,nm in zip(gone,new): pos[nm]=pos.pop(old)     # renamed as typed
+        for old in gone[len(new):]: del pos[old]
+        new=new[len(gone):]
+        if not new: return
+        cw,ch=self.BOX_W+self.H_GAP,self.BOX_H+self.V_GAP
+        taken={(int(x//cw),int(y//ch)) for x,y in pos.values()}
+        above={}; below={}
+        for e in self.doc.edges:
+            above.setdefault(e["dst"],e["src"]); below.setdefault(e["src"],e["dst"])
+        bottom=max(y for _,y in pos.values())+ch
+        for nm in new:
+            p=pos.get(above.get(nm)); q=pos.get(below.get(nm))
+            if p: x,y=p[0],p[1]+ch
+            elif q: x,y=q[0],q[1]-ch
+            else: x,y=50,bottom
+            cx,cy=int(x//cw),int(y//ch)
+            while (cx,cy) in taken: cx+=1
+            taken.add((cx,cy)); pos[nm]=(x+(cx-int(x//cw))*cw,y)
+
+    # ── canvas ────────────────────────────────────────────────────────────
+    def _reset_canvas(self):
+        self.canvas.delete("all")
+        self._node_items.clear(); self._edge_items.clear()
+        self._grid_key=None; self._ready=False
+
+    def _new_tag(self,kind):
+        self._tag_seq+=1; return f"{kind}{self._tag_seq}"
+
+    def render(self):
+        """Redraw what changed since the last render."""
+        c=self.canvas; pos=self.pos; nodes=self.doc.nodes; W,H=self.BOX_W,self.BOX_H
+        if not self._ready:
+            c.create_line(0,0,0,0,state="hidden",tags=("edges_top",))
+            c.create_text(8,8,anchor="nw",text="",fill="#555577",
+                          font=("Segoe UI",8),tags=("stats",))
+            self._ready=True
+        xs=[p[0] for p in pos.values()]; ys=[p[1] for p in pos.values()]
+        VW=max(3000,max(xs)+W+120) if xs else 3000
+        VH=max(2000,max(ys)+H+120) if ys else 2000
+        key=(-(-int(VW)//400)*400,-(-int(VH)//400)*400)
+        if key!=self._grid_key:
+            self._grid_key=key; VW,VH=key
+            c.delete("grid"); c.configure(scrollregion=(0,0,VW,VH))
+            for x in range(0,VW,40): c.create_line(x,0,x,VH,fill="#252535",width=1,tags=("grid",))
+            for y in range(0,VH,40): c.create_line(0,y,VW,y,fill="#252535",width=1,tags=("grid",))
+            c.tag_lower("grid")
+        # edges: drawn per distinct (geometry, style), as many as there are
+        want={}
+        for e in self.doc.edges:
+            sp=pos.get(e["src"]); dp=pos.get(e["dst"])
+            if not sp or not dp: continue
+            sig=(sp,dp,e["op"],e["lbl"]); want[sig]=want.get(sig,0)+1
+        for sig in list(self._edge_items):
+            tags=self._edge_items[sig]; keep=want.get(sig,0)
+            while len(tags)>keep: c.delete(tags.pop())
+            if not tags: del self._edge_items[sig]
+        for sig,n in want.items():
+            tags=self._edge_items.setdefault(sig,[])
+            while len(tags)<n:
+                tag=self._new_tag("e"); tags.append(tag)
+                self._draw_edge(_Pen(c,(tag,)),*sig); c.tag_lower(tag,"edges_top")
+        # nodes
+        for nm in [nm for nm in self._node_items if nm not in nodes or nm not in pos]:
+            c.delete(self._node_items.pop(nm)[1])
+        for nm,nd in nodes.items():
+            p=pos.get(nm)
+            if not p: continue
+            sig=(p,nd["type"],nd["fill"],nd["stroke"])
+            old=self._node_items.get(nm)
+            if old and old[0]==sig: continue
+            if old: c.delete(old[1])
+            tag=self._new_tag("n"); self._node_items[nm]=(sig,tag)
+            self._draw_node(_Pen(c,(tag,)),nm,nd,*p)
+        c.itemconfigure("stats",text=f"{len(nodes)} nodes  {len(self.doc.edges)} edges")
+        c.tag_raise("stats")
+
+    def _draw_edge(self,c,sp,dp,op,lbl):
+        W,H=self.BOX_W,self.BOX_H
+        x1=sp[0]+W//2; y1=sp[1]+H//2
+        x2=dp[0]+W//2; y2=dp[1]+H//2
+        dash=(6,4) if op=="-->" else ()
+        c.create_line(x1,y1,x2,y2,fill="#6878a8",width=1.5,dash=dash,
+                      arrow=tk.LAST,arrowshape=(10,12,4))
+        if op=="<->":
+            c.create_line(x1,y1,x2,y2,fill="#6878a8",width=1.5,
+                          arrow=tk.FIRST,arrowshape=(10,12,4))
+        if lbl:
+            mx,my=(x1+x2)//2,(y1+y2)//2
+            c.create_rectangle(mx-40,my-10,mx+40,my+10,fill="#1a1a2e",outline="")
+            c.create_text(mx,my,text=lbl,fill="#a89ee8",font=("Segoe UI",9))
+
+    def _draw_node(self,c,nm,nd,x,y):
+        BOX_W,BOX_H=self.BOX_W,self.BOX_H
+        fill=nd["fill"]; stroke=nd["stroke"]; typ=nd["type"]
+        if typ=="actor":
+            # Stick figure
+            cx=x+BOX_W//2; r=10
+            c.create_oval(cx-r,y,cx+r,y+r*2,fill=fill,outline=stroke)
+            c.create_line(cx,y+r*2,cx,y+r*2+20,fill=stroke,width=1.5)
+            c.create_line(cx-15,y+r*3+2,cx+15,y+r*3+2,fill=stroke,width=1.5)
+            c.create_line(cx,y+r*2+20,cx-12,y+r*2+34,fill=stroke,width=1.5)
+            c.create_line(cx,y+r*2+20,cx+12,y+r*2+34,fill=stroke,width=1.5)
+            c.create_text(cx,y+BOX_H,text=nm,fill="#e0dff5",font=("Segoe UI",10,"bold"))
+        elif typ=="database":
+            ry=8; cx=x+BOX_W//2
+            c.create_oval(x,y,x+BOX_W,y+ry*2,fill=fill,outline=stroke)
+            c.create_rectangle(x,y+ry,x+BOX_W,y+BOX_H-ry,fill=fill,outline="")
+            c.create_oval(x,y+BOX_H-ry*2,x+BOX_W,y+BOX_H,fill=fill,outline=stroke)
+            c.create_line(x,y+ry,x,y+BOX_H-ry,fill=stroke)
+            c.create_line(x+BOX_W,y+ry,x+BOX_W,y+BOX_H-ry,fill=stroke)
+            c.create_text(cx,y+BOX_H//2,text=nm,fill="#e0dff5",font=("Segoe UI",10,"bold"))
+        elif typ=="queue":
+            rx=BOX_H//2; cx=x+BOX_W//2
+            c.create_arc(x+BOX_W-rx*2,y,x+BOX_W,y+BOX_H,start=270,extent=180,
+                         fill=fill,outline=stroke)
+            c.create_arc(x,y,x+rx*2,y+BOX_H,start=90,extent=180,fill=fill,outline=stroke)
+            c.create_rectangle(x+rx,y,x+BOX_W-rx,y+BOX_H,fill=fill,outline="")
+            c.create_line(x+rx,y,x+BOX_W-rx,y,fill=stroke)
+            c.create_line(x+rx,y+BOX_H,x+BOX_W-rx,y+BOX_H,fill=stroke)
+            c.create_text(cx,y+BOX_H//2,text=nm,fill="#e0dff5",font=("Segoe UI",10,"bold"))
+        else:
+            # Standard rect with accent bar and type badge
+            c.create_rectangle(x+3,y+3,x+BOX_W+3,y+BOX_H+3,fill="#111122",outline="")
+            c.create_rectangle(x,y,x+BOX_W,y+BOX_H,fill=fill,outline=stroke)
+            c.create_rectangle(x,y,x+BOX_W,y+5,fill=stroke,outline="")
+            badge=typ.upper() if typ!="default" else ""
+            cx_nm=x+BOX_W//2
+            if badge:
+                c.create_text(cx_nm,y+16,text=badge,fill="#888aaa",font=("Segoe UI",8))
+                c.create_text(cx_nm,y+34,text=nm,fill="#e0dff5",font=("Segoe UI",10,"bold"))
+            else:
+                c.create_text(cx_nm,y+BOX_H//2,text=nm,fill="#e0dff5",font=("Segoe UI",10,"bold"))
+
+    def node_at(self,x,y):
+        for nm,p in self.pos.items():
+            if p[0]<=x<=p[0]+self.BOX_W and p[1]<=y<=p[1]+self.BOX_H: return nm
+        return None
+
+    # ── syntax colours ────────────────────────────────────────────────────
+    def highlight(self,lo=0,hi=None):
+        """Re-colour editor lines lo..hi-1 (0-based) from the parsed text."""
+        ed=self.editor; lines=self.doc.lines
+        hi=len(lines) if hi is None else hi
+        if hi<=lo: return
+        for t in self.HL_TAGS: ed.tag_remove(t,f"{lo+1}.0",f"{hi}.end")
+        for i in range(lo,hi):
+            line=lines[i]; s=line.strip(); n=i+1
+            if s.startswith("#"):
+                ed.tag_add("comment",f"{n}.0",f"{n}.end")
+            elif DslDocument.KEYWORD_RE.match(s):
+                ed.tag_add("type_kw",f"{n}.0",f"{n}.{line.index(':')+1}")
+            if "->" in line:
+                for kw in ("->","-->","<->"):
+                    k=line.find(kw)
+                    if k>=0: ed.tag_add("arrow",f"{n}.{k}",f"{n}.{k+len(kw)}")
+            for m in DslDocument.BRACKET_RE.finditer(line):
+                ed.tag_add("bracket",f"{n}.{m.start()}",f"{n}.{m.end()}")
+
+
 # ═══ MAIN APPLICATION ═════════════════════════════════════════════════════════
 
+class _Pen:
+    """The canvas as seen by the _draw_* helpers: every item they create
+    is tagged with `tags`, so one object's items can be moved, scaled or
+    deleted together."""
+    def __init__(self, canvas, tags):
+        self.canvas=canvas; self.tags=tags
+
+    def __getattr__(self, name):
+        fn=getattr(self.canvas,name)
+        if not name.startswith("create_"): return fn
+        return lambda *a,**kw: fn(*a,tags=self.tags,**kw)
+
+
 class DiagramApp:
     HANDLE_R = 5
 
@@ -1732,7 +3801,7 @@ class DiagramApp:
         self.selected       = None    # primary selected item (for single ops)
         self.mode           = "select"
         self.arrow_src      = None
-        self.undo_stack     = []
+        self.history        = History(self)
         self.clipboard      = []      # copied boxes
 
         self.offset_x, self.offset_y = 40, 40
@@ -1753,9 +3822,31 @@ class DiagramApp:
         self.ortho_enabled  = tk.BooleanVar(value=False)
         self.minimap_enabled= tk.BooleanVar(value=True)
         self.focus_enabled  = tk.BooleanVar(value=True)   # highlight on select
+        self.watch_enabled  = tk.BooleanVar(value=False)  # re-analyse on file changes
+        self._analysis      = None    # {path, mode, data, tree, texts} of the analysis on the canvas
+        self._watch         = None    # running watch (see _start_watch)
         self._focus_ids     = set()   # box ids in focus (selected + neighbours)
         self._focus_arrow_ids = set() # arrow ids connected to focused boxes
 
+        # Retained scene: canvas items stay put between frames (see _draw_all)
+        self._scene         = {}      # "b12" / "a7" / "t3" -> signature drawn from
+        self._scene_view    = None    # (offset_x, offset_y, zoom) items are at; None = rebuild
+        self._layer_marks   = {}      # "arrow"/"box"/"text" -> hidden item under that layer
+        self._grid_key      = None
+        self._style_zoom    = 1.0     # zoom fonts and line widths were drawn for
+        self._zoom_job      = None
+        self._minimap_job   = None
+        self._minimap_xf    = None    # (ox, oy, scale, canvas w, h) of the minimap drawn
+
+        # Lookup: id maps + spatial grids for hit-tests, band selection, culling
+        self._index_gen     = None
+        self._boxes_by_id   = {}
+        self._box_order     = {}      # box id -> index in self.boxes (z-order)
+        self._arrow_order   = {}      # arrow id -> index in self.arrows
+        self._box_grid      = SpatialGrid()
+        self._arrow_grid    = SpatialGrid()
+        self._arrow_geo     = {}      # arrow id -> end-box geometry its path was indexed for
+
         self.new_line_style = tk.StringVar(value="solid")
         self.new_head_style = tk.StringVar(value="open")
         self.new_color      = tk.StringVar(value="Blue")
@@ -1848,6 +3939,10 @@ class DiagramApp:
                   relief="flat", padx=10, pady=8, cursor="hand2",
                   font=("Segoe UI",10,"bold"),
                   command=self._analyse_code).pack(side="left",padx=3,pady=6)
+        tk.Checkbutton(tb, text="👁 Watch", variable=self.watch_enabled,
+                       bg=SURFACE, fg=TEXT_LIGHT, selectcolor=ACCENT,
+                       activebackground=SURFACE, font=("Segoe UI",9), cursor="hand2",
+                       command=self._toggle_watch).pack(side="left", padx=3, pady=8)
 
         tk.Button(tb, text="✍ Text to Diagram", bg="#5c3a1e", fg="white",
                   relief="flat", padx=10, pady=8, cursor="hand2",
@@ -1953,7 +4048,7 @@ class DiagramApp:
         info=tk.Frame(parent,bg=SURFACE,width=175); info.pack(fill="y",side="right"); info.pack_propagate(False)
         tk.Label(info,text="SHORTCUTS",bg=SURFACE,fg=TEXT_MUTED,font=("Segoe UI",9,"bold"),pady=6).pack()
         for key,desc in [("Ctrl+S","Save"),("Ctrl+O","Open"),("Ctrl+Z","Undo"),
-                         ("Ctrl+C","Copy"),("Ctrl+V","Paste"),
+                         ("Ctrl+Y","Redo"),("Ctrl+C","Copy"),("Ctrl+V","Paste"),
                          ("Del","Delete"),("Esc","Deselect / unfocus"),
                          ("S","Toggle snap"),("O","Toggle ortho"),
                          ("F","Toggle focus mode"),
@@ -2020,9 +4115,11 @@ class DiagramApp:
     # ═══ HIT TEST ═════════════════════════════════════════════════════════════
 
     def _box_at(self,wx,wy):
-        for b in reversed(self.boxes):
-            if b.contains(wx,wy): return b
-        return None
+        self._ensure_index()
+        hits=[self._boxes_by_id[k] for k in self._box_grid.query(wx,wy,wx,wy)]
+        hits=[b for b in hits if b.contains(wx,wy)]
+        # topmost = drawn last = latest in self.boxes
+        return max(hits,key=lambda b:self._box_order[b.id]) if hits else None
 
     def _handle_at(self,box,wx,wy):
         tol=self.HANDLE_R*1.8/self.zoom
@@ -2031,16 +4128,19 @@ class DiagramApp:
         return None
 
     def _arrow_at(self,wx,wy,tol=8):
-        for a in self.arrows:
-            src=self._box_by_id(a.src_id); dst=self._box_by_id(a.dst_id)
-            if not src or not dst: continue
-            x1,y1=src.edge_point(*dst.center()); x2,y2=dst.edge_point(*src.center())
-            dx,dy=x2-x1,y2-y1; length=math.hypot(dx,dy)
-            if length==0: continue
-            t=max(0,min(1,((wx-x1)*dx+(wy-y1)*dy)/length**2))
-            px,py=x1+t*dx,y1+t*dy
-            if math.hypot(wx-px,wy-py)<tol/self.zoom: return a
-        return None
+        self._ensure_index(); r=tol/self.zoom
+        best=None
+        for aid in self._arrow_grid.query(wx-r,wy-r,wx+r,wy+r):
+            pts=self._arrow_grid.shape(aid)
+            for (x1,y1),(x2,y2) in zip(pts,pts[1:]):
+                dx,dy=x2-x1,y2-y1; length=math.hypot(dx,dy)
+                if length==0: continue
+                t=max(0,min(1,((wx-x1)*dx+(wy-y1)*dy)/length**2))
+                px,py=x1+t*dx,y1+t*dy
+                if math.hypot(wx-px,wy-py)<r:
+                    if best is None or self._arrow_order[aid]<self._arrow_order[best]: best=aid
+                    break
+        return self.arrows[self._arrow_order[best]] if best is not None else None
 
     def _floattext_at(self,wx,wy,tol=22):
         for ft in reversed(self.floattexts):
@@ -2048,9 +4148,65 @@ class DiagramApp:
         return None
 
     def _box_by_id(self,bid):
+        self._index_ids()
+        return self._boxes_by_id.get(bid)
+
+    # ═══ INDEX ════════════════════════════════════════════════════════════════
+    # Boxes and arrows are only ever appended or the lists replaced, so the
+    # list identity + length tells when the id maps must be rebuilt.  Geometry
+    # is re-checked (tuple compares) by every _draw_all, which follows every
+    # model change — hit-tests between two draws use the grids as they are.
+
+    def _index_key(self):
+        return (id(self.boxes),len(self.boxes),id(self.arrows),len(self.arrows))
+
+    def _ensure_index(self):
+        if self._index_gen!=self._index_key(): self._sync_index()
+
+    def _index_ids(self):
+        gen=self._index_key()
+        if gen==self._index_gen: return False
+        self._index_gen=gen
+        self._boxes_by_id={b.id:b for b in self.boxes}
+        self._box_order={b.id:i for i,b in enumerate(self.boxes)}
+        self._arrow_order={a.id:i for i,a in enumerate(self.arrows)}
+        return True
+
+    def _sync_index(self):
+        """Bring the box / arrow grids in line with the model; True if a
+        box was added, removed, moved or resized."""
+        changed=self._index_ids()
+        if changed:
+            for k in set(self._box_grid.where)-set(self._boxes_by_id): self._box_grid.remove(k)
+            for k in set(self._arrow_grid.where)-set(self._arrow_order): self._arrow_grid.remove(k)
+            for k in set(self._arrow_geo)-set(self._arrow_order): del self._arrow_geo[k]
+        grid=self._box_grid
         for b in self.boxes:
-            if b.id==bid: return b
-        return None
+            if grid.put_rect(b.id,b.x,b.y,b.x+b.w,b.y+b.h): changed=True
+        boxes=self._boxes_by_id; geo=self._arrow_geo
+        for a in self.arrows:
+            src=boxes.get(a.src_id); dst=boxes.get(a.dst_id)
+            if not src or not dst:
+                self._arrow_grid.remove(a.id); continue
+            key=(src.x,src.y,src.w,src.h,src.shape,dst.x,dst.y,dst.w,dst.h,dst.shape,a.orthogonal)
+            if geo.get(a.id)==key and a.id in self._arrow_grid.where: continue
+            geo[a.id]=key
+            self._arrow_grid.put_path(a.id,self._arrow_path(a,src,dst))
+        return changed
+
+    def _arrow_path(self,a,src,dst):
+        """World-space polyline of an arrow as _draw_arrow draws it."""
+        x1,y1=src.edge_point(*dst.center()); x2,y2=dst.edge_point(*src.center())
+        if getattr(a,"orthogonal",False):
+            mx=(x1+x2)/2
+            return [(x1,y1),(mx,y1),(mx,y2),(x2,y2)]
+        return [(x1,y1),(x2,y2)]
+
+    def _viewport(self,margin=40):
+        """World rectangle on screen, `margin` canvas pixels wider each side."""
+        c=self.canvas; w=c.winfo_width() or 1400; h=c.winfo_height() or 800
+        x1,y1=self._to_world(-margin,-margin); x2,y2=self._to_world(w+margin,h+margin)
+        return x1,y1,x2,y2
 
     # ═══ EVENTS ═══════════════════════════════════════════════════════════════
 
@@ -2123,6 +4279,8 @@ class DiagramApp:
         self.root.bind("<Control-s>",lambda e:self._save())
         self.root.bind("<Control-o>",lambda e:self._load())
         self.root.bind("<Control-z>",lambda e:self._undo())
+        self.root.bind("<Control-y>",lambda e:self._redo())
+        self.root.bind("<Control-Z>",lambda e:self._redo())
         self.root.bind("<Control-a>",lambda e:self._select_all_boxes())
         self.root.bind("<Control-c>",lambda e:self._copy())
         self.root.bind("<Control-v>",lambda e:self._paste())
@@ -2140,7 +4298,6 @@ class DiagramApp:
             self._pan_start=(event.x,event.y); return
 
         if self.mode=="shape":
-            self._push_undo()
             shape=self._pending_shape or "rect"
             sizes={"circle":(80,80),"ellipse":(120,70),"diamond":(120,80),
                    "triangle":(100,80),"hexagon":(100,80),"oval":(120,60),
@@ -2148,13 +4305,12 @@ class DiagramApp:
             w,h=sizes.get(shape,(160,70))
             sx,sy=self._snap(wx-w//2),self._snap(wy-h//2)
             b=Box(sx,sy,w,h,shape.capitalize(),self.new_color.get(),shape)
-            self.boxes.append(b); self.selected=b
+            self._append("Add shape","boxes",[b]); self.selected=b
             self.selected_items={b.id}; self._update_sel_info(); self._draw_all()
             return
 
         if self.mode=="text":
-            self._push_undo()
-            ft=FloatText(wx,wy); self.floattexts.append(ft)
+            ft=FloatText(wx,wy); self._append("Add text","floattexts",[ft])
             self._draw_all(); self._edit_floattext(ft); return
 
         if self.mode=="arrow":
@@ -2166,11 +4322,10 @@ class DiagramApp:
                     self._draw_all()
                 else:
                     if hit.id!=self.arrow_src.id:
-                        self._push_undo()
                         a=Arrow(self.arrow_src.id,hit.id,"",
                                 self.new_line_style.get(),self.new_head_style.get(),
                                 self.ortho_enabled.get())
-                        self.arrows.append(a)
+                        self._append("Add arrow","arrows",[a])
                     self.arrow_src=None; self.selected=None
                     self.status_var.set("Arrow  •  Click SOURCE → TARGET")
                     self._draw_all()
@@ -2223,7 +4378,8 @@ class DiagramApp:
             # Highlight boxes inside band
             x1,y1=self._to_world(*self._rband_start); x2,y2=wx,wy
             rx1,rx2=min(x1,x2),max(x1,x2); ry1,ry2=min(y1,y2),max(y1,y2)
-            self.selected_items={b.id for b in self.boxes
+            near=(self._boxes_by_id[k] for k in self._box_grid.query(rx1,ry1,rx2,ry2))
+            self.selected_items={b.id for b in near
                                  if b.x<rx2 and b.x+b.w>rx1 and b.y<ry2 and b.y+b.h>ry1}
             self._draw_all(); return
 
@@ -2254,7 +4410,17 @@ class DiagramApp:
             self._update_sel_info(); self._draw_all()
 
     def _on_release(self,event):
-        if self._drag_obj or self._resize_handle: self._push_undo()
+        if self._resize_handle and isinstance(self.selected,Box):
+            b=self.selected; ox,oy,ow,oh=self._resize_origin[:4]
+            self._record_sets("Resize",[(b,dict(x=ox,y=oy,w=ow,h=oh))])
+        elif self._drag_obj and self._drag_start:
+            if len(self.selected_items)>1:
+                olds=[(b,dict(x=self._drag_origins[b.id][0],y=self._drag_origins[b.id][1]))
+                      for b in self.boxes if b.id in self._drag_origins]
+            elif self._drag_origin:
+                olds=[(self._drag_obj,dict(x=self._drag_origin[0],y=self._drag_origin[1]))]
+            else: olds=[]
+            self._record_sets("Move",olds,key=("move",tuple(sorted(id(o) for o,_ in olds))))
         if self._rband_rect:
             # Finalize rubber-band
             self._rband_rect=None; self._rband_start=None
@@ -2269,7 +4435,10 @@ class DiagramApp:
     def _on_dblclick(self,event):
         wx,wy=self._to_world(event.x,event.y)
         hit=(self._box_at(wx,wy) or self._arrow_at(wx,wy) or self._floattext_at(wx,wy))
-        if isinstance(hit,Box): self._edit_box_label(hit)
+        if isinstance(hit,Box):
+            tree=self._group_of(hit)
+            if tree and tree.is_group(hit.key): self._expand_group(hit)
+            else: self._edit_box_label(hit)
         elif isinstance(hit,Arrow): self._edit_arrow_label(hit)
         elif isinstance(hit,FloatText): self._edit_floattext(hit)
 
@@ -2297,6 +4466,15 @@ class DiagramApp:
             if isinstance(hit,Box):
                 menu.add_command(label="🎨  Change color", command=self._change_color)
                 menu.add_command(label="◈  Change shape",  command=self._change_shape)
+                tree=self._group_of(hit)
+                if tree:
+                    if tree.is_group(hit.key):
+                        menu.add_command(label="⊞  Open group",
+                                         command=lambda:self._expand_group(hit))
+                    up=tree.parent[hit.key]
+                    if up!=tree.ROOT:
+                        menu.add_command(label=f"⊟  Close into {tree.name(up)}",
+                                         command=lambda:self._collapse_group(up))
             menu.add_separator()
             menu.add_command(label="📋  Copy",          command=self._copy)
             menu.add_command(label="🗑  Delete",        command=self._delete_selected)
@@ -2320,6 +4498,8 @@ class DiagramApp:
             self.offset_x=cx-(cx-self.offset_x)*(self.zoom/old)
             self.offset_y=cy-(cy-self.offset_y)*(self.zoom/old)
         self.zoom_var.set(f"{int(self.zoom*100)}%")
+        if self._zoom_job:        # still zooming: push the sharp redraw back
+            self.root.after_cancel(self._zoom_job); self._zoom_job=None
         self._draw_all()
 
     def _escape(self):
@@ -2354,18 +4534,68 @@ class DiagramApp:
                 self._focus_ids.add(a.dst_id)
 
     def _draw_all(self):
+        """Bring the canvas up to date with the model — retained mode.
+        Every box / arrow / float text owns the canvas items tagged with its
+        key ("b12", "a7", "t3") and remembers the signature they were drawn
+        from: (world origin, everything else).  Unchanged objects are left
+        alone, a changed origin alone is a canvas.move, anything else a
+        redraw of that object only.  Pan and zoom move / scale the items in
+        place; fonts catch up once the zoom settles (_settle_zoom)."""
         self._compute_focus()
-        c=self.canvas; c.delete("all")
+        c=self.canvas
+        rebuild=self._scene_view is None
+        if rebuild:
+            c.delete("all"); self._scene.clear()
+            self._grid_key=None; self._minimap_xf=None
+            self._style_zoom=self.zoom
+            self._scene_view=(self.offset_x,self.offset_y,self.zoom)
+        else:
+            self._apply_view()
+        if self.zoom!=self._style_zoom and not self._zoom_job:
+            self._zoom_job=self.root.after(150,self._settle_zoom)
         self._draw_grid()
-        # Draw dimmed arrows first, then focused arrows on top
-        for a in self.arrows: self._draw_arrow(a)
-        for b in self.boxes:  self._draw_box(b)
-        for ft in self.floattexts: self._draw_floattext(ft)
-        # Multi-select highlight
+
+        # Culling: only what the grids put in (or near) the viewport is drawn;
+        # items of objects that scrolled away are dropped
+        moved=self._sync_index()
+        vx1,vy1,vx2,vy2=self._viewport()
+        vis_a=self._arrow_grid.query(vx1,vy1,vx2,vy2)
+        vis_b=self._box_grid.query(vx1,vy1,vx2,vy2)
+        live=set(); boxes=self._boxes_by_id
+        if rebuild: self._layer_marks["arrow"]=c.create_line(0,0,0,0,state="hidden")
+        below=self._layer_marks.get("box")
+        for a in self.arrows:
+            if a.id not in vis_a: continue
+            tag=f"a{a.id}"; sig=self._arrow_sig(a,boxes)
+            if sig is None: continue
+            live.add(tag)
+            if self._retain(tag,sig,lambda t,a=a:self._draw_arrow(a,t))=="draw" and not rebuild:
+                c.tag_lower(tag,below)
+        if rebuild: self._layer_marks["box"]=c.create_line(0,0,0,0,state="hidden")
+        prev=self._layer_marks["box"]
         for b in self.boxes:
-            if b.id in self.selected_items and b is not self.selected:
-                x1,y1=self._to_canvas(b.x,b.y); x2,y2=self._to_canvas(b.x+b.w,b.y+b.h)
-                c.create_rectangle(x1-2,y1-2,x2+2,y2+2,outline=RBAND_COL,width=2,dash=(4,3))
+            if b.id not in vis_b: continue
+            tag=f"b{b.id}"; live.add(tag); known=tag in self._scene
+            done=self._retain(tag,self._box_sig(b),lambda t,b=b:self._draw_box(b,t))
+            if done:
+                moved=moved or known       # not just scrolled into view
+                if done=="draw" and not rebuild: c.tag_raise(tag,prev)
+            prev=tag
+        if rebuild: self._layer_marks["text"]=c.create_line(0,0,0,0,state="hidden")
+        prev=self._layer_marks["text"]
+        pad=300/self.zoom
+        for ft in self.floattexts:
+            if not (vx1-pad<=ft.x<=vx2+pad and vy1-pad<=ft.y<=vy2+pad): continue
+            tag=f"t{ft.id}"; live.add(tag)
+            done=self._retain(tag,self._floattext_sig(ft),lambda t,ft=ft:self._draw_floattext(ft,t))
+            if done=="draw" and not rebuild: c.tag_raise(tag,prev)
+            prev=tag
+        for tag in set(self._scene)-live:
+            c.delete(tag); del self._scene[tag]
+
+        # Overlay: few items, redrawn every frame on top of the scene
+        c.delete("overlay")
+        ov=_Pen(c,("overlay",))
         if isinstance(self.selected,Box):
             self._draw_handles(self.selected)
             # Focus ring — bright glow around selected box
@@ -2373,34 +4603,110 @@ class DiagramApp:
                 x1,y1=self._to_canvas(self.selected.x,self.selected.y)
                 x2,y2=self._to_canvas(self.selected.x+self.selected.w,
                                        self.selected.y+self.selected.h)
-                self.canvas.create_rectangle(x1-4,y1-4,x2+4,y2+4,
+                ov.create_rectangle(x1-4,y1-4,x2+4,y2+4,
                     outline=SEL_COL,width=2.5,fill="",dash=())
         # Rubber-band rect
         if self._rband_rect:
             x1,y1,x2,y2=self._rband_rect
-            c.create_rectangle(x1,y1,x2,y2,outline=RBAND_COL,fill=RBAND_COL,
-                               stipple="gray12",dash=(4,3))
+            ov.create_rectangle(x1,y1,x2,y2,outline=RBAND_COL,fill=RBAND_COL,
+                                stipple="gray12",dash=(4,3))
         if self.mode=="arrow" and self.arrow_src:
             cx,cy=self._to_canvas(*self.arrow_src.center())
-            c.create_oval(cx-7,cy-7,cx+7,cy+7,fill=SEL_COL,outline="")
-        if self.minimap_enabled.get(): self._draw_minimap()
+            ov.create_oval(cx-7,cy-7,cx+7,cy+7,fill=SEL_COL,outline="")
+        if not self.minimap_enabled.get():
+            c.delete("minimap"); self._minimap_xf=None
+        elif (self._minimap_xf is None or
+              self._minimap_xf[3:]!=(c.winfo_width() or 1,c.winfo_height() or 1)):
+            self._draw_minimap()
+        else:
+            if moved and not self._minimap_job:   # at most ~8 minimap rebuilds a second
+                self._minimap_job=self.root.after(120,self._draw_minimap)
+            self._draw_minimap_view()
         self._update_scrollregion()
 
+    def _invalidate(self):
+        """Drop the retained scene: the next _draw_all rebuilds every item."""
+        self._scene_view=None
+
+    def _apply_view(self):
+        """Move / scale the scene items from the view they were drawn at to
+        the current offset and zoom."""
+        ox,oy,z=self._scene_view
+        if (ox,oy,z)==(self.offset_x,self.offset_y,self.zoom): return
+        if z!=self.zoom:
+            f=self.zoom/z; self.canvas.scale("scene",ox,oy,f,f)
+        self.canvas.move("scene",self.offset_x-ox,self.offset_y-oy)
+        self._scene_view=(self.offset_x,self.offset_y,self.zoom)
+
+    def _settle_zoom(self):
+        # Scaled items keep their old font sizes and line widths: redraw once
+        self._zoom_job=None
+        self._invalidate(); self._draw_all()
+
+    def _retain(self,tag,sig,draw):
+        """Update one object's canvas items to `sig`: None if they were
+        current, "move" or "draw" (new items, on top of the stack)."""
+        old=self._scene.get(tag)
+        if old==sig: return None
+        self._scene[tag]=sig
+        if old is not None and old[1]==sig[1]:
+            (ox,oy),(nx,ny)=old[0],sig[0]
+            self.canvas.move(tag,(nx-ox)*self.zoom,(ny-oy)*self.zoom)
+            return "move"
+        self.canvas.delete(tag)
+        draw((tag,"scene"))
+        return "draw"
+
+    def _box_sig(self,b):
+        in_focus=(not self._focus_ids) or (b.id in self._focus_ids)
+        state=(self.selected is b, self.mode=="arrow" and self.arrow_src is b,
+               in_focus, b.id in self.selected_items, bool(self._focus_ids))
+        return (b.x,b.y),(b.w,b.h,b.label,b.color,b.shape,state)
+
+    def _arrow_sig(self,a,boxes):
+        src=boxes.get(a.src_id); dst=boxes.get(a.dst_id)
+        if not src or not dst: return None
+        state=(self.selected is a, a.id in self._focus_arrow_ids, bool(self._focus_ids),
+               a.src_id in self.selected_items or a.dst_id in self.selected_items)
+        return (src.x,src.y),(dst.x-src.x,dst.y-src.y,src.w,src.h,src.shape,
+                              dst.w,dst.h,dst.shape,a.label,a.line_style,a.head_style,
+                              a.orthogonal,state)
+
+    def _floattext_sig(self,ft):
+        return (ft.x,ft.y),(ft.text,ft.style,self.selected is ft,bool(self._focus_ids))
+
     def _draw_grid(self):
         c=self.canvas; w=c.winfo_width() or 1400; h=c.winfo_height() or 800
         sp=GRID_SIZE*self.zoom; ox=self.offset_x%sp; oy=self.offset_y%sp
         gc=SNAP_COL if self.snap_enabled.get() else GRID_COL
+        key=(w,h,sp,ox,oy,gc)
+        if key==self._grid_key: return
+        self._grid_key=key; c.delete("grid")
         x=ox
-        while x<w: c.create_line(x,0,x,h,fill=gc,width=1); x+=sp
+        while x<w: c.create_line(x,0,x,h,fill=gc,width=1,tags="grid"); x+=sp
         y=oy
-        while y<h: c.create_line(0,y,w,y,fill=gc,width=1); y+=sp
+        while y<h: c.create_line(0,y,w,y,fill=gc,width=1,tags="grid"); y+=sp
+        c.tag_lower("grid")
 
-    def _draw_box(self,box):
-        c=self.canvas
+    def _draw_box(self,box,tags=()):
+        c=_Pen(self.canvas,tags)
         x1,y1=self._to_canvas(box.x,box.y); x2,y2=self._to_canvas(box.x+box.w,box.y+box.h)
         fill,border=BOX_COLORS.get(box.color,("#2e3a5c","#5a7ec8"))
         is_sel=(self.selected is box or (self.mode=="arrow" and self.arrow_src is box))
 
+        if self.zoom<LOD_ZOOM:
+            # Far out: one rectangle and the name line — cheap for thousands
+            dim=bool(self._focus_ids) and box.id not in self._focus_ids
+            c.create_rectangle(x1,y1,x2,y2,fill=fill,outline=SEL_COL if is_sel else border,
+                               width=2 if is_sel else 1,stipple="gray50" if dim else "")
+            if self.zoom>=LOD_TEXT_ZOOM:
+                name=next((l for l in box.label.split("\n") if l.strip() and not l.startswith("«")),"")
+                c.create_text((x1+x2)/2,(y1+y2)/2,text=name,fill="#888aaa" if dim else TEXT_LIGHT,
+                              font=("Consolas",7),anchor="center",width=max(1,x2-x1-4))
+            if box.id in self.selected_items and not is_sel:
+                c.create_rectangle(x1-2,y1-2,x2+2,y2+2,outline=RBAND_COL,width=2,dash=(4,3))
+            return
+
         # Focus dimming
         in_focus  = (not self._focus_ids) or (box.id in self._focus_ids)
         is_centre = box.id in self.selected_items  # directly selected
@@ -2486,19 +4792,22 @@ class DiagramApp:
             c.create_line(cx,by,x2-4,y2-4,fill=bc,width=lw)
             if box.label: c.create_text(cx,y2,text=box.label,fill=TEXT_LIGHT,
                                         font=("Segoe UI",fs),anchor="s",width=W)
+        # Multi-select highlight
+        if is_centre and self.selected is not box:
+            c.create_rectangle(x1-2,y1-2,x2+2,y2+2,outline=RBAND_COL,width=2,dash=(4,3))
 
     def _rounded_rect(self,c,x1,y1,x2,y2,r,**kw):
         pts=[x1+r,y1,x2-r,y1,x2,y1,x2,y1+r,x2,y2-r,x2,y2,x2-r,y2,x1+r,y2,x1,y2,x1,y2-r,x1,y1+r,x1,y1]
         c.create_polygon(pts,smooth=True,**kw)
 
     def _draw_handles(self,box):
-        c=self.canvas
+        c=_Pen(self.canvas,("overlay",))
         for key,(hx,hy) in box.handle_rects().items():
             cx,cy=self._to_canvas(hx,hy); r=self.HANDLE_R
             c.create_rectangle(cx-r,cy-r,cx+r,cy+r,fill=HANDLE_COL,outline="white",width=1)
 
-    def _draw_arrow(self,arrow):
-        c=self.canvas
+    def _draw_arrow(self,arrow,tags=()):
+        c=_Pen(self.canvas,tags)
         src=self._box_by_id(arrow.src_id); dst=self._box_by_id(arrow.dst_id)
         if not src or not dst: return
         tx,ty=dst.center(); sx,sy=src.center()
@@ -2530,6 +4839,13 @@ class DiagramApp:
         head=getattr(arrow,"head_style","open")
         ortho=getattr(arrow,"orthogonal",False)
 
+        if self.zoom<LOD_ZOOM:
+            # Far out: the line only — no head, no label
+            mx=(cx1+cx2)/2
+            pts=[cx1,cy1,mx,cy1,mx,cy2,cx2,cy2] if ortho else [cx1,cy1,cx2,cy2]
+            c.create_line(*pts,fill=color,width=1,dash=dash)
+            return
+
         # Orthogonal routing: L-shaped via midpoint
         if ortho:
             mx=(cx1+cx2)/2
@@ -2584,8 +4900,8 @@ class DiagramApp:
         rx=mx-w*math.cos(p); ry=my-w*math.sin(p)
         c.create_polygon(tx,ty,lx,ly,bx,by,rx,ry,fill=BG if open_ else color,outline=color,width=1.5)
 
-    def _draw_floattext(self,ft):
-        c=self.canvas; cx,cy=self._to_canvas(ft.x,ft.y)
+    def _draw_floattext(self,ft,tags=()):
+        c=_Pen(self.canvas,tags); cx,cy=self._to_canvas(ft.x,ft.y)
         is_sel=(self.selected is ft); fs=max(8,int(11*self.zoom))
         fonts={"heading":("Segoe UI",fs+2,"bold"),"note":("Segoe UI",fs,"italic"),"normal":("Segoe UI",fs)}
         font=fonts.get(getattr(ft,"style","normal"),("Segoe UI",fs))
@@ -2595,14 +4911,17 @@ class DiagramApp:
         if is_sel: c.create_oval(cx-8,cy-8,cx+8,cy+8,outline=SEL_COL,width=1,fill="")
 
     def _draw_minimap(self):
-        c=self.canvas; cw=c.winfo_width() or 1; ch=c.winfo_height() or 1
+        self._minimap_job=None
+        c=_Pen(self.canvas,("minimap",)); c.delete("minimap"); self._minimap_xf=None
+        if not self.minimap_enabled.get(): return
+        cw=c.winfo_width() or 1; ch=c.winfo_height() or 1
         if cw<200 or ch<200: return
         mw,mh=160,110; mx=cw-mw-10; my=ch-mh-10
         c.create_rectangle(mx,my,mx+mw,my+mh,fill="#1a1a2a",outline=ACCENT2,width=1)
+        self._minimap_xf=(0,0,0,cw,ch)
         if not self.boxes: return
         all_x=[b.x for b in self.boxes]+[b.x+b.w for b in self.boxes]
         all_y=[b.y for b in self.boxes]+[b.y+b.h for b in self.boxes]
-        if not all_x: return
         wxmin,wxmax=min(all_x),max(all_x); wymin,wymax=min(all_y),max(all_y)
         ww=max(wxmax-wxmin,1); wh=max(wymax-wymin,1)
         scale=min((mw-10)/ww,(mh-10)/wh)
@@ -2612,13 +4931,20 @@ class DiagramApp:
             bx1=ox+b.x*scale; by1=oy+b.y*scale
             bx2=bx1+b.w*scale; by2=by1+b.h*scale
             c.create_rectangle(bx1,by1,bx2,by2,fill=fill,outline=border,width=0.5)
-        # Viewport rectangle
-        vx1,vy1=self._to_world(0,0); vx2,vy2=self._to_world(cw,ch)
-        vbx1=ox+vx1*scale; vby1=oy+vy1*scale
-        vbx2=ox+vx2*scale; vby2=oy+vy2*scale
-        c.create_rectangle(vbx1,vby1,vbx2,vby2,outline=SEL_COL,width=1,fill="",dash=(3,2))
+        self._minimap_xf=(ox,oy,scale,cw,ch)
+        self._draw_minimap_view()
         c.create_text(mx+mw//2,my+2,text="MAP",fill=TEXT_MUTED,font=("Segoe UI",6,"bold"),anchor="n")
 
+    def _draw_minimap_view(self):
+        # Viewport rectangle — follows every pan / zoom, the boxes lag behind
+        c=self.canvas; c.delete("minimap_view")
+        if not self.boxes or not self._minimap_xf: return
+        ox,oy,scale,_,_=self._minimap_xf
+        vx1,vy1=self._to_world(0,0)
+        vx2,vy2=self._to_world(c.winfo_width() or 1,c.winfo_height() or 1)
+        c.create_rectangle(ox+vx1*scale,oy+vy1*scale,ox+vx2*scale,oy+vy2*scale,
+                           outline=SEL_COL,width=1,fill="",dash=(3,2),tags=("minimap","minimap_view"))
+
     # ═══ EDIT HELPERS ═════════════════════════════════════════════════════════
 
     def _update_sel_info(self):
@@ -2642,17 +4968,17 @@ class DiagramApp:
         tk.Label(dlg,text="Label (Ctrl+Enter to apply):",bg=SURFACE,fg=TEXT_LIGHT,font=("Segoe UI",10),pady=6).pack()
         txt=tk.Text(dlg,bg=BG,fg=TEXT_LIGHT,font=("Consolas",10),insertbackground=TEXT_LIGHT,wrap="word",height=8,padx=8,pady=5)
         txt.pack(fill="both",expand=True,padx=12); txt.insert("1.0",box.label); txt.focus_set()
-        def apply(): box.label=txt.get("1.0","end-1c"); self._draw_all(); dlg.destroy()
+        def apply(): self._set_attrs("Edit label",box,label=txt.get("1.0","end-1c")); self._draw_all(); dlg.destroy()
         tk.Button(dlg,text="Apply",bg=ACCENT,fg="white",relief="flat",padx=14,pady=5,cursor="hand2",command=apply).pack(pady=6)
         dlg.bind("<Control-Return>",lambda e:apply())
 
     def _edit_arrow_label(self,arrow):
         new=simpledialog.askstring("Arrow Label","Label:",initialvalue=arrow.label,parent=self.root)
-        if new is not None: arrow.label=new; self._draw_all()
+        if new is not None: self._set_attrs("Edit label",arrow,label=new); self._draw_all()
 
     def _edit_floattext(self,ft):
         new=simpledialog.askstring("Text","Text:",initialvalue=ft.text,parent=self.root)
-        if new is not None: ft.text=new; self._draw_all()
+        if new is not None: self._set_attrs("Edit text",ft,text=new); self._draw_all()
 
     def _edit_selected(self):
         if isinstance(self.selected,Box): self._edit_box_label(self.selected)
@@ -2668,7 +4994,7 @@ class DiagramApp:
             tk.Radiobutton(row,text=name,variable=chosen,value=name,bg=SURFACE,fg=TEXT_LIGHT,
                            selectcolor=fill,activebackground=SURFACE,font=("Segoe UI",10)).pack(side="left")
             tk.Frame(row,bg=fill,width=40,height=14).pack(side="right",padx=4)
-        def apply(): self.selected.color=chosen.get(); self._draw_all(); dlg.destroy()
+        def apply(): self._set_attrs("Colour",self.selected,color=chosen.get()); self._draw_all(); dlg.destroy()
         tk.Button(dlg,text="Apply",bg=ACCENT,fg="white",relief="flat",padx=18,pady=5,cursor="hand2",command=apply).pack(pady=8)
 
     def _change_shape(self):
@@ -2679,7 +5005,7 @@ class DiagramApp:
             tk.Radiobutton(dlg,text=f"{sym}  {label}",variable=chosen,value=key,
                            bg=SURFACE,fg=TEXT_LIGHT,selectcolor=ACCENT,activebackground=SURFACE,
                            font=("Segoe UI",10),anchor="w").pack(fill="x",padx=14,pady=1)
-        def apply(): self.selected.shape=chosen.get(); self._draw_all(); dlg.destroy()
+        def apply(): self._set_attrs("Shape",self.selected,shape=chosen.get()); self._draw_all(); dlg.destroy()
         tk.Button(dlg,text="Apply",bg=ACCENT,fg="white",relief="flat",padx=18,pady=5,cursor="hand2",command=apply).pack(pady=8)
 
     # ═══ COPY / PASTE ═════════════════════════════════════════════════════════
@@ -2693,14 +5019,14 @@ class DiagramApp:
 
     def _paste(self):
         if not self.clipboard: return
-        self._push_undo()
-        new_ids={}; offset=30
+        new_ids={}; offset=30; pasted=[]
         for bd in self.clipboard:
             Box._id+=1; new_id=Box._id
             new_ids[bd["id"]]=new_id
             nb=Box(bd["x"]+offset,bd["y"]+offset,bd["w"],bd["h"],
                    bd["label"],bd.get("color","Blue"),bd.get("shape","rect"))
-            nb.id=new_id; self.boxes.append(nb)
+            nb.id=new_id; pasted.append(nb)
+        self._append("Paste","boxes",pasted)
         self.selected_items={nid for nid in new_ids.values()}
         self.selected=self.boxes[-1] if self.boxes else None
         self._update_sel_info(); self._draw_all()
@@ -2708,26 +5034,66 @@ class DiagramApp:
 
     # ═══ UNDO ═════════════════════════════════════════════════════════════════
 
-    def _push_undo(self):
-        self.undo_stack.append(self._serialize())
-        if len(self.undo_stack)>60: self.undo_stack.pop(0)
+    def _push_undo(self,label="Replace diagram"):
+        """Before a change to the whole diagram (load, clear, analysis): the
+        lists are handed to the history as they are and replaced by copies.
+        A watched analysis stops being patched."""
+        self._stop_watch(); self._analysis=None
+        ops=[["swap",name,getattr(self,name)] for name in ("boxes","arrows","floattexts")]
+        ops.append(["ids",(Box._id,Arrow._id,FloatText._id)])
+        for name in ("boxes","arrows","floattexts"): setattr(self,name,list(getattr(self,name)))
+        self.history.record(label,ops)
+
+    def _append(self,label,name,objs):
+        lst=getattr(self,name); n=len(lst); lst.extend(objs)
+        self.history.record(label,[("insert",name,list(enumerate(objs,n)))])
+
+    def _take(self,name,drop):
+        """Remove the items `drop` accepts from owner.<name>; the remove op."""
+        lst=getattr(self,name); gone=[(i,o) for i,o in enumerate(lst) if drop(o)]
+        if gone: setattr(self,name,[o for o in lst if not drop(o)])
+        return ("remove",name,gone)
+
+    def _set_attrs(self,what,obj,**attrs):
+        old={k:getattr(obj,k) for k in attrs}
+        for k,v in attrs.items(): setattr(obj,k,v)
+        self._record_sets(what,[(obj,old)])
+
+    def _record_sets(self,label,olds,key=None):
+        """olds: [(obj, {attr: old value})] for objects already changed."""
+        ops=[]
+        for obj,old in olds:
+            diff={k:(v,getattr(obj,k)) for k,v in old.items() if v!=getattr(obj,k)}
+            if diff: ops.append(("set",obj,diff))
+        self.history.record(label,ops,key)
 
     def _undo(self):
-        if not self.undo_stack: self.status_var.set("Nothing to undo"); return
-        self._deserialize(self.undo_stack.pop()); self._draw_all()
-        self.status_var.set("Undone")
+        label=self.history.undo()
+        if label is None: self.status_var.set("Nothing to undo"); return
+        self._after_history(); self.status_var.set(f"Undone: {label}  •  Ctrl+Y to redo")
+
+    def _redo(self):
+        label=self.history.redo()
+        if label is None: self.status_var.set("Nothing to redo"); return
+        self._after_history(); self.status_var.set(f"Redone: {label}")
+
+    def _after_history(self):
+        self.selected=None; self.selected_items.clear(); self.arrow_src=None
+        self._focus_ids.clear(); self._focus_arrow_ids.clear()
+        self._update_sel_info(); self._draw_all()
 
     def _delete_selected(self):
         if not self.selected: return
-        self._push_undo()
         ids=self.selected_items if self.selected_items else {self.selected.id}
         if any(isinstance(b,Box) and b.id in ids for b in self.boxes):
-            self.boxes=[b for b in self.boxes if b.id not in ids]
-            self.arrows=[a for a in self.arrows if a.src_id not in ids and a.dst_id not in ids]
+            ops=[self._take("boxes",lambda b:b.id in ids),
+                 self._take("arrows",lambda a:a.src_id in ids or a.dst_id in ids)]
         elif isinstance(self.selected,Arrow):
-            self.arrows=[a for a in self.arrows if a.id!=self.selected.id]
+            sel=self.selected.id; ops=[self._take("arrows",lambda a:a.id==sel)]
         elif isinstance(self.selected,FloatText):
-            self.floattexts=[ft for ft in self.floattexts if ft.id!=self.selected.id]
+            sel=self.selected.id; ops=[self._take("floattexts",lambda ft:ft.id==sel)]
+        else: ops=[]
+        self.history.record("Delete",[op for op in ops if op[2]])
         self.selected=None; self.selected_items.clear()
         self._update_sel_info(); self._draw_all()
 
@@ -2739,7 +5105,7 @@ class DiagramApp:
 
     def _clear(self):
         if messagebox.askyesno("Clear","Delete everything?"):
-            self._push_undo(); self.boxes.clear(); self.arrows.clear(); self.floattexts.clear()
+            self._push_undo("Clear"); self.boxes.clear(); self.arrows.clear(); self.floattexts.clear()
             self.selected=None; self.selected_items.clear(); self._draw_all()
 
     def _reset_view(self):
@@ -2847,24 +5213,31 @@ class DiagramApp:
 
     def _run_analysis(self, path, mode):
         """Actually run the chosen analyser and load result onto canvas."""
+        watcher = None
         try:
             self.status_var.set(f"Analysing {mode}: {os.path.basename(path)} …")
             self.root.update()
 
-            if mode == "spring":
+            watcher = self._make_watcher(path, mode) if self.watch_enabled.get() else None
+            if watcher:
+                data = watcher.data
+            elif mode == "spring":
                 data = _analyze_spring_project(path)
-            elif mode in ("python", "java"):
-                data = _analyze_code_files(path)
             else:
-                data = _analyze_code_files(path)
+                data = _analyze_code_files(path, layout=False)
+            # Python / Java: the package tree; the canvas shows a cut of it
+            tree = None if mode == "spring" else DiagramTree(
+                data, "module" if project_lang(path) == "py" else "package")
 
         except Exception as e:
+            if watcher: watcher.close()
             messagebox.showerror("Analysis Error",
                 f"Could not analyse:\n\n{e}\n\n"
                 "Check the file/folder is a valid Python or Java project.")
             return
 
         if not data.get("boxes"):
+            if watcher: watcher.close()
             messagebox.showinfo("No Classes Found",
                 "No classes were detected.\n"
                 "Make sure the file/folder contains class definitions.")
@@ -2872,25 +5245,285 @@ class DiagramApp:
 
         if (self.boxes or self.arrows) and not messagebox.askyesno(
                 "Load Analysis", "Replace current canvas with analysis result?"):
+            if watcher: watcher.close()
             return
 
-        self._push_undo()
+        view = data
+        if tree:
+            view = tree.view(tree.initial_cut(HIER_BUDGET))
+            pos = tree.layout(view)
+            for b in view["boxes"]: b["x"], b["y"] = pos[b["key"]]
+        self._push_undo("Analysis")
         Box._id = Arrow._id = FloatText._id = 0
-        self._deserialize(data)
+        self._deserialize(view)
         self.offset_x = 30; self.offset_y = 50
         # Auto-zoom: smaller zoom for larger diagrams
-        n_boxes = len(data.get("boxes", []))
+        n_boxes = len(view.get("boxes", []))
         if n_boxes > 25:   z = 0.5
         elif n_boxes > 15: z = 0.65
         elif n_boxes > 8:  z = 0.8
         else:              z = 0.9
         self.zoom = z; self.zoom_var.set(f"{int(z*100)}%")
         self._draw_all()
-        n_cls = len(self.boxes); n_rel = len(self.arrows)
+        n_cls = len(data["boxes"]); n_rel = len(data.get("arrows", []))
+        n_grp = sum(1 for b in self.boxes if tree and b.key and tree.is_group(b.key))
         self.status_var.set(
-            f"Analysis complete  •  {n_cls} classes · {n_rel} relationships  •  "
-            f"Scroll to zoom · Drag to pan · Double-click to edit")
-
+            f"Analysis complete  •  {n_cls} classes · {n_rel} relationships  •  " +
+            (f"{n_grp} groups shown closed: double-click one to open it, "
+             f"right-click a box to close its group" if n_grp else
+             "Scroll to zoom · Drag to pan · Double-click to edit"))
+        self._analysis = dict(path=path, mode=mode, data=data, tree=tree,
+                              texts=[ft.id for ft in self.floattexts])
+        if watcher:
+            self._start_watch(watcher)
+
+    # ═══ ANALYSIS PATCHES ═════════════════════════════════════════════════════
+    # Boxes of an analysis carry the analyser's key (class name, "lib:…",
+    # "pkg:…" for a package group), so a newer analysis — or another cut of
+    # the package tree — is applied as a diagram_diff against the canvas as
+    # it stands: found by key, boxes keep where the user moved them, and the
+    # change is one undo entry.
+
+    def _canvas_keys(self):
+        """{key: box} and {arrow key: arrow} of the analysis boxes on the canvas."""
+        boxes = {b.key: b for b in self.boxes if b.key}
+        keys = {b.id: k for k, b in boxes.items()}
+        arrows = {}
+        for a in self.arrows:
+            sk, dk = keys.get(a.src_id), keys.get(a.dst_id)
+            if sk and dk: arrows[(sk, dk, a.label, a.line_style, a.head_style)] = a
+        return boxes, arrows
+
+    def _patch_canvas(self, diff, placed=None):
+        """Apply a diagram_diff; returns (history ops, (boxes added, removed,
+        arrows added, removed)).  New boxes go to `placed` {key: (x, y)},
+        else next to a box they are linked to."""
+        boxes, amap = self._canvas_keys()
+        gone = {boxes.pop(k).id for k in diff["removed"] if k in boxes}
+        dead = {amap.pop(k).id for k in diff["arrows_removed"] if k in amap}
+        ops = []
+        if gone or dead:
+            ops.append(self._take("arrows", lambda a: a.id in dead or a.src_id in gone or a.dst_id in gone))
+        if gone:
+            ops.append(self._take("boxes", lambda b: b.id in gone))
+        for key, attrs in diff["changed"].items():
+            b = boxes.get(key)
+            if not b: continue
+            ops.append(("set", b, {k: (getattr(b, k), v) for k, v in attrs.items()}))
+            for k, v in attrs.items(): setattr(b, k, v)
+        new = []
+        for bd in diff["added"]:
+            if bd["key"] in boxes: continue
+            b = Box(0, 0, bd["w"], bd["h"], bd["label"], bd.get("color", "Blue"), bd.get("shape", "rect"))
+            b.key = bd["key"]; boxes[b.key] = b; new.append(b)
+        self._sync_index()
+        self._place_new_boxes(new, diff["arrows_added"], boxes, placed or {})
+        if new:
+            ops.append(("insert", "boxes", list(enumerate(new, len(self.boxes)))))
+            self.boxes.extend(new)
+        arrows = []
+        for sk, dk, ad in diff["arrows_added"]:
+            src, dst = boxes.get(sk), boxes.get(dk)
+            if not src or not dst: continue
+            arr = Arrow(src.id, dst.id, ad.get("label", ""), ad.get("line_style", "solid"), ad.get("head_style", "open"))
+            k = (sk, dk, arr.label, arr.line_style, arr.head_style)
+            if k in amap: continue
+            amap[k] = arr; arrows.append(arr)
+        if arrows:
+            ops.append(("insert", "arrows", list(enumerate(arrows, len(self.arrows)))))
+            self.arrows.extend(arrows)
+        fts = {ft.id: ft for ft in self.floattexts}; texts = self._analysis["texts"]
+        for i, text in diff["texts"]:
+            ft = fts.get(texts[i]) if i < len(texts) else None
+            if ft: ops.append(("set", ft, {"text": (ft.text, text)})); ft.text = text
+        sel = self.selected
+        if (isinstance(sel, Box) and sel.id in gone) or (isinstance(sel, Arrow) and sel.id in dead):
+            self.selected = None; self.selected_items.clear(); self._update_sel_info()
+        return ops, (len(new), len(gone), len(arrows), len(dead))
+
+    def _place_new_boxes(self, new, links, boxes, placed):
+        """Put boxes new to the canvas at `placed`, else under a box they are
+        linked to (or right of the diagram), moved right until they overlap
+        nothing."""
+        byid = self._boxes_by_id; newids = {b.id for b in new}
+        done = []; nbrs = {}
+        for sk, dk, _ in links:
+            nbrs.setdefault(sk, []).append(dk); nbrs.setdefault(dk, []).append(sk)
+        right = max((b.x + b.w for b in self.boxes), default=0) + 80
+        top = min((b.y for b in self.boxes), default=80); stack = top
+        def free(x, y, w, h):
+            for bid in self._box_grid.query(x - 20, y - 20, x + w + 20, y + h + 20):
+                o = byid.get(bid)
+                if o and o.x < x + w + 20 and x < o.x + o.w + 20 and o.y < y + h + 20 and y < o.y + o.h + 20:
+                    return False
+            return not any(o.x < x + w + 20 and x < o.x + o.w + 20 and o.y < y + h + 20 and y < o.y + o.h + 20
+                           for o in done)
+        for b in sorted(new, key=lambda b: b.key not in placed):
+            if b.key in placed:
+                b.x, b.y = placed[b.key]; done.append(b); continue
+            anchor = next((o for o in (boxes.get(k) for k in nbrs.get(b.key, ()))
+                           if o is not None and (o.id not in newids or o in done)), None)
+            if anchor: x, y = anchor.x, anchor.y + anchor.h + 60
+            else: x, y = right, stack; stack += b.h + 40
+            for _ in range(200):
+                if free(x, y, b.w, b.h): break
+                x += b.w + 40
+            b.x, b.y = x, y; done.append(b)
+
+    # ═══ PACKAGE GROUPS ═══════════════════════════════════════════════════════
+    # A large analysis opens as package / module group boxes (DiagramTree):
+    # the canvas holds one cut of the tree, HIER_BUDGET boxes at first, and
+    # the cut is read back from the boxes' keys — so undo / redo of an open
+    # or close needs nothing else.  Opening a group lays out its children
+    # where it was and moves the boxes right of / below it aside.
+
+    def _tree_cut(self):
+        tree = self._analysis["tree"]
+        return {b.key for b in self.boxes if b.key in tree.parent}
+
+    def _group_of(self, box):
+        """The DiagramTree if `box` is one of its nodes, else None."""
+        a = self._analysis; tree = a and a.get("tree")
+        return tree if tree and box.key in tree.parent else None
+
+    def _expand_group(self, box):
+        tree = self._group_of(box)
+        if not tree or not tree.is_group(box.key): return
+        node = box.key; cut = self._tree_cut()
+        new = tree.view(tree.expand(cut, node))
+        pos = tree.layout(new, tree.children[node], box.x, box.y)
+        sizes = {b["key"]: (b["w"], b["h"]) for b in new["boxes"] if b["key"] in pos}
+        W = max(x + sizes[k][0] for k, (x, y) in pos.items()) - box.x
+        H = max(y + sizes[k][1] for k, (x, y) in pos.items()) - box.y
+        dx, dy = max(0, W - box.w), max(0, H - box.h)
+        olds = []
+        for b in self.boxes:
+            nx = b.x + dx if b.x >= box.x + box.w else b.x
+            ny = b.y + dy if b.y >= box.y + box.h and b.x < box.x + W and box.x < b.x + b.w else b.y
+            if b is not box and (nx, ny) != (b.x, b.y):
+                olds.append((b, dict(x=b.x, y=b.y))); b.x, b.y = nx, ny
+        ops, (n_new, _, n_arr, _) = self._patch_canvas(diagram_diff(tree.view(cut), new), pos)
+        ops += [("set", b, {k: (v, getattr(b, k)) for k, v in old.items()}) for b, old in olds]
+        self.history.record(f"Open {tree.name(node)}", ops)
+        self.selected = None; self.selected_items.clear(); self._update_sel_info()
+        self._draw_all()
+        self.status_var.set(f"Opened {tree.name(node)}  •  {n_new} boxes · {n_arr} arrows  •  "
+                            f"right-click one of them → close the group again")
+
+    def _collapse_group(self, node):
+        tree = self._analysis["tree"]; cut = self._tree_cut()
+        below = set(tree.descendants(node))
+        members = [b for b in self.boxes if b.key in below]
+        if not members: return
+        at = (min(b.x for b in members), min(b.y for b in members))
+        diff = diagram_diff(tree.view(cut), tree.view(tree.collapse(cut, node)))
+        ops, (_, n_gone, _, _) = self._patch_canvas(diff, {node: at})
+        self.history.record(f"Close {tree.name(node)}", ops)
+        self._draw_all()
+        self.status_var.set(f"Closed {tree.name(node)}  •  {n_gone} boxes folded into one")
+
+    # ═══ WATCH MODE ═══════════════════════════════════════════════════════════
+    # A ProjectWatcher on a worker thread looks at the analysed project every
+    # WATCH_EVENT_S (WATCH_POLL_S when it has to scan) and re-analyses only
+    # the files that changed; each result (new diagram + diff) is queued and
+    # applied on the Tk side by _patch_analysis.
+
+    def _make_watcher(self, path, mode):
+        if mode != "spring":
+            return ProjectWatcher(path, layout=False)
+        memo = {}
+        def rebuild(changed, removed):
+            if changed is None or any(not p.endswith(".java") for p in changed + removed):
+                memo.clear()              # properties / build files: every class may change
+            return _analyze_spring_project(path, memo)
+        return ProjectWatcher(path, rebuild=rebuild, suffixes=SPRING_WATCH_SUFFIXES)
+
+    def _toggle_watch(self):
+        if not self.watch_enabled.get():
+            self._stop_watch(); self.status_var.set("Watch mode off"); return
+        a = self._analysis
+        if not a:
+            self.status_var.set("Watch mode on  •  🔍 Analyse Code to choose the project to watch"); return
+        try:
+            watcher = self._make_watcher(a["path"], a["mode"])
+        except Exception as e:
+            self.watch_enabled.set(False)
+            messagebox.showerror("Watch", f"Could not watch {a['path']}:\n\n{e}"); return
+        self._start_watch(watcher)
+
+    def _start_watch(self, watcher):
+        """Patch the canvas, loaded from self._analysis, from now on."""
+        self._stop_watch()
+        base = self._analysis["data"]
+        stop = threading.Event(); out = queue.Queue()
+        wait = WATCH_EVENT_S if watcher.mode == "events" else WATCH_POLL_S
+        def loop():
+            while not stop.wait(wait):
+                try:
+                    found = watcher.poll()
+                    if not found: continue
+                    t0 = time.perf_counter(); base = watcher.data
+                    data, diff = watcher.update(*found)
+                    out.put((base, data, diff, len(found[0]) + len(found[1]),
+                             time.perf_counter() - t0))
+                except Exception as e:          # reported, the watch goes on
+                    out.put(e)
+        self._watch = dict(
+            watcher=watcher, stop=stop, out=out,
+            thread=threading.Thread(target=loop, name="diagram-watch", daemon=True),
+            job=None)
+        if watcher.data is not base:           # changed while nobody was watching
+            self._patch_analysis(base, watcher.data, diagram_diff(base, watcher.data), 0, 0.0)
+        self._watch["thread"].start()
+        self._watch["job"] = self.root.after(100, self._watch_tick)
+        self.status_var.set(f"👁 Watching {os.path.basename(watcher.path)} ({watcher.mode})  •  "
+                            f"edits to the code show up here; moved boxes stay put")
+
+    def _stop_watch(self):
+        w = self._watch; self._watch = None
+        if not w: return
+        w["stop"].set()
+        if w["job"]: self.root.after_cancel(w["job"])
+        w["watcher"].close()
+
+    def _watch_tick(self):
+        w = self._watch
+        if not w: return
+        while True:
+            try: item = w["out"].get_nowait()
+            except queue.Empty: break
+            if isinstance(item, Exception):
+                self.status_var.set(f"👁 Watch: re-analysis failed — {item}")
+            else:
+                self._patch_analysis(*item)
+        w["job"] = self.root.after(100, self._watch_tick)
+
+    def _patch_analysis(self, base, data, diff, n_files, secs):
+        """Apply a re-analysis (`diff` from `base` to `data`) to the canvas as
+        one undo entry.  The entry also swaps self._analysis, so undo / redo
+        take the analysis the canvas shows along; when that is not `base` any
+        more, the diff is taken from it instead.  A package tree is rebuilt
+        and its cut carried over (DiagramTree.adapt); the diff is then
+        between the two cuts' views."""
+        t0 = time.perf_counter()
+        a = self._analysis; tree = a["tree"]; fresh = None
+        if tree:
+            fresh = DiagramTree(data, tree.leaf_kind); cut = self._tree_cut()
+            diff = diagram_diff(tree.view(cut), fresh.view(fresh.adapt(tree, cut)))
+        elif a["data"] is not base:           # undo / redo moved the canvas off `base`
+            diff = diagram_diff(a["data"], data)
+        ops, (n_new, n_gone, n_arr, n_dead) = self._patch_canvas(diff)
+        self._analysis = dict(a, data=data, tree=fresh)
+        if ops:                                # weighs as much as the analysis it keeps
+            ops.append(("set", self, {"_analysis": (a, self._analysis)},
+                        len(a["data"]["boxes"]) + len(a["data"].get("arrows", []))))
+            self.history.record("Code change", ops)
+        self._draw_all()
+        if n_files:
+            self.status_var.set(
+                f"👁 {n_files} file(s) changed  •  boxes +{n_new} −{n_gone} ~{len(diff['changed'])}"
+                f"  arrows +{n_arr} −{n_dead}  •  re-analysis {secs*1e3:.0f} ms, "
+                f"canvas {(time.perf_counter()-t0)*1e3:.0f} ms")
 
     # ═══ TEXT TO DIAGRAM ══════════════════════════════════════════════════════
 
@@ -2920,199 +5553,10 @@ class DiagramApp:
         dlg.geometry("1100x680")
         dlg.resizable(True, True)
 
-        # ── Colour tables ──────────────────────────────────────────────────
-        NODE_FILLS = {
-            "actor":    ("Gray",   "#2e2e3e","#666688"),
-            "system":   ("Blue",   "#2e3a5c","#5a7ec8"),
-            "database": ("Teal",   "#1e3d3a","#3aaaa0"),
-            "queue":    ("Orange", "#4a3020","#cc7744"),
-            "cloud":    ("Green",  "#1e3d2e","#3aaa6a"),
-            "service":  ("Purple", "#3a2e5c","#7c6fcd"),
-            "ui":       ("Pink",   "#3a1e3a","#cc44cc"),
-            "api":      ("Yellow", "#3a3a1e","#aaaa3a"),
-            "default":  ("Blue",   "#2e3a5c","#5a7ec8"),
-        }
-        COLOR_MAP = {
-            "blue":   ("#2e3a5c","#5a7ec8"), "green":  ("#1e3d2e","#3aaa6a"),
-            "purple": ("#3a2e5c","#7c6fcd"), "teal":   ("#1e3d3a","#3aaaa0"),
-            "orange": ("#4a3020","#cc7744"), "red":    ("#4a2020","#cc4444"),
-            "gray":   ("#2e2e3e","#666688"), "yellow": ("#3a3a1e","#aaaa3a"),
-            "pink":   ("#3a1e3a","#cc44cc"),
-        }
-        DIAGRAM_COLOR_MAP = {
-            "blue":"Blue","green":"Green","purple":"Purple","teal":"Teal",
-            "orange":"Orange","red":"Red","gray":"Gray","yellow":"Yellow","pink":"Pink",
-        }
-        TYPE_COLOR_MAP = {
-            "actor":"Gray","system":"Blue","database":"Teal","queue":"Orange",
-            "cloud":"Green","service":"Purple","ui":"Pink","api":"Yellow",
-        }
-
-        # ── State ─────────────────────────────────────────────────────────
-        parsed_nodes = {}   # name -> {type, color, fill, stroke}
-        parsed_edges = []   # {src, dst, op, lbl}
-
-        # ── Parse ──────────────────────────────────────────────────────────
-        import re as _re
-        TYPE_RE  = _re.compile(r"^(Actor|System|Database|Queue|Cloud|Service|UI|API|DB):\s*(.+)", _re.I)
-        EDGE_RE  = _re.compile(r"^(.+?)\s*(<->|-->|->)\s*(.+)")
-        LBL_RE   = _re.compile(r"\[label:\s*([^\]]+)\]")
-        COL_RE   = _re.compile(r"\[color:\s*(\w+)\]")
-
-        def clean(s): return _re.sub(r"\[.*?\]","",s).strip()
-        def get_lbl(s):
-            m=LBL_RE.search(s); return m.group(1).strip() if m else ""
-        def get_col(s):
-            m=COL_RE.search(s); return m.group(1).lower() if m else None
-
-        def do_parse(text):
-            parsed_nodes.clear(); parsed_edges.clear()
-            for raw in text.split("\n"):
-                line=raw.strip()
-                if not line or line.startswith("#"): continue
-                tm=TYPE_RE.match(line)
-                if tm:
-                    typ=tm.group(1).lower(); rest=tm.group(2)
-                    nm=clean(rest); col=get_col(rest)
-                    base=NODE_FILLS.get(typ,NODE_FILLS["default"])
-                    if col and col in COLOR_MAP:
-                        fill,stroke=COLOR_MAP[col]
-                        dcolor=DIAGRAM_COLOR_MAP.get(col,"Blue")
-                    else:
-                        dcolor,fill,stroke=base
-                    parsed_nodes[nm]={"type":typ,"color":dcolor,"fill":fill,"stroke":stroke}
-                    continue
-                em=EDGE_RE.match(line)
-                if em:
-                    src=clean(em.group(1)); op=em.group(2); rest2=em.group(3)
-                    dst=clean(rest2); lbl=get_lbl(rest2) or get_lbl(em.group(1))
-                    for nm in (src,dst):
-                        if nm not in parsed_nodes:
-                            parsed_nodes[nm]={"type":"default","color":"Blue",
-                                              "fill":"#2e3a5c","stroke":"#5a7ec8"}
-                    parsed_edges.append({"src":src,"dst":dst,"op":op,"lbl":lbl})
-
-        # ── Layout ─────────────────────────────────────────────────────────
-        def do_layout(node_positions=None):
-            names=list(parsed_nodes.keys()); n=len(names)
-            if not n: return {}
-            in_deg={nm:0 for nm in names}
-            for e in parsed_edges: in_deg[e["dst"]]=in_deg.get(e["dst"],0)+1
-            roots=[nm for nm in names if in_deg.get(nm,0)==0] or [names[0]]
-            layers=[]; placed=set()
-            layer=roots[:]
-            while layer and len(placed)<n:
-                layer=[nm for nm in layer if nm not in placed]
-                if not layer: break
-                layers.append(layer); placed.update(layer)
-                nxt=set()
-                for src2 in layer:
-                    for e in parsed_edges:
-                        if e["src"]==src2 and e["dst"] not in placed:
-                            nxt.add(e["dst"])
-                layer=list(nxt)
-            remain=[nm for nm in names if nm not in placed]
-            if remain: layers.append(remain)
-            # Wider spacing for large diagrams
-            BOX_W_L=180
-            CW=BOX_W_L+30; RH=130; SX=50; SY=50
-            pos={}
-            for li,lay in enumerate(layers):
-                for ci,nm in enumerate(lay):
-                    pos[nm]=(SX+ci*(CW), SY+li*(RH))
-            return pos
-
-        # ── Canvas draw ────────────────────────────────────────────────────
-        pos_cache={}
-
-        def draw_canvas():
-            c=preview_canvas; c.delete("all")
-            if not parsed_nodes: return
-            pos=do_layout()
-            pos_cache.update(pos)
-            BOX_W,BOX_H=160,52
-            # Compute virtual canvas size from content
-            all_x=[p[0]+BOX_W for p in pos.values()]
-            all_y=[p[1]+BOX_H for p in pos.values()]
-            VW=max(3000, max(all_x)+120) if all_x else 3000
-            VH=max(2000, max(all_y)+120) if all_y else 2000
-            c.configure(scrollregion=(0,0,VW,VH))
-            # Grid covers full virtual space
-            for x in range(0,VW,40): c.create_line(x,0,x,VH,fill="#252535",width=1)
-            for y in range(0,VH,40): c.create_line(0,y,VW,y,fill="#252535",width=1)
-            # Edges first
-            for e in parsed_edges:
-                sp=pos.get(e["src"]); dp=pos.get(e["dst"])
-                if not sp or not dp: continue
-                x1=sp[0]+BOX_W//2; y1=sp[1]+BOX_H//2
-                x2=dp[0]+BOX_W//2; y2=dp[1]+BOX_H//2
-                dash=(6,4) if e["op"]=="-->" else ()
-                c.create_line(x1,y1,x2,y2,fill="#6878a8",width=1.5,dash=dash,
-                              arrow=tk.LAST,arrowshape=(10,12,4))
-                if e["op"]=="<->":
-                    c.create_line(x1,y1,x2,y2,fill="#6878a8",width=1.5,
-                                  arrow=tk.FIRST,arrowshape=(10,12,4))
-                if e["lbl"]:
-                    mx,my=(x1+x2)//2,(y1+y2)//2
-                    c.create_rectangle(mx-40,my-10,mx+40,my+10,fill="#1a1a2e",outline="")
-                    c.create_text(mx,my,text=e["lbl"],fill="#a89ee8",
-                                  font=("Segoe UI",9))
-            # Nodes
-            for nm,nd in parsed_nodes.items():
-                p=pos.get(nm)
-                if not p: continue
-                x,y=p; fill=nd["fill"]; stroke=nd["stroke"]; typ=nd["type"]
-                if typ=="actor":
-                    # Stick figure
-                    cx=x+BOX_W//2; r=10; hy=y+r+4
-                    c.create_oval(cx-r,y,cx+r,y+r*2,fill=fill,outline=stroke)
-                    c.create_line(cx,y+r*2,cx,y+r*2+20,fill=stroke,width=1.5)
-                    c.create_line(cx-15,y+r*3+2,cx+15,y+r*3+2,fill=stroke,width=1.5)
-                    c.create_line(cx,y+r*2+20,cx-12,y+r*2+34,fill=stroke,width=1.5)
-                    c.create_line(cx,y+r*2+20,cx+12,y+r*2+34,fill=stroke,width=1.5)
-                    c.create_text(cx,y+BOX_H,text=nm,fill="#e0dff5",
-                                  font=("Segoe UI",10,"bold"))
-                elif typ=="database":
-                    ry=8; cx=x+BOX_W//2
-                    c.create_oval(x,y,x+BOX_W,y+ry*2,fill=fill,outline=stroke)
-                    c.create_rectangle(x,y+ry,x+BOX_W,y+BOX_H-ry,fill=fill,outline="")
-                    c.create_oval(x,y+BOX_H-ry*2,x+BOX_W,y+BOX_H,fill=fill,outline=stroke)
-                    c.create_line(x,y+ry,x,y+BOX_H-ry,fill=stroke)
-                    c.create_line(x+BOX_W,y+ry,x+BOX_W,y+BOX_H-ry,fill=stroke)
-                    c.create_text(cx,y+BOX_H//2,text=nm,fill="#e0dff5",
-                                  font=("Segoe UI",10,"bold"))
-                elif typ=="queue":
-                    rx=BOX_H//2; cx=x+BOX_W//2
-                    pts=[x+rx,y, x+BOX_W-rx,y]
-                    c.create_arc(x+BOX_W-rx*2,y,x+BOX_W,y+BOX_H,start=270,extent=180,
-                                 fill=fill,outline=stroke)
-                    c.create_arc(x,y,x+rx*2,y+BOX_H,start=90,extent=180,
-                                 fill=fill,outline=stroke)
-                    c.create_rectangle(x+rx,y,x+BOX_W-rx,y+BOX_H,fill=fill,outline="")
-                    c.create_line(x+rx,y,x+BOX_W-rx,y,fill=stroke)
-                    c.create_line(x+rx,y+BOX_H,x+BOX_W-rx,y+BOX_H,fill=stroke)
-                    c.create_text(cx,y+BOX_H//2,text=nm,fill="#e0dff5",
-                                  font=("Segoe UI",10,"bold"))
-                else:
-                    # Standard rect with accent bar
-                    c.create_rectangle(x+3,y+3,x+BOX_W+3,y+BOX_H+3,fill="#111122",outline="")
-                    c.create_rectangle(x,y,x+BOX_W,y+BOX_H,fill=fill,outline=stroke)
-                    c.create_rectangle(x,y,x+BOX_W,y+5,fill=stroke,outline="")
-                    # Type badge
-                    badge=typ.upper() if typ!="default" else ""
-                    cx_nm=x+BOX_W//2
-                    if badge:
-                        c.create_text(cx_nm,y+16,text=badge,fill="#888aaa",
-                                      font=("Segoe UI",8))
-                        c.create_text(cx_nm,y+34,text=nm,fill="#e0dff5",
-                                      font=("Segoe UI",10,"bold"))
-                    else:
-                        c.create_text(cx_nm,y+BOX_H//2,text=nm,fill="#e0dff5",
-                                      font=("Segoe UI",10,"bold"))
-            # Stats
-            c.create_text(8,8,anchor="nw",
-                          text=f"{len(parsed_nodes)} nodes  {len(parsed_edges)} edges",
-                          fill="#555577",font=("Segoe UI",8))
+        # Parsing, layout, drawing and syntax colours live in DslPreview
+        # (created with the editor below); on_change re-renders at once.
+        def on_change(event=None):
+            preview.refresh()
 
         # ── Build UI ───────────────────────────────────────────────────────
         # Top row: quick-insert buttons
@@ -3740,47 +6184,17 @@ SIEM Splunk -> API Gateway [label: collect logs]""",
             # Adjust scrollregion to simulate zoom
             sz = int(3000 * _prev_zoom[0])
             preview_canvas.configure(scrollregion=(0,0,sz,sz))
-            on_change()
+            preview.render()
         preview_canvas.bind("<MouseWheel>", prev_wheel)
         preview_canvas.bind("<Button-4>",   prev_wheel)
         preview_canvas.bind("<Button-5>",   prev_wheel)
 
-        # ── Syntax highlighting ────────────────────────────────────────────
-        def highlight():
-            editor.tag_remove("comment","1.0",tk.END)
-            editor.tag_remove("type_kw","1.0",tk.END)
-            editor.tag_remove("arrow",  "1.0",tk.END)
-            editor.tag_remove("bracket","1.0",tk.END)
-            for i,line in enumerate(editor.get("1.0",tk.END).split("\n"),1):
-                ln=f"{i}.0"; le=f"{i}.end"
-                s=line.strip()
-                if s.startswith("#"):
-                    editor.tag_add("comment",ln,le)
-                elif _re.match(r"(Actor|System|Database|Queue|Cloud|Service|UI|API|DB):",s,_re.I):
-                    kend=s.index(":")+1
-                    editor.tag_add("type_kw",ln,f"{i}.{kend}")
-                if "->" in line or "-->" in line or "<->" in line:
-                    for kw in ["->","-->","<->"]:
-                        start="1.0"
-                        while True:
-                            idx=editor.search(kw,f"{i}.0",f"{i}.end")
-                            if not idx: break
-                            editor.tag_add("arrow",idx,f"{idx}+{len(kw)}c")
-                            start=f"{idx}+{len(kw)}c"
-                            break
-                for m in _re.finditer(r"\[.*?\]",line):
-                    editor.tag_add("bracket",f"{i}.{m.start()}",f"{i}.{m.end()}")
-
-        def on_change(event=None):
-            do_parse(editor.get("1.0",tk.END))
-            draw_canvas()
-            highlight()
-
-        editor.bind("<KeyRelease>", on_change)
+        # ── Live update: debounced, only the edited lines ────────────────
+        preview = DslPreview(editor, preview_canvas)
+        editor.bind("<KeyRelease>", preview.schedule)
 
         # ── Node drag on preview ───────────────────────────────────────────
         drag_state={"node":None,"ox":0,"oy":0}
-        BOX_W,BOX_H=160,52
 
         def _cv_xy(e):
             """Convert screen event coords to canvas (virtual) coords."""
@@ -3788,99 +6202,30 @@ SIEM Splunk -> API Gateway [label: collect logs]""",
                     preview_canvas.canvasy(e.y))
 
         def pc_click(e):
-            cx,cy=_cv_xy(e)
-            for nm,p in pos_cache.items():
-                if p[0]<=cx<=p[0]+BOX_W and p[1]<=cy<=p[1]+BOX_H:
-                    drag_state.update({"node":nm,"ox":cx-p[0],"oy":cy-p[1]})
-                    return
+            cx,cy=_cv_xy(e); nm=preview.node_at(cx,cy)
+            if nm:
+                p=preview.pos[nm]
+                drag_state.update({"node":nm,"ox":cx-p[0],"oy":cy-p[1]})
         def pc_drag(e):
             nm=drag_state["node"]
             if nm:
                 cx,cy=_cv_xy(e)
-                pos_cache[nm]=(cx-drag_state["ox"],cy-drag_state["oy"])
-                draw_canvas_with_positions()
+                preview.pos[nm]=(cx-drag_state["ox"],cy-drag_state["oy"])
+                preview.render()
         def pc_release(e): drag_state["node"]=None
 
-        def draw_canvas_with_positions():
-            """Redraw using cached (possibly manually moved) positions."""
-            c=preview_canvas; c.delete("all")
-            BOX_W2,BOX_H2=160,52
-            all_x2=[p[0]+BOX_W2 for p in pos_cache.values()]
-            all_y2=[p[1]+BOX_H2 for p in pos_cache.values()]
-            VW2=max(3000, max(all_x2)+120) if all_x2 else 3000
-            VH2=max(2000, max(all_y2)+120) if all_y2 else 2000
-            c.configure(scrollregion=(0,0,VW2,VH2))
-            for x in range(0,VW2,40): c.create_line(x,0,x,VH2,fill="#252535",width=1)
-            for y in range(0,VH2,40): c.create_line(0,y,VW2,y,fill="#252535",width=1)
-            # Edges
-            for e in parsed_edges:
-                sp=pos_cache.get(e["src"]); dp=pos_cache.get(e["dst"])
-                if not sp or not dp: continue
-                x1=sp[0]+BOX_W//2; y1=sp[1]+BOX_H//2
-                x2=dp[0]+BOX_W//2; y2=dp[1]+BOX_H//2
-                dash=(6,4) if e["op"]=="-->" else ()
-                c.create_line(x1,y1,x2,y2,fill="#6878a8",width=1.5,dash=dash,
-                              arrow=tk.LAST,arrowshape=(10,12,4))
-                if e["op"]=="<->":
-                    c.create_line(x1,y1,x2,y2,fill="#6878a8",width=1.5,
-                                  arrow=tk.FIRST,arrowshape=(10,12,4))
-                if e["lbl"]:
-                    mx,my=(x1+x2)//2,(y1+y2)//2
-                    c.create_rectangle(mx-40,my-10,mx+40,my+10,fill="#1a1a2e",outline="")
-                    c.create_text(mx,my,text=e["lbl"],fill="#a89ee8",font=("Segoe UI",9))
-            # Nodes
-            for nm,nd in parsed_nodes.items():
-                p=pos_cache.get(nm)
-                if not p: continue
-                x,y=p; fill=nd["fill"]; stroke=nd["stroke"]; typ=nd["type"]
-                if typ=="actor":
-                    cx=x+BOX_W//2; r=10
-                    c.create_oval(cx-r,y,cx+r,y+r*2,fill=fill,outline=stroke)
-                    c.create_line(cx,y+r*2,cx,y+r*2+20,fill=stroke,width=1.5)
-                    c.create_line(cx-15,y+r*3+2,cx+15,y+r*3+2,fill=stroke,width=1.5)
-                    c.create_line(cx,y+r*2+20,cx-12,y+r*2+34,fill=stroke,width=1.5)
-                    c.create_line(cx,y+r*2+20,cx+12,y+r*2+34,fill=stroke,width=1.5)
-                    c.create_text(cx,y+BOX_H,text=nm,fill="#e0dff5",font=("Segoe UI",10,"bold"))
-                elif typ=="database":
-                    ry=8; cx=x+BOX_W//2
-                    c.create_oval(x,y,x+BOX_W,y+ry*2,fill=fill,outline=stroke)
-                    c.create_rectangle(x,y+ry,x+BOX_W,y+BOX_H-ry,fill=fill,outline="")
-                    c.create_oval(x,y+BOX_H-ry*2,x+BOX_W,y+BOX_H,fill=fill,outline=stroke)
-                    c.create_line(x,y+ry,x,y+BOX_H-ry,fill=stroke)
-                    c.create_line(x+BOX_W,y+ry,x+BOX_W,y+BOX_H-ry,fill=stroke)
-                    c.create_text(cx,y+BOX_H//2+4,text=nm,fill="#e0dff5",font=("Segoe UI",10,"bold"))
-                elif typ=="queue":
-                    cx=x+BOX_W//2
-                    c.create_rectangle(x,y,x+BOX_W,y+BOX_H,fill=fill,outline=stroke)
-                    c.create_line(x+8,y+4,x+8,y+BOX_H-4,fill=stroke,width=2)
-                    c.create_line(x+BOX_W-8,y+4,x+BOX_W-8,y+BOX_H-4,fill=stroke,width=2)
-                    c.create_text(cx,y+BOX_H//2,text=nm,fill="#e0dff5",font=("Segoe UI",10,"bold"))
-                else:
-                    c.create_rectangle(x+3,y+3,x+BOX_W+3,y+BOX_H+3,fill="#111122",outline="")
-                    c.create_rectangle(x,y,x+BOX_W,y+BOX_H,fill=fill,outline=stroke)
-                    c.create_rectangle(x,y,x+BOX_W,y+5,fill=stroke,outline="")
-                    badge=typ.upper() if typ!="default" else ""
-                    cx_nm=x+BOX_W//2
-                    if badge:
-                        c.create_text(cx_nm,y+16,text=badge,fill="#888aaa",font=("Segoe UI",8))
-                        c.create_text(cx_nm,y+34,text=nm,fill="#e0dff5",font=("Segoe UI",10,"bold"))
-                    else:
-                        c.create_text(cx_nm,y+BOX_H//2,text=nm,fill="#e0dff5",font=("Segoe UI",10,"bold"))
-            c.create_text(8,8,anchor="nw",
-                          text=f"{len(parsed_nodes)} nodes  {len(parsed_edges)} edges",
-                          fill="#555577",font=("Segoe UI",8))
-
         preview_canvas.bind("<ButtonPress-1>",   pc_click)
         preview_canvas.bind("<B1-Motion>",        pc_drag)
         preview_canvas.bind("<ButtonRelease-1>",  pc_release)
-        preview_canvas.bind("<Configure>",        lambda e: draw_canvas_with_positions() if pos_cache else on_change())
+        preview_canvas.bind("<Configure>",        lambda e: preview.render())
 
         # ── Bottom buttons ─────────────────────────────────────────────────
         bot = tk.Frame(dlg, bg=SURFACE); bot.pack(fill="x", pady=6)
 
         def load_to_canvas():
             """Convert parsed DSL nodes/edges to DiagramTool Box/Arrow objects."""
-            if not parsed_nodes:
+            preview.refresh()               # a pending keystroke included
+            if not preview.doc.nodes:
                 messagebox.showinfo("Nothing to load",
                     "Type some nodes and arrows first.", parent=dlg)
                 return
@@ -3888,38 +6233,12 @@ SIEM Splunk -> API Gateway [label: collect logs]""",
                     "Load to Canvas",
                     "Replace current canvas with this diagram?", parent=dlg):
                 return
-            self._push_undo()
+            self._push_undo("Load from text")
             Box._id = Arrow._id = FloatText._id = 0
             self.boxes.clear(); self.arrows.clear(); self.floattexts.clear()
 
-            # Use pos_cache (preserves dragged positions from preview)
-            # Fall back to do_layout() only for nodes not yet in cache
-            auto_pos = do_layout()
-            pos = {nm: pos_cache.get(nm, auto_pos.get(nm, (100,100)))
-                   for nm in parsed_nodes}
-            id_map = {}  # name -> Box id
-            for nm, nd in parsed_nodes.items():
-                Box._id += 1
-                p = pos.get(nm, (100, 100))
-                color = DIAGRAM_COLOR_MAP.get(nd.get("color","blue").lower(),"Blue")
-                tc = TYPE_COLOR_MAP.get(nd["type"], "Blue")
-                final_color = color if color != "Blue" or nd["type"]=="default" else tc
-                b = Box(p[0], p[1], 160, 52,
-                        nd["type"].upper() + "\n" + nm if nd["type"] != "default" else nm,
-                        final_color, "actor" if nd["type"]=="actor" else
-                                     "cylinder" if nd["type"]=="database" else "rect")
-                b.id = Box._id
-                self.boxes.append(b)
-                id_map[nm] = b.id
-            for e in parsed_edges:
-                Arrow._id += 1
-                sid = id_map.get(e["src"]); did = id_map.get(e["dst"])
-                if not sid or not did: continue
-                ls = "dashed" if e["op"]=="-->" else "solid"
-                hs = "open"
-                a = Arrow(sid, did, e["lbl"], ls, hs)
-                a.id = Arrow._id
-                self.arrows.append(a)
+            # Positions from the preview (dragged ones included)
+            self._deserialize(dsl_to_diagram(preview.doc, preview.pos))
 
             # Auto-fit: zoom out to show full diagram
             self.root.update_idletasks()
@@ -3967,6 +6286,9 @@ SIEM Splunk -> API Gateway [label: collect logs]""",
                   relief="flat", padx=16, pady=6, cursor="hand2",
                   font=("Segoe UI",10,"bold"),
                   command=load_to_canvas).pack(side="left", padx=8)
+        tk.Button(bot, text="⟲ Re-layout", bg=SURFACE2, fg=TEXT_LIGHT,
+                  relief="flat", padx=12, pady=6, cursor="hand2",
+                  font=("Segoe UI",10), command=preview.relayout).pack(side="left", padx=4)
         tk.Button(bot, text="💾 Save DSL", bg=SURFACE2, fg=TEXT_LIGHT,
                   relief="flat", padx=12, pady=6, cursor="hand2",
                   font=("Segoe UI",10), command=save_dsl).pack(side="left", padx=4)
@@ -4045,7 +6367,7 @@ Dev Server --> Developer [label: notify]"""
 
     def _load_template(self,fn,dlg):
         if (self.boxes or self.arrows) and not messagebox.askyesno("Load Template","Replace current canvas?",parent=dlg): return
-        self._push_undo(); Box._id=Arrow._id=FloatText._id=0
+        self._push_undo("Template"); Box._id=Arrow._id=FloatText._id=0
         self._deserialize(fn())
         self.offset_x=40; self.offset_y=40; self.zoom=1.0; self.zoom_var.set("100%")
         self._draw_all(); dlg.destroy()
@@ -4078,65 +6400,26 @@ Dev Server --> Developer [label: notify]"""
         path=filedialog.askopenfilename(filetypes=[("Diagram JSON","*.json"),("All","*.*")],title="Open")
         if path:
             with open(path) as f: data=json.load(f)
-            self._push_undo(); self._deserialize(data); self._draw_all()
+            self._push_undo("Open file"); self._deserialize(data); self._draw_all()
             self.status_var.set(f"Loaded ← {os.path.basename(path)}")
 
     def _export_png(self):
-        try: from PIL import ImageGrab
+        try: import PIL  # noqa: F401
         except ImportError:
-            messagebox.showinfo("PNG Export","pip install Pillow  for PNG export\nOr use Win+Shift+S"); return
+            messagebox.showinfo("PNG Export","pip install Pillow  for PNG export\nOr use Export SVG"); return
         path=filedialog.asksaveasfilename(defaultextension=".png",filetypes=[("PNG","*.png")],title="Export PNG")
-        if path:
-            x=self.root.winfo_rootx()+self.canvas.winfo_x()
-            y=self.root.winfo_rooty()+self.canvas.winfo_y()
-            w=self.canvas.winfo_width(); h=self.canvas.winfo_height()
-            from PIL import ImageGrab; ImageGrab.grab(bbox=(x,y,x+w,y+h)).save(path)
-            self.status_var.set(f"PNG → {os.path.basename(path)}")
+        if not path: return
+        scale=simpledialog.askfloat("Export PNG","Scale (pixels per diagram unit):",
+                                    initialvalue=2.0,minvalue=0.1,maxvalue=8.0,parent=self.root)
+        if not scale: return
+        render_png(self._serialize(),path,scale)
+        self.status_var.set(f"PNG → {os.path.basename(path)}  ({scale:g}×, whole diagram)")
 
     def _export_svg(self):
         path=filedialog.asksaveasfilename(defaultextension=".svg",filetypes=[("SVG","*.svg"),("All","*.*")],title="Export SVG")
         if not path: return
-        cw=self.canvas.winfo_width() or 1200; ch=self.canvas.winfo_height() or 800
-        lines=[]
-        lines.append(f'<svg xmlns="http://www.w3.org/2000/svg" width="{cw}" height="{ch}" style="background:{BG}">')
-        lines.append('<defs><marker id="arr" viewBox="0 0 10 10" refX="8" refY="5" markerWidth="6" markerHeight="6" orient="auto-start-reverse">'
-                     '<path d="M2 1L8 5L2 9" fill="none" stroke="#a0b0e0" stroke-width="1.5"/></marker></defs>')
-        # Arrows
-        for a in self.arrows:
-            src=self._box_by_id(a.src_id); dst=self._box_by_id(a.dst_id)
-            if not src or not dst: continue
-            ex1,ey1=src.edge_point(*dst.center()); ex2,ey2=dst.edge_point(*src.center())
-            x1,y1=self._to_canvas(ex1,ey1); x2,y2=self._to_canvas(ex2,ey2)
-            dash='stroke-dasharray="6,4"' if a.line_style=="dashed" else ""
-            lines.append(f'<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" '
-                         f'stroke="#a0b0e0" stroke-width="1.5" {dash} marker-end="url(#arr)"/>')
-            if a.label:
-                mx,my=(x1+x2)/2,(y1+y2)/2
-                lines.append(f'<text x="{mx:.1f}" y="{my-8:.1f}" text-anchor="middle" '
-                             f'font-family="sans-serif" font-size="11" fill="#a89ee8">{a.label}</text>')
-        # Boxes
-        for b in self.boxes:
-            x1,y1=self._to_canvas(b.x,b.y); x2,y2=self._to_canvas(b.x+b.w,b.y+b.h)
-            fill,border=BOX_COLORS.get(b.color,("#2e3a5c","#5a7ec8"))
-            cx=(x1+x2)/2; cy=(y1+y2)/2; W=x2-x1; H=y2-y1
-            lines.append(f'<rect x="{x1:.1f}" y="{y1:.1f}" width="{W:.1f}" height="{H:.1f}" '
-                         f'rx="4" fill="{fill}" stroke="{border}" stroke-width="1"/>')
-            for i,line in enumerate(b.label.split("\n")):
-                ly=y1+18+(i*14)
-                esc=line.replace("&","&amp;").replace("<","&lt;").replace(">","&gt;")
-                lines.append(f'<text x="{cx:.1f}" y="{ly:.1f}" text-anchor="middle" '
-                             f'font-family="monospace" font-size="11" fill="#e0dff5">{esc}</text>')
-        # Float texts
-        for ft in self.floattexts:
-            cx,cy=self._to_canvas(ft.x,ft.y)
-            fs="13" if ft.style=="heading" else "11"
-            fw="bold" if ft.style=="heading" else "normal"
-            esc=ft.text.replace("&","&amp;").replace("<","&lt;").replace(">","&gt;")
-            lines.append(f'<text x="{cx:.1f}" y="{cy:.1f}" text-anchor="middle" '
-                         f'font-family="sans-serif" font-size="{fs}" font-weight="{fw}" fill="#a89ee8">{esc}</text>')
-        lines.append("</svg>")
-        with open(path,"w") as f: f.write("\n".join(lines))
-        self.status_var.set(f"SVG → {os.path.basename(path)}")
+        with open(path,"w",encoding="utf-8") as f: f.write(render_svg(self._serialize()))
+        self.status_var.set(f"SVG → {os.path.basename(path)}  (whole diagram)")
 
 
 # ═══ ENTRY POINT ══════════════════════════════════════════════════════════════
@@ -78,6 +78,8 @@ import json
 
 import re
 
+import hashlib
+
 from pathlib import Path
 
 from collections import Counter
@@ -190,6 +192,20 @@ def load_spacy():
 
 
 
+@st.cache_resource(show_spinner=False, max_entries=64)
+
+def parse_live_text(text_hash: str, _text: str):
+
+    """Parse sandbox text once per distinct text — reruns reuse the Doc."""
+
+    nlp, _ = load_spacy()
+
+    return nlp(_text) if nlp is not None else None
+
+
+
+
+
 @st.cache_data
 
 def load_data(db_path: str = DB_PATH):
@@ -320,9 +336,15 @@ with st.sidebar:
 
                         df_scan = os_mod.scan_emails(target_sender=sender_input)
 
-                        os_mod.save_csv(df_scan)
+                        if not df_scan.empty:
+
+                            os_mod.save_csv(df_scan, sender_input)
+
+                            os_mod.save_to_sqlite(df_scan,
 
-                        os_mod.save_sqlite_raw(df_scan)
+                                                  os_mod.build_thread_summary(df_scan),
+
+                                                  sender_input, DB_PATH)
 
                         st.success(f"✓ {len(df_scan)} emails saved")
 
@@ -376,11 +398,19 @@ with st.sidebar:
 
     if uploaded:
 
+        import email_store
+
         df_up = pd.read_csv(uploaded)
 
         con = sqlite3.connect(DB_PATH)
 
-        df_up.to_sql("emails", con, if_exists="replace", index=False)
+        email_store.create_schema(con)
+
+        keys = df_up.get("sender_email", pd.Series("", index=df_up.index))
+
+        for key, grp in df_up.groupby(keys.fillna("").map(email_store.make_sender_key)):
+
+            email_store.insert_emails(con, key, grp.to_dict("records"))
 
         con.commit(); con.close()
 
@@ -2034,7 +2064,9 @@ with tabs[10]:
 
         else:
 
-            doc = nlp(user_text)
+            doc = parse_live_text(hashlib.sha1(user_text.encode("utf-8")).hexdigest(),
+
+                                  user_text)
 
             col1, col2 = st.columns(2)
 
@@ -0,0 +1,194 @@
+"""
+bench_email_scan.py
+───────────────────
+Regression benchmarks for the email_scan hot paths, on the deterministic
+synthetic corpus (synthetic_corpus.py) at several sizes:
+
+  analyse_text          nlp_pipeline   — spaCy analysis per email body
+  analyse_batch         offline_summarizer — dashboard intelligence briefing
+  answer_question       offline_summarizer — Q&A shortcuts + TF-IDF fallback
+  build_thread_summary  outlook_scanner — groupby thread aggregation
+  save_to_sqlite        outlook_scanner — emails + threads write
+
+Each case is timed best-of-N. Results can be stored as a baseline JSON and
+later runs compared against it; a case slower than baseline × --tolerance is
+reported as a regression and the script exits with status 1 (CI-friendly).
+
+Usage:
+    python bench_email_scan.py --save            # record bench_baseline.json
+    python bench_email_scan.py                   # compare against it
+    python bench_email_scan.py --only analyse_batch --sizes 100 1000
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+import outlook_scanner
+import synthetic_corpus
+from offline_summarizer import analyse_batch, answer_question
+
+try:
+    import nlp_pipeline
+    HAS_SPACY = True
+except ImportError:
+    HAS_SPACY = False
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "bench_baseline.json")
+SIZES     = [100, 1000, 5000]
+NLP_SIZES = [100, 1000]          # spaCy is ~ms per email; keep runs short
+REPEAT    = 3
+TOLERANCE = 1.25                 # 25 % slower than baseline = regression
+
+QUESTIONS = [
+    "Which tool breaks most often?",
+    "Who are the key people involved?",
+    "What did we spend on licences and cost?",
+    "Summarise the L3 incidents",
+    "What is the biggest risk to escalate?",
+    "What happened with the certificate renewal?",   # TF-IDF fallback
+]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CASES — each returns a zero-arg callable to time for a given size
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _frame(records):
+    df = pd.DataFrame(records)
+    df["received_time"] = pd.to_datetime(df["received_time"], errors="coerce")
+    return df
+
+
+def case_analyse_text(records, ctx):
+    nlp = ctx.setdefault("nlp", nlp_pipeline.load_nlp() if HAS_SPACY else None)
+    bodies = [r["body"] for r in records]
+    return lambda: [nlp_pipeline.analyse_text(b, nlp) for b in bodies]
+
+
+def case_analyse_batch(records, ctx):
+    return lambda: analyse_batch(records)
+
+
+def case_answer_question(records, ctx):
+    return lambda: [answer_question(q, records) for q in QUESTIONS]
+
+
+def case_build_thread_summary(records, ctx):
+    df = _frame(records)
+    return lambda: outlook_scanner.build_thread_summary(df)
+
+
+def case_save_to_sqlite(records, ctx):
+    df = _frame(records)
+    threads = outlook_scanner.build_thread_summary(df)
+    tmp = ctx.setdefault("tmp", tempfile.mkdtemp(prefix="bench_email_scan_"))
+
+    def run():
+        db = os.path.join(tmp, "bench.db")
+        if os.path.exists(db):
+            os.remove(db)
+        outlook_scanner.save_to_sqlite(df, threads, synthetic_corpus.SENDER, db)
+    return run
+
+
+CASES = {
+    "analyse_text"         : (case_analyse_text,         NLP_SIZES),
+    "analyse_batch"        : (case_analyse_batch,        SIZES),
+    "answer_question"      : (case_answer_question,      SIZES),
+    "build_thread_summary" : (case_build_thread_summary, SIZES),
+    "save_to_sqlite"       : (case_save_to_sqlite,       SIZES),
+}
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            t0 = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(only=None, sizes=None, repeat: int = REPEAT) -> dict:
+    results, ctx, corpus = {}, {}, {}
+    for name, (make, default_sizes) in CASES.items():
+        if only and name not in only:
+            continue
+        if name == "analyse_text" and not HAS_SPACY:
+            print(f"  [skip] {name}: spaCy not installed")
+            continue
+        for n in (sizes or default_sizes):
+            if n not in corpus:
+                corpus[n] = synthetic_corpus.load_records(n)
+            secs = _best_of(make(corpus[n], ctx), repeat)
+            results[f"{name}[{n}]"] = round(secs, 6)
+            print(f"  {name + f'[{n}]':<30} {secs:>10.4f}s  "
+                  f"{n / secs:>10.0f} emails/s")
+    if "tmp" in ctx:
+        for f in os.listdir(ctx["tmp"]):
+            os.remove(os.path.join(ctx["tmp"], f))
+        os.rmdir(ctx["tmp"])
+    return results
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    regressions = []
+    print(f"\n{'─'*66}")
+    print(f"  {'CASE':<30} {'BASELINE':>10} {'NOW':>10} {'RATIO':>8}")
+    print(f"{'─'*66}")
+    for case, secs in results.items():
+        base = baseline.get("results", {}).get(case)
+        if base is None:
+            print(f"  {case:<30} {'—':>10} {secs:>10.4f} {'new':>8}")
+            continue
+        ratio = secs / base if base else float("inf")
+        flag  = "  ✗" if ratio > tolerance else ""
+        print(f"  {case:<30} {base:>10.4f} {secs:>10.4f} {ratio:>7.2f}x{flag}")
+        if ratio > tolerance:
+            regressions.append(case)
+    print(f"{'─'*66}")
+    return regressions
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="email_scan benchmark suite")
+    ap.add_argument("--save", action="store_true", help="write results as the new baseline")
+    ap.add_argument("--baseline", default=BASELINE_PATH)
+    ap.add_argument("--only", nargs="*", choices=list(CASES))
+    ap.add_argument("--sizes", nargs="*", type=int)
+    ap.add_argument("--repeat", type=int, default=REPEAT)
+    ap.add_argument("--tolerance", type=float, default=TOLERANCE)
+    args = ap.parse_args()
+
+    print(f"[+] email_scan benchmarks  (python {platform.python_version()}, "
+          f"best of {args.repeat})\n")
+    results = run(args.only, args.sizes, args.repeat)
+
+    if args.save:
+        with open(args.baseline, "w") as fh:
+            json.dump({"python": platform.python_version(),
+                       "machine": platform.machine(),
+                       "recorded_at": time.strftime("%Y-%m-%d %H:%M:%S"),
+                       "results": results}, fh, indent=2)
+        print(f"\n[✓] Baseline saved → {args.baseline}")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as fh:
+            regressions = compare(results, json.load(fh), args.tolerance)
+        if regressions:
+            print(f"[✗] {len(regressions)} regression(s) over {args.tolerance:.2f}x: "
+                  + ", ".join(regressions))
+            sys.exit(1)
+        print("[✓] No regressions.")
+    else:
+        print(f"\n[i] No baseline at {args.baseline} — run with --save to record one.")
@@ -0,0 +1,187 @@
+"""
+bench_sender_tables.py
+──────────────────────
+Cross-sender query benchmark: legacy per-sender tables vs the unified
+`emails` table (sender_key column + composite indexes).
+
+Builds two throw-away SQLite files with the same synthetic data
+(default 100 senders × 10,000 emails) and times the queries the dashboard
+needs when looking across senders, plus the dedup path of an incremental
+scan (load-every-ID set vs per-message primary-key lookup).
+
+Usage:
+    python bench_sender_tables.py                       # 100 × 10,000
+    python bench_sender_tables.py --senders 20 --emails 2000
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import email_store
+
+BODY = ("Deployment of the payments service failed on prod-eu-1 after the "
+        "helm upgrade; rollback completed, root cause under investigation. ")
+
+
+def _rows(sender_idx: int, n_emails: int, rnd: random.Random):
+    base = datetime(2024, 1, 1)
+    for i in range(n_emails):
+        t = base + timedelta(minutes=rnd.randint(0, 60 * 24 * 365))
+        thread = f"t{sender_idx:03d}_{rnd.randint(0, n_emails // 8):05d}"
+        yield {
+            "message_id"      : f"s{sender_idx:03d}m{i:06d}",
+            "subject"         : f"RE: Incident {thread}",
+            "thread_subject"  : f"Incident {thread}",
+            "thread_id"       : thread,
+            "is_reply"        : 1,
+            "direction"       : "received",
+            "sender_name"     : f"Sender {sender_idx}",
+            "sender_email"    : f"sender{sender_idx}@corp.example",
+            "received_time"   : t.strftime("%Y-%m-%d %H:%M:%S"),
+            "folder_path"     : "Inbox",
+            "body"            : BODY,
+            "body_length"     : len(BODY),
+            "has_attachments" : i % 7 == 0,
+        }
+
+
+def build_legacy(path: str, senders: int, n_emails: int):
+    con = sqlite3.connect(path)
+    cols = [c for c, _ in email_store.EMAIL_COLUMNS if c != "sender_key"]
+    rnd = random.Random(42)
+    for s in range(senders):
+        table = f"emails_sender{s}_corp_example"
+        con.execute(f"CREATE TABLE [{table}] ({', '.join(cols)})")
+        con.execute(f"CREATE UNIQUE INDEX idx_{table}_msgid ON [{table}] (message_id)")
+        con.executemany(
+            f"INSERT INTO [{table}] VALUES ({', '.join('?' for _ in cols)})",
+            ([email_store._sql_value(r.get(c)) for c in cols]
+             for r in _rows(s, n_emails, rnd)))
+    con.commit()
+    con.close()
+
+
+def build_unified(path: str, senders: int, n_emails: int):
+    con = sqlite3.connect(path)
+    email_store.create_schema(con)
+    rnd = random.Random(42)
+    for s in range(senders):
+        email_store.insert_emails(con, f"sender{s}_corp_example",
+                                  _rows(s, n_emails, rnd))
+    con.commit()
+    con.close()
+
+
+def _legacy_tables(con):
+    return [r[0] for r in con.execute(
+        "SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'emails_%'")]
+
+
+def legacy_queries(con):
+    tables = _legacy_tables(con)
+    union = " UNION ALL ".join(
+        f"SELECT '{t[7:]}' AS sender_key, * FROM [{t}]" for t in tables)
+    return {
+        "count per sender":
+            f"SELECT sender_key, COUNT(*) FROM ({union}) GROUP BY sender_key",
+        "emails per day (all senders)":
+            f"SELECT substr(received_time, 1, 10) d, COUNT(*) FROM ({union}) GROUP BY d",
+        "latest 50 across senders":
+            f"SELECT sender_key, subject FROM ({union}) "
+            f"ORDER BY received_time DESC LIMIT 50",
+        "one week, all senders":
+            f"SELECT COUNT(*) FROM ({union}) "
+            f"WHERE received_time BETWEEN '2024-06-01' AND '2024-06-08'",
+        "busiest threads":
+            f"SELECT sender_key, thread_id, COUNT(*) c FROM ({union}) "
+            f"GROUP BY sender_key, thread_id ORDER BY c DESC LIMIT 20",
+    }
+
+
+def unified_queries():
+    t = email_store.EMAILS_TABLE
+    return {
+        "count per sender":
+            f"SELECT sender_key, COUNT(*) FROM {t} GROUP BY sender_key",
+        "emails per day (all senders)":
+            f"SELECT substr(received_time, 1, 10) d, COUNT(*) FROM {t} GROUP BY d",
+        "latest 50 across senders":
+            f"SELECT sender_key, subject FROM {t} "
+            f"ORDER BY received_time DESC LIMIT 50",
+        "one week, all senders":
+            f"SELECT COUNT(*) FROM {t} "
+            f"WHERE received_time BETWEEN '2024-06-01' AND '2024-06-08'",
+        "busiest threads":
+            f"SELECT sender_key, thread_id, COUNT(*) c FROM {t} "
+            f"GROUP BY sender_key, thread_id ORDER BY c DESC LIMIT 20",
+    }
+
+
+def _time(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def run(senders: int, n_emails: int):
+    tmp = tempfile.mkdtemp(prefix="bench_sender_tables_")
+    legacy_db  = os.path.join(tmp, "legacy.db")
+    unified_db = os.path.join(tmp, "unified.db")
+
+    print(f"[+] Building {senders} senders × {n_emails:,} emails in {tmp}")
+    t0 = time.perf_counter(); build_legacy(legacy_db, senders, n_emails)
+    print(f"    legacy  layout built in {time.perf_counter() - t0:6.1f}s")
+    t0 = time.perf_counter(); build_unified(unified_db, senders, n_emails)
+    print(f"    unified layout built in {time.perf_counter() - t0:6.1f}s")
+
+    lcon, ucon = sqlite3.connect(legacy_db), sqlite3.connect(unified_db)
+    lq, uq = legacy_queries(lcon), unified_queries()
+
+    print(f"\n{'─'*66}")
+    print(f"  {'QUERY':<32} {'LEGACY (s)':>10} {'UNIFIED (s)':>11} {'SPEEDUP':>8}")
+    print(f"{'─'*66}")
+    for name in uq:
+        tl = _time(lambda: lcon.execute(lq[name]).fetchall())
+        tu = _time(lambda: ucon.execute(uq[name]).fetchall())
+        print(f"  {name:<32} {tl:>10.4f} {tu:>11.4f} {tl / tu:>7.1f}x")
+
+    # ── Incremental-scan dedup: 1,000 fresh + 1,000 known messages ───────────
+    table = "emails_sender0_corp_example"
+    key   = "sender0_corp_example"
+    fresh = list(_rows(0, 2000, random.Random(7)))
+    for i, r in enumerate(fresh[:1000]):
+        r["message_id"] = f"new{i:06d}"
+
+    def legacy_dedup():
+        ids = {r[0] for r in lcon.execute(f"SELECT message_id FROM [{table}]")}
+        return [r for r in fresh if r["message_id"] not in ids]
+
+    def unified_dedup():
+        return [r for r in fresh
+                if not email_store.email_known(ucon, key, r["message_id"])]
+
+    tl, tu = _time(legacy_dedup), _time(unified_dedup)
+    print(f"  {'dedup 2k msgs (ID set vs PK)':<32} {tl:>10.4f} {tu:>11.4f} {tl / tu:>7.1f}x")
+    print(f"{'─'*66}")
+
+    lcon.close(); ucon.close()
+    for p in (legacy_db, unified_db):
+        print(f"  {os.path.basename(p):<12} {os.path.getsize(p) / 1e6:8.1f} MB")
+        os.remove(p)
+    os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--senders", type=int, default=100)
+    ap.add_argument("--emails",  type=int, default=10_000)
+    args = ap.parse_args()
+    run(args.senders, args.emails)
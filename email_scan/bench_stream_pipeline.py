@@ -0,0 +1,110 @@
+"""
+bench_stream_pipeline.py
+────────────────────────
+Throughput + peak-memory benchmark: the current three-step batch flow vs the
+single-pass streaming pipeline (stream_pipeline.py).
+
+  three-step : stand-in scan → DataFrame → save_to_sqlite
+               → nlp_pipeline.run_pipeline (reads ALL emails, writes nlp_results)
+               → dashboard-style severity pass over the merged DataFrame
+  streaming  : run_stream_pipeline(CsvMailbox)
+
+Both runs use the same spaCy model object, a fresh SQLite file and no Doc
+cache (so both pay for every parse). The corpus
+comes from synthetic_corpus.py (raw bodies, so cleaning is exercised too).
+Peak memory is Python-heap peak measured with tracemalloc.
+
+Usage:
+    python bench_stream_pipeline.py --emails 2000
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sqlite3
+import tempfile
+import time
+import tracemalloc
+
+import pandas as pd
+
+import nlp_pipeline
+import outlook_scanner
+import stream_pipeline
+import synthetic_corpus
+from offline_summarizer import detect_severity
+
+SENDER = synthetic_corpus.SENDER
+
+
+def three_step(corpus: str, db_path: str, nlp):
+    # 1 — scan (stand-in mailbox) → DataFrame → SQLite
+    records = [outlook_scanner.clean_record(r)
+               for r in stream_pipeline.CsvMailbox(corpus)]
+    df = pd.DataFrame(records)
+    df["received_time"] = pd.to_datetime(df["received_time"], errors="coerce")
+    outlook_scanner.save_to_sqlite(df, outlook_scanner.build_thread_summary(df),
+                                   SENDER, db_path)
+    del records, df
+
+    # 2 — nlp_pipeline over everything in the DB
+    load_nlp = nlp_pipeline.load_nlp
+    nlp_pipeline.load_nlp = lambda: nlp
+    try:
+        nlp_pipeline.run_pipeline(db_path, use_cache=False)
+    finally:
+        nlp_pipeline.load_nlp = load_nlp
+
+    # 3 — dashboard: merge emails + nlp_results, score severity
+    con = sqlite3.connect(db_path)
+    emails = pd.read_sql("SELECT * FROM emails", con)
+    nlp_df = pd.read_sql("SELECT * FROM nlp_results", con)
+    con.close()
+    merged = emails.merge(nlp_df[["message_id", "top_keywords_json"]],
+                          on="message_id", how="left")
+    return [detect_severity(f"{e['subject']} {e['body'][:500]}".lower())
+            for e in merged.to_dict("records")]
+
+
+def streaming(corpus: str, db_path: str, nlp):
+    return stream_pipeline.run_stream_pipeline(
+        stream_pipeline.CsvMailbox(corpus), SENDER, db_path, nlp=nlp,
+        resume=False, use_cache=False)
+
+
+def measure(fn, *args):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        fn(*args)
+    secs = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return secs, peak
+
+
+def run(n_emails: int):
+    nlp = nlp_pipeline.load_nlp()
+    tmp = tempfile.mkdtemp(prefix="bench_stream_")
+    corpus = os.path.join(tmp, "corpus.csv")
+    synthetic_corpus.write_csv(corpus, n_emails, SENDER, raw=True)
+    print(f"[+] Corpus: {n_emails:,} emails ({os.path.getsize(corpus) / 1e6:.1f} MB)")
+
+    print(f"\n{'─'*62}")
+    print(f"  {'FLOW':<14} {'SECONDS':>10} {'EMAILS/S':>10} {'PEAK MB':>10}")
+    print(f"{'─'*62}")
+    for name, fn in [("three-step", three_step), ("streaming", streaming)]:
+        db = os.path.join(tmp, f"{name}.db")
+        secs, peak = measure(fn, corpus, db, nlp)
+        print(f"  {name:<14} {secs:>10.2f} {n_emails / secs:>10.1f} {peak / 1e6:>10.1f}")
+        os.remove(db)
+    print(f"{'─'*62}")
+    os.remove(corpus)
+    os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--emails", type=int, default=2000)
+    run(ap.parse_args().emails)
@@ -0,0 +1,176 @@
+"""
+doc_cache.py
+────────────
+On-disk cache of parsed spaCy Docs, so re-analysis never re-parses an
+unchanged email.
+
+Docs are stored in spaCy DocBin shards, keyed by a content hash of the text
+plus the model name/version. A later run with new keyword sets, category
+rules or a different noun-chunk cutoff reads the Docs back from the shards
+(tokens, POS, lemmas, dependencies, entities, sentences) instead of running
+the parser again.
+
+Layout
+──────
+  <root>/<lang>_<model>-<version>/
+      index.db            key → (shard, position)      SQLite
+      shard_00000.spacy   DocBin, up to SHARD_SIZE docs
+      shard_00001.spacy   …
+
+Shards are loaded lazily: a shard is only read when one of its docs is
+asked for, and at most MAX_OPEN_SHARDS decoded shards are kept (LRU).
+New docs are buffered and written as a new shard every SHARD_SIZE docs or
+on close(). Switching model/version simply starts a fresh directory.
+
+Usage:
+    with DocCache(nlp) as cache:
+        for doc in cache.pipe(texts):
+            ...
+"""
+
+import hashlib
+import os
+import sqlite3
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from spacy.tokens import DocBin
+
+CACHE_DIR       = ".doc_cache"
+SHARD_SIZE      = 1000
+MAX_OPEN_SHARDS = 4
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha1((text or "").encode("utf-8")).hexdigest()
+
+
+def model_tag(nlp) -> str:
+    meta = getattr(nlp, "meta", {}) or {}
+    return (f"{meta.get('lang', 'xx')}_{meta.get('name', 'model')}"
+            f"-{meta.get('version', '0')}")
+
+
+class DocCache:
+    """Content-addressed DocBin store for one spaCy model version."""
+
+    def __init__(self, nlp, root: str = CACHE_DIR,
+                 shard_size: int = SHARD_SIZE,
+                 max_open_shards: int = MAX_OPEN_SHARDS):
+        self.nlp        = nlp
+        self.dir        = os.path.join(root, model_tag(nlp))
+        self.shard_size = shard_size
+        self.max_open   = max_open_shards
+        os.makedirs(self.dir, exist_ok=True)
+
+        self._index = sqlite3.connect(os.path.join(self.dir, "index.db"))
+        self._index.execute("""
+            CREATE TABLE IF NOT EXISTS docs (
+                key   TEXT PRIMARY KEY,
+                shard INTEGER NOT NULL,
+                pos   INTEGER NOT NULL
+            )
+        """)
+        self._index.commit()
+        row = self._index.execute("SELECT MAX(shard) FROM docs").fetchone()
+        self._next_shard = (row[0] + 1) if row[0] is not None else 0
+
+        self._open: "OrderedDict[int, list]" = OrderedDict()   # shard → [Doc]
+        self._pending: Dict[str, object] = {}                   # key → Doc
+        self.hits = self.misses = 0
+
+    # ── lookup ────────────────────────────────────────────────────────────────
+
+    def _shard_path(self, shard: int) -> str:
+        return os.path.join(self.dir, f"shard_{shard:05d}.spacy")
+
+    def _load_shard(self, shard: int) -> list:
+        if shard in self._open:
+            self._open.move_to_end(shard)
+            return self._open[shard]
+        docs = list(DocBin().from_disk(self._shard_path(shard))
+                    .get_docs(self.nlp.vocab))
+        self._open[shard] = docs
+        if len(self._open) > self.max_open:
+            self._open.popitem(last=False)
+        return docs
+
+    def get(self, text: str):
+        """Cached Doc for `text`, or None."""
+        key = text_hash(text)
+        if key in self._pending:
+            return self._pending[key]
+        row = self._index.execute(
+            "SELECT shard, pos FROM docs WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        return self._load_shard(row[0])[row[1]]
+
+    # ── parse-through ─────────────────────────────────────────────────────────
+
+    def pipe(self, texts: Iterable[str], batch_size: int = 64) -> Iterator:
+        """
+        Yield one Doc per text, in order. Cached docs are read from the
+        shards; misses are parsed with nlp.pipe() in batches and stored.
+        """
+        batch: List[str] = []
+        for text in texts:
+            batch.append(text or "")
+            if len(batch) >= batch_size:
+                yield from self._resolve(batch, batch_size)
+                batch = []
+        if batch:
+            yield from self._resolve(batch, batch_size)
+
+    def _resolve(self, texts: List[str], batch_size: int) -> List:
+        docs: List[Optional[object]] = [self.get(t) for t in texts]
+        todo = [i for i, d in enumerate(docs) if d is None]
+        self.hits   += len(texts) - len(todo)
+        self.misses += len(todo)
+        if todo:
+            parsed = self.nlp.pipe([texts[i] for i in todo], batch_size=batch_size)
+            for i, doc in zip(todo, parsed):
+                docs[i] = doc
+                self._pending[text_hash(texts[i])] = doc
+            if len(self._pending) >= self.shard_size:
+                self.flush()
+        return docs
+
+    def __call__(self, text: str):
+        return next(iter(self.pipe([text])))
+
+    # ── persistence ───────────────────────────────────────────────────────────
+
+    def flush(self):
+        """Write buffered docs as a new shard and index them."""
+        if not self._pending:
+            return
+        shard = self._next_shard
+        db = DocBin(store_user_data=False)
+        rows = []
+        for pos, (key, doc) in enumerate(self._pending.items()):
+            db.add(doc)
+            rows.append((key, shard, pos))
+        db.to_disk(self._shard_path(shard))
+        self._index.executemany(
+            "INSERT OR REPLACE INTO docs (key, shard, pos) VALUES (?, ?, ?)", rows)
+        self._index.commit()
+        self._next_shard += 1
+        self._pending.clear()
+
+    def close(self):
+        self.flush()
+        self._index.close()
+        self._open.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def stats(self) -> Dict[str, int]:
+        n = self._index.execute("SELECT COUNT(*) FROM docs").fetchone()[0]
+        return {"hits": self.hits, "misses": self.misses,
+                "stored_docs": n + len(self._pending),
+                "shards": self._next_shard}
@@ -0,0 +1,511 @@
+"""
+email_store.py
+──────────────
+SQLite storage layer shared by outlook_scanner.py, nlp_pipeline.py and app.py.
+
+All senders live in ONE set of tables, keyed by a `sender_key` column:
+
+  emails          raw emails          PRIMARY KEY (sender_key, message_id)
+  email_threads   thread aggregates   PRIMARY KEY (sender_key, thread_id)
+                  (merged incrementally, see upsert_threads)
+  nlp_results     spaCy NLP results   (written by nlp_pipeline.py)
+  scan_log        one row per scan run (created by outlook_scanner.init_db)
+
+Dedup is done by the primary key: inserts use INSERT OR IGNORE, so re-running
+a scan never duplicates rows and no ID set has to be loaded into Python.
+
+Older databases used one table per sender (emails_<key>, email_threads_<key>,
+nlp_<key>) or a single `emails` table without a sender column.
+migrate_legacy_tables() folds both layouts into the unified tables; it is
+idempotent and called automatically from create_schema(), which only
+touches the per-sender tables of senders recorded in scan_log.
+
+Pure stdlib — importable on any OS (no Outlook / pywin32 needed).
+"""
+
+import re
+import sqlite3
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List
+
+EMAILS_TABLE  = "emails"
+THREADS_TABLE = "email_threads"
+NLP_TABLE     = "nlp_results"
+
+# Column order matters: it is the INSERT column list for insert_emails()
+EMAIL_COLUMNS = [
+    ("sender_key",         "TEXT NOT NULL"),
+    ("message_id",         "TEXT NOT NULL"),
+    ("subject",            "TEXT"),
+    ("thread_subject",     "TEXT"),
+    ("thread_id",          "TEXT"),
+    ("is_reply",           "INTEGER"),
+    ("direction",          "TEXT"),
+    ("sender_name",        "TEXT"),
+    ("sender_email",       "TEXT"),
+    ("received_time",      "TEXT"),
+    ("folder_path",        "TEXT"),
+    ("body",               "TEXT"),
+    ("body_length",        "INTEGER"),
+    ("has_attachments",    "INTEGER"),
+    ("attachment_count",   "INTEGER"),
+    ("scanned_at",         "TEXT"),
+    ("thread_email_count", "INTEGER"),
+    ("ticket_level",       "TEXT"),
+    ("category_hint",      "TEXT"),
+]
+
+THREAD_COLUMNS = [
+    ("sender_key",           "TEXT NOT NULL"),
+    ("thread_id",            "TEXT NOT NULL"),
+    ("thread_subject",       "TEXT"),
+    ("email_count",          "INTEGER"),
+    ("reply_count",          "INTEGER"),
+    ("first_email_date",     "TEXT"),
+    ("last_email_date",      "TEXT"),
+    ("has_attachments",      "INTEGER"),
+    ("folders",              "TEXT"),
+    ("total_body_length",    "INTEGER"),
+    ("thread_duration_days", "INTEGER"),
+    ("is_active",            "INTEGER"),
+]
+
+_EMAIL_COLS  = [c for c, _ in EMAIL_COLUMNS]
+_THREAD_COLS = [c for c, _ in THREAD_COLUMNS]
+
+# Legacy per-sender table prefixes → unified table, columns the layout always had
+_LEGACY_PREFIXES = [
+    ("email_threads_", THREADS_TABLE, {"thread_id", "email_count"}),   # before "emails_"
+    ("emails_",        EMAILS_TABLE,  {"message_id", "thread_id"}),
+    ("nlp_",           NLP_TABLE,     {"message_id"}),
+]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SENDER KEY
+# ─────────────────────────────────────────────────────────────────────────────
+
+def make_sender_key(sender: str) -> str:
+    """
+    Turn any email/name into a normalised sender key.
+    'fish.john@devops-team.com' → 'fish_john_devops_team_com'
+    'Fish John'                 → 'fish_john'
+    """
+    key = (sender or "").lower().strip()
+    key = re.sub(r"[^a-z0-9]+", "_", key)   # replace non-alphanumeric with _
+    key = key.strip("_")
+    return key
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SCHEMA
+# ─────────────────────────────────────────────────────────────────────────────
+
+def create_schema(con: sqlite3.Connection):
+    """Create the unified tables + indexes (migrating legacy layouts first)."""
+    migrate_legacy_tables(con, sender_keys=_scanned_sender_keys(con))
+    _create_tables_only(con)
+
+    # Composite indexes for the common per-sender and cross-sender queries
+    con.execute(f"CREATE INDEX IF NOT EXISTS idx_emails_sender_time "
+                f"ON {EMAILS_TABLE} (sender_key, received_time)")
+    con.execute(f"CREATE INDEX IF NOT EXISTS idx_emails_sender_thread "
+                f"ON {EMAILS_TABLE} (sender_key, thread_id)")
+    con.execute(f"CREATE INDEX IF NOT EXISTS idx_emails_time "
+                f"ON {EMAILS_TABLE} (received_time)")
+    con.execute(f"CREATE INDEX IF NOT EXISTS idx_threads_sender_last "
+                f"ON {THREADS_TABLE} (sender_key, last_email_date)")
+    con.commit()
+
+
+def _table_columns(con: sqlite3.Connection, table: str) -> List[str]:
+    return [r[1] for r in con.execute(f"PRAGMA table_info([{table}])")]
+
+
+def _tables(con: sqlite3.Connection) -> List[str]:
+    return [r[0] for r in con.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'table'")]
+
+
+def ensure_columns(con: sqlite3.Connection, table: str, columns: List[str]):
+    """
+    Create `table` with `columns` (untyped) if missing, else ALTER TABLE ADD
+    any column it lacks. Used for tables whose shape follows the NLP output.
+    """
+    if table not in _tables(con):
+        con.execute(f"CREATE TABLE [{table}] ("
+                    + ", ".join(f"[{c}]" for c in columns) + ")")
+        return
+    have = set(_table_columns(con, table))
+    for c in columns:
+        if c not in have:
+            con.execute(f"ALTER TABLE [{table}] ADD COLUMN [{c}]")
+            have.add(c)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# INSERT / LOOKUP
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _sql_value(v):
+    """Convert pandas / numpy scalars into something sqlite3 can bind."""
+    if v is None:
+        return None
+    if hasattr(v, "item"):          # numpy scalar → python scalar
+        try:
+            v = v.item()
+        except (ValueError, AttributeError):
+            pass
+    if isinstance(v, bool):
+        return int(v)
+    if isinstance(v, float) and v != v:   # NaN
+        return None
+    return v
+
+
+def _insert_rows(con, table: str, columns: List[str], sender_key: str,
+                 records: Iterable[Dict], verb: str) -> int:
+    placeholders = ", ".join("?" for _ in columns)
+    sql = (f"{verb} INTO {table} ({', '.join(columns)}) "
+           f"VALUES ({placeholders})")
+    rows = (
+        [sender_key] + [_sql_value(rec.get(c)) for c in columns[1:]]
+        for rec in records
+    )
+    before = con.total_changes
+    con.executemany(sql, rows)
+    return con.total_changes - before
+
+
+def insert_emails(con: sqlite3.Connection, sender_key: str,
+                  records: Iterable[Dict]) -> int:
+    """
+    INSERT OR IGNORE email dicts for one sender.
+    Duplicates are rejected by the (sender_key, message_id) primary key.
+    Returns the number of rows actually inserted. Caller commits.
+    """
+    return _insert_rows(con, EMAILS_TABLE, _EMAIL_COLS, sender_key,
+                        records, "INSERT OR IGNORE")
+
+
+def existing_message_ids(con: sqlite3.Connection, sender_key: str,
+                         message_ids: Iterable[str]) -> set:
+    """Which of `message_ids` are already stored (PK lookups, chunked)."""
+    ids, found = list(message_ids), set()
+    for i in range(0, len(ids), 500):
+        chunk = ids[i:i + 500]
+        found.update(r[0] for r in con.execute(
+            f"SELECT message_id FROM {EMAILS_TABLE} "
+            f"WHERE sender_key = ? AND message_id IN ({', '.join('?' * len(chunk))})",
+            [sender_key, *chunk]))
+    return found
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# THREADS — mergeable aggregates, upserted per thread
+# ─────────────────────────────────────────────────────────────────────────────
+#
+# Each email_threads row is the running aggregate of every stored email in
+# the thread. A batch of NEW emails is reduced to one partial aggregate per
+# thread and merged in with INSERT … ON CONFLICT DO UPDATE:
+#
+#   email_count / reply_count / total_body_length   add
+#   first_email_date / last_email_date              min / max
+#   has_attachments                                 or
+#   folders                                         set union (" | " joined)
+#   thread_duration_days / is_active                recomputed from the merge
+#
+# so the cost of an update depends on the batch, not on the thread history.
+# is_active is evaluated as of the thread's last merge; a thread nobody
+# writes to ages past ACTIVE_DAYS unseen, so a report that needs it current
+# tests `last_email_date > cutoff` or calls refresh_thread_activity() first.
+
+ACTIVE_DAYS    = 30
+FOLDER_SEP     = " | "
+
+
+def merge_folders(a: str, b: str) -> str:
+    """Union of two ' | '-joined folder sets, sorted."""
+    parts = set()
+    for v in (a, b):
+        if v:
+            parts.update(p for p in v.split(FOLDER_SEP) if p)
+    return FOLDER_SEP.join(sorted(parts))
+
+
+def _active_cutoff() -> str:
+    return (datetime.now() - timedelta(days=ACTIVE_DAYS)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def thread_delta(rec: Dict) -> Dict:
+    """Partial thread aggregate for a single email record."""
+    received = rec.get("received_time")
+    received = None if received in (None, "", "NaT") else str(received)[:19]
+    return {
+        "thread_id"         : rec.get("thread_id"),
+        "thread_subject"    : rec.get("thread_subject"),
+        "email_count"       : 1,
+        "reply_count"       : int(bool(_sql_value(rec.get("is_reply")))),
+        "first_email_date"  : received,
+        "last_email_date"   : received,
+        "has_attachments"   : int(bool(_sql_value(rec.get("has_attachments")))),
+        "folders"           : rec.get("folder_path") or "",
+        "total_body_length" : int(_sql_value(rec.get("body_length")) or 0),
+    }
+
+
+def upsert_threads(con: sqlite3.Connection, sender_key: str,
+                   deltas: Iterable[Dict]) -> int:
+    """
+    Merge per-thread partial aggregates (build_thread_summary rows of the
+    NEW emails, or thread_delta() dicts) into email_threads. Caller commits.
+    """
+    con.create_function("merge_folders", 2, merge_folders)
+    cutoff = _active_cutoff()
+    rows = []
+    for d in deltas:
+        first = _sql_value(d.get("first_email_date"))
+        last  = _sql_value(d.get("last_email_date"))
+        first = None if first in ("", "NaT") else first
+        last  = None if last in ("", "NaT") else last
+        rows.append((
+            sender_key, d.get("thread_id"), d.get("thread_subject"),
+            int(_sql_value(d.get("email_count")) or 0),
+            int(_sql_value(d.get("reply_count")) or 0),
+            first, last,
+            int(bool(_sql_value(d.get("has_attachments")))),
+            d.get("folders") or "",
+            int(_sql_value(d.get("total_body_length")) or 0),
+            cutoff,
+        ))
+    before = con.total_changes
+    con.executemany(f"""
+        INSERT INTO {THREADS_TABLE} AS t
+               (sender_key, thread_id, thread_subject, email_count, reply_count,
+                first_email_date, last_email_date, has_attachments, folders,
+                total_body_length, thread_duration_days, is_active)
+        SELECT ?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, ?9, ?10,
+               CAST(COALESCE(julianday(?7) - julianday(?6), 0) AS INTEGER),
+               COALESCE(?7 > ?11, 0)
+        WHERE true
+        ON CONFLICT (sender_key, thread_id) DO UPDATE SET
+            thread_subject    = COALESCE(t.thread_subject, excluded.thread_subject),
+            email_count       = t.email_count + excluded.email_count,
+            reply_count       = t.reply_count + excluded.reply_count,
+            first_email_date  = MIN(COALESCE(t.first_email_date, excluded.first_email_date),
+                                    COALESCE(excluded.first_email_date, t.first_email_date)),
+            last_email_date   = MAX(COALESCE(t.last_email_date, excluded.last_email_date),
+                                    COALESCE(excluded.last_email_date, t.last_email_date)),
+            has_attachments   = MAX(t.has_attachments, excluded.has_attachments),
+            folders           = merge_folders(t.folders, excluded.folders),
+            total_body_length = t.total_body_length + excluded.total_body_length,
+            thread_duration_days = CAST(COALESCE(
+                julianday(MAX(COALESCE(t.last_email_date, excluded.last_email_date),
+                              COALESCE(excluded.last_email_date, t.last_email_date)))
+              - julianday(MIN(COALESCE(t.first_email_date, excluded.first_email_date),
+                              COALESCE(excluded.first_email_date, t.first_email_date))),
+                0) AS INTEGER),
+            is_active         = COALESCE(MAX(COALESCE(t.last_email_date, excluded.last_email_date),
+                                             COALESCE(excluded.last_email_date, t.last_email_date))
+                                         > ?11, 0)
+    """, rows)
+    return con.total_changes - before
+
+
+def refresh_thread_activity(con: sqlite3.Connection, sender_key: str = None):
+    """Re-evaluate is_active against today's cutoff (it ages with the clock).
+    Touches every thread of the sender (all senders if None) — run it before
+    reporting, not on every save."""
+    sql = (f"UPDATE {THREADS_TABLE} SET is_active = "
+           f"COALESCE(last_email_date > ?, 0)")
+    params = [_active_cutoff()]
+    if sender_key is not None:
+        sql += " WHERE sender_key = ?"
+        params.append(sender_key)
+    con.execute(sql, params)
+
+
+def rebuild_threads(con: sqlite3.Connection, sender_key: str) -> int:
+    """
+    Recompute this sender's thread aggregates from the emails table in one
+    SQL pass. Used after migrations and as a reference for upsert_threads.
+    """
+    con.create_function("merge_folders", 2, merge_folders)
+    con.execute(f"DELETE FROM {THREADS_TABLE} WHERE sender_key = ?", (sender_key,))
+    con.execute(f"""
+        INSERT INTO {THREADS_TABLE}
+               (sender_key, thread_id, thread_subject, email_count, reply_count,
+                first_email_date, last_email_date, has_attachments, folders,
+                total_body_length, thread_duration_days, is_active)
+        SELECT sender_key, thread_id,
+               (SELECT e2.thread_subject FROM {EMAILS_TABLE} e2
+                 WHERE e2.sender_key = e.sender_key AND e2.thread_id = e.thread_id
+                 ORDER BY e2.received_time LIMIT 1),
+               COUNT(*), SUM(COALESCE(is_reply, 0)),
+               MIN(received_time), MAX(received_time),
+               MAX(COALESCE(has_attachments, 0)),
+               (SELECT group_concat(fp, ?) FROM (
+                    SELECT DISTINCT folder_path AS fp FROM {EMAILS_TABLE} e3
+                     WHERE e3.sender_key = e.sender_key AND e3.thread_id = e.thread_id
+                       AND COALESCE(folder_path, '') != ''
+                     ORDER BY fp)),
+               SUM(COALESCE(body_length, 0)),
+               CAST(COALESCE(julianday(MAX(received_time))
+                           - julianday(MIN(received_time)), 0) AS INTEGER),
+               COALESCE(MAX(received_time) > ?, 0)
+        FROM   {EMAILS_TABLE} e
+        WHERE  sender_key = ? AND thread_id IS NOT NULL
+        GROUP  BY sender_key, thread_id
+    """, (FOLDER_SEP, _active_cutoff(), sender_key))
+    return con.execute(f"SELECT COUNT(*) FROM {THREADS_TABLE} WHERE sender_key = ?",
+                       (sender_key,)).fetchone()[0]
+
+
+def email_known(con: sqlite3.Connection, sender_key: str,
+                message_id: str) -> bool:
+    """Primary-key lookup: is this message already stored for the sender?"""
+    return con.execute(
+        f"SELECT 1 FROM {EMAILS_TABLE} WHERE sender_key = ? AND message_id = ?",
+        (sender_key, message_id),
+    ).fetchone() is not None
+
+
+def list_sender_keys(con: sqlite3.Connection) -> List[str]:
+    return [r[0] for r in con.execute(
+        f"SELECT DISTINCT sender_key FROM {EMAILS_TABLE} ORDER BY sender_key")]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# MIGRATION — per-sender tables / unkeyed `emails` → unified tables
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _copy_into(con, src: str, dst: str, sender_key_sql: str,
+               params: tuple = ()) -> int:
+    """Copy the columns `src` and `dst` share, adding sender_key."""
+    dst_cols = _table_columns(con, dst)
+    shared   = [c for c in _table_columns(con, src)
+                if c in dst_cols and c != "sender_key"]
+    cols     = ", ".join(f"[{c}]" for c in shared)
+    before   = con.total_changes
+    con.execute(
+        f"INSERT OR IGNORE INTO [{dst}] (sender_key, {cols}) "
+        f"SELECT {sender_key_sql}, {cols} FROM [{src}]", params)
+    return con.total_changes - before
+
+
+def _ensure_nlp_table(con, like_table: str):
+    """
+    nlp_results has a dynamic column set (written by pandas). Make sure it
+    exists, has a sender_key column and every column of `like_table`.
+    """
+    ensure_columns(con, NLP_TABLE,
+                   ["sender_key"] + [c for c in _table_columns(con, like_table)
+                                     if c != "sender_key"])
+    con.execute(f"CREATE INDEX IF NOT EXISTS idx_nlp_sender_msg "
+                f"ON {NLP_TABLE} (sender_key, message_id)")
+
+
+def _scanned_sender_keys(con: sqlite3.Connection) -> set:
+    """Sender keys scan_log has seen (the legacy scanner logged them too)."""
+    if "scan_log" not in _tables(con):
+        return set()
+    return {r[0] for r in con.execute("SELECT DISTINCT sender_key FROM scan_log")}
+
+
+def _legacy_table(con, table: str, sender_keys=None):
+    """(unified table, sender_key) when `table` is a legacy per-sender table."""
+    for prefix, dst, required in _LEGACY_PREFIXES:
+        if table.startswith(prefix) and table != dst:
+            key = table[len(prefix):]
+            cols = set(_table_columns(con, table))
+            if (key and make_sender_key(key) == key and "sender_key" not in cols
+                    and required <= cols
+                    and (sender_keys is None or key in sender_keys)):
+                return dst, key
+            return None
+    return None
+
+
+def migrate_legacy_tables(con: sqlite3.Connection,
+                          drop_old: bool = True, sender_keys=None) -> Dict[str, int]:
+    """
+    Fold legacy layouts into the unified tables. Safe to run repeatedly.
+
+      emails (no sender_key)  → emails, sender_key derived from sender_email
+      nlp_results (no key)    → gains a sender_key column, filled the same way
+      emails_<key>            → emails          (sender_key = <key>)
+      email_threads_<key>     → email_threads   (sender_key = <key>)
+      nlp_<key>               → nlp_results     (sender_key = <key>)
+
+    A per-sender table only counts as legacy when <key> is a sender key, it
+    has no sender_key column and it has the columns of its old layout; with
+    `sender_keys`, <key> must also be one of them (create_schema passes the
+    senders in scan_log), so other tables that share a prefix are left alone.
+
+    Returns {legacy_table: rows_copied}. Legacy tables are dropped after a
+    successful copy unless drop_old=False. Legacy thread tables were rebuilt
+    wholesale per scan, so the threads of every migrated sender are then
+    recomputed from their emails (rebuild_threads) whoever runs this.
+    """
+    con.create_function("sender_key_of", 1, make_sender_key)
+    migrated: Dict[str, int] = {}
+    tables = _tables(con)
+
+    # ── Unkeyed single-sender `emails` table (pre multi-sender layout) ────────
+    unkeyed = None
+    if EMAILS_TABLE in tables and "sender_key" not in _table_columns(con, EMAILS_TABLE):
+        unkeyed = "_emails_unkeyed"
+        con.execute(f"ALTER TABLE {EMAILS_TABLE} RENAME TO {unkeyed}")
+        tables = _tables(con)
+
+    legacy = []
+    for t in tables:
+        match = _legacy_table(con, t, sender_keys)
+        if match:
+            legacy.append((t,) + match)
+    if unkeyed is None and not legacy and not (
+            NLP_TABLE in tables and "sender_key" not in _table_columns(con, NLP_TABLE)):
+        return migrated
+
+    # Create the unified tables without recursing into the migration again
+    _create_tables_only(con)
+
+    senders = set()
+    if unkeyed:
+        migrated[EMAILS_TABLE] = _copy_into(
+            con, unkeyed, EMAILS_TABLE, "sender_key_of(sender_email)")
+        senders.update(r[0] for r in con.execute(
+            f"SELECT DISTINCT sender_key_of(sender_email) FROM [{unkeyed}]"))
+        if drop_old:
+            con.execute(f"DROP TABLE [{unkeyed}]")
+
+    if NLP_TABLE in _tables(con) and "sender_key" not in _table_columns(con, NLP_TABLE):
+        con.execute(f"ALTER TABLE {NLP_TABLE} ADD COLUMN sender_key TEXT")
+        con.execute(f"UPDATE {NLP_TABLE} SET sender_key = sender_key_of(sender_email)")
+        migrated[NLP_TABLE] = con.execute(
+            f"SELECT COUNT(*) FROM {NLP_TABLE}").fetchone()[0]
+
+    for src, dst, key in legacy:
+        if dst == NLP_TABLE:
+            _ensure_nlp_table(con, src)
+        migrated[src] = _copy_into(con, src, dst, "?", (key,))
+        if dst != NLP_TABLE:
+            senders.add(key)
+        if drop_old:
+            con.execute(f"DROP TABLE [{src}]")
+
+    # Copied thread rows are not mergeable totals — recompute them
+    for key in senders.intersection(list_sender_keys(con)):
+        rebuild_threads(con, key)
+
+    con.commit()
+    return migrated
+
+
+def _create_tables_only(con):
+    cols = ", ".join(f"{c} {t}" for c, t in EMAIL_COLUMNS)
+    con.execute(f"CREATE TABLE IF NOT EXISTS {EMAILS_TABLE} "
+                f"({cols}, PRIMARY KEY (sender_key, message_id))")
+    cols = ", ".join(f"{c} {t}" for c, t in THREAD_COLUMNS)
+    con.execute(f"CREATE TABLE IF NOT EXISTS {THREADS_TABLE} "
+                f"({cols}, PRIMARY KEY (sender_key, thread_id))")
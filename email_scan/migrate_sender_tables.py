@@ -0,0 +1,57 @@
+"""
+migrate_sender_tables.py
+────────────────────────
+One-off migration from the old per-sender layout to the unified tables.
+
+  emails_<key> / email_threads_<key> / nlp_<key>  →  emails / email_threads / nlp_results
+  emails (single sender, no sender_key column)    →  emails  (sender_key from sender_email)
+
+init_db() in outlook_scanner.py runs the same migration automatically
+for the senders in scan_log (thread aggregates are recomputed from the
+emails either way); this script migrates every table with a per-sender
+layout, lets you inspect what moved, and keep the old tables around with
+--keep until you are happy with the result.
+
+Usage:
+    python migrate_sender_tables.py                 # migrates emails.db
+    python migrate_sender_tables.py other.db --keep
+"""
+
+import argparse
+import sqlite3
+
+import email_store
+
+DB_PATH = "emails.db"
+
+
+def migrate(db_path: str = DB_PATH, keep_old: bool = False) -> dict:
+    con = sqlite3.connect(db_path)
+    try:
+        migrated = email_store.migrate_legacy_tables(con, drop_old=not keep_old)
+        email_store.create_schema(con)
+        senders = email_store.list_sender_keys(con)
+    finally:
+        con.close()
+
+    if not migrated:
+        print(f"[✓] {db_path} already uses the unified layout — nothing to do.")
+    else:
+        print(f"\n{'─'*62}")
+        print(f"  {'LEGACY TABLE':<45} {'ROWS':>10}")
+        print(f"{'─'*62}")
+        for table, rows in sorted(migrated.items()):
+            print(f"  {table:<45} {rows:>10}")
+        print(f"{'─'*62}")
+        print(f"  Old tables {'kept' if keep_old else 'dropped'}.")
+    print(f"[i] Senders in [{email_store.EMAILS_TABLE}]: {len(senders)}")
+    return migrated
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__.split("\n")[3])
+    ap.add_argument("db_path", nargs="?", default=DB_PATH)
+    ap.add_argument("--keep", action="store_true",
+                    help="copy only, do not drop the legacy tables")
+    args = ap.parse_args()
+    migrate(args.db_path, keep_old=args.keep)
@@ -28,6 +28,8 @@ import spacy
 from collections import Counter
 from typing import List, Dict, Any
 
+import email_store
+
 try:
     import textstat
     HAS_TEXTSTAT = True
@@ -36,6 +38,8 @@ except ImportError:
 
 DB_PATH   = "emails.db"
 SPACY_MODEL = "en_core_web_sm"   # upgrade to en_core_web_md for better accuracy
+USE_DOC_CACHE   = True           # reuse parsed Docs from doc_cache.py shards
+MIN_CHUNK_WORDS = 2              # noun chunks shorter than this are ignored
 
 # ── Domain keyword sets for category tagging ──────────────────────────────────
 CATEGORY_KEYWORDS = {
@@ -98,10 +102,19 @@ def get_category(tokens_lower: List[str]) -> str:
     return best if scores[best] > 0 else "General"
 
 
+MAX_TEXT_CHARS = 100_000   # cap to avoid memory issues
+
+
 def analyse_text(text: str, nlp) -> Dict[str, Any]:
     """Full spaCy analysis of a single text blob."""
-    doc = nlp(text[:100_000])   # cap to avoid memory issues
+    return analyse_doc(nlp(text[:MAX_TEXT_CHARS]), text)
 
+
+def analyse_doc(doc, text: str) -> Dict[str, Any]:
+    """
+    Full analysis of an already-parsed Doc (see analyse_text).
+    Split out so callers can parse in bulk with nlp.pipe().
+    """
     # ── Basic token stats ──────────────────────────────────────────────────────
     tokens_alpha  = [t.text.lower() for t in doc if t.is_alpha]
     tokens_no_stop= [t.text.lower() for t in doc if t.is_alpha and not t.is_stop]
@@ -125,7 +138,7 @@ def analyse_text(text: str, nlp) -> Dict[str, Any]:
 
     # ── Noun chunks (key phrases) ──────────────────────────────────────────────
     chunks = [chunk.text.lower() for chunk in doc.noun_chunks
-              if len(chunk.text.split()) >= 2]
+              if len(chunk.text.split()) >= MIN_CHUNK_WORDS]
     top_chunks = [c for c, _ in Counter(chunks).most_common(15)]
 
     # ── Top keywords (lemmatised, no stopwords) ────────────────────────────────
@@ -169,7 +182,11 @@ def analyse_text(text: str, nlp) -> Dict[str, Any]:
 
 def analyse_subject(subject: str, nlp) -> Dict[str, Any]:
     """Lightweight NLP on subject line only."""
-    doc = nlp(subject or "")
+    return analyse_subject_doc(nlp(subject or ""))
+
+
+def analyse_subject_doc(doc) -> Dict[str, Any]:
+    """analyse_subject for an already-parsed Doc."""
     subj_entities = [(ent.text, ent.label_) for ent in doc.ents]
     subj_keywords = [t.lemma_.lower() for t in doc
                      if t.is_alpha and not t.is_stop]
@@ -179,32 +196,55 @@ def analyse_subject(subject: str, nlp) -> Dict[str, Any]:
     }
 
 
-def run_pipeline(db_path: str = DB_PATH):
-    """Load emails from SQLite, analyse, write nlp_results table."""
+def run_pipeline(db_path: str = DB_PATH, use_cache: bool = USE_DOC_CACHE):
+    """
+    Load emails from SQLite, analyse, write nlp_results table.
+    With use_cache, parsed Docs come from / go to the DocBin cache, so only
+    new or edited emails are run through the spaCy parser.
+    """
     nlp = load_nlp()
 
     con = sqlite3.connect(db_path)
-    df  = pd.read_sql("SELECT * FROM emails", con)
+    email_store.create_schema(con)   # folds legacy per-sender tables in
+    df  = pd.read_sql(f"SELECT * FROM {email_store.EMAILS_TABLE}", con)
     print(f"[+] Analysing {len(df)} emails with spaCy…")
 
+    bodies   = [str(b or "")[:MAX_TEXT_CHARS] for b in df.get("body", [])]
+    subjects = [str(s or "") for s in df.get("subject", [])]
+    cache    = None
+    if use_cache:
+        from doc_cache import DocCache
+        cache = DocCache(nlp)
+        parse = cache.pipe
+    else:
+        parse = nlp.pipe
+    body_docs = parse(bodies)
+    subj_docs = parse(subjects)
+
     results = []
     for i, row in df.iterrows():
         print(f"   [{i+1}/{len(df)}] {str(row.get('subject',''))[:50]}")
-        combined_text = f"{row.get('subject','')} {row.get('body','')}"
 
         nlp_row = {
+            "sender_key"    : row.get("sender_key", ""),
             "message_id"    : row.get("message_id", ""),
             "subject"       : row.get("subject", ""),
             "sender_email"  : row.get("sender_email", ""),
             "sender_name"   : row.get("sender_name", ""),
             "received_time" : row.get("received_time", ""),
         }
-        nlp_row.update(analyse_text(row.get("body", ""), nlp))
-        nlp_row.update(analyse_subject(row.get("subject", ""), nlp))
+        nlp_row.update(analyse_doc(next(body_docs), row.get("body", "") or ""))
+        nlp_row.update(analyse_subject_doc(next(subj_docs)))
         results.append(nlp_row)
 
+    if cache is not None:
+        print(f"[i] Doc cache: {cache.stats()}")
+        cache.close()
+
     nlp_df = pd.DataFrame(results)
-    nlp_df.to_sql("nlp_results", con, if_exists="replace", index=False)
+    nlp_df.to_sql(email_store.NLP_TABLE, con, if_exists="replace", index=False)
+    con.execute(f"CREATE INDEX IF NOT EXISTS idx_nlp_sender_msg "
+                f"ON {email_store.NLP_TABLE} (sender_key, message_id)")
     con.commit()
     con.close()
     print(f"\n[✓] NLP enrichment complete → nlp_results table in {db_path}")
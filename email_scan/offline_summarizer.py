@@ -186,6 +186,17 @@ def domain_score_sentences(text: str, n: int = 5) -> List[str]:
     return [s for sc, s in scored[:n] if sc > 0]
 
 
+def detect_severity(text_lower: str) -> str:
+    """'High' / 'Medium' / 'Low' from SEVERITY_WORDS (text must be lower-cased)."""
+    for word in SEVERITY_WORDS["high"]:
+        if word in text_lower:
+            return "High"
+    for word in SEVERITY_WORDS["medium"]:
+        if word in text_lower:
+            return "Medium"
+    return "Low"
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # SINGLE EMAIL ANALYSIS
 # ─────────────────────────────────────────────────────────────────────────────
@@ -214,14 +225,7 @@ def analyse_single_email(subject: str, body: str,
 
     # ── 3. Severity detection ─────────────────────────────────────────────────
     text_lower = clean_text.lower()
-    severity = "Low"
-    for word in SEVERITY_WORDS["high"]:
-        if word in text_lower:
-            severity = "High"; break
-    if severity != "High":
-        for word in SEVERITY_WORDS["medium"]:
-            if word in text_lower:
-                severity = "Medium"; break
+    severity = detect_severity(text_lower)
 
     # ── 4. Action detection ───────────────────────────────────────────────────
     actions_found = []
@@ -405,13 +409,7 @@ def analyse_batch(emails: List[Dict]) -> Dict[str, Any]:
     for em in emails:
         text = f"{em.get('subject','')} {em.get('body','')[:500]}"
         sl   = text.lower()
-        sev  = "Low"
-        for w in SEVERITY_WORDS["high"]:
-            if w in sl: sev = "High"; break
-        if sev != "High":
-            for w in SEVERITY_WORDS["medium"]:
-                if w in sl: sev = "Medium"; break
-        severity_counts[sev] += 1
+        severity_counts[detect_severity(sl)] += 1
         issue_types[_classify_issue(em.get("subject",""), sl)] += 1
 
     # ── Top sentences across ALL emails (TF-IDF) ──────────────────────────────
@@ -4,37 +4,48 @@ outlook_scanner.py
 Scans ALL Outlook folders + subfolders recursively for emails from a specific sender.
 
 KEY BEHAVIOURS:
-  ✅ Multi-sender isolation  — each sender gets their own table in SQLite
-                               scanning Fish John never touches Rajesh Sharma's data
+  ✅ Multi-sender storage    — one set of tables keyed by sender_key
+                               scanning Fish John never touches Rajesh Sharma's rows
   ✅ Incremental scanning    — remembers last scan date, only fetches NEW emails
   ✅ Full scan on first run  — auto-detects when a sender is brand new
   ✅ Force full rescan flag  — FORCE_FULL_SCAN = True if you ever need it
-  ✅ Deduplication by EntryID — same email never inserted twice
+  ✅ Deduplication by EntryID — (sender_key, message_id) primary key +
+                               INSERT OR IGNORE, no in-memory ID set
   ✅ Scan log table          — records every run: who, when, how many found
 
-SQLite table layout
+SQLite table layout  (see email_store.py)
 ───────────────────
-  emails_<sender_key>        raw emails for this sender
-  email_threads_<sender_key> thread grouping for this sender
-  nlp_<sender_key>           spaCy NLP results for this sender   (written by nlp_pipeline.py)
-  scan_log                   one row per scan run (all senders)
+  emails          raw emails, all senders       PK (sender_key, message_id)
+  email_threads   thread grouping, all senders  PK (sender_key, thread_id)
+  nlp_results     spaCy NLP results             (written by nlp_pipeline.py)
+  scan_log        one row per scan run (all senders)
 
   Example for fish.john@devops-team.com:
-    emails_fish_john_devops_team_com
-    email_threads_fish_john_devops_team_com
-    nlp_fish_john_devops_team_com
+    SELECT * FROM emails WHERE sender_key = 'fish_john_devops_team_com'
+
+  Databases from the old per-sender layout (emails_<key>, email_threads_<key>,
+  nlp_<key>) are migrated automatically by init_db(), or explicitly with
+  `python migrate_sender_tables.py`.
 
 Requirements:
     pip install pywin32 pandas
 """
 
-import win32com.client
 import pandas as pd
 import re
 import sqlite3
 import hashlib
 from datetime import datetime, timezone
 
+import email_store
+from email_store import make_sender_key
+
+try:
+    import win32com.client
+    HAS_WIN32 = True
+except ImportError:       # not on Windows — stand-in mailboxes still work
+    HAS_WIN32 = False
+
 # ── CONFIG ────────────────────────────────────────────────────────────────────
 TARGET_SENDER   = "fish.john@devops-team.com"  # ← email address OR display name
 DB_PATH         = "emails.db"
@@ -46,29 +57,16 @@ FORCE_FULL_SCAN = False         # True = ignore last scan date, re-fetch everyth
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# SENDER KEY — safe SQLite table name from any email/name
+# TABLE NAMES — all senders share the same tables, rows keyed by sender_key
 # ─────────────────────────────────────────────────────────────────────────────
 
-def make_sender_key(sender: str) -> str:
-    """
-    Turn any email/name into a safe SQLite table suffix.
-    'fish.john@devops-team.com' → 'fish_john_devops_team_com'
-    'Fish John'                 → 'fish_john'
-    """
-    key = sender.lower().strip()
-    key = re.sub(r"[^a-z0-9]+", "_", key)   # replace non-alphanumeric with _
-    key = key.strip("_")
-    return key
-
-
 def table_names(sender: str) -> dict:
-    """Return all table names for a given sender."""
-    k = make_sender_key(sender)
+    """Return all table names used for a given sender."""
     return {
-        "emails"   : f"emails_{k}",
-        "threads"  : f"email_threads_{k}",
-        "nlp"      : f"nlp_{k}",
-        "scan_log" : "scan_log",         # shared across all senders
+        "emails"   : email_store.EMAILS_TABLE,
+        "threads"  : email_store.THREADS_TABLE,
+        "nlp"      : email_store.NLP_TABLE,
+        "scan_log" : "scan_log",
     }
 
 
@@ -77,7 +75,7 @@ def table_names(sender: str) -> dict:
 # ─────────────────────────────────────────────────────────────────────────────
 
 def init_db(db_path: str):
-    """Create shared tables if they don't exist yet."""
+    """Create shared tables if they don't exist yet (migrates old layouts)."""
     con = sqlite3.connect(db_path)
     con.execute("""
         CREATE TABLE IF NOT EXISTS scan_log (
@@ -93,6 +91,7 @@ def init_db(db_path: str):
             status          TEXT    DEFAULT 'running'
         )
     """)
+    email_store.create_schema(con)
     con.commit()
     con.close()
 
@@ -124,16 +123,13 @@ def get_last_scan_info(db_path: str, sender_key: str) -> dict:
         con.close()
 
 
-def get_existing_entry_ids(db_path: str, emails_table: str) -> set:
-    """Load all known EntryIDs for this sender from SQLite (for dedup)."""
+def count_sender_emails(db_path: str, sender_key: str) -> int:
+    """Number of emails already stored for this sender (index-only count)."""
     con = sqlite3.connect(db_path)
     try:
-        rows = con.execute(
-            f"SELECT message_id FROM [{emails_table}]"
-        ).fetchall()
-        return {r[0] for r in rows}
-    except Exception:
-        return set()   # table doesn't exist yet → no existing IDs
+        return con.execute(
+            f"SELECT COUNT(*) FROM {email_store.EMAILS_TABLE} WHERE sender_key = ?",
+            (sender_key,)).fetchone()[0]
     finally:
         con.close()
 
@@ -176,6 +172,9 @@ def log_scan_done(db_path: str, log_id: int,
 # ─────────────────────────────────────────────────────────────────────────────
 
 def connect_outlook():
+    if not HAS_WIN32:
+        raise RuntimeError("pywin32 is not installed — Outlook scanning "
+                           "needs Windows + desktop Outlook.")
     try:
         outlook = win32com.client.Dispatch("Outlook.Application")
         return outlook.GetNamespace("MAPI")
@@ -293,6 +292,148 @@ def recipient_matches(msg, target: str) -> bool:
     return False
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# MESSAGE STREAM — one raw record per matching Outlook message
+# ─────────────────────────────────────────────────────────────────────────────
+
+def iter_outlook_emails(ns, target_sender: str, db_path: str = DB_PATH,
+                        since_date=None, check_known: bool = False,
+                        scan_sent: bool = SCAN_SENT, stats: dict = None):
+    """
+    Walk every folder and yield one RAW record dict per matching message.
+    Lazy: nothing is buffered, so callers decide how many to pull.
+
+    since_date  — stop each folder once messages get older than this
+    check_known — skip messages already stored for this sender (PK lookup)
+    stats       — optional dict updated with folders_checked / skipped_old /
+                  by_folder counts while iterating
+
+    Bodies are NOT cleaned here; pass each record through clean_record().
+    """
+    stats = stats if stats is not None else {}
+    stats.setdefault("folders_checked", 0)
+    stats.setdefault("skipped_old", 0)
+    stats.setdefault("by_folder", {})
+
+    sender_key = make_sender_key(target_sender)
+    dedup_con  = sqlite3.connect(db_path)   # PK lookups for known EntryIDs
+    seen_ids   = set()                      # this run only
+
+    try:
+        for folder in iter_all_folders(ns):
+            folder_path    = get_folder_path(folder)
+            is_sent_folder = "sent" in folder_path.lower()
+            stats["folders_checked"] += 1
+
+            try:
+                items = folder.Items
+                items.Sort("[ReceivedTime]", True)   # newest first
+            except Exception:
+                continue
+
+            for msg in items:
+                try:
+                    if msg.Class != 43:
+                        continue
+
+                    # ── Incremental date filter ───────────────────────────────
+                    if since_date is not None:
+                        try:
+                            msg_date = pd.to_datetime(str(msg.ReceivedTime))
+                            if msg_date <= since_date:
+                                stats["skipped_old"] += 1
+                                # Outlook sorts newest-first so once we go past
+                                # the cutoff date in this folder we can stop
+                                break
+                        except Exception:
+                            pass
+
+                    entry_id = msg.EntryID
+                    if entry_id in seen_ids:
+                        continue
+
+                    # ── Sender match ──────────────────────────────────────────
+                    from_match = sender_matches(msg, target_sender)
+                    to_match   = (scan_sent and is_sent_folder and
+                                   recipient_matches(msg, target_sender))
+                    if not from_match and not to_match:
+                        continue
+
+                    # ── Dedup check (matching messages only) ──────────────────
+                    if check_known and email_store.email_known(
+                            dedup_con, sender_key, entry_id):
+                        continue
+
+                    seen_ids.add(entry_id)   # add to dedup set immediately
+
+                    # ── Extract ───────────────────────────────────────────────
+                    subject      = (msg.Subject or "").strip()
+                    sender_email = sender_name = ""
+                    try: sender_email = msg.SenderEmailAddress.lower()
+                    except Exception: pass
+                    try: sender_name  = msg.SenderName
+                    except Exception: pass
+
+                    received = ""
+                    try: received = str(msg.ReceivedTime)
+                    except Exception: pass
+
+                    n_attach = 0
+                    try: n_attach = msg.Attachments.Count
+                    except Exception: pass
+
+                    conversation_id = ""
+                    try: conversation_id = msg.ConversationID or ""
+                    except Exception: pass
+
+                    by_folder = stats["by_folder"]
+                    by_folder[folder_path] = by_folder.get(folder_path, 0) + 1
+
+                    yield {
+                        "message_id"       : entry_id,
+                        "subject"          : subject,
+                        "direction"        : "sent" if (to_match and not from_match) else "received",
+                        "sender_name"      : sender_name,
+                        "sender_email"     : sender_email,
+                        "received_time"    : received,
+                        "folder_path"      : folder_path,
+                        "body"             : msg.Body or "",
+                        "has_attachments"  : n_attach > 0,
+                        "attachment_count" : n_attach,
+                        "conversation_id"  : conversation_id,
+                    }
+
+                except Exception:
+                    continue
+    finally:
+        dedup_con.close()
+
+
+def clean_record(rec: dict) -> dict:
+    """
+    Clean the body and derive thread fields for one raw record
+    (as yielded by iter_outlook_emails or any stand-in mailbox).
+    """
+    subject   = (rec.get("subject") or "").strip()
+    body_text = clean_body(rec.get("body") or "")
+    conversation_id = rec.pop("conversation_id", "") or ""
+
+    base_subj = normalise_subject(subject)
+    thread_id = (hashlib.md5(conversation_id.encode()).hexdigest()[:12]
+                 if conversation_id else make_thread_id(base_subj))
+
+    rec.update({
+        "subject"        : subject,
+        "thread_subject" : base_subj,
+        "thread_id"      : thread_id,
+        "is_reply"       : is_reply(subject),
+        "body"           : body_text,
+        "body_length"    : len(body_text),
+        "scanned_at"     : datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    })
+    return rec
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # MAIN SCAN — incremental by default
 # ─────────────────────────────────────────────────────────────────────────────
@@ -316,14 +457,14 @@ def scan_emails(
     if force_full_scan or is_new_sender:
         scan_type       = "full"
         since_date      = None
-        existing_ids    = set()   # full scan: ignore existing IDs (table will be upserted)
+        check_known     = False   # full scan: INSERT OR IGNORE drops duplicates
         print(f"[+] Scan type   : FULL {'(first time for this sender)' if is_new_sender else '(forced)'}")
     else:
         scan_type       = "incremental"
         since_date      = pd.to_datetime(last_info["last_email_date"])
-        existing_ids    = get_existing_entry_ids(db_path, tables["emails"])
+        check_known     = True    # skip extraction of already-stored messages
         print(f"[+] Scan type   : INCREMENTAL (only emails after {since_date.date()})")
-        print(f"[+] Known emails: {len(existing_ids)} already in DB")
+        print(f"[+] Known emails: {count_sender_emails(db_path, sender_key)} already in DB")
         print(f"[+] Last scan   : {last_info['finished_at']}")
 
     print(f"[+] Target      : {target_sender}")
@@ -334,106 +475,20 @@ def scan_emails(
     log_id = log_scan_start(db_path, target_sender, sender_key, scan_type)
 
     ns = connect_outlook()
-    records      = []
-    folder_stats = {}
-    total_checked = 0
-    skipped_old   = 0
-
-    for folder in iter_all_folders(ns):
+    scan_stats = {"folders_checked": 0, "skipped_old": 0, "by_folder": {}}
+    records = []
+    for rec in iter_outlook_emails(ns, target_sender, db_path,
+                                   since_date=since_date,
+                                   check_known=check_known,
+                                   scan_sent=scan_sent,
+                                   stats=scan_stats):
+        records.append(clean_record(rec))
         if len(records) >= max_emails:
             break
 
-        folder_path    = get_folder_path(folder)
-        is_sent_folder = "sent" in folder_path.lower()
-        total_checked += 1
-
-        try:
-            items = folder.Items
-            items.Sort("[ReceivedTime]", True)   # newest first
-        except Exception:
-            continue
-
-        for msg in items:
-            if len(records) >= max_emails:
-                break
-            try:
-                if msg.Class != 43:
-                    continue
-
-                # ── Incremental date filter ───────────────────────────────────
-                if since_date is not None:
-                    try:
-                        msg_date = pd.to_datetime(str(msg.ReceivedTime))
-                        if msg_date <= since_date:
-                            skipped_old += 1
-                            # Outlook sorts newest-first so once we go past
-                            # the cutoff date in this folder we can stop
-                            break
-                    except Exception:
-                        pass
-
-                # ── Dedup check ───────────────────────────────────────────────
-                entry_id = msg.EntryID
-                if entry_id in existing_ids:
-                    continue
-
-                # ── Sender match ──────────────────────────────────────────────
-                from_match = sender_matches(msg, target_sender)
-                to_match   = (scan_sent and is_sent_folder and
-                               recipient_matches(msg, target_sender))
-                if not from_match and not to_match:
-                    continue
-
-                existing_ids.add(entry_id)   # add to dedup set immediately
-
-                # ── Extract ───────────────────────────────────────────────────
-                subject      = (msg.Subject or "").strip()
-                sender_email = sender_name = ""
-                try: sender_email = msg.SenderEmailAddress.lower()
-                except Exception: pass
-                try: sender_name  = msg.SenderName
-                except Exception: pass
-
-                received = ""
-                try: received = str(msg.ReceivedTime)
-                except Exception: pass
-
-                n_attach = 0
-                try: n_attach = msg.Attachments.Count
-                except Exception: pass
-
-                body_text = clean_body(msg.Body or "")
-
-                conversation_id = ""
-                try: conversation_id = msg.ConversationID or ""
-                except Exception: pass
-
-                base_subj = normalise_subject(subject)
-                thread_id = (hashlib.md5(conversation_id.encode()).hexdigest()[:12]
-                             if conversation_id else make_thread_id(base_subj))
-
-                records.append({
-                    "message_id"       : entry_id,
-                    "subject"          : subject,
-                    "thread_subject"   : base_subj,
-                    "thread_id"        : thread_id,
-                    "is_reply"         : is_reply(subject),
-                    "direction"        : "sent" if (to_match and not from_match) else "received",
-                    "sender_name"      : sender_name,
-                    "sender_email"     : sender_email,
-                    "received_time"    : received,
-                    "folder_path"      : folder_path,
-                    "body"             : body_text,
-                    "body_length"      : len(body_text),
-                    "has_attachments"  : n_attach > 0,
-                    "attachment_count" : n_attach,
-                    "scanned_at"       : datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                })
-
-                folder_stats[folder_path] = folder_stats.get(folder_path, 0) + 1
-
-            except Exception:
-                continue
+    folder_stats  = scan_stats["by_folder"]
+    total_checked = scan_stats["folders_checked"]
+    skipped_old   = scan_stats["skipped_old"]
 
     if not records:
         print(f"\n[✓] No NEW emails found (checked {total_checked} folders, "
@@ -508,53 +563,53 @@ def build_thread_summary(df: pd.DataFrame) -> pd.DataFrame:
 
 
 # ─────────────────────────────────────────────────────────────────────────────
-# SAVE — per-sender tables, APPEND not replace
+# SAVE — shared tables keyed by sender_key, APPEND not replace
 # ─────────────────────────────────────────────────────────────────────────────
 
 def save_to_sqlite(df: pd.DataFrame, threads: pd.DataFrame,
                    target_sender: str, db_path: str = DB_PATH):
     """
-    Append NEW emails to this sender's table.
-    Never touches any other sender's tables.
-    Uses INSERT OR IGNORE so re-running is always safe.
+    Append NEW emails for this sender and merge them into its thread
+    aggregates.
+    Only rows with this sender_key are ever written or deleted.
+    Uses INSERT OR IGNORE on the primary key so re-running is always safe.
+    `threads` is build_thread_summary(df); when some emails were already
+    stored it is recomputed over the new rows only, so nothing is counted
+    twice.
     """
-    tables = table_names(target_sender)
-    con    = sqlite3.connect(db_path)
+    sender_key = make_sender_key(target_sender)
+    tables     = table_names(target_sender)
+    init_db(db_path)
+    con        = sqlite3.connect(db_path)
 
     # ── emails table: append only ─────────────────────────────────────────────
-    out = df.copy()
+    known = email_store.existing_message_ids(con, sender_key, df["message_id"]) \
+        if "message_id" in df.columns else set()
+    new   = df[~df["message_id"].isin(known)] if known else df
+    out   = new.copy()
     if "received_time" in out.columns:
         out["received_time"] = out["received_time"].astype(str)
+    inserted = email_store.insert_emails(con, sender_key,
+                                         out.to_dict("records"))
 
-    # Create table if first time, then INSERT OR IGNORE duplicates
-    out.to_sql(tables["emails"], con, if_exists="append", index=False,
-               method="multi")
-
-    # Add UNIQUE constraint on message_id if table is new
-    # (SQLite: silently ignored if already exists)
-    try:
-        con.execute(f"""
-            CREATE UNIQUE INDEX IF NOT EXISTS
-            idx_{tables['emails']}_msgid
-            ON [{tables['emails']}] (message_id)
-        """)
-        con.commit()
-    except Exception:
-        pass
-
-    # ── threads table: rebuild for this sender ────────────────────────────────
-    if not threads.empty:
+    # ── threads table: upsert the new emails' partial aggregates ──────────────
+    if known and not new.empty:
+        threads = build_thread_summary(new)
+    if not new.empty and not threads.empty:
         t = threads.drop(columns=["combined_body"], errors="ignore").copy()
         for col in ["first_email_date", "last_email_date"]:
             if col in t.columns:
-                t[col] = t[col].astype(str)
-        t.to_sql(tables["threads"], con, if_exists="replace", index=False)
+                t[col] = t[col].dt.strftime("%Y-%m-%d %H:%M:%S") \
+                    if pd.api.types.is_datetime64_any_dtype(t[col]) else t[col].astype(str)
+                t[col] = t[col].where(t[col].notna(), None)
+        email_store.upsert_threads(con, sender_key, t.to_dict("records"))
 
     con.commit()
     con.close()
 
-    print(f"[✓] Appended {len(df)} new emails → [{tables['emails']}]")
-    print(f"[✓] Rebuilt threads          → [{tables['threads']}]")
+    print(f"[✓] Appended {inserted} new emails → [{tables['emails']}] "
+          f"({len(df) - inserted} duplicates ignored)")
+    print(f"[✓] Merged threads           → [{tables['threads']}]")
     print(f"[✓] Database                 → {db_path}")
 
 
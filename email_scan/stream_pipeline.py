@@ -0,0 +1,362 @@
+"""
+stream_pipeline.py
+──────────────────
+Single-pass streaming version of the three batch steps
+
+    outlook_scanner.py  →  nlp_pipeline.py  →  offline_summarizer (dashboard)
+
+Every stage is a generator, so one email flows scan → clean → dedup → NLP →
+severity → SQLite before the next batch is pulled. Nothing is materialised
+as a DataFrame; memory is bounded by the spaCy batch size plus one commit
+window, regardless of mailbox size.
+
+    mailbox ─► clean_stage ─► dedup_stage ─► nlp_stage ─► severity_stage ─► sqlite_sink
+               (clean_record)  (PK lookup)   (nlp.pipe)   (detect_severity)  (emails + nlp_results
+                                                                              + checkpoint, 1 txn)
+
+Checkpoint / resume
+───────────────────
+The sink commits every COMMIT_EVERY emails. Each commit writes the emails,
+their NLP rows and the `pipeline_checkpoint` row in ONE transaction, so the
+checkpoint's last_message_id is always something that is really on disk.
+On restart the source is skipped up to and including that message_id. If
+the source no longer contains it, the run starts from the top and the
+(sender_key, message_id) primary key drops everything already stored.
+
+Only an interrupted run is resumed that way: once the source is used up the
+sink clears last_message_id, so the next run reads from the top again —
+Outlook lists newest first, and mail that arrived since sits ahead of
+where the last run stopped. Dedup drops what is already stored.
+
+Mailboxes
+─────────
+  OutlookMailbox  — live Outlook via COM (Windows only)
+  CsvMailbox      — stand-in: streams rows of an emails CSV (any OS)
+
+Usage:
+    python stream_pipeline.py emails_devops.csv --sender fish.john@devops-team.com
+    python stream_pipeline.py --outlook --sender fish.john@devops-team.com
+"""
+
+import argparse
+import csv
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from itertools import islice
+from typing import Dict, Iterable, Iterator
+
+import email_store
+import nlp_pipeline
+from email_store import make_sender_key
+from offline_summarizer import detect_severity, _classify_issue
+from outlook_scanner import (DB_PATH, TARGET_SENDER, SCAN_SENT, clean_record,
+                             connect_outlook, init_db, iter_outlook_emails)
+
+BATCH_SIZE   = 32     # docs per nlp.pipe() batch
+COMMIT_EVERY = 200    # emails per transaction / checkpoint
+PIPELINE     = "stream"
+
+CHECKPOINT_TABLE = "pipeline_checkpoint"
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# MAILBOXES — re-iterable sources of RAW records
+# ─────────────────────────────────────────────────────────────────────────────
+
+class CsvMailbox:
+    """
+    Stand-in mailbox: streams an emails CSV (same columns the scanner writes)
+    row by row. Each iter() re-opens the file, so it can be replayed.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def __iter__(self) -> Iterator[Dict]:
+        csv.field_size_limit(sys.maxsize)
+        with open(self.path, newline="", encoding="utf-8-sig") as fh:
+            for row in csv.DictReader(fh):
+                row.setdefault("conversation_id", "")
+                row["has_attachments"]  = str(row.get("has_attachments")) in ("True", "true", "1")
+                row["attachment_count"] = int(row.get("attachment_count") or 0)
+                yield row
+
+
+class OutlookMailbox:
+    """Live Outlook source (Windows). Yields raw records newest-first."""
+
+    def __init__(self, target_sender: str, db_path: str = DB_PATH,
+                 scan_sent: bool = SCAN_SENT):
+        self.target_sender = target_sender
+        self.db_path       = db_path
+        self.scan_sent     = scan_sent
+        self.stats: Dict   = {}
+
+    def __iter__(self) -> Iterator[Dict]:
+        return iter_outlook_emails(connect_outlook(), self.target_sender,
+                                   self.db_path, scan_sent=self.scan_sent,
+                                   stats=self.stats)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# STAGES
+# ─────────────────────────────────────────────────────────────────────────────
+
+def clean_stage(records: Iterable[Dict]) -> Iterator[Dict]:
+    for rec in records:
+        yield clean_record(rec)
+
+
+def dedup_stage(records: Iterable[Dict], con: sqlite3.Connection,
+                sender_key: str, stats: Dict) -> Iterator[Dict]:
+    """Drop messages already stored for this sender before paying for NLP."""
+    for rec in records:
+        if email_store.email_known(con, sender_key, rec["message_id"]):
+            stats["duplicates"] = stats.get("duplicates", 0) + 1
+            continue
+        yield rec
+
+
+def nlp_stage(records: Iterable[Dict], nlp,
+              batch_size: int = BATCH_SIZE, doc_cache=None) -> Iterator[Dict]:
+    """
+    Attach rec["nlp"] (same fields nlp_pipeline writes). Bodies and subjects
+    are parsed with nlp.pipe() one batch at a time — only `batch_size`
+    records are ever held here. With a DocCache, unchanged texts are read
+    back from its shards instead of being parsed.
+    """
+    parse = doc_cache.pipe if doc_cache is not None else nlp.pipe
+    it = iter(records)
+    while True:
+        batch = list(islice(it, batch_size))
+        if not batch:
+            return
+        bodies   = [(r.get("body") or "")[:nlp_pipeline.MAX_TEXT_CHARS] for r in batch]
+        subjects = [r.get("subject") or "" for r in batch]
+        for rec, text, doc, sdoc in zip(batch, bodies,
+                                        parse(bodies, batch_size=batch_size),
+                                        parse(subjects, batch_size=batch_size)):
+            rec["nlp"] = {
+                **nlp_pipeline.analyse_doc(doc, text),
+                **nlp_pipeline.analyse_subject_doc(sdoc),
+            }
+            yield rec
+
+
+def severity_stage(records: Iterable[Dict]) -> Iterator[Dict]:
+    """Same severity / issue-type rules the dashboard's briefing uses."""
+    for rec in records:
+        subject = rec.get("subject") or ""
+        text_lower = f"{subject} {(rec.get('body') or '')[:500]}".lower()
+        rec["severity"]   = detect_severity(text_lower)
+        rec["issue_type"] = _classify_issue(subject, text_lower)
+        yield rec
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# CHECKPOINT
+# ─────────────────────────────────────────────────────────────────────────────
+
+def init_checkpoint(con: sqlite3.Connection):
+    con.execute(f"""
+        CREATE TABLE IF NOT EXISTS {CHECKPOINT_TABLE} (
+            pipeline        TEXT NOT NULL,
+            sender_key      TEXT NOT NULL,
+            last_message_id TEXT,
+            processed       INTEGER DEFAULT 0,
+            updated_at      TEXT,
+            PRIMARY KEY (pipeline, sender_key)
+        )
+    """)
+    con.commit()
+
+
+def get_checkpoint(con: sqlite3.Connection, sender_key: str,
+                   pipeline: str = PIPELINE) -> Dict:
+    row = con.execute(f"""
+        SELECT last_message_id, processed, updated_at FROM {CHECKPOINT_TABLE}
+        WHERE  pipeline = ? AND sender_key = ?
+    """, (pipeline, sender_key)).fetchone()
+    if not row:
+        return None
+    return {"last_message_id": row[0], "processed": row[1], "updated_at": row[2]}
+
+
+def _save_checkpoint(con, sender_key: str, pipeline: str,
+                     last_message_id: str, processed: int):
+    con.execute(f"""
+        INSERT INTO {CHECKPOINT_TABLE}
+               (pipeline, sender_key, last_message_id, processed, updated_at)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (pipeline, sender_key) DO UPDATE SET
+               last_message_id = excluded.last_message_id,
+               processed       = excluded.processed,
+               updated_at      = excluded.updated_at
+    """, (pipeline, sender_key, last_message_id, processed,
+          datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+
+def skip_to_checkpoint(source: Iterable[Dict], last_message_id: str,
+                       stats: Dict) -> Iterator[Dict]:
+    """
+    Yield records AFTER last_message_id. If it never shows up, replay the
+    source from the top (source must be re-iterable) and let dedup handle it.
+    """
+    if not last_message_id:
+        yield from source
+        return
+    it = iter(source)
+    for rec in it:
+        stats["resumed_skipped"] = stats.get("resumed_skipped", 0) + 1
+        if rec.get("message_id") == last_message_id:
+            yield from it
+            return
+    print(f"[!] Checkpoint {last_message_id} not found in source — "
+          "replaying from the start (duplicates are ignored).")
+    stats["resumed_skipped"] = 0
+    yield from source
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# SINK
+# ─────────────────────────────────────────────────────────────────────────────
+
+def sqlite_sink(records: Iterable[Dict], con: sqlite3.Connection,
+                sender_key: str, pipeline: str = PIPELINE,
+                commit_every: int = COMMIT_EVERY, processed: int = 0,
+                stats: Dict = None) -> Dict:
+    """
+    Write emails + nlp_results rows and merge each email into its thread
+    aggregate; commit (with checkpoint) every
+    `commit_every` emails. When `records` is used up the checkpoint is
+    marked complete (last_message_id cleared). Returns the stats dict.
+    """
+    stats = stats if stats is not None else {}
+    pending, written, last_id, nlp_cols_ready = 0, 0, None, False
+    severity_counts: Dict[str, int] = stats.setdefault("severity", {})
+
+    for rec in records:
+        if not email_store.insert_emails(con, sender_key, [rec]):
+            continue
+        email_store.upsert_threads(con, sender_key,
+                                   [email_store.thread_delta(rec)])
+
+        nlp_row = {
+            "sender_key"    : sender_key,
+            "message_id"    : rec.get("message_id", ""),
+            "subject"       : rec.get("subject", ""),
+            "sender_email"  : rec.get("sender_email", ""),
+            "sender_name"   : rec.get("sender_name", ""),
+            "received_time" : rec.get("received_time", ""),
+            **rec.get("nlp", {}),
+            "severity"      : rec.get("severity"),
+            "issue_type"    : rec.get("issue_type"),
+        }
+        if not nlp_cols_ready:
+            email_store.ensure_columns(con, email_store.NLP_TABLE, list(nlp_row))
+            nlp_cols_ready = True
+        cols = list(nlp_row)
+        con.execute(
+            f"INSERT INTO {email_store.NLP_TABLE} "
+            f"({', '.join(f'[{c}]' for c in cols)}) "
+            f"VALUES ({', '.join('?' for _ in cols)})",
+            [email_store._sql_value(nlp_row[c]) for c in cols])
+
+        sev = rec.get("severity") or "Low"
+        severity_counts[sev] = severity_counts.get(sev, 0) + 1
+        processed += 1
+        written   += 1
+        pending   += 1
+        last_id    = rec.get("message_id")
+        if pending >= commit_every:
+            _save_checkpoint(con, sender_key, pipeline, last_id, processed)
+            con.commit()
+            pending = 0
+
+    # source used up: nothing to resume, the next run starts from the top
+    _save_checkpoint(con, sender_key, pipeline, None, processed)
+    con.commit()
+
+    stats["written"]   = written
+    stats["processed"] = processed   # cumulative across resumed runs
+    return stats
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# RUNNER
+# ─────────────────────────────────────────────────────────────────────────────
+
+def run_stream_pipeline(source: Iterable[Dict],
+                        target_sender: str = TARGET_SENDER,
+                        db_path: str = DB_PATH,
+                        nlp=None,
+                        batch_size: int = BATCH_SIZE,
+                        commit_every: int = COMMIT_EVERY,
+                        resume: bool = True,
+                        pipeline: str = PIPELINE,
+                        use_cache: bool = nlp_pipeline.USE_DOC_CACHE) -> Dict:
+    """
+    Stream `source` (a re-iterable of raw email dicts) through every stage.
+    Returns run stats: processed, duplicates, resumed_skipped, severity, seconds.
+    """
+    sender_key = make_sender_key(target_sender)
+    init_db(db_path)
+    con = sqlite3.connect(db_path)
+    init_checkpoint(con)
+    nlp = nlp or nlp_pipeline.load_nlp()
+
+    cache = None
+    if use_cache:
+        from doc_cache import DocCache
+        cache = DocCache(nlp)
+
+    ckpt  = get_checkpoint(con, sender_key, pipeline) if resume else None
+    stats = {}
+    t0    = time.perf_counter()
+
+    records = skip_to_checkpoint(source, ckpt and ckpt["last_message_id"], stats)
+    records = clean_stage(records)
+    records = dedup_stage(records, con, sender_key, stats)
+    records = nlp_stage(records, nlp, batch_size, doc_cache=cache)
+    records = severity_stage(records)
+    try:
+        sqlite_sink(records, con, sender_key, pipeline, commit_every,
+                    processed=ckpt["processed"] if ckpt else 0, stats=stats)
+    finally:
+        con.close()
+        if cache is not None:
+            stats["doc_cache"] = cache.stats()
+            cache.close()
+
+    stats["seconds"] = round(time.perf_counter() - t0, 3)
+    return stats
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Streaming scan → NLP → severity pipeline")
+    ap.add_argument("csv", nargs="?", help="emails CSV to use as a stand-in mailbox")
+    ap.add_argument("--outlook", action="store_true", help="read live Outlook instead")
+    ap.add_argument("--sender", default=TARGET_SENDER)
+    ap.add_argument("--db", default=DB_PATH)
+    ap.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    ap.add_argument("--commit-every", type=int, default=COMMIT_EVERY)
+    ap.add_argument("--no-resume", action="store_true")
+    args = ap.parse_args()
+
+    if args.outlook:
+        src = OutlookMailbox(args.sender, args.db)
+    elif args.csv:
+        src = CsvMailbox(args.csv)
+    else:
+        ap.error("give a CSV path or --outlook")
+
+    stats = run_stream_pipeline(src, args.sender, args.db,
+                                batch_size=args.batch_size,
+                                commit_every=args.commit_every,
+                                resume=not args.no_resume)
+    print(f"\n[✓] Streamed {stats['written']} new emails in {stats['seconds']}s "
+          f"(duplicates {stats.get('duplicates', 0)}, "
+          f"skipped by checkpoint {stats.get('resumed_skipped', 0)})")
+    print(f"[i] Severity: {stats.get('severity', {})}")
@@ -0,0 +1,365 @@
+"""
+synthetic_corpus.py
+───────────────────
+Deterministic generator of realistic DevOps-style emails for benchmarks and
+offline demos. Same seed + size → byte-identical corpus.
+
+What it produces (shaped like emails_devops.csv):
+  • threads of 1-8 messages with RE: / FW: / RE[2]: chains, ascending times
+  • L1 / L3 tickets, releases, upgrades, maintenance, invoices, meetings
+  • people (PERSON), tool names that hit DOMAIN_SIGNALS (jenkins, kubernetes,
+    terraform, argocd …), money ($14,200), dates ("Friday 14 March") and
+    versions, so NER, severity and the Q&A shortcuts all have something to find
+
+Writers:
+  write_sqlite(db, …)  → `emails` (+ `nlp_results`) in the email_store schema;
+                         the NLP rows are synthesised from the generator's own
+                         ground truth, so no spaCy model is needed
+  write_csv(path, …)   → same columns as the scanner's CSV; raw=True keeps
+                         HTML and quoted reply history for clean_body()
+
+Usage:
+    python synthetic_corpus.py --emails 5000 --db synthetic.db
+    python synthetic_corpus.py --emails 5000 --csv synthetic.csv --raw
+"""
+
+import argparse
+import csv
+import json
+import random
+import re
+import sqlite3
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List
+
+import email_store
+from email_store import make_sender_key
+from outlook_scanner import make_thread_id, normalise_subject
+
+SEED   = 20241021
+SENDER = "fish.john@devops-team.com"
+
+PEOPLE = ["Sneha Roy", "Rajesh Sharma", "Priya Nair", "Arjun Mehta", "Emily Clarke",
+          "Tom Becker", "Aisha Khan", "Carlos Ortega", "Mei Lin", "David Okafor",
+          "Fish John", "Kavya Iyer", "Lukas Novak", "Grace Hopper", "Omar Farouk"]
+TOOLS  = ["Jenkins", "Kubernetes", "Terraform", "ArgoCD", "GitLab", "Docker",
+          "Helm", "AWS", "SonarQube", "Nexus", "Prometheus", "Grafana", "Vault",
+          "EKS", "Trivy"]
+ENVS   = ["prod-eu-1", "prod-us-2", "qa-server-02", "staging-eu", "uat-01", "dr-west"]
+SERVICES = ["payment-service", "order-api", "auth-gateway", "catalog-svc",
+            "notification-worker", "billing-batch"]
+DAYS   = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]
+MONTHS = ["January", "February", "March", "April", "May", "June", "July",
+          "August", "September", "October", "November", "December"]
+
+# topic → (subject templates, body sentence templates, folder, ticket_level,
+#          category_hint, nlp category, sentiment)
+TOPICS = {
+    "l1": (["[L1-TKT-{tkt}] {tool} pipeline failing on {env}",
+            "[L1-TKT-{tkt}] {tool} agent offline – builds queued"],
+           ["Ticket: L1-TKT-{tkt} | Priority: Low | Raised by: {person}.",
+            "{tool} job for {service} failed on {env} with a timeout error.",
+            "Root cause: an orphaned process was holding port 8080.",
+            "Fix applied and the health check is passing again.",
+            "Please add a cleanup step to the {tool} pipeline before deploy.",
+            "Time to resolve: {n} minutes. No escalation needed."],
+           "Inbox / Support / L1-Tickets", "L1", "CICD", "Technical", "Neutral"),
+    "l3": (["[L3-TKT-{tkt}] CRITICAL – {tool} outage on {env}",
+            "[L3-TKT-{tkt}] Deep Dive – {tool} memory leak causing OOM"],
+           ["This is a P0 production incident affecting {service} on {env}.",
+            "{tool} nodes went NotReady at 02:14 and pods were evicted.",
+            "CPU and memory on the workers hit 100% before the crash.",
+            "{person} is leading the incident bridge; {person2} owns comms.",
+            "Customer impact: checkout errors for {n} minutes, breaching the SLA.",
+            "Root cause under investigation; a workaround was applied manually.",
+            "We must schedule a permanent fix before {day} {date}.",
+            "Estimated cost of the downtime is {money}."],
+           "Inbox / Support / L3-Deep-Dives", "L3", "Maintenance", "Technical", "Negative"),
+    "release": (["[RELEASE] Production Release v{ver} – Go/No-Go",
+                 "[RELEASE] Hotfix Release v{ver} – {service} bug"],
+                ["Release v{ver} is planned for {day} {date} at 22:00.",
+                 "Services in scope: {service} and {service2}.",
+                 "{tool} deploy via {tool2} completed successfully on staging.",
+                 "Rollback plan is documented and approved by {person}.",
+                 "Please confirm Go/No-Go by {day} EOD.",
+                 "Thanks everyone, great work on this sprint."],
+                "Inbox / Releases", "Release", "Release", "Technical", "Positive"),
+    "upgrade": (["[UPGRADE] {tool} {ver} → {ver2} – Upgrade Plan",
+                 "[UPGRADE] {tool} LTS upgrade report"],
+                ["We will upgrade {tool} from {ver} to {ver2} on {env}.",
+                 "The migration fixes CVE-2024-{n}, a high severity vulnerability.",
+                 "Staging validation completed by {person} with no regressions.",
+                 "Downtime window: 30 minutes on {day} {date}.",
+                 "Licence renewal for the upgrade is {money} per year.",
+                 "Need approval from {person2} before we proceed."],
+                "Inbox / DevOps / Upgrades", "Upgrade", "Upgrade Tools", "Technical", "Neutral"),
+    "maint": (["[MAINT] {tool} disk cleanup – artifacts purge {month}",
+               "[MAINT] SSL certificate renewal – {n} services"],
+              ["Routine maintenance scheduled for {day} {date}.",
+               "Disk usage on the {tool} controller reached 91% again.",
+               "Old build artifacts and logs will be purged manually.",
+               "SSL certificate rotation for {service} is included.",
+               "This is the third time this quarter; we should automate it.",
+               "No customer impact expected."],
+              "Inbox / DevOps / Maintenance", "Maintenance", "Maintenance", "Technical", "Neutral"),
+    "invoice": (["Invoice {tkt} – {tool} enterprise licence",
+                 "Budget review – cloud cost for {month}"],
+                ["Please find the invoice for {money} attached.",
+                 "The {tool} licence renews on {day} {date}.",
+                 "Our AWS spend this month was {money2}, up 12% on last month.",
+                 "{person} needs to approve the payment before the deadline.",
+                 "We could save {money3} by rightsizing the {env} nodes."],
+                "Inbox / Finance", "", "Finance", "Finance", "Neutral"),
+    "meeting": (["Weekly DevOps sync – agenda {month}",
+                 "Invite: {tool} migration planning call"],
+                ["Agenda for the {day} sync is below.",
+                 "1. {tool} status update from {person}.",
+                 "2. Review of open incidents and action items.",
+                 "3. Capacity planning for {env}.",
+                 "Teams link is in the calendar invite; minutes to follow."],
+                "Inbox / Meetings", "", "Meeting", "Meeting", "Neutral"),
+}
+TOPIC_WEIGHTS = {"l1": 5, "l3": 2, "release": 3, "upgrade": 2, "maint": 3,
+                 "invoice": 1, "meeting": 2}
+REPLY_LINES = ["Thanks, looking into it now.", "Confirmed on my side.",
+               "Escalating to {person} as this is now urgent.",
+               "Resolved – closing the ticket.", "Can we get an update by {day}?",
+               "Adding {person} for visibility.", "Fix deployed via {tool}."]
+
+
+def _fill(tpl: str, ctx: Dict) -> str:
+    return tpl.format(**ctx)
+
+
+def _context(rnd: random.Random, when: datetime) -> Dict:
+    p1, p2 = rnd.sample(PEOPLE, 2)
+    t1, t2 = rnd.sample(TOOLS, 2)
+    s1, s2 = rnd.sample(SERVICES, 2)
+    due = when + timedelta(days=rnd.randint(1, 21))
+    major = rnd.randint(1, 4)
+    return {
+        "person": p1, "person2": p2, "tool": t1, "tool2": t2,
+        "service": s1, "service2": s2, "env": rnd.choice(ENVS),
+        "tkt": rnd.randint(1000, 9999), "n": rnd.randint(3, 480),
+        "ver": f"{major}.{rnd.randint(0, 9)}.{rnd.randint(0, 20)}",
+        "ver2": f"{major}.{rnd.randint(10, 19)}.0",
+        "money": f"${rnd.randint(2, 90) * 100:,}",
+        "money2": f"${rnd.randint(10, 400) * 100:,}",
+        "money3": f"${rnd.randint(5, 60) * 100:,}",
+        "day": DAYS[due.weekday() % 5],
+        "date": f"{due.day} {MONTHS[due.month - 1]}",
+        "month": MONTHS[when.month - 1],
+    }
+
+
+def iter_emails(n_emails: int, sender: str = SENDER, seed: int = SEED,
+                start: datetime = datetime(2024, 1, 1), raw: bool = False
+                ) -> Iterator[Dict]:
+    """
+    Yield `n_emails` records (newest thread last). With raw=True, bodies
+    carry HTML tags and quoted reply history, like Outlook's msg.Body.
+    Each record also has a private "_truth" dict used by write_sqlite().
+    """
+    rnd   = random.Random(seed)
+    name  = sender.split("@")[0].replace(".", " ").title()
+    topics, weights = zip(*TOPIC_WEIGHTS.items())
+    when  = start
+    made  = 0
+    while made < n_emails:
+        topic = rnd.choices(topics, weights)[0]
+        subj_tpls, sent_tpls, folder, level, hint, cat, sentiment = TOPICS[topic]
+        when += timedelta(minutes=rnd.randint(20, 600))
+        ctx   = _context(rnd, when)
+        base  = _fill(rnd.choice(subj_tpls), ctx)
+        length = min(rnd.choice([1, 1, 2, 3, 3, 4, 5, 8]), n_emails - made)
+        t = when
+        history: List[str] = []
+        for k in range(length):
+            if k == 0:
+                subject = base
+                sents = rnd.sample(sent_tpls, min(len(sent_tpls), rnd.randint(3, 6)))
+            else:
+                prefix = rnd.choice(["RE: ", "RE: ", "RE: RE: ", "FW: ", "RE[2]: "])
+                subject = prefix + base
+                sents = [rnd.choice(REPLY_LINES)] + rnd.sample(sent_tpls, 2)
+            t = t + timedelta(minutes=rnd.randint(5, 2880)) if k else t
+            body = "Hi team,\n\n" + "\n".join(_fill(s, ctx) for s in sents) \
+                   + f"\n\n{name}\nDevOps Support"
+            raw_body = body
+            if raw:
+                raw_body = f"<div>{body}</div>"
+                if history:
+                    raw_body += ("\n\n________________________________\nFrom: "
+                                 f"{ctx['person']}\nSent: {t:%A, %d %B %Y}\n"
+                                 + history[-1])
+            history.append(body)
+
+            n_attach = rnd.choice([0, 0, 0, 1, 2])
+            made += 1
+            yield {
+                "message_id"       : f"SYN{seed % 10_000:04d}{made:08d}",
+                "subject"          : subject,
+                "thread_subject"   : normalise_subject(subject),
+                "thread_id"        : make_thread_id(normalise_subject(subject)),
+                "is_reply"         : k > 0,
+                "direction"        : "received",
+                "sender_name"      : name,
+                "sender_email"     : sender.lower(),
+                "received_time"    : t.strftime("%Y-%m-%d %H:%M:%S"),
+                "folder_path"      : folder,
+                "body"             : raw_body,
+                "body_length"      : len(body),
+                "has_attachments"  : n_attach > 0,
+                "attachment_count" : n_attach,
+                "thread_email_count": length,
+                "ticket_level"     : level,
+                "category_hint"    : hint,
+                "_truth"           : {"ctx": ctx, "category": cat,
+                                      "sentiment": sentiment, "clean": body},
+            }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# NLP rows from ground truth (no spaCy needed)
+# ─────────────────────────────────────────────────────────────────────────────
+
+_STOP = {"the", "and", "for", "was", "are", "with", "this", "that", "from",
+         "will", "our", "has", "been", "before", "team", "please", "devops",
+         "support", "per", "now", "all", "any", "again", "into", "not"}
+
+
+def synth_nlp_row(rec: Dict) -> Dict:
+    """nlp_results-shaped row built from the generator's own ground truth."""
+    truth = rec["_truth"]
+    ctx, text = truth["ctx"], truth["clean"]
+    words = [w.strip(".,:;–()!?").lower() for w in text.split()]
+    alpha = [w for w in words if w.isalpha()]
+    kws   = [w for w, _ in Counter(w for w in alpha
+                                   if len(w) > 2 and w not in _STOP).most_common(20)]
+    ents  = ([{"text": ctx["person"], "label": "PERSON"},
+              {"text": ctx["person2"], "label": "PERSON"},
+              {"text": ctx["tool"], "label": "ORG"},
+              {"text": ctx["tool2"], "label": "ORG"}]
+             + [{"text": ctx[k], "label": "MONEY"}
+                for k in ("money", "money2", "money3")]
+             + [{"text": f"{ctx['day']} {ctx['date']}", "label": "DATE"}])
+    ents = [e for e in ents if e["text"] in text]
+    sents = max(1, len([s for s in re.split(r"[.!?]\s+|\n+", text) if s.strip()]))
+    score = {"Positive": 0.6, "Negative": -0.7}.get(truth["sentiment"], 0.0)
+    return {
+        "message_id"       : rec["message_id"],
+        "subject"          : rec["subject"],
+        "sender_email"     : rec["sender_email"],
+        "sender_name"      : rec["sender_name"],
+        "received_time"    : rec["received_time"],
+        "word_count"       : len(alpha),
+        "unique_words"     : len(set(alpha)),
+        "type_token_ratio" : round(len(set(alpha)) / max(1, len(alpha)), 3),
+        "sentence_count"   : sents,
+        "avg_sentence_len" : round(len(alpha) / sents, 1),
+        "entity_types_json": json.dumps(dict(Counter(e["label"] for e in ents))),
+        "top_entities_json": json.dumps(ents),
+        "pos_dist_json"    : json.dumps({}),
+        "top_keywords_json": json.dumps(kws),
+        "top_chunks_json"  : json.dumps([]),
+        "dep_dist_json"    : json.dumps({}),
+        "readability_json" : json.dumps({}),
+        "sentiment_label"  : truth["sentiment"],
+        "sentiment_score"  : score,
+        "positive_hits"    : int(score > 0),
+        "negative_hits"    : int(score < 0),
+        "category"         : truth["category"],
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# WRITERS
+# ─────────────────────────────────────────────────────────────────────────────
+
+def write_sqlite(db_path: str, n_emails: int, sender: str = SENDER,
+                 seed: int = SEED, with_nlp: bool = True) -> int:
+    """Insert the corpus into `emails` (+ `nlp_results`). Returns rows inserted."""
+    key = make_sender_key(sender)
+    con = sqlite3.connect(db_path)
+    email_store.create_schema(con)
+    nlp_cols = None
+    inserted = 0
+    batch: List[Dict] = []
+
+    def flush():
+        nonlocal inserted, nlp_cols
+        inserted += email_store.insert_emails(con, key, batch)
+        if with_nlp:
+            rows = [dict(sender_key=key, **synth_nlp_row(r)) for r in batch]
+            if nlp_cols is None:
+                nlp_cols = list(rows[0])
+                email_store.ensure_columns(con, email_store.NLP_TABLE, nlp_cols)
+            con.executemany(
+                f"INSERT INTO {email_store.NLP_TABLE} "
+                f"({', '.join(nlp_cols)}) VALUES ({', '.join('?' for _ in nlp_cols)})",
+                ([r[c] for c in nlp_cols] for r in rows))
+        batch.clear()
+
+    for rec in iter_emails(n_emails, sender, seed):
+        rec["body"] = rec["_truth"]["clean"]
+        batch.append(rec)
+        if len(batch) >= 1000:
+            flush()
+    if batch:
+        flush()
+    con.commit()
+    con.close()
+    return inserted
+
+
+CSV_COLUMNS = ["message_id", "subject", "sender_name", "sender_email",
+               "received_time", "body", "body_length", "has_attachments",
+               "ticket_level", "category_hint", "thread_subject", "thread_id",
+               "is_reply", "direction", "folder_path", "thread_email_count",
+               "attachment_count"]
+
+
+def write_csv(path: str, n_emails: int, sender: str = SENDER,
+              seed: int = SEED, raw: bool = False) -> int:
+    """Write the scanner's CSV layout. Returns rows written."""
+    n = 0
+    with open(path, "w", newline="", encoding="utf-8-sig") as fh:
+        w = csv.DictWriter(fh, fieldnames=CSV_COLUMNS, extrasaction="ignore")
+        w.writeheader()
+        for rec in iter_emails(n_emails, sender, seed, raw=raw):
+            w.writerow(rec)
+            n += 1
+    return n
+
+
+def load_records(n_emails: int, sender: str = SENDER,
+                 seed: int = SEED) -> List[Dict]:
+    """Corpus as analyse_batch / answer_question input (emails ⋈ nlp_results)."""
+    out = []
+    for rec in iter_emails(n_emails, sender, seed):
+        row = {k: v for k, v in rec.items() if k != "_truth"}
+        row["body"] = rec["_truth"]["clean"]
+        row.update(synth_nlp_row(rec))
+        out.append(row)
+    return out
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Generate a synthetic DevOps email corpus")
+    ap.add_argument("--emails", type=int, default=1000)
+    ap.add_argument("--sender", default=SENDER)
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--db", help="write emails + nlp_results into this SQLite file")
+    ap.add_argument("--csv", help="write the scanner CSV layout to this path")
+    ap.add_argument("--raw", action="store_true",
+                    help="CSV bodies keep HTML + quoted history (uncleaned)")
+    args = ap.parse_args()
+    if not args.db and not args.csv:
+        ap.error("give --db and/or --csv")
+    if args.db:
+        n = write_sqlite(args.db, args.emails, args.sender, args.seed)
+        print(f"[✓] {n} emails → {args.db}")
+    if args.csv:
+        n = write_csv(args.csv, args.emails, args.sender, args.seed, raw=args.raw)
+        print(f"[✓] {n} emails → {args.csv}")
@@ -0,0 +1,95 @@
+# test_stream_pipeline.py
+"""
+Checks for stream_pipeline's checkpoint against a temporary SQLite file:
+an interrupted run resumes after the last committed message, and a run
+that used its source up starts from the top next time, so mail that
+arrived since (listed newest first, as Outlook does) is picked up.
+NLP is replaced by a pass-through stage; needs spaCy installed to import.
+"""
+import os
+import sqlite3
+import tempfile
+
+import pytest
+
+pytest.importorskip("spacy")
+
+import stream_pipeline
+from email_store import EMAILS_TABLE, make_sender_key
+from stream_pipeline import get_checkpoint, run_stream_pipeline
+
+SENDER = "fish.john@devops-team.com"
+
+
+def mail(i):
+    return {"message_id": f"M{i:04d}", "subject": f"Incident {i}", "direction": "received",
+            "sender_name": "Fish John", "sender_email": SENDER,
+            "received_time": f"2024-10-{i % 28 + 1:02d} 09:00:00", "folder_path": "Inbox",
+            "body": f"Service {i} is down.", "has_attachments": False,
+            "attachment_count": 0, "conversation_id": ""}
+
+
+def mailbox(ids):
+    """Newest first, like iter_outlook_emails; fresh dicts on every iter()."""
+    class Mailbox:
+        def __iter__(self):
+            return (mail(i) for i in sorted(ids, reverse=True))
+    return Mailbox()
+
+
+class Interrupted(Exception):
+    pass
+
+
+def interrupted_after(source, n):
+    class Mailbox:
+        def __iter__(self):
+            for k, rec in enumerate(source):
+                if k == n:
+                    raise Interrupted()
+                yield rec
+    return Mailbox()
+
+
+@pytest.fixture
+def run(monkeypatch):
+    monkeypatch.setattr(stream_pipeline, "nlp_stage",
+                        lambda records, *a, **k: (dict(r, nlp={}) for r in records))
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    os.remove(path)
+    yield lambda source, **kw: run_stream_pipeline(source, SENDER, path, nlp=object(),
+                                                   use_cache=False, **kw), path
+    os.remove(path)
+
+
+def stored(path):
+    con = sqlite3.connect(path)
+    try:
+        return {r[0] for r in con.execute(f"SELECT message_id FROM {EMAILS_TABLE}")}
+    finally:
+        con.close()
+
+
+def test_complete_run_then_new_mail_is_picked_up(run):
+    run, path = run
+    stats = run(mailbox(range(1, 11)), commit_every=3)
+    assert stats["written"] == 10
+    con = sqlite3.connect(path)
+    ckpt = get_checkpoint(con, make_sender_key(SENDER))
+    con.close()
+    assert ckpt["last_message_id"] is None and ckpt["processed"] == 10
+    stats = run(mailbox(range(1, 14)), commit_every=3)       # M0011..M0013 arrived on top
+    assert stats["written"] == 3 and stats["duplicates"] == 10
+    assert stats.get("resumed_skipped", 0) == 0
+    assert stored(path) == {f"M{i:04d}" for i in range(1, 14)}
+
+
+def test_interrupted_run_resumes_after_the_last_commit(run):
+    run, path = run
+    with pytest.raises(Interrupted):
+        run(interrupted_after(mailbox(range(1, 11)), 7), commit_every=3)
+    assert stored(path) == {f"M{i:04d}" for i in range(5, 11)}   # two commits of three
+    stats = run(mailbox(range(1, 11)), commit_every=3)
+    assert stats["resumed_skipped"] == 6 and stats["written"] == 4
+    assert stored(path) == {f"M{i:04d}" for i in range(1, 11)}